@@ -0,0 +1,450 @@
+"""
+Origen de correo sin Outlook: directorios de archivos .eml, .mbox y .msg
+(respaldos exportados), para procesarlos en equipos Linux.
+
+Los archivos se analizan en paralelo con multiprocessing (un proceso por
+núcleo). Cada proceso devuelve solo encabezados, vista previa y la lista de
+adjuntos; el cuerpo y el contenido de los adjuntos se vuelven a leer del
+archivo cuando se piden. Con esos datos se arma en memoria el mismo modelo
+de objetos de Outlook que implementa fake_outlook, así que EmailSearch, los
+reportes y export_attachments funcionan sin cambios:
+
+    backend = ArchiveBackend(["/datos/respaldos"])
+    EmailSearch(backend).search(query="from:juan has:attachment")
+
+Estructura: cada ruta raíz es un almacén; cada subdirectorio, una carpeta;
+cada archivo .mbox, una carpeta con el nombre del archivo. Los .msg
+requieren el paquete opcional extract-msg.
+"""
+
+import hashlib
+import html
+import multiprocessing
+import os
+import re
+from datetime import datetime
+from email import policy
+from email.parser import BytesParser
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+
+from fake_outlook import FakeOutlook, MailRecord, PR_PREVIEW
+from outlook_client import OutlookClient
+
+EXTENSIONS = (".eml", ".mbox", ".msg")
+
+# Archivos por tarea de un proceso (reduce el costo de comunicación)
+BATCH_FILES = 200
+# Los .mbox más grandes se reparten en tramos de este tamaño (bytes)
+MBOX_CHUNK = 64 * 1024 * 1024
+PREVIEW_CHARS = 255
+
+# Nombres de carpeta (en minúsculas) que hacen de carpeta predeterminada
+ARCHIVE_FOLDER_NAMES = {
+    6: ("inbox", "bandeja de entrada", "recibidos"),
+    5: ("sent", "sent items", "sent mail", "enviados", "elementos enviados"),
+    16: ("drafts", "borradores"),
+    3: ("trash", "deleted items", "papelera", "elementos eliminados"),
+    23: ("junk", "spam", "correo no deseado"),
+}
+
+SUBJECT_PREFIX_RE = re.compile(r"^\s*((re|rv|fw|fwd|reenv)\s*:\s*)+", re.IGNORECASE)
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+
+
+class ArchiveBackend(OutlookClient):
+    """
+    Correos de archivos .eml/.mbox/.msg con la misma interfaz que
+    OutlookClient (ver backend.MailBackend).
+
+    Attributes:
+        paths: Rutas raíz (una por almacén)
+        messages: Correos cargados
+        errors: Lista de (archivo, error) de los que no se pudieron leer
+    """
+
+    def __init__(self, paths, processes: int = None, progress_callback=None):
+        """
+        Args:
+            paths: Ruta o lista de rutas (directorios o archivos sueltos)
+            processes: Procesos de análisis (None = uno por núcleo; 1 = en
+                       este proceso)
+            progress_callback: Función opcional (current, total, message)
+                               con los archivos analizados
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.messages = 0
+        self.errors = []
+        names = ", ".join(os.path.basename(p.rstrip(os.sep)) or p for p in self.paths)
+        self.model = FakeOutlook(account_email=f"Archivo: {names}")
+        self._load(processes, progress_callback)
+        super().__init__(application=self.model.application)
+
+    # === Carga ===
+
+    def _load(self, processes, progress_callback):
+        folders = {}
+        tasks = []
+        for root in self.paths:
+            store = self.model.add_store(os.path.basename(root.rstrip(os.sep)) or root,
+                                         file_path=root, exchange=False, default_folders=False)
+            folders[(root, "")] = store._root
+            for rel_dir, kind, path in _walk(root):
+                folder = self._folder(folders, root, rel_dir)
+                if kind == "mbox":
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    rel = os.path.join(rel_dir, name) if rel_dir else name
+                    folder = self._folder(folders, root, rel)
+                    tasks.extend((id(folder), "mbox", path, start, end)
+                                 for start, end in _mbox_ranges(path))
+                else:
+                    tasks.append((id(folder), kind, path, None, None))
+            _set_default_folders(store)
+
+        by_id = {id(f): f for f in folders.values()}
+        batches = [tasks[i:i + BATCH_FILES] for i in range(0, len(tasks), BATCH_FILES)]
+        done = 0
+        for summaries, errors, n_tasks in _map(_parse_batch, batches, processes):
+            for folder_key, summary in summaries:
+                self.model.add_message(by_id[folder_key], _record(summary))
+            self.messages += len(summaries)
+            self.errors.extend(errors)
+            done += n_tasks
+            if progress_callback:
+                progress_callback(done, len(tasks),
+                                  f"Analizados: {done}/{len(tasks)} archivos ({self.messages} correos)")
+
+    @staticmethod
+    def _folder(folders, root, rel_dir):
+        """Carpeta del modelo para un directorio relativo (la crea si no existe)."""
+        key = (root, rel_dir)
+        folder = folders.get(key)
+        if folder is None:
+            parent = ArchiveBackend._folder(folders, root, os.path.dirname(rel_dir))
+            folder = folders[key] = parent._add_child(os.path.basename(rel_dir))
+        return folder
+
+
+def _walk(root):
+    """Archivos de correo bajo una ruta: tuplas (directorio relativo, tipo, ruta)."""
+    if os.path.isfile(root):
+        ext = os.path.splitext(root)[1].lower()
+        if ext in EXTENSIONS:
+            yield "", ext[1:], root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        rel_dir = os.path.relpath(dirpath, root)
+        rel_dir = "" if rel_dir == "." else rel_dir
+        for name in sorted(filenames):
+            ext = os.path.splitext(name)[1].lower()
+            if ext in EXTENSIONS:
+                yield rel_dir, ext[1:], os.path.join(dirpath, name)
+
+
+def _mbox_ranges(path, chunk: int = None):
+    """Tramos (inicio, fin) de un .mbox, cortados en límites de mensaje."""
+    chunk = chunk or MBOX_CHUNK
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, "rb") as f:
+        while starts[-1] + chunk < size:
+            f.seek(starts[-1] + chunk)
+            prev = f.readline()  # descartar la línea a medias
+            cut = None
+            while True:
+                pos = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if line.startswith(b"From ") and prev in (b"\n", b"\r\n"):
+                    cut = pos
+                    break
+                prev = line
+            if cut is None:
+                break
+            starts.append(cut)
+    return [(s, e) for s, e in zip(starts, starts[1:] + [size])]
+
+
+def _set_default_folders(store):
+    """Carpetas predeterminadas por nombre; la bandeja de entrada es la raíz si no hay otra."""
+    children = {f.Name.lower(): f for f in store._root._children}
+    for folder_type, names in ARCHIVE_FOLDER_NAMES.items():
+        folder = next((children[n] for n in names if n in children), None)
+        if folder is not None:
+            store._default_folders[folder_type] = folder
+    store._default_folders.setdefault(6, store._root)
+
+
+def _map(func, batches, processes):
+    """Aplica func a cada lote, en paralelo salvo que no valga la pena."""
+    if processes == 1 or len(batches) <= 1:
+        yield from map(func, batches)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(func, batches)
+
+
+# ══════════════ Análisis (en los procesos del pool) ══════════════
+
+def _parse_batch(tasks):
+    """
+    Analiza un lote de archivos.
+
+    Returns:
+        Tupla (resúmenes [(carpeta, resumen)], errores [(archivo, mensaje)],
+        cantidad de tareas)
+    """
+    summaries, errors = [], []
+    for folder_key, kind, path, start, end in tasks:
+        try:
+            if kind == "mbox":
+                for offset, length, raw in _mbox_messages(path, start, end):
+                    summaries.append((folder_key, _summarize(raw, (kind, path, offset, length))))
+            elif kind == "msg":
+                summaries.append((folder_key, _summarize_msg(path)))
+            else:
+                with open(path, "rb") as f:
+                    raw = f.read()
+                summaries.append((folder_key, _summarize(raw, (kind, path, None, None))))
+        except Exception as e:
+            errors.append((path, str(e)))
+    return summaries, errors, len(tasks)
+
+
+def _mbox_messages(path, start, end):
+    """
+    Mensajes de un tramo de .mbox: tuplas (posición, largo en el archivo,
+    bytes del mensaje sin la línea 'From ').
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset, lines = None, []
+        pos = start
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.startswith(b"From ") and (not lines or lines[-1] in (b"\n", b"\r\n")):
+                if offset is not None:
+                    yield offset, pos - offset, _unescape_mbox(lines)
+                offset, lines = pos + len(line), []
+            elif offset is not None:
+                lines.append(line)
+            pos += len(line)
+        if offset is not None:
+            yield offset, pos - offset, _unescape_mbox(lines)
+
+
+def _unescape_mbox(lines) -> bytes:
+    """Quita el escape '>From ' de las líneas del cuerpo (formato mboxrd)."""
+    return b"".join(l[1:] if l.startswith(b">From ") else l for l in lines)
+
+
+def _summarize(raw: bytes, source) -> dict:
+    """Encabezados, vista previa y adjuntos de un mensaje RFC 822."""
+    msg = BytesParser(policy=policy.default).parsebytes(raw)
+    sender_name, sender_email = parseaddr(str(msg.get("From", "")))
+    recipients = []
+    for header, rtype in (("To", 1), ("Cc", 2), ("Bcc", 3)):
+        for name, address in getaddresses([str(v) for v in msg.get_all(header, [])]):
+            if name or address:
+                recipients.append((name or address, address, rtype))
+
+    attachments = []
+    for part in msg.iter_attachments():
+        payload = part.get_payload(decode=True) or b""
+        content_id = (part.get("Content-ID") or "").strip("<> ")
+        name = part.get_filename() or (f"adjunto{len(attachments) + 1}" + _guess_ext(part))
+        inline = part.get_content_disposition() == "inline" and content_id
+        attachments.append((name, len(payload), content_id if inline else ""))
+
+    message_id = (msg.get("Message-ID") or "").strip()
+    references = (msg.get("References") or msg.get("In-Reply-To") or "").split()
+    subject = str(msg.get("Subject", "") or "")
+    return {
+        "source": source,
+        "subject": subject,
+        "sender_name": sender_name or sender_email,
+        "sender_email": sender_email,
+        "recipients": recipients,
+        "received": _parse_date(msg.get("Date"), source[1]),
+        "importance": header_importance(msg),
+        "categories": str(msg.get("Keywords", "") or ""),
+        "unread": "R" not in str(msg.get("Status", "R")),
+        "size": len(raw),
+        "attachments": attachments,
+        "thread": references[0] if references else message_id,
+        "preview": preview_text(_text_body(msg)),
+    }
+
+
+def _summarize_msg(path: str) -> dict:
+    """Resumen de un archivo .msg de Outlook (requiere extract-msg)."""
+    try:
+        import extract_msg
+    except ImportError:
+        raise RuntimeError("Para leer archivos .msg instala el paquete extract-msg")
+    msg = extract_msg.Message(path)
+    try:
+        sender_name, sender_email = parseaddr(msg.sender or "")
+        recipients = []
+        for header, rtype in ((msg.to, 1), (msg.cc, 2), (msg.bcc, 3)):
+            for name, address in getaddresses([header or ""]):
+                if name or address:
+                    recipients.append((name or address, address, rtype))
+        attachments = [
+            (att.longFilename or att.shortFilename or f"adjunto{i + 1}",
+             len(att.data or b"") if isinstance(att.data, bytes) else 0,
+             (getattr(att, "cid", None) or "") if getattr(att, "hidden", False) else "")
+            for i, att in enumerate(msg.attachments)
+        ]
+        body = msg.body or html_to_text(_decode(msg.htmlBody))
+        date = msg.date
+        if isinstance(date, datetime):
+            received = date.astimezone().replace(tzinfo=None) if date.tzinfo else date
+        else:
+            received = _parse_date(date, path)
+        return {
+            "source": ("msg", path, None, None),
+            "subject": msg.subject or "",
+            "sender_name": sender_name or sender_email,
+            "sender_email": sender_email,
+            "recipients": recipients,
+            "received": received,
+            "importance": 1,
+            "categories": "",
+            "unread": False,
+            "size": os.path.getsize(path),
+            "attachments": attachments,
+            "thread": msg.messageId or path,
+            "preview": preview_text(body),
+        }
+    finally:
+        msg.close()
+
+
+def _parse_date(value, path):
+    try:
+        date = parsedate_to_datetime(str(value))
+        return date.astimezone().replace(tzinfo=None) if date.tzinfo else date
+    except Exception:
+        return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def header_importance(msg) -> int:
+    """Importancia de Outlook (0 Baja, 1 Normal, 2 Alta) desde los encabezados."""
+    value = str(msg.get("Importance") or msg.get("X-Priority") or "").strip().lower()
+    if value.startswith(("high", "1", "2")):
+        return 2
+    if value.startswith(("low", "4", "5")):
+        return 0
+    return 1
+
+
+def _guess_ext(part) -> str:
+    import mimetypes
+    return mimetypes.guess_extension(part.get_content_type()) or ""
+
+
+def _text_body(msg) -> str:
+    """Texto del cuerpo; si solo hay HTML, se convierte a texto."""
+    part = msg.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return ""
+    try:
+        content = part.get_content()
+    except Exception:
+        content = _decode(part.get_payload(decode=True))
+    if part.get_content_subtype() == "html":
+        return html_to_text(content)
+    return content
+
+
+def html_to_text(content: str) -> str:
+    """Texto de un cuerpo HTML (sin etiquetas, scripts ni estilos)."""
+    return html.unescape(_TAG_RE.sub(" ", content or ""))
+
+
+def _decode(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value or ""
+
+
+def preview_text(text: str) -> str:
+    """Vista previa: los primeros PREVIEW_CHARS caracteres con espacios normalizados."""
+    return " ".join(text[:PREVIEW_CHARS * 2].split())[:PREVIEW_CHARS]
+
+
+# ══════════════ Modelo en memoria (proceso principal) ══════════════
+
+def _record(summary: dict) -> MailRecord:
+    """MailRecord con cuerpo y adjuntos leídos del archivo bajo demanda."""
+    source = summary["source"]
+    key = f"{source[1]}:{source[2]}".encode("utf-8", errors="replace")
+    recipients = summary["recipients"]
+    props = {PR_PREVIEW: summary["preview"]}
+    for i in range(len(summary["attachments"])):
+        props[("attachment", i)] = _attachment_loader(source, i)
+    return MailRecord(
+        entry_id=hashlib.sha1(key).hexdigest()[:24].upper(),
+        subject=summary["subject"],
+        sender_name=summary["sender_name"],
+        sender_email=summary["sender_email"],
+        to="; ".join(r[0] for r in recipients if r[2] == 1),
+        cc="; ".join(r[0] for r in recipients if r[2] == 2),
+        received=summary["received"],
+        body=_body_loader(source),
+        importance=summary["importance"],
+        categories=summary["categories"],
+        size=summary["size"],
+        attachments=summary["attachments"],
+        recipients=recipients,
+        unread=summary["unread"],
+        conversation_id=hashlib.sha1(summary["thread"].encode("utf-8", errors="replace")).hexdigest()[:16].upper(),
+        conversation_topic=SUBJECT_PREFIX_RE.sub("", summary["subject"]),
+        props=props,
+    )
+
+
+def _read_source(source):
+    kind, path, offset, length = source
+    with open(path, "rb") as f:
+        if offset is None:
+            return f.read()
+        f.seek(offset)
+        return _unescape_mbox(f.read(length).splitlines(keepends=True))
+
+
+def _body_loader(source):
+    def load():
+        try:
+            if source[0] == "msg":
+                import extract_msg
+                msg = extract_msg.Message(source[1])
+                try:
+                    return msg.body or html_to_text(_decode(msg.htmlBody))
+                finally:
+                    msg.close()
+            return _text_body(BytesParser(policy=policy.default).parsebytes(_read_source(source)))
+        except Exception:
+            return ""
+    return load
+
+
+def _attachment_loader(source, index):
+    def load():
+        if source[0] == "msg":
+            import extract_msg
+            msg = extract_msg.Message(source[1])
+            try:
+                return msg.attachments[index].data
+            finally:
+                msg.close()
+        msg = BytesParser(policy=policy.default).parsebytes(_read_source(source))
+        part = list(msg.iter_attachments())[index]
+        return part.get_payload(decode=True) or b""
+    return load
@@ -0,0 +1,245 @@
+"""
+Fachada asyncio sobre OutlookWorker.
+Permite usar el motor de búsqueda desde servicios asíncronos sin bloquear el
+event loop: cada operación es una tarea en la cola del worker (que sigue
+siendo el único thread que toca COM) y su resultado vuelve al loop como un
+asyncio.Future. Muchas corrutinas pueden compartir una misma sesión de
+Outlook; sus tareas se atienden por orden de llegada y prioridad.
+
+    async with AsyncOutlook() as outlook:
+        rows = await outlook.search(subject="factura", max_results=200)
+        async for page in outlook.search_stream(query="from:juan", page_size=100):
+            ...
+        stats = await outlook.export_attachments(rows, "C:/adjuntos")
+
+Cancelar la corrutina (task.cancel(), asyncio.wait_for con timeout) quita la
+operación de la cola si todavía no empezó, o detiene la que está en curso:
+una búsqueda corta sus resultados y una exportación de adjuntos se detiene
+antes del siguiente correo (los archivos ya guardados quedan en el disco).
+"""
+
+import asyncio
+from typing import AsyncIterator, Callable, Optional
+
+from outlook_worker import OutlookWorker
+
+
+class AsyncOutlook:
+    """
+    Cliente asyncio de un OutlookWorker propio.
+
+    Attributes:
+        worker: OutlookWorker (disponible después de start)
+        account_email: Cuenta conectada
+    """
+
+    def __init__(self, client_factory: Optional[Callable] = None, max_streams: int = 16):
+        """
+        Args:
+            client_factory: Función que crea el origen de correo en el thread
+                            del worker (por defecto OutlookClient; también
+                            ArchiveBackend, ImapBackend o Outlook simulado)
+            max_streams: Búsquedas paginadas (search_stream) abiertas a la vez;
+                         las siguientes esperan a que termine alguna
+        """
+        self.client_factory = client_factory
+        self.max_streams = max_streams
+        self.worker = None
+        self.account_email = None
+        self._loop = None
+        self._pending = {}  # número de tarea -> Future
+        self._streams = None  # asyncio.Semaphore de search_stream (creado en start)
+
+    async def start(self) -> "AsyncOutlook":
+        """
+        Inicia el worker y espera la conexión.
+
+        Raises:
+            ConnectionError: si no se pudo conectar al origen de correo
+        """
+        self._loop = asyncio.get_running_loop()
+        self._streams = asyncio.Semaphore(self.max_streams)
+        self.worker = OutlookWorker(None, client_factory=self.client_factory)
+        self.worker.MAX_CURSORS = self.max_streams
+        self.worker.start()
+        await self._loop.run_in_executor(None, self.worker.ready.wait)
+        if self.worker.startup_error:
+            raise ConnectionError(self.worker.startup_error)
+        self.account_email = self.worker.account_email
+        return self
+
+    async def close(self):
+        """Detiene el worker; las operaciones pendientes quedan canceladas."""
+        if self.worker is None:
+            return
+        self.worker.stop()
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        await self._loop.run_in_executor(None, self.worker.join)
+        self.worker = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # === Operaciones ===
+
+    async def search(self, **filters) -> list:
+        """
+        Búsqueda completa (mismos parámetros que EmailSearch.search).
+
+        Returns:
+            Lista de diccionarios sin referencias COM
+        """
+        filters.pop("live", None)  # los cambios en vivo solo llegan a la GUI
+        cursor_id, rows, has_more, _cancelled, _total = await self._call("search", filters)
+        return await self._collect(cursor_id, rows, has_more)
+
+    async def search_stream(self, page_size: int = 100, **filters) -> AsyncIterator[list]:
+        """
+        Búsqueda paginada: entrega lotes de hasta page_size filas a medida que
+        el worker los lee. Entre lote y lote el worker atiende otras tareas.
+        Con max_streams búsquedas abiertas, la siguiente espera su turno en vez
+        de desplazar el cursor de otra (que expiraría a mitad de la lectura).
+
+        Yields:
+            Listas de diccionarios sin referencias COM
+        """
+        filters.pop("live", None)
+        filters.pop("max_results", None)
+        async with self._streams:
+            cursor_id, rows, has_more, cancelled = await self._call(
+                "open_cursor", dict(filters, page_size=page_size))
+            try:
+                if rows:
+                    yield rows
+                while has_more and not cancelled:
+                    rows, has_more, cancelled = await self._call(
+                        "fetch_page", {"cursor_id": cursor_id, "page_size": page_size})
+                    if rows:
+                        yield rows
+            finally:
+                if has_more and self.worker is not None:
+                    # El consumidor dejó de iterar: liberar el cursor en el worker
+                    self.worker.submit("close_cursor", {"cursor_id": cursor_id}, _ignore, _ignore,
+                                       OutlookWorker.PRIORITY_HIGH)
+
+    async def search_stores(self, stores: list, **filters) -> tuple:
+        """
+        Búsqueda en varios almacenes a la vez (ver multistore.search_stores).
+
+        Returns:
+            Tupla (resultados, estadísticas por almacén)
+        """
+        filters.pop("live", None)
+        cursor_id, rows, has_more, _cancelled, _total, stats = await self._call(
+            "search_stores", dict(filters, stores=stores))
+        return await self._collect(cursor_id, rows, has_more), stats
+
+    async def refresh_saved_search(self, name: str) -> tuple:
+        """
+        Actualiza una búsqueda guardada consultando solo correos nuevos.
+
+        Returns:
+            Tupla (resultados fusionados, cantidad de nuevos)
+        """
+        cursor_id, rows, has_more, _cancelled, _total, n_new = await self._call(
+            "refresh_saved_search", {"name": name})
+        return await self._collect(cursor_id, rows, has_more), n_new
+
+    async def _collect(self, cursor_id, rows: list, has_more: bool) -> list:
+        """
+        Resultados completos de una búsqueda que el worker entrega por páginas
+        (la primera llega con la respuesta, las demás se piden con fetch_page).
+        """
+        results = list(rows)
+        try:
+            while has_more:
+                rows, has_more, _cancelled = await self._call("fetch_page", {"cursor_id": cursor_id})
+                results.extend(rows)
+        finally:
+            if has_more and self.worker is not None:
+                self.worker.submit("close_cursor", {"cursor_id": cursor_id}, _ignore, _ignore,
+                                   OutlookWorker.PRIORITY_HIGH)
+        return results
+
+    async def get_detail(self, entry_id: str, store_id: str = None) -> dict:
+        """Detalle completo de un correo (cuerpo, destinatarios, adjuntos)."""
+        detail, = await self._call("get_detail", {"entry_id": entry_id, "store_id": store_id},
+                                   OutlookWorker.PRIORITY_HIGH)
+        return detail
+
+    async def export_attachments(self, results: list, output_dir: str, **options) -> dict:
+        """
+        Exporta los adjuntos de los resultados indicados.
+
+        Args:
+            results: Filas devueltas por search/search_stream
+            output_dir: Directorio destino
+            **options: organize_by, file_types, skip_inline (ver
+                       attachments.export_attachments)
+
+        Returns:
+            Diccionario con el resumen de la exportación
+        """
+        stats, = await self._call("export_attachments",
+                                  dict(options, results=results, output_dir=output_dir))
+        return stats
+
+    async def list_stores(self) -> list:
+        """Almacenes del perfil (buzones y archivos PST)."""
+        stores, = await self._call("list_stores", {})
+        return stores
+
+    async def list_folders(self, **kwargs) -> list:
+        """Carpetas del buzón (ver OutlookClient.list_folders)."""
+        folders, = await self._call("list_folders", kwargs)
+        return folders
+
+    # === Despacho ===
+
+    async def _call(self, task_name: str, kwargs: dict, priority: int = OutlookWorker.PRIORITY_NORMAL) -> tuple:
+        """
+        Envía una tarea al worker y espera sus argumentos de on_success.
+
+        Raises:
+            RuntimeError: con el mensaje de error de la tarea
+        """
+        if self.worker is None:
+            raise RuntimeError("AsyncOutlook no está iniciado (use start() o 'async with').")
+        loop = self._loop
+        future = loop.create_future()
+
+        # Los callbacks corren en el thread del worker: solo agendan en el loop
+        def on_success(*args):
+            loop.call_soon_threadsafe(_resolve, future, args, None)
+
+        def on_error(message):
+            loop.call_soon_threadsafe(_resolve, future, None, RuntimeError(message))
+
+        ticket = self.worker.submit(task_name, kwargs, on_success, on_error, priority)
+        self._pending[ticket] = future
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if self.worker is not None:
+                self.worker.cancel(ticket)
+            raise
+        finally:
+            self._pending.pop(ticket, None)
+
+
+def _resolve(future, result, error):
+    if future.done():  # cancelada mientras el worker terminaba
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _ignore(*args):
+    pass
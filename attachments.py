@@ -15,12 +15,15 @@ def export_attachments(
     file_types: Optional[list] = None,
     skip_inline: bool = True,
     progress_callback: Optional[Callable] = None,
+    cancel_event=None,
+    resolve_item: Optional[Callable] = None,
 ) -> dict:
     """
     Exporta archivos adjuntos de los correos encontrados.
     
     Args:
-        results: Lista de resultados de búsqueda (con _outlook_item)
+        results: Resultados de búsqueda (con _outlook_item, o resolve_item);
+                 se recorren dos veces, sin copiarlos (admite un ResultStore)
         output_dir: Directorio destino para guardar los archivos
         organize_by: Modo de organización:
             - 'flat': Todos en la misma carpeta
@@ -31,6 +34,10 @@ def export_attachments(
                     None = todos los tipos
         skip_inline: Si True, omite imágenes embebidas (inline)
         progress_callback: Función opcional (current, total, message) para reportar progreso
+        cancel_event: threading.Event opcional; si se activa se detiene antes
+                      del siguiente correo (los archivos ya guardados quedan)
+        resolve_item: Función opcional fila -> objeto COM para las filas sin
+                      '_outlook_item' (p. ej. EmailSearch.get_item)
         
     Returns:
         Diccionario con resumen de la exportación
@@ -47,20 +54,25 @@ def export_attachments(
         "errors": 0,
         "error_details": [],
         "files": [],
+        "cancelled": False,
     }
 
-    # Filtrar solo correos con adjuntos
-    emails_with_att = [r for r in results if r.get("has_attachments")]
+    # Solo correos con adjuntos (se cuentan primero para informar el total)
+    total = sum(1 for r in results if r.get("has_attachments"))
     stats["total_emails"] = len(results)
-    stats["emails_with_attachments"] = len(emails_with_att)
+    stats["emails_with_attachments"] = total
 
-    if not emails_with_att:
+    if not total:
         return stats
 
-    total = len(emails_with_att)
-
+    emails_with_att = (r for r in results if r.get("has_attachments"))
     for idx, email_data in enumerate(emails_with_att):
+        if cancel_event is not None and cancel_event.is_set():
+            stats["cancelled"] = True
+            break
         item = email_data.get("_outlook_item")
+        if not item and resolve_item is not None:
+            item = resolve_item(email_data)
         if not item:
             continue
 
@@ -99,7 +111,7 @@ def export_attachments(
                     os.makedirs(target_dir, exist_ok=True)
 
                     # Manejar nombres duplicados
-                    filepath = _get_unique_path(target_dir, filename)
+                    filepath = get_unique_path(target_dir, filename)
 
                     # Guardar archivo
                     att.SaveAsFile(filepath)
@@ -132,7 +144,7 @@ def _get_subfolder(organize_by: str, email_data: dict) -> str:
     """Genera nombre de subcarpeta según el modo de organización."""
     if organize_by == "sender":
         name = email_data.get("sender_name", "Desconocido")
-        return _sanitize_foldername(name)
+        return sanitize_foldername(name)
     elif organize_by == "date":
         date_str = email_data.get("date", "")
         try:
@@ -142,11 +154,11 @@ def _get_subfolder(organize_by: str, email_data: dict) -> str:
             return "sin_fecha"
     elif organize_by == "subject":
         subject = email_data.get("subject", "Sin asunto")
-        return _sanitize_foldername(subject[:50])
+        return sanitize_foldername(subject[:50])
     return ""
 
 
-def _sanitize_foldername(name: str) -> str:
+def sanitize_foldername(name: str) -> str:
     """Sanitiza un nombre de carpeta eliminando caracteres no válidos."""
     invalid_chars = '<>:"/\\|?*'
     for c in invalid_chars:
@@ -154,7 +166,7 @@ def _sanitize_foldername(name: str) -> str:
     return name.strip(". ") or "sin_nombre"
 
 
-def _get_unique_path(directory: str, filename: str) -> str:
+def get_unique_path(directory: str, filename: str) -> str:
     """Genera una ruta única si el archivo ya existe (agrega sufijo numérico)."""
     filepath = os.path.join(directory, filename)
     if not os.path.exists(filepath):
@@ -0,0 +1,72 @@
+"""
+Interfaz de un origen de correo.
+EmailSearch, los reportes y la exportación de adjuntos no dependen de COM
+sino de esta interfaz y del subconjunto del modelo de objetos de Outlook que
+devuelven sus carpetas:
+
+    Carpetas   Name, EntryID, StoreID, FolderPath, Folders, Items, GetTable
+    Items      Count, Sort, Restrict, Find/FindNext, GetFirst/GetNext/GetLast
+    Tablas     Columns (RemoveAll/Add), Sort, Restrict, GetArray, EndOfTable
+               (lectura de columnas en bloque)
+    Correos    propiedades de MailItem, Recipients, PropertyAccessor
+    Adjuntos   Attachments.Count, Item(i).FileName/Size/SaveAsFile/PropertyAccessor
+
+Implementaciones:
+    OutlookClient   Outlook via COM (outlook_client.py)
+    ArchiveBackend  directorios de .eml/.mbox/.msg sin Outlook (archive.py)
+    ImapBackend     servidor IMAP (imap_backend.py)
+"""
+
+
+class MailBackend:
+    """
+    Origen de correo para EmailSearch.
+
+    Attributes:
+        namespace: Objeto Namespace (Folders, Stores, GetDefaultFolder,
+                   GetFolderFromID, GetItemFromID)
+        outlook: Objeto Application (AdvancedSearch; puede no soportarlo)
+        server_body_search: True si Restrict filtra el cuerpo en el origen
+                            (urn:schemas:httpmail:textdescription) y no hace
+                            falta leer Body para body_contains
+    """
+
+    namespace = None
+    outlook = None
+    server_body_search = False
+
+    def get_default_folder(self, folder_type: str = "inbox", store_id: str = None):
+        """Carpeta predeterminada ('inbox', 'sent', ...) del almacén indicado."""
+        raise NotImplementedError
+
+    def get_folder_by_path(self, path: str):
+        """Carpeta por ruta completa ('Almacén/Carpeta/Subcarpeta')."""
+        raise NotImplementedError
+
+    def get_registry(self, rebuild: bool = False):
+        """Registro de carpetas (folder_registry.FolderRegistry)."""
+        raise NotImplementedError
+
+    def list_folders(self, parent=None, indent=0, max_depth=3):
+        """Lista de tuplas (nombre, ruta, cantidad_items, indent)."""
+        raise NotImplementedError
+
+    def list_stores(self) -> list:
+        """Almacenes: diccionarios con name, store_id, kind y file_path."""
+        raise NotImplementedError
+
+    def get_store(self, store_id: str):
+        """Almacén por StoreID."""
+        raise NotImplementedError
+
+    def new_session(self) -> "MailBackend":
+        """Conexión equivalente para usar desde otro thread."""
+        raise NotImplementedError
+
+    def get_account_email(self) -> str:
+        """Dirección (o descripción) de la cuenta principal."""
+        raise NotImplementedError
+
+    def set_instrumentation(self, enabled: bool):
+        """Activa o desactiva la instrumentación de llamadas."""
+        raise NotImplementedError
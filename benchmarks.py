@@ -0,0 +1,557 @@
+"""
+Benchmarks de rendimiento de la herramienta.
+
+Uso:
+    python benchmarks.py startup [--runs 5]
+    python benchmarks.py suite [--items 10000] [--latency 0.00005] [--scenarios search,extract]
+    python benchmarks.py service [--clients 16] [--requests 200] [--distinct 4]
+
+'startup' lanza la aplicación en un proceso nuevo (arranque en frío) y
+reporta el tiempo hasta la pantalla de carga y hasta la interfaz interactiva,
+más el costo de importar los módulos pesados que ahora se cargan bajo demanda.
+
+'suite' ejecuta búsqueda, extracción, búsqueda rápida combinada, exportaciones
+y exportación de adjuntos contra un Outlook simulado (fake_outlook) y reporta
+throughput, latencia p50/p99 y cantidad de llamadas COM. El escenario 'imap'
+repite las búsquedas contra un servidor IMAP simulado (fake_imap).
+
+'service' es una prueba de carga del servicio HTTP (service.py) contra el
+Outlook simulado: varios clientes concurrentes piden un puñado de búsquedas
+distintas y se mide la latencia por pedido y cuántos recorridos reales se
+hicieron, con y sin compartir las búsquedas en curso.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ══════════════ Arranque ══════════════
+
+def _import_cost(module: str) -> float:
+    """Segundos que tarda un import en un intérprete nuevo (None si no está instalado)."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(runs: int = 5, timeout: float = 120.0) -> dict:
+    """
+    Mide el arranque en frío de la GUI.
+
+    Returns:
+        Diccionario con medianas de time_to_splash / time_to_interactive (s)
+        y el costo de import de los módulos diferidos
+    """
+    from gui_app import STARTUP_BENCH_ENV
+
+    samples = []
+    for _ in range(runs):
+        env = dict(os.environ)
+        env[STARTUP_BENCH_ENV] = repr(time.time())
+        proc = subprocess.run(
+            [sys.executable, os.path.join(HERE, "main.py")],
+            cwd=HERE, env=env, capture_output=True, text=True, timeout=timeout,
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f"El arranque falló:\n{proc.stderr.strip()}")
+        samples.append(json.loads(lines[-1]))
+
+    def median(key):
+        values = [s[key] for s in samples if key in s]
+        return round(statistics.median(values), 4) if values else None
+
+    return {
+        "runs": runs,
+        "time_to_splash": median("splash"),
+        "time_to_ui_built": median("ui_built"),
+        "time_to_connected": median("connected"),
+        "time_to_interactive": median("interactive"),
+        "deferred_imports": {
+            m: _import_cost(m) for m in ("pandas", "openpyxl", "win32com.client")
+        },
+    }
+
+
+# ══════════════ Suite contra Outlook simulado ══════════════
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def _report(durations: list, items: int, seconds: float, calls_before: dict, outlook) -> dict:
+    """Arma el reporte de un escenario a partir de latencias por operación."""
+    after = outlook.stats.snapshot()
+    delta = {k: v - calls_before.get(k, 0) for k, v in after.items() if v != calls_before.get(k, 0)}
+    com_calls = sum(delta.values())
+    top = sorted(delta.items(), key=lambda kv: kv[1], reverse=True)[:8]
+    return {
+        "ops": len(durations),
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput_items_s": round(items / seconds, 1) if seconds > 0 else None,
+        "p50_ms": round(_percentile(durations, 50) * 1000, 3),
+        "p99_ms": round(_percentile(durations, 99) * 1000, 3),
+        "com_calls": com_calls,
+        "com_calls_per_item": round(com_calls / items, 2) if items else None,
+        "top_calls": dict(top),
+    }
+
+
+class _DirectApp:
+    """Sustituto de la ventana Tk: ejecuta los callbacks del worker en el acto."""
+
+    def after(self, _ms, fn, *args):
+        fn(*args)
+
+    def _on_search_progress(self, *args, **kwargs):
+        pass
+
+    def _on_attachment_progress(self, *args, **kwargs):
+        pass
+
+
+def _search_queries() -> list:
+    recent = (datetime.now() - timedelta(days=30)).strftime("%d-%m-%Y")
+    return [
+        {"subject": "Factura"},
+        {"sender": "juan"},
+        {"date_from": recent},
+        {"has_attachments": True},
+        {"subject": "Contrato", "has_attachments": True},
+        {"body_contains": "transferencia"},
+    ]
+
+
+def scenario_search(outlook, searcher, max_results: int) -> dict:
+    durations, items = [], 0
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    for q in _search_queries():
+        t = time.perf_counter()
+        items += len(searcher.search(max_results=max_results, **q))
+        durations.append(time.perf_counter() - t)
+    return _report(durations, items, time.perf_counter() - start, before, outlook)
+
+
+def scenario_extract(outlook, searcher, max_results: int) -> dict:
+    items = searcher.client.get_default_folder("inbox").Items
+    items.Sort("[ReceivedTime]", True)
+    durations = []
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    for n, item in enumerate(items):
+        if n >= max_results:
+            break
+        t = time.perf_counter()
+        searcher._extract_email_data(item)
+        durations.append(time.perf_counter() - t)
+    return _report(durations, len(durations), time.perf_counter() - start, before, outlook)
+
+
+def scenario_quick_all(outlook, searcher, max_results: int) -> dict:
+    from outlook_worker import OutlookWorker
+
+    worker = OutlookWorker(_DirectApp())
+    worker.client, worker.searcher = searcher.client, searcher
+    received = []
+    durations = []
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    for term in ("Factura", "juan", "Pago", "Reunión"):
+        t = time.perf_counter()
+        worker._do_quick_search_all(
+            {"term": term, "max_results": max_results},
+            lambda cursor_id, rows, has_more, cancelled, total: received.append(total),
+        )
+        durations.append(time.perf_counter() - t)
+    return _report(durations, sum(received), time.perf_counter() - start, before, outlook)
+
+
+def scenario_threads(outlook, searcher, max_results: int) -> dict:
+    durations, items, threads = [], 0, 0
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    for q in _search_queries():
+        t = time.perf_counter()
+        found = searcher.search_threads(max_threads=max_results, **q)
+        durations.append(time.perf_counter() - t)
+        threads += len(found)
+        items += sum(th["count"] for th in found)
+    report = _report(durations, items, time.perf_counter() - start, before, outlook)
+    report["threads"] = threads
+    return report
+
+
+def scenario_planner(outlook, searcher, max_results: int) -> dict:
+    """Cada consulta con la estrategia elegida y con cada estrategia forzada."""
+    durations, items = [], 0
+    per_strategy = {}
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    for q in _search_queries():
+        for strategy in (None, "restrict", "find", "table"):
+            calls = sum(outlook.stats.snapshot().values())
+            t = time.perf_counter()
+            items += len(searcher.search(max_results=max_results, strategy=strategy, **q))
+            elapsed = time.perf_counter() - t
+            durations.append(elapsed)
+            key = "auto" if strategy is None else strategy
+            entry = per_strategy.setdefault(key, {"ms": 0.0, "com_calls": 0, "chosen": {}})
+            entry["ms"] = round(entry["ms"] + elapsed * 1000, 2)
+            entry["com_calls"] += sum(outlook.stats.snapshot().values()) - calls
+            if strategy is None:
+                chosen = searcher.last_plan.strategy
+                entry["chosen"][chosen] = entry["chosen"].get(chosen, 0) + 1
+    report = _report(durations, items, time.perf_counter() - start, before, outlook)
+    report["per_strategy"] = per_strategy
+    return report
+
+
+def scenario_stores(outlook, searcher, max_results: int) -> dict:
+    """Búsqueda en el buzón + 3 archivos: almacén por almacén vs en paralelo."""
+    from fake_outlook import generate_mailbox
+    from multistore import search_stores
+
+    archive_items = max(100, len(outlook.stores[0]._records_by_id) // 4)
+    latency, outlook.latency = outlook.latency, 0.0
+    for year in (2021, 2022, 2023):
+        if not any(s._display_name == f"Archivo {year}" for s in outlook.stores):
+            generate_mailbox(outlook, f"Archivo {year}", archive_items, seed=year)
+    outlook.latency = latency
+    stores = searcher.client.list_stores()
+
+    durations, items = [], 0
+    sequential = concurrent = 0.0
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    for q in _search_queries():
+        t = time.perf_counter()
+        for store in stores:
+            searcher.search(max_results=max_results, store_id=store["store_id"], **q)
+        sequential += time.perf_counter() - t
+        t = time.perf_counter()
+        results, _ = search_stores(searcher.client, stores, max_results=max_results, **q)
+        elapsed = time.perf_counter() - t
+        concurrent += elapsed
+        durations.append(elapsed)
+        items += len(results)
+    report = _report(durations, items, time.perf_counter() - start, before, outlook)
+    report["stores"] = len(stores)
+    report["sequential_s"] = round(sequential, 4)
+    report["concurrent_s"] = round(concurrent, 4)
+    return report
+
+
+def scenario_exports(outlook, searcher, max_results: int) -> dict:
+    import reports
+
+    results = searcher.search(max_results=max_results)
+    tmp = tempfile.mkdtemp(prefix="bench_export_")
+    exports = [("stream_csv", lambda p: reports.export_rows(results, csv_path=p + ".csv"))]
+    if _installed("openpyxl"):
+        exports.append(("stream_xlsx", lambda p: reports.export_rows(results, xlsx_path=p + ".xlsx")))
+    if _installed("pandas"):
+        exports.append(("pandas_csv", lambda p: reports.export_to_csv(results, p + ".csv")))
+        if _installed("openpyxl"):
+            exports.append(("pandas_xlsx", lambda p: reports.export_to_excel(results, p + ".xlsx")))
+
+    durations, per_export = [], {}
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    try:
+        for name, fn in exports:
+            t = time.perf_counter()
+            fn(os.path.join(tmp, name))
+            elapsed = time.perf_counter() - t
+            durations.append(elapsed)
+            per_export[name] = round(elapsed * 1000, 2)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    report = _report(durations, len(results) * len(exports), time.perf_counter() - start, before, outlook)
+    report["per_export_ms"] = per_export
+    return report
+
+
+def scenario_attachments(outlook, searcher, max_results: int) -> dict:
+    from attachments import export_attachments
+
+    results = searcher.search(has_attachments=True, max_results=max_results)
+    tmp = tempfile.mkdtemp(prefix="bench_att_")
+    stamps = []
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    try:
+        stats = export_attachments(
+            results, tmp, organize_by="sender",
+            progress_callback=lambda *a: stamps.append(time.perf_counter()),
+        )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    seconds = time.perf_counter() - start
+    durations = [b - a for a, b in zip([start] + stamps[:-1], stamps)]
+    report = _report(durations, stats["exported"], seconds, before, outlook)
+    report["emails"] = stats["emails_with_attachments"]
+    report["errors"] = stats["errors"]
+    return report
+
+
+def scenario_imap(outlook, searcher, max_results: int) -> dict:
+    """Búsquedas contra un servidor IMAP simulado (fake_imap) con 1 ms de ida y vuelta."""
+    from fake_imap import FakeImapServer
+    from imap_backend import ImapBackend
+    from search import EmailSearch
+
+    server = FakeImapServer.from_outlook(outlook, limit=2000, latency=0.001)
+    with server:
+        t = time.perf_counter()
+        backend = ImapBackend("127.0.0.1", server.user, server.password, port=server.port, ssl=False)
+        connect = time.perf_counter() - t
+        imap_searcher = EmailSearch(backend)
+        server.commands.clear()
+        durations, items = [], 0
+        before = backend.model.stats.snapshot()
+        start = time.perf_counter()
+        try:
+            for q in _search_queries():
+                t = time.perf_counter()
+                items += len(imap_searcher.search(max_results=max_results, **q))
+                durations.append(time.perf_counter() - t)
+            report = _report(durations, items, time.perf_counter() - start, before, backend.model)
+        finally:
+            backend.close()
+    report["connect_s"] = round(connect, 4)
+    report["imap_commands"] = dict(server.commands.most_common())
+    return report
+
+
+def scenario_bulk(outlook, searcher, max_results: int) -> dict:
+    """Acciones masivas por lotes; cada cambio se revierte con la acción inversa."""
+    from bulk import BATCH_ITEMS, bulk_action
+
+    results = searcher.search(max_results=max_results)
+    inbox = searcher.resolve_folder()
+    target = inbox.Folders.Add("bench_bulk")
+    tmp = tempfile.mkdtemp(prefix="bench_bulk_")
+    steps = [("categorize", "Bench"), ("uncategorize", "Bench"), ("flag", None), ("unflag", None),
+             ("mark_read", None), ("mark_unread", None), ("move", target), ("move", inbox),
+             ("save_msg", tmp)]
+    durations, per_action, items = [], {}, 0
+    before = outlook.stats.snapshot()
+    start = time.perf_counter()
+    try:
+        for action, value in steps:
+            stamps = []
+            t = time.perf_counter()
+            stats = bulk_action(results, action, value, pause=0,
+                                progress_callback=lambda *a: stamps.append(time.perf_counter()))
+            elapsed = time.perf_counter() - t
+            durations.extend(b - a for a, b in zip([t] + stamps[:-1], stamps))
+            items += stats["total"]
+            name = action if action != "move" or value is target else "move_back"
+            per_action[name] = round(stats["total"] / elapsed, 1) if elapsed > 0 else None
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    report = _report(durations, items, time.perf_counter() - start, before, outlook)
+    report["batch_items"] = BATCH_ITEMS  # p50/p99 = tiempo por lote (worker ocupado)
+    report["per_action_items_s"] = per_action
+    return report
+
+
+SCENARIOS = {
+    "search": scenario_search,
+    "extract": scenario_extract,
+    "quick_all": scenario_quick_all,
+    "threads": scenario_threads,
+    "planner": scenario_planner,
+    "stores": scenario_stores,
+    "exports": scenario_exports,
+    "attachments": scenario_attachments,
+    "imap": scenario_imap,
+    "bulk": scenario_bulk,  # al final: modifica el buzón simulado
+}
+
+
+def _installed(module: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+def bench_suite(n_items: int = 10_000, latency: float = 0.0, max_results: int = 500,
+                scenarios: list = None, seed: int = 42) -> dict:
+    """
+    Ejecuta la suite de benchmarks contra un buzón sintético.
+
+    Args:
+        n_items: Correos del buzón sintético (10k–1M)
+        latency: Latencia simulada por llamada COM (s)
+        max_results: Límite de resultados por búsqueda/extracción
+        scenarios: Nombres de escenarios a ejecutar (None = todos)
+        seed: Semilla del generador
+
+    Returns:
+        Diccionario escenario -> métricas
+    """
+    from fake_outlook import FakeOutlook
+    from outlook_client import OutlookClient
+    from search import EmailSearch
+
+    t = time.perf_counter()
+    outlook = FakeOutlook.with_mailbox(n_items, latency=0.0, seed=seed)
+    setup = time.perf_counter() - t
+    client = OutlookClient(application=outlook.application)
+    searcher = EmailSearch(client)
+    outlook.latency = latency
+
+    report = {
+        "config": {"items": n_items, "latency_s": latency, "max_results": max_results,
+                   "mailbox_setup_s": round(setup, 2)},
+    }
+    for name in scenarios or SCENARIOS:
+        report[name] = SCENARIOS[name](outlook, searcher, max_results)
+    return report
+
+
+# ══════════════ Servicio HTTP ══════════════
+
+def bench_service(n_items: int = 10_000, latency: float = 0.00005, clients: int = 16,
+                  requests: int = 200, distinct: int = 4, seed: int = 42) -> dict:
+    """
+    Prueba de carga del servicio HTTP/NDJSON contra un buzón sintético.
+
+    Args:
+        n_items: Correos del buzón sintético
+        latency: Latencia simulada por llamada COM (s)
+        clients: Clientes HTTP concurrentes
+        requests: Pedidos en total
+        distinct: Búsquedas distintas entre las que eligen los clientes
+        seed: Semilla del generador (buzón y elección de búsquedas)
+
+    Returns:
+        Diccionario modo ('coalesced' / 'independent') -> métricas
+    """
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    from fake_outlook import FakeOutlook
+    from outlook_client import OutlookClient
+    from service import SearchService, ServiceHTTPServer
+
+    outlook = FakeOutlook.with_mailbox(n_items, latency=0.0, seed=seed)
+    outlook.latency = latency
+    queries = [dict(q, max_results=500) for q in _search_queries()][:distinct]
+    report = {"config": {"items": n_items, "latency_s": latency, "clients": clients,
+                         "requests": requests, "distinct": len(queries)}}
+
+    for mode, coalesce in (("coalesced", True), ("independent", False)):
+        service = SearchService(lambda: OutlookClient(application=outlook.application),
+                                coalesce=coalesce).start()
+        httpd = ServiceHTTPServer(service, port=0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        port = httpd.server_address[1]
+        rng = random.Random(seed)
+        plan = [rng.choice(queries) for _ in range(requests)]
+        before = outlook.stats.snapshot()
+
+        def one(params):
+            t = time.perf_counter()
+            rows = _post_ndjson(port, "/search", params, httpd.token)
+            return time.perf_counter() - t, rows
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=clients) as pool:
+                done = list(pool.map(one, plan))
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            service.stop()
+        seconds = time.perf_counter() - start
+        durations = [d for d, _ in done]
+        result = _report(durations, sum(r for _, r in done), seconds, before, outlook)
+        result["requests_s"] = round(requests / seconds, 1) if seconds > 0 else None
+        result.update({k: service.stats[k] for k in ("scans", "shared")})
+        report[mode] = result
+    return report
+
+
+def _post_ndjson(port: int, path: str, params: dict, token: str) -> int:
+    """POST con cuerpo JSON; lee la respuesta NDJSON completa y devuelve las filas."""
+    import http.client
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    try:
+        conn.request("POST", path, json.dumps(params), {"Content-Type": "application/json",
+                                                        "Authorization": f"Bearer {token}"})
+        response = conn.getresponse()
+        lines = response.read().decode("utf-8").splitlines()
+    finally:
+        conn.close()
+    tail = json.loads(lines[-1]) if lines else {}
+    if response.status != 200 or "error" in tail:
+        raise RuntimeError(f"{path}: {tail.get('error') or response.status}")
+    return tail.get("rows", 0)
+
+
+# ══════════════ CLI ══════════════
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de Outlook Email Search Tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("startup", help="Tiempo hasta splash e interfaz interactiva")
+    s.add_argument("--runs", type=int, default=5)
+
+    b = sub.add_parser("suite", help="Benchmarks contra Outlook simulado")
+    b.add_argument("--items", type=int, default=10_000, help="Correos del buzón sintético")
+    b.add_argument("--latency", type=float, default=0.0, help="Latencia por llamada COM (s)")
+    b.add_argument("--max", dest="max_results", type=int, default=500)
+    b.add_argument("--scenarios", help=f"Lista separada por comas ({', '.join(SCENARIOS)})")
+    b.add_argument("--seed", type=int, default=42)
+
+    v = sub.add_parser("service", help="Prueba de carga del servicio HTTP contra Outlook simulado")
+    v.add_argument("--items", type=int, default=10_000, help="Correos del buzón sintético")
+    v.add_argument("--latency", type=float, default=0.00005, help="Latencia por llamada COM (s)")
+    v.add_argument("--clients", type=int, default=16, help="Clientes concurrentes")
+    v.add_argument("--requests", type=int, default=200, help="Pedidos en total")
+    v.add_argument("--distinct", type=int, default=4, help="Búsquedas distintas")
+    v.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args(argv)
+    if args.command == "startup":
+        report = bench_startup(args.runs)
+    elif args.command == "suite":
+        report = bench_suite(
+            args.items, args.latency, args.max_results,
+            args.scenarios.split(",") if args.scenarios else None, args.seed,
+        )
+    elif args.command == "service":
+        report = bench_service(args.items, args.latency, args.clients, args.requests,
+                               args.distinct, args.seed)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
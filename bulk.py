@@ -0,0 +1,256 @@
+"""
+Acciones masivas sobre resultados de búsqueda: categorizar, marcar con
+bandera, marcar como leído, mover a otra carpeta y guardar como .msg.
+Los cambios se escriben por lotes; entre lotes se hace una pausa (y el
+worker atiende los mensajes COM) para que Outlook siga respondiendo. Se
+puede cancelar y reanudar desde donde quedó:
+
+    stats = bulk_action(results, "categorize", "Procesado", cancel_event=ev)
+    if stats["cancelled"]:
+        stats = bulk_action(results, "categorize", "Procesado", start=stats["next"])
+"""
+
+import os
+import time
+from typing import Callable, Optional
+
+from attachments import get_unique_path, sanitize_foldername
+
+# Acción -> etiqueta para la interfaz
+ACTIONS = {
+    "categorize": "Asignar categoría",
+    "uncategorize": "Quitar categoría",
+    "flag": "Marcar con bandera",
+    "unflag": "Quitar bandera",
+    "mark_read": "Marcar como leído",
+    "mark_unread": "Marcar como no leído",
+    "move": "Mover a carpeta",
+    "save_msg": "Guardar como .msg",
+}
+
+# Correos por lote y pausa entre lotes (segundos)
+BATCH_ITEMS = 50
+BATCH_PAUSE = 0.05
+
+OL_MARK_NO_DATE = 4  # OlMarkInterval.olMarkNoDate
+OL_MSG_UNICODE = 9  # OlSaveAsType.olMSGUnicode
+
+# Detalles de error que se guardan como máximo (el conteo sigue completo)
+_MAX_ERROR_DETAILS = 200
+
+
+def bulk_action(
+    results,
+    action: str,
+    value=None,
+    positions: Optional[list] = None,
+    start: int = 0,
+    batch_size: int = BATCH_ITEMS,
+    pause: float = BATCH_PAUSE,
+    progress_callback: Optional[Callable] = None,
+    cancel_event=None,
+    resolve_item: Optional[Callable] = None,
+    between_batches: Optional[Callable] = None,
+) -> dict:
+    """
+    Aplica una acción a cada correo de los resultados.
+
+    Args:
+        results: Resultados de búsqueda (con _outlook_item, o resolve_item);
+                 admite un ResultStore o una sesión
+        action: Una de ACTIONS
+        value: Categoría (categorize/uncategorize), objeto Folder de destino
+               (move) o directorio (save_msg); no se usa en las demás
+        positions: Posiciones de results a procesar (None = todas)
+        start: Índice en positions desde el cual seguir (reanudar)
+        batch_size: Correos por lote
+        pause: Pausa entre lotes, en segundos
+        progress_callback: Función opcional (current, total, message), una vez por lote
+        cancel_event: threading.Event opcional; se detiene antes del siguiente
+                      correo y stats['next'] indica dónde reanudar
+        resolve_item: Función opcional fila -> objeto COM para las filas sin
+                      '_outlook_item' (p. ej. EmailSearch.get_item)
+        between_batches: Función opcional que se llama entre lotes (p. ej.
+                         atender mensajes COM)
+
+    Returns:
+        Diccionario con el resumen: total, done (modificados), unchanged
+        (ya estaban así), errors, error_details, failed_ids, cancelled,
+        next, seconds, files (save_msg) y updated ({posición: campos
+        cambiados}, p. ej. el EntryID nuevo tras 'move'; ya aplicados a results)
+
+    Raises:
+        ValueError: si la acción no existe o le falta el valor
+    """
+    apply = _APPLY.get(action)
+    if apply is None:
+        raise ValueError(f"Acción desconocida: {action}")
+    if action in ("categorize", "uncategorize", "move", "save_msg") and not value:
+        raise ValueError(f"Falta el valor para '{ACTIONS[action]}'.")
+    if action == "save_msg":
+        os.makedirs(value, exist_ok=True)
+    elif action == "move":
+        value = (value, value.EntryID, value.StoreID)  # una sola vez por acción
+
+    targets = range(len(results)) if positions is None else positions
+    total = len(targets)
+    stats = {
+        "action": action,
+        "total": total,
+        "done": 0,
+        "unchanged": 0,
+        "errors": 0,
+        "error_details": [],
+        "failed_ids": [],
+        "files": [],
+        "updated": {},
+        "cancelled": False,
+        "next": start,
+        "seconds": 0.0,
+    }
+    started = time.perf_counter()
+    label = ACTIONS[action]
+
+    i = start
+    while i < total:
+        end = min(i + batch_size, total)
+        for k in range(i, end):
+            if cancel_event is not None and cancel_event.is_set():
+                stats["cancelled"] = True
+                end = k
+                break
+            position = targets[k]
+            email_data = results[position]
+            item = email_data.get("_outlook_item")
+            if not item and resolve_item is not None:
+                item = resolve_item(email_data)
+            try:
+                if not item:
+                    raise LookupError("el correo ya no existe o cambió de carpeta")
+                changed = apply(item, value, email_data, stats)
+                if changed:
+                    stats["done"] += 1
+                    if isinstance(changed, dict):
+                        _update_row(results, position, email_data, changed)
+                        stats["updated"][position] = {
+                            key: v for key, v in changed.items() if not key.startswith("_")}
+                else:
+                    stats["unchanged"] += 1
+            except Exception as e:
+                stats["errors"] += 1
+                stats["failed_ids"].append(email_data.get("entry_id", ""))
+                if len(stats["error_details"]) < _MAX_ERROR_DETAILS:
+                    stats["error_details"].append(f"{email_data.get('subject', '')}: {e}")
+        i = stats["next"] = end
+        if progress_callback:
+            progress_callback(i, total, f"{label}: {i}/{total}...")
+        if stats["cancelled"]:
+            break
+        if i < total:
+            if between_batches is not None:
+                between_batches()
+            if pause > 0:
+                if cancel_event is not None:
+                    cancel_event.wait(pause)
+                else:
+                    time.sleep(pause)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def _update_row(results, position, row, changes: dict):
+    """Aplica cambios a una fila (también si results la guarda en disco o en una sesión)."""
+    row.update(changes)
+    update = getattr(results, "update_row", None)
+    if update is not None:
+        update(position, changes)
+
+
+# ══════════════ Acciones sobre un correo ══════════════
+# Cada una retorna True si modificó el correo, False si ya estaba así o un
+# diccionario con los campos de la fila que cambiaron.
+
+def _split_categories(text: str) -> tuple:
+    """Categorías y separador usado (Outlook usa el separador de listas regional)."""
+    sep = "; " if ";" in (text or "") else ", "
+    return [c.strip() for c in (text or "").replace(";", ",").split(",") if c.strip()], sep
+
+
+def _categorize(item, category, email_data, stats):
+    # Outlook no distingue mayúsculas en los nombres de categoría
+    current, sep = _split_categories(item.Categories)
+    if category.casefold() in {c.casefold() for c in current}:
+        return False
+    item.Categories = sep.join(current + [category])
+    item.Save()
+    return True
+
+
+def _uncategorize(item, category, email_data, stats):
+    current, sep = _split_categories(item.Categories)
+    wanted = category.casefold()
+    kept = [c for c in current if c.casefold() != wanted]
+    if len(kept) == len(current):
+        return False
+    item.Categories = sep.join(kept)
+    item.Save()
+    return True
+
+
+def _flag(item, value, email_data, stats):
+    # MarkAsTask crea la marca de seguimiento (FlagStatus está obsoleta en correos)
+    if item.IsMarkedAsTask:
+        return False
+    item.MarkAsTask(OL_MARK_NO_DATE)
+    item.Save()
+    return True
+
+
+def _unflag(item, value, email_data, stats):
+    if not item.IsMarkedAsTask:
+        return False
+    item.ClearTaskFlag()
+    item.Save()
+    return True
+
+
+def _set_unread(unread):
+    def apply(item, value, email_data, stats):
+        if bool(item.UnRead) == unread:
+            return False
+        item.UnRead = unread
+        item.Save()
+        return True
+    return apply
+
+
+def _move(item, target, email_data, stats):
+    # En Exchange el correo movido tiene otro EntryID: la fila pasa a apuntar
+    # al elemento que retorna Move
+    folder, folder_id, store_id = target
+    if item.Parent.EntryID == folder_id:
+        return False
+    moved = item.Move(folder)
+    return {"entry_id": moved.EntryID, "store_id": store_id, "_outlook_item": moved}
+
+
+def _save_msg(item, directory, email_data, stats):
+    date = (email_data.get("received") or "")[:10] or "sin_fecha"
+    subject = sanitize_foldername((email_data.get("subject") or "Sin asunto")[:60])
+    path = get_unique_path(directory, f"{date}_{subject}.msg")
+    item.SaveAs(path, OL_MSG_UNICODE)
+    stats["files"].append(path)
+    return True
+
+
+_APPLY = {
+    "categorize": _categorize,
+    "uncategorize": _uncategorize,
+    "flag": _flag,
+    "unflag": _unflag,
+    "mark_read": _set_unread(False),
+    "mark_unread": _set_unread(True),
+    "move": _move,
+    "save_msg": _save_msg,
+}
@@ -0,0 +1,343 @@
+"""
+Modo de línea de comandos (sin interfaz gráfica).
+Ejecuta búsquedas y vuelca los resultados a CSV/Excel/adjuntos sin importar Tk,
+y permite procesar un archivo de trabajos con muchas consultas en una sola
+sesión de Outlook.
+
+Ejemplos:
+    python main.py search --subject factura --from 01-01-2024 --csv facturas.csv
+    python main.py search -q 'from:juan has:attachment -category:Procesado' --csv juan.csv
+    python main.py search --subject factura --stores all --csv facturas.csv
+    python main.py batch trabajos.json
+    python main.py refresh                  # actualiza todas las búsquedas guardadas
+    python main.py serve --port 8765        # servicio HTTP/JSON compartido
+    python main.py --archive /datos/respaldos search --folder-path respaldos/2023 -q 'from:juan' --csv juan.csv
+    python main.py --imap imaps://ana@mail.empresa.cl search --subject factura --csv f.csv
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from reports import export_rows
+
+
+# Claves aceptadas en la sección "search" de un trabajo (mismos kwargs que EmailSearch.search)
+SEARCH_KEYS = (
+    "subject", "sender", "date_from", "date_to", "folder", "folder_path",
+    "subfolder", "has_attachments", "body_contains", "recipient", "max_results",
+    "query", "strategy", "stores", "body_terms", "body_regex", "body_match",
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construye el parser de argumentos del modo CLI."""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Outlook Email Search Tool — modo línea de comandos",
+    )
+    origin = parser.add_mutually_exclusive_group()
+    origin.add_argument("--archive", action="append", metavar="RUTA",
+                        help="Buscar en archivos .eml/.mbox/.msg en vez de Outlook "
+                             "(directorio o archivo; se puede repetir)")
+    origin.add_argument("--imap", metavar="URL",
+                        help="Buscar en un servidor IMAP en vez de Outlook "
+                             "(imaps://usuario@servidor[:puerto]; contraseña en "
+                             "IMAP_PASSWORD o se pide por consola)")
+    parser.add_argument("--processes", type=int,
+                        help="Procesos para analizar los archivos y buscar --body-term/--body-regex "
+                             "(por defecto uno por núcleo)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("search", help="Ejecuta una búsqueda y exporta los resultados")
+    s.add_argument("-q", "--query", help='Consulta (ej: \'from:juan has:attachment size>5MB\')')
+    s.add_argument("--subject", help="Texto en el asunto")
+    s.add_argument("--sender", help="Nombre o email del remitente")
+    s.add_argument("--from", dest="date_from", metavar="DD-MM-YYYY", help="Fecha inicio")
+    s.add_argument("--to", dest="date_to", metavar="DD-MM-YYYY", help="Fecha fin")
+    s.add_argument("--folder", default="inbox",
+                   help="Carpeta predeterminada (inbox, sent, ...). Con --archive, si no hay un "
+                        "subdirectorio Inbox/Bandeja de entrada, inbox es solo el directorio raíz")
+    s.add_argument("--folder-path",
+                   help="Ruta completa de carpeta (Cuenta/Bandeja de entrada/...). Con --archive: "
+                        "directorio raíz/subdirectorio (ej: respaldos/2023)")
+    s.add_argument("--subfolder", help="Subcarpeta dentro de la carpeta")
+    s.add_argument("--attachments", choices=["si", "no"], help="Filtrar por adjuntos")
+    s.add_argument("--body", dest="body_contains", help="Texto en el cuerpo")
+    s.add_argument("--body-term", action="append", dest="body_terms", metavar="TEXTO",
+                   help="Término a buscar en el cuerpo (se puede repetir; basta uno)")
+    s.add_argument("--body-terms-file", metavar="ARCHIVO",
+                   help="Archivo con un término por línea ('re:' al comienzo = expresión regular)")
+    s.add_argument("--body-regex", action="append", metavar="EXPR",
+                   help="Expresión regular a buscar en el cuerpo (se puede repetir)")
+    s.add_argument("--body-all", action="store_const", const="all", dest="body_match",
+                   help="Exigir todos los términos/expresiones en vez de alguno")
+    s.add_argument("--recipient", help="Destinatario")
+    s.add_argument("--max", dest="max_results", type=int, default=500, help="Máximo de resultados")
+    s.add_argument("--stores", type=lambda v: [n.strip() for n in v.split(",")] if v != "all" else "all",
+                   help="Almacenes donde buscar a la vez, separados por coma (buzones, PST) o 'all'")
+    s.add_argument("--strategy", choices=["restrict", "find", "table", "advanced_search"],
+                   help="Forzar la estrategia de ejecución (por defecto la de menor costo)")
+    s.add_argument("--explain", action="store_true",
+                   help="Mostrar el plan de ejecución con filas estimadas vs reales")
+    _add_output_args(s)
+
+    b = sub.add_parser("batch", help="Ejecuta un archivo JSON de trabajos en una sola sesión")
+    b.add_argument("jobfile", help="Archivo JSON con la lista de trabajos")
+    b.add_argument("--stop-on-error", action="store_true", help="Detener al primer trabajo con error")
+
+    r = sub.add_parser("refresh", help="Actualiza búsquedas guardadas (solo correos nuevos)")
+    r.add_argument("names", nargs="*", help="Búsquedas a actualizar (vacío = todas)")
+    r.add_argument("--new-csv", help="CSV con los correos nuevos de todas las búsquedas")
+
+    sv = sub.add_parser("serve", help="Servicio HTTP/JSON local compartido (ver service.py)")
+    sv.add_argument("--host", default="127.0.0.1", help="Interfaz donde escuchar (por defecto solo local)")
+    sv.add_argument("--port", type=int, default=8765)
+    sv.add_argument("--token", help="Token para 'Authorization: Bearer <token>' (por defecto se genera uno)")
+    sv.add_argument("--export-dir", help="Directorio donde /export puede escribir "
+                                         "(por defecto ~/.outlook_search/exportaciones)")
+
+    return parser
+
+
+def _add_output_args(parser):
+    parser.add_argument("--csv", help="Ruta del CSV de salida")
+    parser.add_argument("--xlsx", help="Ruta del Excel de salida")
+    parser.add_argument("--attachments-dir", help="Directorio donde exportar adjuntos")
+    parser.add_argument("--organize-by", default="flat",
+                        choices=["flat", "sender", "date", "subject"],
+                        help="Organización de los adjuntos")
+    parser.add_argument("--types", help="Extensiones de adjuntos a exportar (ej: .pdf,.xlsx)")
+
+
+def run_job(searcher, job: dict, log=print) -> dict:
+    """
+    Ejecuta un trabajo: búsqueda + volcado a CSV/Excel/adjuntos.
+
+    Args:
+        searcher: Instancia de EmailSearch (sesión de Outlook compartida)
+        job: Diccionario con claves 'search', 'csv', 'xlsx' y 'attachments'
+        log: Función para mensajes de avance
+
+    Returns:
+        Diccionario con estadísticas del trabajo
+    """
+    from attachments import export_attachments
+    from multistore import search_stores, select_stores
+
+    params = dict(job.get("search", {}))
+    unknown = set(params) - set(SEARCH_KEYS)
+    if unknown:
+        raise ValueError(f"Parámetros de búsqueda no reconocidos: {', '.join(sorted(unknown))}")
+    store_names = params.pop("stores", None)
+    store_stats = []
+
+    att_cfg = job.get("attachments")
+    with_att = []  # solo se retienen los correos cuyos adjuntos se exportarán
+
+    def rows():
+        if store_names:
+            stores = select_stores(searcher.client.list_stores(), store_names)
+            found, stats = search_stores(searcher.client, stores, **params)
+            store_stats.extend(stats)
+        else:
+            found = searcher.iter_search(**params)
+        for row in found:
+            if att_cfg and row.get("has_attachments"):
+                with_att.append(row)
+            yield row
+
+    started = time.perf_counter()
+    if job.get("csv") or job.get("xlsx"):
+        stats = export_rows(rows(), csv_path=job.get("csv"), xlsx_path=job.get("xlsx"))
+    else:
+        stats = {"rows": sum(1 for _ in rows()), "csv": "", "xlsx": ""}
+
+    if att_cfg:
+        searcher.hydrate(with_att)  # los resultados de varios almacenes no traen COM refs
+        stats["attachments"] = export_attachments(
+            results=with_att,
+            output_dir=att_cfg["output_dir"],
+            organize_by=att_cfg.get("organize_by", "flat"),
+            file_types=att_cfg.get("file_types"),
+        )
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+
+    name = job.get("name", "búsqueda")
+    log(f"✓ {name}: {stats['rows']} correos en {stats['seconds']} s")
+    for s in store_stats:
+        log(f"  · {s['store']}: {s['rows']} correos, {s['scanned']} revisados en {s['seconds']} s"
+            + (f" (error: {s['error']})" if s["error"] else ""))
+    if job.get("explain") and searcher.last_plan is not None and not store_names:
+        log(searcher.last_plan.explain())
+    for key in ("csv", "xlsx"):
+        if stats[key]:
+            log(f"  → {stats[key]}")
+    if att_cfg:
+        a = stats["attachments"]
+        log(f"  → {a['exported']} adjuntos en {att_cfg['output_dir']}"
+            + (f" ({a['errors']} errores)" if a["errors"] else ""))
+    return stats
+
+
+def load_jobs(path: str) -> list:
+    """
+    Lee un archivo de trabajos. Formato:
+        {"defaults": {"folder": "inbox", ...},
+         "jobs": [{"name": "...", "search": {...}, "csv": "...",
+                   "xlsx": "...", "attachments": {"output_dir": "..."}}]}
+    Los valores de 'defaults' se aplican a la sección 'search' de cada trabajo.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"jobs": data}
+
+    defaults = data.get("defaults", {})
+    jobs = []
+    for job in data.get("jobs", []):
+        job = dict(job)
+        job["search"] = {**defaults, **job.get("search", {})}
+        jobs.append(job)
+    return jobs
+
+
+def refresh_saved(searcher, names: list = None, new_csv: str = None, log=print) -> dict:
+    """
+    Actualiza búsquedas guardadas consultando solo correos posteriores a su marca de agua.
+
+    Returns:
+        Diccionario nombre -> cantidad de correos nuevos
+    """
+    from saved_searches import SavedSearchStore
+
+    store = SavedSearchStore()
+    names = names or store.list_names()
+    new_rows = []
+    summary = {}
+    for name in names:
+        started = time.perf_counter()
+        results, n_new = store.refresh(name, searcher)
+        summary[name] = n_new
+        new_rows.extend(r for r in results if r.get("is_new"))
+        log(f"✓ {name}: {n_new} nuevos de {len(results)} "
+            f"({time.perf_counter() - started:.1f} s)")
+    if new_csv:
+        export_rows(new_rows, csv_path=new_csv)
+        log(f"  → {new_csv}")
+    return summary
+
+
+def _job_from_args(args) -> dict:
+    params = {k: getattr(args, k) for k in SEARCH_KEYS if getattr(args, k, None) is not None}
+    if args.body_terms_file:
+        from content_match import load_terms
+
+        terms, regexes = load_terms(args.body_terms_file)
+        params["body_terms"] = (args.body_terms or []) + terms
+        params["body_regex"] = (args.body_regex or []) + regexes
+    if args.attachments:
+        params["has_attachments"] = args.attachments == "si"
+    job = {"search": params, "csv": args.csv, "xlsx": args.xlsx, "explain": args.explain}
+    if args.attachments_dir:
+        job["attachments"] = {
+            "output_dir": args.attachments_dir,
+            "organize_by": args.organize_by,
+            "file_types": [t.strip() for t in args.types.split(",")] if args.types else None,
+        }
+    return job
+
+
+def _open_archive(paths, processes=None, log=print):
+    """Carga archivos de correo (archive.ArchiveBackend) mostrando el avance."""
+    from archive import ArchiveBackend
+
+    started = time.perf_counter()
+    client = ArchiveBackend(paths, processes=processes)
+    log(f"📂 {client.messages} correos cargados en {time.perf_counter() - started:.1f} s")
+    for path, error in client.errors[:10]:
+        log(f"  ⚠ {path}: {error}")
+    if len(client.errors) > 10:
+        log(f"  ⚠ ... y {len(client.errors) - 10} archivos más con error")
+    return client
+
+
+def _open_imap(url: str, log=print):
+    """Conecta a un servidor IMAP (imap_backend.ImapBackend) a partir de una URL."""
+    import getpass
+    import os
+    from urllib.parse import unquote, urlsplit
+
+    from imap_backend import ImapBackend
+
+    parts = urlsplit(url if "://" in url else f"imaps://{url}")
+    if parts.scheme not in ("imap", "imaps") or not parts.hostname or not parts.username:
+        raise ConnectionError(f"URL IMAP inválida: {url} (use imaps://usuario@servidor)")
+    user = unquote(parts.username)
+    password = (unquote(parts.password) if parts.password else
+                os.environ.get("IMAP_PASSWORD") or getpass.getpass(f"Contraseña de {user}: "))
+    started = time.perf_counter()
+    client = ImapBackend(parts.hostname, user, password, port=parts.port, ssl=parts.scheme == "imaps")
+    log(f"📡 Conectado a {parts.hostname} en {time.perf_counter() - started:.1f} s")
+    return client
+
+
+def main(argv=None) -> int:
+    """Punto de entrada del modo CLI. Retorna el código de salida."""
+    args = build_parser().parse_args(argv)
+
+    if args.command == "search":
+        jobs = [_job_from_args(args)]
+    elif args.command == "batch":
+        jobs = load_jobs(args.jobfile)
+
+    from outlook_client import OutlookClient
+    from search import EmailSearch
+
+    if args.command == "serve":
+        from service import DEFAULT_EXPORT_DIR, serve
+
+        # El origen se crea en el thread del worker del servicio
+        factory = None
+        if args.archive:
+            factory = lambda: _open_archive(args.archive, args.processes)
+        elif args.imap:
+            factory = lambda: _open_imap(args.imap)
+        try:
+            serve(args.host, args.port, factory, args.token, args.export_dir or DEFAULT_EXPORT_DIR)
+        except ConnectionError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        return 0
+
+    if args.archive:
+        client = _open_archive(args.archive, args.processes)
+    else:
+        try:
+            client = _open_imap(args.imap) if args.imap else OutlookClient()
+        except ConnectionError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+    searcher = EmailSearch(client)
+    if args.processes:
+        searcher.MATCH_PROCESSES = args.processes
+
+    if args.command == "refresh":
+        try:
+            refresh_saved(searcher, args.names, args.new_csv)
+        except Exception as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    failures = 0
+    for job in jobs:
+        try:
+            run_job(searcher, job)
+        except Exception as e:
+            failures += 1
+            print(f"❌ {job.get('name', 'búsqueda')}: {e}", file=sys.stderr)
+            if getattr(args, "stop_on_error", False):
+                break
+    return 1 if failures else 0
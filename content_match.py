@@ -0,0 +1,274 @@
+"""
+Búsqueda de muchos términos y expresiones regulares en el cuerpo de los correos.
+Los términos literales se buscan todos a la vez con un autómata Aho-Corasick
+(una sola pasada por el texto, sin importar si son 5 o 5.000) y las
+expresiones regulares con re. El resultado de cada correo es la lista de
+términos/expresiones encontrados:
+
+    matcher = ContentMatcher(terms=["12-345-678", "98-765-432"], regexes=[r"\\bCL\\d{22}\\b"])
+    matcher.find(body)          # ['98-765-432', '\\bCL\\d{22}\\b']
+
+BodyMatchPool reparte lotes de cuerpos entre procesos (multiprocessing, como
+archive.py): el thread COM solo lee los cuerpos y sigue leyendo mientras los
+procesos buscan. Si está instalado el paquete opcional pyahocorasick, el
+autómata usa su implementación en C.
+"""
+
+import multiprocessing
+import os
+import re
+from collections import deque
+from typing import Iterable, Optional
+
+# Lote de cuerpos por tarea del pool y lotes en vuelo por proceso
+BATCH_BODIES = 64
+_INFLIGHT_PER_PROCESS = 2
+
+# Con menos patrones (y sin expresiones regulares) no conviene usar procesos:
+# copiar el cuerpo a otro proceso cuesta más que buscarlo
+POOL_MIN_PATTERNS = 20
+
+
+def load_terms(path: str) -> tuple:
+    """
+    Lee un archivo de términos: uno por línea, 're:' al comienzo para una
+    expresión regular; se ignoran las líneas vacías y las que empiezan con '#'.
+
+    Returns:
+        Tupla (términos, expresiones regulares)
+    """
+    terms, regexes = [], []
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("re:"):
+                regexes.append(line[3:].strip())
+            else:
+                terms.append(line)
+    return terms, regexes
+
+
+class ContentMatcher:
+    """
+    Términos literales (sin distinguir mayúsculas) y expresiones regulares
+    (re.IGNORECASE) a buscar en un texto.
+
+    Attributes:
+        terms: Términos literales, sin repetir, en el orden dado
+        regexes: Patrones de las expresiones regulares
+        match_all: True = el correo debe contener todos; False = alguno
+    """
+
+    def __init__(self, terms: Iterable[str] = (), regexes: Iterable[str] = (),
+                 match_all: bool = False):
+        """
+        Raises:
+            ValueError: si una expresión regular no es válida o no hay patrones
+        """
+        self.terms = list(dict.fromkeys(t for t in terms if t))
+        self.regexes = list(dict.fromkeys(r for r in regexes if r))
+        self.match_all = match_all
+        if not self.terms and not self.regexes:
+            raise ValueError("Indica al menos un término o expresión regular.")
+        self._compiled = []
+        for pattern in self.regexes:
+            try:
+                self._compiled.append(re.compile(pattern, re.IGNORECASE))
+            except re.error as e:
+                raise ValueError(f"Expresión regular inválida '{pattern}': {e}")
+        self._automaton = _Automaton([t.lower() for t in self.terms]) if self.terms else None
+
+    def __len__(self):
+        return len(self.terms) + len(self.regexes)
+
+    def spec(self) -> tuple:
+        """Argumentos para reconstruir el matcher en otro proceso."""
+        return self.terms, self.regexes, self.match_all
+
+    @property
+    def wants_pool(self) -> bool:
+        """Si vale la pena buscar en procesos aparte (muchos patrones o regex)."""
+        return bool(self.regexes) or len(self.terms) >= POOL_MIN_PATTERNS
+
+    def find(self, text: str) -> list:
+        """Términos y patrones encontrados en el texto (en el orden declarado)."""
+        if not text:
+            return []
+        found = []
+        if self._automaton is not None:
+            hits = self._automaton.search(text.lower())
+            found = [self.terms[i] for i in sorted(hits)]
+        for pattern, compiled in zip(self.regexes, self._compiled):
+            if compiled.search(text):
+                found.append(pattern)
+        return found
+
+    def accepts(self, found: list) -> bool:
+        """Si lo encontrado cumple el criterio (alguno / todos)."""
+        if self.match_all:
+            return len(found) == len(self)
+        return bool(found)
+
+
+class _Automaton:
+    """Aho-Corasick sobre términos en minúsculas; search() retorna sus índices."""
+
+    def __init__(self, words: list):
+        try:
+            import ahocorasick  # opcional (pyahocorasick), en C
+        except ImportError:
+            ahocorasick = None
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for i, word in enumerate(words):
+                # Términos repetidos al pasar a minúsculas: se conservan todos los índices
+                previous = automaton.get(word, ())
+                automaton.add_word(word, previous + (i,))
+            automaton.make_automaton()
+            self._native = automaton
+            return
+        self._native = None
+        goto, output = [{}], [set()]
+        for i, word in enumerate(words):
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    output.append(set())
+                state = nxt
+            output[state].add(i)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f][ch] if state and ch in goto[f] else 0
+                output[nxt] |= output[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._output = [frozenset(o) for o in output]
+        self._first = frozenset(goto[0])  # caracteres con que empieza algún término
+
+    def search(self, text: str) -> set:
+        if self._native is not None:
+            hits = set()
+            for _end, indices in self._native.iter(text):
+                hits.update(indices)
+            return hits
+        goto, fail, output, first = self._goto, self._fail, self._output, self._first
+        hits = set()
+        state = 0
+        for ch in text:
+            if not state and ch not in first:
+                continue  # atajo en la raíz: la mayoría de los caracteres
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                hits |= output[state]
+        return hits
+
+
+# ══════════════ Pool de procesos ══════════════
+
+class BodyMatchPool:
+    """
+    Busca un ContentMatcher en lotes de cuerpos, en procesos aparte cuando
+    conviene (ver ContentMatcher.wants_pool) o en el mismo thread si no.
+
+    Los lotes se entregan en orden: submit() agrega un lote y ready() retorna
+    los lotes ya resueltos del frente de la cola, sin esperar; drain() espera
+    todos.
+    """
+
+    def __init__(self, matcher: ContentMatcher, processes: Optional[int] = None):
+        """
+        Args:
+            matcher: Términos y expresiones a buscar
+            processes: Procesos del pool (None = núcleos - 1; 1 = sin procesos)
+        """
+        self.matcher = matcher
+        if processes is None:
+            processes = max(1, (os.cpu_count() or 2) - 1)
+        self.processes = processes if matcher.wants_pool else 1
+        self._pool = None
+        self._pending = deque()  # (AsyncResult o lista de encontrados, contexto del lote)
+
+    @property
+    def max_inflight(self) -> int:
+        """Lotes pendientes a partir de los cuales conviene esperar (drain/ready)."""
+        return self.processes * _INFLIGHT_PER_PROCESS
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, bodies: list, context):
+        """
+        Encola un lote.
+
+        Args:
+            bodies: Textos a analizar
+            context: Dato que acompaña al lote de vuelta (p. ej. los ítems)
+        """
+        if self.processes <= 1:
+            self._pending.append(([self.matcher.find(b) for b in bodies], context))
+            return
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.processes, _init_worker, (self.matcher.spec(),))
+        self._pending.append((self._pool.apply_async(_find_batch, (bodies,)), context))
+
+    def ready(self, wait: bool = False) -> list:
+        """
+        Lotes resueltos del frente de la cola, en orden de envío.
+
+        Args:
+            wait: Esperar al menos el primer lote pendiente
+
+        Returns:
+            Lista de (encontrados por cuerpo, contexto)
+        """
+        done = []
+        while self._pending:
+            result, context = self._pending[0]
+            if not isinstance(result, list):
+                if not (wait and not done) and not result.ready():
+                    break
+                result = result.get()
+            self._pending.popleft()
+            done.append((result, context))
+        return done
+
+    def drain(self) -> list:
+        """Espera y retorna todos los lotes pendientes, en orden."""
+        done = []
+        while self._pending:
+            done.extend(self.ready(wait=True))
+        return done
+
+    def close(self):
+        """Descarta lo pendiente y termina los procesos."""
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+_MATCHER = None  # matcher de cada proceso del pool
+
+
+def _init_worker(spec):
+    global _MATCHER
+    _MATCHER = ContentMatcher(*spec)
+
+
+def _find_batch(bodies):
+    return [_MATCHER.find(body) for body in bodies]
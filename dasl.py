@@ -0,0 +1,259 @@
+"""
+Parser y evaluador de filtros DASL (@SQL=...).
+Cubre el subconjunto que genera la aplicación: comparaciones LIKE, =, <>,
+<, <=, >, >= sobre propiedades urn:/http:, combinadas con AND, OR, NOT y
+paréntesis. Lo usan los backends que no son Outlook (y el Outlook simulado)
+para evaluar Items.Restrict en Python.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+
+# Propiedades DASL -> nombre de propiedad del MailItem
+PROPERTY_MAP = {
+    "urn:schemas:httpmail:subject": "Subject",
+    "urn:schemas:httpmail:fromemail": "SenderEmailAddress",
+    "urn:schemas:httpmail:fromname": "SenderName",
+    "urn:schemas:httpmail:datereceived": "ReceivedTime",
+    "urn:schemas:httpmail:hasattachment": "HasAttachment",
+    "urn:schemas:httpmail:textdescription": "Body",
+    "urn:schemas:httpmail:displayto": "To",
+    "urn:schemas:httpmail:displaycc": "CC",
+    "urn:schemas:httpmail:importance": "Importance",
+    "urn:schemas:httpmail:read": "Read",
+    "urn:schemas-microsoft-com:office:office#Keywords": "Categories",
+    "http://schemas.microsoft.com/mapi/proptag/0x0E080003": "Size",
+    "http://schemas.microsoft.com/mapi/proptag/0x0037001f": "Subject",
+}
+
+_DATE_FORMATS = ("%m/%d/%Y %I:%M %p", "%m/%d/%Y %H:%M", "%m/%d/%Y")
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<prop>"[^"]+")
+      | (?P<str>'(?:[^']|'')*')
+      | (?P<num>-?\d+(?:\.\d+)?)
+      | (?P<op><=|>=|<>|=|<|>)
+      | (?P<paren>[()])
+      | (?P<word>[A-Za-z_]+)
+    )""",
+    re.VERBOSE,
+)
+
+
+class DaslError(ValueError):
+    """Filtro DASL con sintaxis no soportada."""
+
+
+# ══════════════ AST ══════════════
+# Nodos: ("and", [hijos]) | ("or", [hijos]) | ("not", hijo)
+#        | ("cmp", propiedad, operador, valor)
+
+
+def parse(filter_str: str):
+    """
+    Convierte un filtro '@SQL=...' en un árbol de nodos (tuplas).
+
+    Raises:
+        DaslError: si la sintaxis no es reconocida
+    """
+    text = filter_str.strip()
+    if text[:5].upper() == "@SQL=":
+        text = text[5:]
+    tokens = _tokenize(text)
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise DaslError(f"Token inesperado en filtro DASL: {tokens[parser.pos][1]}")
+    return node
+
+
+def _tokenize(text: str) -> list:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        if text[pos:].strip() == "":
+            break
+        m = _TOKEN_RE.match(text, pos)
+        if not m:
+            raise DaslError(f"No se pudo interpretar el filtro DASL cerca de: {text[pos:pos + 30]}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "word":
+            value = value.upper()
+        elif kind == "prop":
+            value = value[1:-1]
+        elif kind == "str":
+            value = value[1:-1].replace("''", "'")
+        elif kind == "num":
+            value = float(value) if "." in value else int(value)
+        tokens.append((kind, value))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self):
+        tok = self._peek()
+        self.pos += 1
+        return tok
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self._peek() == ("word", "OR"):
+            self._take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self._peek() == ("word", "AND"):
+            self._take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not(self):
+        if self._peek() == ("word", "NOT"):
+            self._take()
+            return ("not", self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, value = self._take()
+        if kind == "paren" and value == "(":
+            node = self.parse_or()
+            if self._take() != ("paren", ")"):
+                raise DaslError("Falta ')' en filtro DASL")
+            return node
+        if kind != "prop":
+            raise DaslError(f"Se esperaba una propiedad DASL, se encontró: {value}")
+        op_kind, op = self._take()
+        if op_kind == "word" and op in ("LIKE", "CI_PHRASEMATCH", "CI_STARTSWITH"):
+            pass
+        elif op_kind != "op":
+            raise DaslError(f"Operador DASL no soportado: {op}")
+        val_kind, val = self._take()
+        if val_kind not in ("str", "num"):
+            raise DaslError(f"Valor DASL inválido: {val}")
+        return ("cmp", value, op, val)
+
+
+# ══════════════ Evaluación ══════════════
+
+
+@lru_cache(maxsize=256)
+def compile_filter(filter_str: str):
+    """
+    Compila un filtro DASL a un predicado Python.
+
+    Returns:
+        Función predicate(get) -> bool, donde get(nombre_propiedad) retorna el
+        valor de la propiedad del MailItem (p. ej. get('Subject'))
+    """
+    return _compile(parse(filter_str))
+
+
+def compile_node(node):
+    """Compila un árbol ya analizado (ver parse) a un predicado como compile_filter."""
+    return _compile(node)
+
+
+def _compile(node):
+    kind = node[0]
+    if kind == "and":
+        parts = [_compile(c) for c in node[1]]
+        return lambda get: all(p(get) for p in parts)
+    if kind == "or":
+        parts = [_compile(c) for c in node[1]]
+        return lambda get: any(p(get) for p in parts)
+    if kind == "not":
+        inner = _compile(node[1])
+        return lambda get: not inner(get)
+    return _compile_cmp(*node[1:])
+
+
+def _compile_cmp(prop: str, op: str, value):
+    name = PROPERTY_MAP.get(prop) or PROPERTY_MAP.get(prop.lower())
+    if name is None:
+        raise DaslError(f"Propiedad DASL no soportada: {prop}")
+
+    if op in ("LIKE", "CI_STARTSWITH", "CI_PHRASEMATCH"):
+        if op == "CI_STARTSWITH":
+            value = f"{value}%"
+        elif op == "CI_PHRASEMATCH":
+            value = f"%{value}%"
+        regex = _like_to_regex(str(value))
+        return lambda get: regex.search(_as_text(get(name))) is not None
+
+    if name == "ReceivedTime":
+        value = parse_date(value)
+    elif name in ("HasAttachment", "Read"):
+        value = bool(int(value))
+
+    def cmp(get):
+        current = get(name)
+        if name == "ReceivedTime":
+            current = _naive(current)
+        elif name in ("HasAttachment", "Read"):
+            current = bool(current)
+        elif isinstance(value, str):
+            current = _as_text(current).lower()
+            return _OPS[op](current, value.lower())
+        if current is None:
+            return False
+        return _OPS[op](current, value)
+
+    return cmp
+
+
+_OPS = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _like_to_regex(pattern: str):
+    parts = [".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in pattern]
+    return re.compile("^" + "".join(parts) + "$", re.IGNORECASE | re.DOTALL)
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def _naive(dt):
+    if dt is not None and getattr(dt, "tzinfo", None) is not None:
+        return dt.replace(tzinfo=None)
+    return dt
+
+
+def parse_date(value: str) -> datetime:
+    """Interpreta una fecha DASL ('MM/DD/YYYY' con hora opcional)."""
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    raise DaslError(f"Fecha DASL inválida: {value}")
+
+
+def format_date(dt: datetime) -> str:
+    """Formatea una fecha para un filtro DASL ('MM/DD/YYYY HH:MM AM')."""
+    return dt.strftime("%m/%d/%Y %I:%M %p")
@@ -0,0 +1,706 @@
+"""
+Servidor IMAP4rev1 simulado en proceso (sockets locales, correos en memoria)
+para probar imap_backend y medir su rendimiento sin un servidor real.
+Soporta lo que usa ImapBackend: LOGIN, ENABLE UTF8=ACCEPT, LIST con
+SPECIAL-USE, SELECT/EXAMINE, STATUS, SEARCH, SORT y FETCH (ENVELOPE,
+BODYSTRUCTURE, secciones y tramos), con y sin UID. Ejemplo:
+
+    server = FakeImapServer(user="ana", password="secreta")
+    server.add_message("INBOX", raw_bytes, date=datetime(2024, 3, 1, 9, 30))
+    with server:
+        backend = ImapBackend("127.0.0.1", "ana", "secreta", port=server.port, ssl=False)
+        EmailSearch(backend).search(subject="factura")
+    print(server.commands)
+
+Cada comando cuenta en server.commands y puede tener una latencia
+configurable (ida y vuelta de red simulada).
+"""
+
+import mimetypes
+import re
+import socketserver
+import threading
+import time
+from collections import Counter
+from datetime import date as date_type, datetime
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from email.message import EmailMessage
+from email.policy import SMTPUTF8, Compat32
+from email.utils import collapse_rfc2231_value, format_datetime, getaddresses
+
+from imap_backend import decode_mailbox, encode_mailbox, parse_values
+
+CAPABILITIES = ("IMAP4rev1", "ENABLE", "UTF8=ACCEPT", "SORT", "SPECIAL-USE")
+
+# Carpeta predeterminada de Outlook -> atributo SPECIAL-USE
+SPECIAL_USE = {5: "\\Sent", 16: "\\Drafts", 3: "\\Trash", 23: "\\Junk"}
+
+
+class _RawHeaders(Compat32):
+    """compat32 sin convertir los encabezados de 8 bits en Header: quedan como
+    surrogates y se recuperan los bytes originales (UTF-8) al responder."""
+
+    def header_fetch_parse(self, name, value):
+        return value
+
+
+_RAW_HEADERS = _RawHeaders()
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_SECTION_RE = re.compile(rb"BODY(\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", re.IGNORECASE)
+_HEADER_LINE_RE = re.compile(rb"^([^:\s]+):.*(?:\r?\n[ \t].*)*\r?\n?", re.MULTILINE)
+
+
+# ══════════════ Datos ══════════════
+
+class FakeImapMessage:
+    """Un correo del servidor (bytes RFC 822 + UID, fecha de llegada y flags)."""
+
+    def __init__(self, uid: int, raw: bytes, date: datetime, flags=()):
+        self.uid = uid
+        self.raw = raw
+        self.date = date if date.tzinfo else date.astimezone()
+        self.flags = list(flags)
+        self._msg = None
+        self._text = None
+
+    @property
+    def msg(self):
+        if self._msg is None:
+            self._msg = message_from_bytes(self.raw, policy=_RAW_HEADERS)
+        return self._msg
+
+    def header(self, name: str) -> str:
+        """Encabezado decodificado (todas sus apariciones)."""
+        return " ".join(_decode(v) for v in self.msg.get_all(name) or [])
+
+    def text(self) -> str:
+        """Texto de las partes text/* (para SEARCH BODY)."""
+        if self._text is None:
+            chunks = []
+            for part in self.msg.walk():
+                if part.get_content_maintype() == "text" and part.get_content_disposition() != "attachment":
+                    payload = part.get_payload(decode=True) or b""
+                    chunks.append(payload.decode(part.get_content_charset() or "utf-8", errors="replace"))
+            self._text = "\n".join(chunks)
+        return self._text
+
+
+class FakeMailbox:
+    """Carpeta del servidor."""
+
+    def __init__(self, name: str, uidvalidity: int, special_use: str = None):
+        self.name = name
+        self.uidvalidity = uidvalidity
+        self.special_use = special_use
+        self.messages = []
+        self.uidnext = 1
+
+
+# ══════════════ Servidor ══════════════
+
+class FakeImapServer:
+    """
+    Servidor IMAP en un thread, escuchando en 127.0.0.1 (puerto libre).
+
+    Attributes:
+        port: Puerto asignado (después de start)
+        mailboxes: Diccionario nombre -> FakeMailbox
+        commands: Counter de comandos recibidos ('UID FETCH', 'SELECT', ...)
+    """
+
+    def __init__(self, user: str = "usuario", password: str = "secreta",
+                 latency: float = 0.0, capabilities=CAPABILITIES, size_slack: int = 0):
+        """
+        Args:
+            user: Usuario aceptado por LOGIN
+            password: Contraseña aceptada por LOGIN
+            latency: Segundos de espera por comando (ida y vuelta simulada)
+            capabilities: Capacidades anunciadas (sin 'SORT' el cliente
+                          ordena con INTERNALDATE)
+            size_slack: Bytes que LARGER/SMALLER suman al tamaño, como un
+                        servidor que no lo calcula igual que RFC822.SIZE
+        """
+        self.user = user
+        self.password = password
+        self.latency = latency
+        self.capabilities = tuple(capabilities)
+        self.size_slack = size_slack
+        self.mailboxes = {}
+        self.commands = Counter()
+        self.port = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.add_mailbox("INBOX")
+
+    def add_mailbox(self, name: str, special_use: str = None) -> FakeMailbox:
+        """Agrega una carpeta ('Archivo/2023'; separador '/')."""
+        mailbox = self.mailboxes.get(name)
+        if mailbox is None:
+            mailbox = self.mailboxes[name] = FakeMailbox(name, 1000 + len(self.mailboxes), special_use)
+        return mailbox
+
+    def add_message(self, mailbox: str, raw: bytes, date: datetime = None, flags=()) -> int:
+        """
+        Agrega un correo.
+
+        Args:
+            mailbox: Carpeta (se crea si no existe)
+            raw: Bytes RFC 822
+            date: Fecha de llegada (INTERNALDATE); por defecto, ahora
+            flags: Flags y palabras clave ('\\\\Seen', 'Procesado', ...)
+
+        Returns:
+            UID asignado
+        """
+        box = self.add_mailbox(mailbox)
+        with self._lock:
+            uid = box.uidnext
+            box.uidnext += 1
+            box.messages.append(FakeImapMessage(uid, raw, date or datetime.now(), flags))
+        return uid
+
+    @classmethod
+    def from_outlook(cls, outlook, store_name: str = None, limit: int = None, **kwargs) -> "FakeImapServer":
+        """
+        Servidor con las carpetas y correos de un almacén de fake_outlook
+        (la bandeja de entrada pasa a ser INBOX).
+
+        Args:
+            outlook: FakeOutlook de origen
+            store_name: Almacén a copiar (por defecto el primero)
+            limit: Máximo de correos por carpeta
+            **kwargs: Argumentos de FakeImapServer
+        """
+        server = cls(**kwargs)
+        store = next((s for s in outlook.stores if store_name in (None, s._display_name)))
+        defaults = {id(f): t for t, f in store._default_folders.items()}
+
+        def walk(folder, prefix):
+            for child in folder._children:
+                folder_type = defaults.get(id(child))
+                name = "INBOX" if folder_type == 6 else f"{prefix}{child._name}"
+                server.add_mailbox(name, SPECIAL_USE.get(folder_type))
+                for record in child._records[:limit]:
+                    flags = [] if record.unread else ["\\Seen"]
+                    if record.flag_status == 2:
+                        flags.append("\\Flagged")
+                    flags.extend(c.strip().replace(" ", "_") for c in record.categories.split(",") if c.strip())
+                    server.add_message(name, record_to_message(record), record.received, flags)
+                walk(child, f"{name}/")
+
+        walk(store._root, "")
+        return server
+
+    def start(self) -> "FakeImapServer":
+        """Empieza a aceptar conexiones en un thread."""
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Session)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-imap", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record_to_message(record) -> bytes:
+    """
+    Bytes RFC 822 de un MailRecord de fake_outlook (con adjuntos). Los
+    encabezados van en UTF-8 (RFC 6532) porque hay direcciones con tildes.
+    """
+    msg = EmailMessage(policy=SMTPUTF8)
+    msg["From"] = _address(record.sender_name, record.sender_email)
+    for header, rtype in (("To", 1), ("Cc", 2)):
+        addresses = [_address(name, address) for name, address, t in record.recipients if t == rtype]
+        if addresses:
+            msg[header] = ", ".join(addresses)
+    msg["Subject"] = record.subject
+    msg["Date"] = format_datetime(record.received.astimezone())
+    msg["Message-ID"] = f"<{record.entry_id}@fake.invalid>"
+    if record.conversation_id:
+        msg["References"] = f"<{record.conversation_id}@fake.invalid>"
+    if record.importance != 1:
+        msg["Importance"] = "High" if record.importance == 2 else "Low"
+    msg.set_content(record.body)
+    for i, (name, size, content_id) in enumerate(record.attachments):
+        content = record.props.get(("attachment", i))
+        if content is None:
+            content = (f"{name}\n".encode("utf-8") * (size // max(len(name), 1) + 1))[:min(size, 4096)]
+        elif callable(content):
+            content = content()
+        maintype, subtype = (mimetypes.guess_type(name)[0] or "application/octet-stream").split("/")
+        msg.add_attachment(content, maintype=maintype, subtype=subtype, filename=name,
+                           disposition="inline" if content_id else "attachment",
+                           cid=f"<{content_id}>" if content_id else None)
+    return msg.as_bytes()
+
+
+def _address(name: str, address: str) -> str:
+    """'"Nombre" <correo>' (X500 de Exchange -> SMTP, como FakeAddressEntry.GetExchangeUser)."""
+    if "/" in address:
+        address = f"{address.rsplit('=', 1)[-1].lower()}@bancotanner.cl"
+    name = name.replace("\\", "").replace('"', "")
+    return f'"{name}" <{address}>' if name else address
+
+
+# ══════════════ Sesión (un thread por conexión) ══════════════
+
+class _Session(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.owner = self.server.owner
+        self.authenticated = False
+        self.mailbox = None
+        self.utf8 = False
+        self._out = bytearray()
+
+    def handle(self):
+        self._send(f"* OK [CAPABILITY {' '.join(self.owner.capabilities)}] Servidor IMAP simulado listo")
+        self._flush()
+        while True:
+            line = self._read_command()
+            if line is None:
+                return
+            tag, _, rest = line.partition(b" ")
+            name, _, args = rest.partition(b" ")
+            name = name.decode("ascii", "replace").upper()
+            uid = name == "UID"
+            if uid:
+                name, _, args = args.partition(b" ")
+                name = name.decode("ascii", "replace").upper()
+            with self.owner._lock:
+                self.owner.commands[("UID " if uid else "") + name] += 1
+            if self.owner.latency:
+                time.sleep(self.owner.latency)
+
+            handler = getattr(self, f"_cmd_{name.lower()}", None)
+            if handler is None or (not self.authenticated and name not in ("CAPABILITY", "LOGIN", "NOOP", "LOGOUT")):
+                self._tagged(tag, "BAD", f"{name} no soportado en este estado")
+                continue
+            try:
+                status, text = handler(parse_values(args), uid) or ("OK", f"{name} completado")
+            except Exception as e:
+                status, text = "BAD", f"{name}: {e}"
+            self._tagged(tag, status, text)
+            if name == "LOGOUT":
+                return
+
+    # === E/S ===
+
+    def _read_command(self):
+        data = b""
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            data += line
+            m = re.search(rb"\{(\d+)(\+?)\}\r?\n$", line)
+            if not m:
+                return data.rstrip(b"\r\n")
+            if not m.group(2):
+                self._send("+ Listo")
+                self._flush()
+            data += self.rfile.read(int(m.group(1)))
+
+    def _send(self, line):
+        self._out += (line.encode("utf-8") if isinstance(line, str) else line) + b"\r\n"
+
+    def _tagged(self, tag, status, text):
+        self._send(tag + f" {status} {text}".encode("utf-8"))
+        self._flush()
+
+    def _flush(self):
+        # Una sola escritura por respuesta (evita esperas de Nagle/ACK diferido)
+        self.wfile.write(bytes(self._out))
+        self._out.clear()
+
+    def _mailbox_name(self, value: bytes) -> str:
+        name = value.decode("utf-8", "replace")
+        return name if self.utf8 else decode_mailbox(name)
+
+    def _quote_mailbox(self, name: str) -> bytes:
+        return _nstring(name if self.utf8 else encode_mailbox(name))
+
+    def _selected(self):
+        if self.mailbox is None:
+            raise ValueError("no hay carpeta seleccionada")
+        return self.mailbox.messages
+
+    # === Comandos ===
+
+    def _cmd_capability(self, args, uid):
+        self._send(f"* CAPABILITY {' '.join(self.owner.capabilities)}")
+
+    def _cmd_noop(self, args, uid):
+        pass
+
+    def _cmd_logout(self, args, uid):
+        self._send("* BYE Hasta luego")
+
+    def _cmd_login(self, args, uid):
+        user, password = (a.decode("utf-8", "replace") for a in args[:2])
+        if (user, password) != (self.owner.user, self.owner.password):
+            return "NO", "[AUTHENTICATIONFAILED] Usuario o contraseña inválidos"
+        self.authenticated = True
+        return None
+
+    def _cmd_enable(self, args, uid):
+        if any(a.upper() == b"UTF8=ACCEPT" for a in args) and "UTF8=ACCEPT" in self.owner.capabilities:
+            self.utf8 = True
+            self._send("* ENABLED UTF8=ACCEPT")
+        else:
+            self._send("* ENABLED")
+
+    def _cmd_list(self, args, uid):
+        for name, box in sorted(self.owner.mailboxes.items()):
+            flags = ["\\HasNoChildren"] + ([box.special_use] if box.special_use else [])
+            self._send(f"* LIST ({' '.join(flags)}) \"/\" ".encode() + self._quote_mailbox(name))
+
+    def _cmd_select(self, args, uid, readonly=False):
+        box = self.owner.mailboxes.get(self._mailbox_name(args[0]))
+        if box is None:
+            self.mailbox = None
+            return "NO", "[NONEXISTENT] Carpeta no encontrada"
+        self.mailbox = box
+        unseen = sum("\\Seen" not in m.flags for m in box.messages)
+        self._send(f"* {len(box.messages)} EXISTS")
+        self._send("* 0 RECENT")
+        self._send("* FLAGS (\\Seen \\Answered \\Flagged \\Deleted \\Draft)")
+        self._send(f"* OK [UNSEEN {unseen}] No leídos")
+        self._send(f"* OK [UIDVALIDITY {box.uidvalidity}] UIDs válidos")
+        self._send(f"* OK [UIDNEXT {box.uidnext}] Próximo UID")
+        return "OK", f"[{'READ-ONLY' if readonly else 'READ-WRITE'}] Carpeta seleccionada"
+
+    def _cmd_examine(self, args, uid):
+        return self._cmd_select(args, uid, readonly=True)
+
+    def _cmd_close(self, args, uid):
+        self.mailbox = None
+
+    def _cmd_status(self, args, uid):
+        box = self.owner.mailboxes.get(self._mailbox_name(args[0]))
+        if box is None:
+            return "NO", "[NONEXISTENT] Carpeta no encontrada"
+        values = {
+            "MESSAGES": len(box.messages),
+            "UIDVALIDITY": box.uidvalidity,
+            "UIDNEXT": box.uidnext,
+            "UNSEEN": sum("\\Seen" not in m.flags for m in box.messages),
+            "RECENT": 0,
+        }
+        items = " ".join(f"{k.decode().upper()} {values[k.decode().upper()]}" for k in args[1])
+        self._send(b"* STATUS " + self._quote_mailbox(box.name) + f" ({items})".encode())
+
+    def _cmd_search(self, args, uid):
+        if args and args[0].upper() == b"CHARSET":
+            args = args[2:]
+        messages = self._selected()
+        test = _criteria(args, messages, self.owner.size_slack)
+        found = [m.uid if uid else seq for seq, m in enumerate(messages, 1) if test(m, seq)]
+        self._send("* SEARCH" + "".join(f" {n}" for n in found))
+
+    def _cmd_sort(self, args, uid):
+        keys, criteria = args[0], args[2:]
+        messages = self._selected()
+        test = _criteria(criteria, messages, self.owner.size_slack)
+        found = [(seq, m) for seq, m in enumerate(messages, 1) if test(m, seq)]
+        for key in reversed([k.upper() for k in keys]):
+            if key == b"REVERSE":
+                found.reverse()  # aplica a la clave siguiente (ya ordenada)
+                continue
+            sort_key = {b"ARRIVAL": lambda e: e[1].date, b"DATE": lambda e: e[1].date,
+                        b"SIZE": lambda e: len(e[1].raw)}.get(key)
+            if sort_key is None:
+                return "BAD", f"Clave de orden no soportada: {key.decode()}"
+            found.sort(key=sort_key)
+        self._send("* SORT" + "".join(f" {m.uid if uid else seq}" for seq, m in found))
+
+    def _cmd_fetch(self, args, uid):
+        messages = self._selected()
+        spec, items = args[0], args[1]
+        items = items if isinstance(items, list) else [items]
+        names = []
+        for item in items:
+            macro = {b"ALL": [b"FLAGS", b"INTERNALDATE", b"RFC822.SIZE", b"ENVELOPE"],
+                     b"FAST": [b"FLAGS", b"INTERNALDATE", b"RFC822.SIZE"],
+                     b"FULL": [b"FLAGS", b"INTERNALDATE", b"RFC822.SIZE", b"ENVELOPE", b"BODY"]}
+            names.extend(macro.get(item.upper(), [item]))
+        if uid and b"UID" not in [n.upper() for n in names]:
+            names.insert(0, b"UID")
+        last = messages[-1].uid if uid and messages else len(messages)
+        wanted = _sequence_set(spec, last)
+        out = bytearray()
+        for seq, message in enumerate(messages, 1):
+            if (message.uid if uid else seq) in wanted:
+                out += b"* %d FETCH (" % seq + b" ".join(_fetch_item(message, n) for n in names) + b")\r\n"
+        self._out += out
+
+
+# ══════════════ FETCH ══════════════
+
+def _fetch_item(message: FakeImapMessage, name: bytes) -> bytes:
+    key = name.upper()
+    if key == b"UID":
+        return b"UID %d" % message.uid
+    if key == b"FLAGS":
+        return b"FLAGS (" + " ".join(message.flags).encode("utf-8") + b")"
+    if key == b"INTERNALDATE":
+        return b'INTERNALDATE "' + _internaldate(message.date).encode() + b'"'
+    if key == b"RFC822.SIZE":
+        return b"RFC822.SIZE %d" % len(message.raw)
+    if key == b"ENVELOPE":
+        return b"ENVELOPE " + _envelope(message.msg)
+    if key in (b"BODYSTRUCTURE", b"BODY"):
+        return key + b" " + _structure(message.msg)
+    if key in (b"RFC822", b"RFC822.HEADER", b"RFC822.TEXT"):
+        section = {b"RFC822": b"", b"RFC822.HEADER": b"HEADER", b"RFC822.TEXT": b"TEXT"}[key]
+        return key + b" " + _literal(_section(message, section))
+    m = _SECTION_RE.fullmatch(name)
+    if m is None:
+        raise ValueError(f"Atributo FETCH no soportado: {name.decode()}")
+    section = m.group(2)
+    data = _section(message, section)
+    origin = b""
+    if m.group(3) is not None:
+        start = int(m.group(3))
+        data = data[start:start + int(m.group(4))]
+        origin = b"<%d>" % start
+    return b"BODY[" + section + b"]" + origin + b" " + _literal(data)
+
+
+def _section(message: FakeImapMessage, section: bytes) -> bytes:
+    raw = message.raw
+    split = re.search(rb"\r?\n\r?\n", raw)
+    header, text = (raw[:split.end()], raw[split.end():]) if split else (raw, b"")
+    upper = section.upper()
+    if not section:
+        return raw
+    if upper == b"HEADER":
+        return header
+    if upper == b"TEXT":
+        return text
+    if upper.startswith(b"HEADER.FIELDS"):
+        fields = {f.upper() for f in re.findall(rb"[^\s()]+", section[section.index(b"(") + 1:])}
+        lines = [m.group() for m in _HEADER_LINE_RE.finditer(header) if m.group(1).upper() in fields]
+        return b"".join(line if line.endswith(b"\n") else line + b"\r\n" for line in lines) + b"\r\n"
+    part = message.msg
+    for number in section.split(b"."):
+        index = int(number)
+        if part.is_multipart() and part.get_content_maintype() == "multipart":
+            part = part.get_payload()[index - 1]
+        elif index != 1:
+            raise ValueError(f"Sección inexistente: {section.decode()}")
+    return _part_bytes(part)
+
+
+def _part_bytes(part) -> bytes:
+    """Contenido de una parte tal como viene en el mensaje (sin decodificar)."""
+    if part.get_content_type() == "message/rfc822":
+        return part.get_payload(0).as_bytes()
+    payload = part.get_payload()
+    if isinstance(payload, list):
+        return b"".join(p.as_bytes() for p in payload)
+    return (payload or "").encode("utf-8", "surrogateescape")
+
+
+def _envelope(msg) -> bytes:
+    def header(name):
+        return _unfold(msg.get(name))
+
+    def addresses(name):
+        values = msg.get_all(name)
+        if not values:
+            return b"NIL"
+        entries = []
+        for display, address in getaddresses([_unfold(v) for v in values]):
+            if not address:
+                continue
+            mailbox, _, host = address.partition("@")
+            entries.append(b"(" + _nstring(display or None) + b" NIL " + _nstring(mailbox) + b" "
+                           + _nstring(host or None) + b")")
+        return b"(" + b"".join(entries) + b")" if entries else b"NIL"
+
+    sender = addresses("From")
+    fields = [
+        _nstring(header("Date")),
+        _nstring(header("Subject")),
+        sender,
+        addresses("Sender") if header("Sender") else sender,
+        addresses("Reply-To") if header("Reply-To") else sender,
+        addresses("To"),
+        addresses("Cc"),
+        addresses("Bcc"),
+        _nstring(header("In-Reply-To")),
+        _nstring(header("Message-ID")),
+    ]
+    return b"(" + b" ".join(fields) + b")"
+
+
+def _structure(part) -> bytes:
+    maintype, subtype = part.get_content_maintype(), part.get_content_subtype()
+    if maintype == "multipart":
+        children = b"".join(_structure(p) for p in part.get_payload())
+        return (b"(" + children + b" " + _nstring(subtype) + b" "
+                + _plist({"boundary": part.get_boundary()}) + b" NIL NIL NIL)")
+    body = _part_bytes(part)
+    params = {k: collapse_rfc2231_value(v) for k, v in (part.get_params() or [])[1:]}
+    fields = [
+        _nstring(maintype), _nstring(subtype), _plist(params),
+        _nstring(part.get("Content-ID")), _nstring(part.get("Content-Description")),
+        _nstring(str(part.get("Content-Transfer-Encoding", "7bit")).lower()),
+        b"%d" % len(body),
+    ]
+    if maintype == "text":
+        fields.append(b"%d" % body.count(b"\n"))
+    elif (maintype, subtype) == ("message", "rfc822"):
+        inner = part.get_payload(0)
+        fields += [_envelope(inner), _structure(inner), b"%d" % body.count(b"\n")]
+    disposition = b"NIL"
+    if part.get("Content-Disposition"):
+        dparams = {k: collapse_rfc2231_value(v)
+                   for k, v in (part.get_params(header="content-disposition") or [])[1:]}
+        disposition = b"(" + _nstring(part.get_content_disposition()) + b" " + _plist(dparams) + b")"
+    fields += [b"NIL", disposition, b"NIL"]
+    return b"(" + b" ".join(fields) + b")"
+
+
+def _plist(params: dict) -> bytes:
+    if not params:
+        return b"NIL"
+    return b"(" + b" ".join(_nstring(k) + b" " + _nstring(str(v)) for k, v in params.items()) + b")"
+
+
+def _nstring(value) -> bytes:
+    """String IMAP: NIL, entre comillas o literal si tiene caracteres especiales."""
+    if value is None:
+        return b"NIL"
+    data = str(value).encode("utf-8", "surrogateescape")
+    if re.search(rb'[\r\n"\\\x80-\xff]', data):
+        return _literal(data)
+    return b'"' + data + b'"'
+
+
+def _literal(data: bytes) -> bytes:
+    return b"{%d}\r\n" % len(data) + data
+
+
+def _unfold(value):
+    return re.sub(r"\r?\n(?=[ \t])", "", str(value)) if value is not None else None
+
+
+def _decode(value) -> str:
+    text = _unfold(value).encode("utf-8", "surrogateescape").decode("utf-8", "replace")
+    try:
+        return str(make_header(decode_header(text)))
+    except Exception:
+        return text
+
+
+def _internaldate(date: datetime) -> str:
+    offset = int(date.utcoffset().total_seconds() // 60)
+    sign = "-" if offset < 0 else "+"
+    zone = f"{sign}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+    return f"{date.day:2d}-{_MONTHS[date.month - 1]}-{date.year} {date:%H:%M:%S} {zone}"
+
+
+# ══════════════ SEARCH ══════════════
+
+def _sequence_set(spec: bytes, last: int):
+    """Conjunto de números de un sequence-set ('1:5,8,10:*')."""
+    numbers = set()
+    for piece in spec.decode().split(","):
+        lo, _, hi = piece.partition(":")
+        lo = last if lo == "*" else int(lo)
+        hi = lo if not hi else last if hi == "*" else int(hi)
+        numbers.update(range(min(lo, hi), max(lo, hi) + 1))
+    return numbers
+
+
+def _criteria(tokens, messages, slack=0):
+    """Predicado (mensaje, número de secuencia) -> bool de una lista de claves de búsqueda."""
+    tests = []
+    pos = 0
+    while pos < len(tokens):
+        test, pos = _criterion(tokens, pos, messages, slack)
+        tests.append(test)
+    return lambda m, seq: all(t(m, seq) for t in tests)
+
+
+def _criterion(tokens, pos, messages, slack=0):
+    token = tokens[pos]
+    pos += 1
+    if isinstance(token, list):
+        return _criteria(token, messages, slack), pos
+    key = token.upper().decode("ascii", "replace")
+
+    flags = {"SEEN": "\\Seen", "ANSWERED": "\\Answered", "FLAGGED": "\\Flagged",
+             "DELETED": "\\Deleted", "DRAFT": "\\Draft"}
+    if key == "ALL":
+        return (lambda m, seq: True), pos
+    if key in flags:
+        return (lambda m, seq: flags[key] in m.flags), pos
+    if key.startswith("UN") and key[2:] in flags:
+        return (lambda m, seq: flags[key[2:]] not in m.flags), pos
+    if key == "NOT":
+        inner, pos = _criterion(tokens, pos, messages, slack)
+        return (lambda m, seq: not inner(m, seq)), pos
+    if key == "OR":
+        left, pos = _criterion(tokens, pos, messages, slack)
+        right, pos = _criterion(tokens, pos, messages, slack)
+        return (lambda m, seq: left(m, seq) or right(m, seq)), pos
+
+    if key in ("SUBJECT", "FROM", "TO", "CC", "BCC"):
+        value = tokens[pos].decode("utf-8", "replace").lower()
+        header = key.title() if key != "BCC" else "Bcc"
+        return (lambda m, seq: value in m.header(header).lower()), pos + 1
+    if key == "HEADER":
+        field, value = tokens[pos].decode(), tokens[pos + 1].decode("utf-8", "replace").lower()
+        return (lambda m, seq: value in m.header(field).lower()), pos + 2
+    if key == "BODY":
+        value = tokens[pos].decode("utf-8", "replace").lower()
+        return (lambda m, seq: value in m.text().lower()), pos + 1
+    if key == "TEXT":
+        value = tokens[pos].decode("utf-8", "replace").lower()
+        return (lambda m, seq: value in m.raw.decode("utf-8", "replace").lower()
+                or value in m.text().lower()), pos + 1
+    if key in ("KEYWORD", "UNKEYWORD"):
+        value = tokens[pos].decode("utf-8", "replace")
+        return (lambda m, seq: (value in m.flags) == (key == "KEYWORD")), pos + 1
+    if key in ("SINCE", "BEFORE", "ON"):
+        day = _parse_date(tokens[pos])
+        compare = {"SINCE": lambda d: d >= day, "BEFORE": lambda d: d < day, "ON": lambda d: d == day}[key]
+        return (lambda m, seq: compare(m.date.date())), pos + 1
+    if key in ("LARGER", "SMALLER"):
+        size = int(tokens[pos])
+        if key == "LARGER":
+            return (lambda m, seq: len(m.raw) + slack > size), pos + 1
+        return (lambda m, seq: len(m.raw) + slack < size), pos + 1
+    if key == "UID":
+        last = messages[-1].uid if messages else 0
+        wanted = _sequence_set(tokens[pos], last)
+        return (lambda m, seq: m.uid in wanted), pos + 1
+    if re.fullmatch(r"[\d:*,]+", key):
+        wanted = _sequence_set(token, len(messages))
+        return (lambda m, seq: seq in wanted), pos
+    raise ValueError(f"Criterio de búsqueda no soportado: {key}")
+
+
+def _parse_date(value: bytes) -> date_type:
+    day, month, year = value.decode().split("-")
+    return date_type(int(year), _MONTHS.index(month.title()) + 1, int(day))
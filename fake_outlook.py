@@ -0,0 +1,1082 @@
+"""
+Outlook simulado en proceso (sin COM).
+Reproduce la parte del modelo de objetos de Outlook que usa la aplicación
+(Namespace, Folders, Items con Sort/Restrict, MailItem con Move/SaveAs,
+Recipients, Attachments con SaveAsFile y PropertyAccessor) para medir
+rendimiento y ejecutar el código de búsqueda/exportación en Linux. archive.py
+lo usa además como modelo en memoria de los correos leídos de archivos
+.eml/.mbox/.msg.
+
+Cada acceso a una propiedad o método público cuenta como una llamada COM y
+puede tener una latencia configurable. Ejemplo:
+
+    outlook = FakeOutlook.with_mailbox(10_000, latency=0.00005)
+    client = OutlookClient(application=outlook.application)
+    EmailSearch(client).search(subject="factura")
+    print(outlook.stats.snapshot())
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import dasl
+
+
+# Tipos de carpeta de Outlook (OlDefaultFolders) y su nombre en el buzón simulado
+DEFAULT_FOLDER_NAMES = {
+    6: "Bandeja de entrada",
+    5: "Elementos enviados",
+    16: "Borradores",
+    3: "Elementos eliminados",
+    4: "Bandeja de salida",
+    23: "Correo no deseado",
+}
+
+PR_ATTACH_CONTENT_ID = "http://schemas.microsoft.com/mapi/proptag/0x3712001F"
+PR_PREVIEW = "http://schemas.microsoft.com/mapi/proptag/0x3FD9001F"
+PR_SENDER_SMTP = "http://schemas.microsoft.com/mapi/proptag/0x5D01001F"
+
+
+# ══════════════ Contabilidad de llamadas ══════════════
+
+class CallStats:
+    """Contador thread-safe de llamadas COM simuladas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def record(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+    def snapshot(self) -> dict:
+        """Copia de los contadores: {'Clase.Miembro': llamadas}."""
+        with self._lock:
+            return dict(self.calls)
+
+
+class _Session:
+    """Estado compartido por todos los objetos de un Outlook simulado."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.stats = CallStats()
+        self.move_changes_entry_id = False
+        self.moves = 0
+
+    def touch(self, name: str):
+        self.stats.record(name)
+        if self.latency > 0:
+            if self.latency >= 0.002:
+                time.sleep(self.latency)
+            else:
+                # time.sleep no es preciso por debajo de ~1 ms
+                end = time.perf_counter() + self.latency
+                while time.perf_counter() < end:
+                    pass
+
+
+class _FakeCom:
+    """Base: cada acceso a un miembro público cuenta como una llamada COM."""
+
+    _com_name = "Object"
+
+    def __init__(self, session: _Session):
+        object.__setattr__(self, "_session", session)
+
+    def __getattribute__(self, name):
+        if name[0] != "_":
+            object.__getattribute__(self, "_session").touch(
+                f"{type(self)._com_name}.{name}"
+            )
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[0] != "_":
+            self._session.touch(f"{type(self)._com_name}.{name}=")
+        object.__setattr__(self, name, value)
+
+
+# ══════════════ Datos de mensajes ══════════════
+
+class MailRecord:
+    """
+    Datos de un mensaje (sin contabilidad COM). El cuerpo puede ser un
+    string o una función que lo genera bajo demanda.
+    """
+
+    __slots__ = (
+        "entry_id", "subject", "sender_name", "sender_email", "to", "cc",
+        "received", "_body", "html_body", "importance", "categories", "size",
+        "attachments", "recipients", "unread", "conversation_id",
+        "conversation_topic", "conversation_index", "flag_status", "folder",
+        "props",
+    )
+
+    def __init__(self, entry_id, subject="", sender_name="", sender_email="",
+                 to="", cc="", received=None, body="", html_body="",
+                 importance=1, categories="", size=0, attachments=(),
+                 recipients=(), unread=False, conversation_id="",
+                 conversation_topic="", conversation_index="", props=None):
+        self.entry_id = entry_id
+        self.subject = subject
+        self.sender_name = sender_name
+        self.sender_email = sender_email
+        self.to = to
+        self.cc = cc
+        self.received = received or datetime.now()
+        self._body = body
+        self.html_body = html_body
+        self.importance = importance
+        self.categories = categories
+        self.size = size
+        self.attachments = list(attachments)   # [(nombre, tamaño, content_id o "")]
+        self.recipients = list(recipients)     # [(nombre, dirección, tipo)]
+        self.unread = unread
+        self.conversation_id = conversation_id
+        self.conversation_topic = conversation_topic or subject
+        self.conversation_index = conversation_index
+        self.flag_status = 0
+        self.folder = None
+        self.props = props or {}
+
+    @property
+    def body(self) -> str:
+        if callable(self._body):
+            return self._body()
+        return self._body or ""
+
+    def get(self, name: str):
+        """Valor de una propiedad por nombre (usado por el evaluador DASL)."""
+        if name == "HasAttachment":
+            return any(not a[2] for a in self.attachments)
+        if name == "Read":
+            return not self.unread
+        return _RECORD_FIELDS[name](self)
+
+
+_RECORD_FIELDS = {
+    "Subject": lambda r: r.subject,
+    "SenderEmailAddress": lambda r: r.sender_email,
+    "SenderName": lambda r: r.sender_name,
+    "ReceivedTime": lambda r: r.received,
+    "Body": lambda r: r.body,
+    "To": lambda r: r.to,
+    "CC": lambda r: r.cc,
+    "Importance": lambda r: r.importance,
+    "Categories": lambda r: r.categories,
+    "Size": lambda r: r.size,
+    "EntryID": lambda r: r.entry_id,
+    "ConversationID": lambda r: r.conversation_id,
+    "ConversationTopic": lambda r: r.conversation_topic,
+    "ConversationIndex": lambda r: r.conversation_index,
+    # Columnas MAPI que también entrega Folder.GetTable
+    PR_PREVIEW: lambda r: _preview(r),
+    PR_SENDER_SMTP: lambda r: _smtp_address(r.sender_email),
+}
+
+
+def _preview(record) -> str:
+    """PR_PREVIEW: como Outlook, los primeros 255 caracteres del cuerpo en texto plano."""
+    value = record.props.get(PR_PREVIEW)
+    if value is None:
+        return " ".join(record.body[:512].split())[:255]
+    return value() if callable(value) else value
+
+
+def _smtp_address(address: str) -> str:
+    """Dirección SMTP de un remitente (las X500 de Exchange se resuelven por alias)."""
+    if "/" not in address:
+        return address
+    return address.rsplit("=", 1)[-1].lower() + "@bancotanner.cl"
+
+
+# ══════════════ Objetos COM simulados ══════════════
+
+class FakeApplication(_FakeCom):
+    _com_name = "Application"
+
+    def __init__(self, session, namespace):
+        super().__init__(session)
+        self._namespace = namespace
+        self._listeners = []   # receptores de AdvancedSearchComplete
+
+    def GetNamespace(self, name):
+        return self._namespace
+
+    def AdvancedSearch(self, scope, filter_str="", search_subfolders=False, tag=""):
+        """Búsqueda sincrónica; el evento de término se emite antes de retornar."""
+        paths = [p.strip().strip("'").replace("''", "'") for p in scope.split(",")]
+        folders = [f for store in self._namespace._stores
+                   for f in store._folders_by_id.values() if f.FolderPath in paths]
+        records = []
+        for folder in folders:
+            records.extend(folder._all_records() if search_subfolders else folder._records)
+        if filter_str:
+            predicate = dasl.compile_filter("@SQL=" + filter_str)
+            records = [r for r in records if predicate(r.get)]
+        search = FakeSearch(self._session, tag, FakeItems(self._session, records))
+        for handler in list(self._listeners):
+            handler.OnAdvancedSearchComplete(search)
+        return search
+
+    def _subscribe(self, handler):
+        """Equivalente a WithEvents(application, ...)."""
+        self._listeners.append(handler)
+        handler.close = lambda: self._listeners.remove(handler)
+
+
+class FakeSearch(_FakeCom):
+    _com_name = "Search"
+
+    def __init__(self, session, tag, results):
+        super().__init__(session)
+        self._tag = tag
+        self._results = results
+
+    Tag = property(lambda self: self._tag)
+    Results = property(lambda self: self._results)
+
+    def Stop(self):
+        pass
+
+
+class FakeNamespace(_FakeCom):
+    _com_name = "Namespace"
+
+    def __init__(self, session, stores, account_email):
+        super().__init__(session)
+        self._stores = stores
+        self._account_email = account_email
+
+    @property
+    def Folders(self):
+        return FakeFolders(self._session, [s._root for s in self._stores], None)
+
+    @property
+    def Stores(self):
+        return FakeStores(self._session, self._stores)
+
+    @property
+    def Accounts(self):
+        return FakeAccounts(self._session, [self._account_email])
+
+    @property
+    def DefaultStore(self):
+        return self._stores[0]
+
+    def GetDefaultFolder(self, folder_type):
+        return self._stores[0].GetDefaultFolder(folder_type)
+
+    def GetFolderFromID(self, entry_id, store_id=None):
+        for store in self._stores:
+            if store_id and store._store_id != store_id:
+                continue
+            folder = store._folders_by_id.get(entry_id)
+            if folder is not None:
+                return folder
+        raise LookupError(f"Carpeta no encontrada: {entry_id}")
+
+    def GetItemFromID(self, entry_id, store_id=None):
+        for store in self._stores:
+            if store_id and store._store_id != store_id:
+                continue
+            record = store._records_by_id.get(entry_id)
+            if record is not None:
+                return FakeMailItem(self._session, record)
+        raise LookupError(f"Elemento no encontrado: {entry_id}")
+
+
+class FakeStore(_FakeCom):
+    _com_name = "Store"
+
+    def __init__(self, session, display_name, store_id, file_path="",
+                 exchange_store_type=0, instant_search=False):
+        super().__init__(session)
+        self._display_name = display_name
+        self._store_id = store_id
+        self._file_path = file_path
+        self._exchange_store_type = exchange_store_type
+        self._instant_search = instant_search
+        self._folders_by_id = {}
+        self._records_by_id = {}
+        self._default_folders = {}
+        self._root = FakeFolder(session, self, display_name, None)
+
+    DisplayName = property(lambda self: self._display_name)
+    StoreID = property(lambda self: self._store_id)
+    FilePath = property(lambda self: self._file_path)
+    ExchangeStoreType = property(lambda self: self._exchange_store_type)
+    IsInstantSearchEnabled = property(lambda self: self._instant_search)
+
+    def GetRootFolder(self):
+        return self._root
+
+    def GetDefaultFolder(self, folder_type):
+        folder = self._default_folders.get(folder_type)
+        if folder is None:
+            raise LookupError(f"Carpeta predeterminada no disponible: {folder_type}")
+        return folder
+
+
+class FakeStores(_FakeCom):
+    _com_name = "Stores"
+
+    def __init__(self, session, stores):
+        super().__init__(session)
+        self._stores = stores
+
+    @property
+    def Count(self):
+        return len(self._stores)
+
+    def Item(self, index):
+        return self._stores[index - 1]
+
+    def __iter__(self):
+        return iter(self._stores)
+
+
+class FakeAccounts(_FakeCom):
+    _com_name = "Accounts"
+
+    def __init__(self, session, emails):
+        super().__init__(session)
+        self._emails = emails
+
+    @property
+    def Count(self):
+        return len(self._emails)
+
+    def Item(self, index):
+        return FakeAccount(self._session, self._emails[index - 1])
+
+
+class FakeAccount(_FakeCom):
+    _com_name = "Account"
+
+    def __init__(self, session, email):
+        super().__init__(session)
+        self._email = email
+
+    SmtpAddress = property(lambda self: self._email)
+
+
+class FakeFolder(_FakeCom):
+    _com_name = "Folder"
+
+    def __init__(self, session, store, name, parent):
+        super().__init__(session)
+        self._store = store
+        self._name = name
+        self._parent = parent
+        self._children = []
+        self._records = []
+        self._listeners = []   # receptores de eventos Items (ItemAdd/Change/Remove)
+        self._entry_id = f"F{len(store._folders_by_id) + 1:08X}:{store._store_id}"
+        store._folders_by_id[self._entry_id] = self
+
+    Name = property(lambda self: self._name)
+    EntryID = property(lambda self: self._entry_id)
+    StoreID = property(lambda self: self._store._store_id)
+    Store = property(lambda self: self._store)
+    Parent = property(lambda self: self._parent)
+
+    @property
+    def FolderPath(self):
+        parts = []
+        folder = self
+        while folder is not None:
+            parts.append(folder._name)
+            folder = folder._parent
+        return "\\\\" + "\\".join(reversed(parts))
+
+    @property
+    def Folders(self):
+        return FakeFolders(self._session, self._children, self)
+
+    @property
+    def Items(self):
+        return FakeItems(self._session, self._records, folder=self)
+
+    def GetTable(self, filter_str="", table_contents=0):
+        records = self._records
+        if filter_str:
+            predicate = dasl.compile_filter(filter_str)
+            records = [r for r in records if predicate(r.get)]
+        return FakeTable(self._session, records)
+
+    def _all_records(self):
+        records = list(self._records)
+        for child in self._children:
+            records.extend(child._all_records())
+        return records
+
+    def _add_child(self, name):
+        child = FakeFolder(self._session, self._store, name, self)
+        self._children.append(child)
+        return child
+
+    def _add_record(self, record):
+        record.folder = self
+        self._records.append(record)
+        self._store._records_by_id[record.entry_id] = record
+
+    def _remove_record(self, record):
+        self._records.remove(record)
+        self._store._records_by_id.pop(record.entry_id, None)
+        record.folder = None
+
+    def _fire(self, event, record=None):
+        for handler in list(self._listeners):
+            if record is None:
+                getattr(handler, event)()
+            else:
+                getattr(handler, event)(FakeMailItem(self._session, record))
+
+
+class FakeFolders(_FakeCom):
+    _com_name = "Folders"
+
+    def __init__(self, session, folders, parent):
+        super().__init__(session)
+        self._folders = folders
+        self._parent = parent
+
+    @property
+    def Count(self):
+        return len(self._folders)
+
+    def Item(self, index):
+        if isinstance(index, str):
+            return self[index]
+        return self._folders[index - 1]
+
+    def __getitem__(self, name):
+        self._session.touch("Folders.__getitem__")
+        for f in self._folders:
+            if f._name.lower() == str(name).lower():
+                return f
+        raise LookupError(f"Subcarpeta no encontrada: {name}")
+
+    def __iter__(self):
+        return iter(list(self._folders))
+
+    def Add(self, name):
+        return self._parent._add_child(name)
+
+
+class FakeItems(_FakeCom):
+    """Colección Items: Sort, Restrict, enumeración y GetFirst/GetNext."""
+
+    _com_name = "Items"
+
+    def __init__(self, session, records, sort_key=None, descending=False, folder=None):
+        super().__init__(session)
+        self._records = records
+        self._folder = folder
+        self._sort = (sort_key, descending)
+        self._pos = 0
+
+    def _ordered(self):
+        key, desc = self._sort
+        if key is None:
+            return list(self._records)
+        return sorted(self._records, key=lambda r: r.get(key), reverse=desc)
+
+    @property
+    def Count(self):
+        return len(self._records)
+
+    def Sort(self, prop, descending=False):
+        self._sort = (prop.strip("[]"), bool(descending))
+        self._records = self._ordered()
+        self._sort = (None, False)
+
+    def Restrict(self, filter_str):
+        if filter_str.upper().startswith("@SQL="):
+            predicate = dasl.compile_filter(filter_str)
+            matched = [r for r in self._records if predicate(r.get)]
+        else:
+            raise ValueError("El Outlook simulado solo soporta filtros DASL (@SQL=)")
+        return FakeItems(self._session, matched)
+
+    def Item(self, index):
+        return FakeMailItem(self._session, self._records[index - 1])
+
+    def GetFirst(self):
+        self._pos = 0
+        return self.GetNext()
+
+    def GetLast(self):
+        if not self._records:
+            return None
+        self._pos = len(self._records)
+        return FakeMailItem(self._session, self._records[-1])
+
+    def Find(self, filter_str):
+        self._find = dasl.compile_filter(filter_str)
+        self._find_pos = 0
+        return self.FindNext()
+
+    def FindNext(self):
+        predicate = getattr(self, "_find", None)
+        if predicate is None:
+            return None
+        while self._find_pos < len(self._records):
+            record = self._records[self._find_pos]
+            self._find_pos += 1
+            if predicate(record.get):
+                return FakeMailItem(self._session, record)
+        return None
+
+    def GetNext(self):
+        if self._pos >= len(self._records):
+            return None
+        record = self._records[self._pos]
+        self._pos += 1
+        return FakeMailItem(self._session, record)
+
+    def __iter__(self):
+        for record in list(self._records):
+            self._session.touch("Items.Next")
+            yield FakeMailItem(self._session, record)
+
+    def _subscribe(self, handler):
+        """Equivalente a WithEvents(items, ...): registra un receptor de eventos."""
+        if self._folder is None:
+            raise TypeError("Solo la colección Items de una carpeta emite eventos")
+        self._folder._listeners.append(handler)
+        handler.close = lambda: self._folder._listeners.remove(handler)
+
+
+class FakeTable(_FakeCom):
+    """Table de Folder.GetTable: columnas configurables, GetNextRow y GetArray."""
+
+    _com_name = "Table"
+
+    def __init__(self, session, records):
+        super().__init__(session)
+        self._records = list(records)
+        self._columns = ["EntryID", "Subject", "CreationTime", "LastModificationTime",
+                         "MessageClass"]
+        self._pos = 0
+
+    @property
+    def Columns(self):
+        return FakeColumns(self._session, self._columns)
+
+    @property
+    def EndOfTable(self):
+        return self._pos >= len(self._records)
+
+    def GetRowCount(self):
+        return len(self._records)
+
+    def MoveToStart(self):
+        self._pos = 0
+
+    def Sort(self, prop, descending=False):
+        key = prop.strip("[]")
+        self._records.sort(key=lambda r: r.get(key), reverse=bool(descending))
+
+    def Restrict(self, filter_str):
+        predicate = dasl.compile_filter(filter_str)
+        return FakeTable(self._session, [r for r in self._records if predicate(r.get)])
+
+    def _values(self, record):
+        values = []
+        for col in self._columns:
+            try:
+                values.append(record.get(dasl.PROPERTY_MAP.get(col, col)))
+            except KeyError:
+                values.append(None)  # columna sin equivalente en el simulador
+        return tuple(values)
+
+    def GetNextRow(self):
+        if self._pos >= len(self._records):
+            return None
+        record = self._records[self._pos]
+        self._pos += 1
+        return FakeRow(self._session, self._columns, self._values(record))
+
+    def GetArray(self, max_rows):
+        chunk = self._records[self._pos:self._pos + max_rows]
+        self._pos += len(chunk)
+        return tuple(self._values(r) for r in chunk)
+
+
+class FakeColumns(_FakeCom):
+    _com_name = "Columns"
+
+    def __init__(self, session, columns):
+        super().__init__(session)
+        self._columns = columns
+
+    @property
+    def Count(self):
+        return len(self._columns)
+
+    def Add(self, name):
+        self._columns.append(name)
+
+    def RemoveAll(self):
+        self._columns.clear()
+
+
+class FakeRow(_FakeCom):
+    _com_name = "Row"
+
+    def __init__(self, session, columns, values):
+        super().__init__(session)
+        self._columns = columns
+        self._values = values
+
+    def GetValues(self):
+        return self._values
+
+    def Item(self, index):
+        if isinstance(index, str):
+            return self._values[self._columns.index(index)]
+        return self._values[index - 1]
+
+
+class FakeMailItem(_FakeCom):
+    _com_name = "MailItem"
+
+    Class = 43  # olMail
+
+    def __init__(self, session, record):
+        super().__init__(session)
+        object.__setattr__(self, "_r", record)
+
+    EntryID = property(lambda self: self._r.entry_id)
+    Subject = property(lambda self: self._r.subject)
+    SenderName = property(lambda self: self._r.sender_name)
+    SenderEmailAddress = property(lambda self: self._r.sender_email)
+    To = property(lambda self: self._r.to)
+    CC = property(lambda self: self._r.cc)
+    ReceivedTime = property(lambda self: self._r.received)
+    Body = property(lambda self: self._r.body)
+    HTMLBody = property(lambda self: self._r.html_body)
+    Importance = property(lambda self: self._r.importance)
+    Size = property(lambda self: self._r.size)
+    ConversationID = property(lambda self: self._r.conversation_id)
+    ConversationTopic = property(lambda self: self._r.conversation_topic)
+    ConversationIndex = property(lambda self: self._r.conversation_index)
+    Parent = property(lambda self: self._r.folder)
+
+    @property
+    def Categories(self):
+        return self._r.categories
+
+    @Categories.setter
+    def Categories(self, value):
+        self._r.categories = value
+
+    @property
+    def UnRead(self):
+        return self._r.unread
+
+    @UnRead.setter
+    def UnRead(self, value):
+        self._r.unread = bool(value)
+
+    @property
+    def FlagStatus(self):
+        return self._r.flag_status
+
+    @FlagStatus.setter
+    def FlagStatus(self, value):
+        self._r.flag_status = value
+
+    @property
+    def IsMarkedAsTask(self):
+        return self._r.flag_status == 2  # olFlagMarked
+
+    def MarkAsTask(self, mark_interval):
+        self._r.flag_status = 2
+
+    def ClearTaskFlag(self):
+        self._r.flag_status = 0
+
+    @property
+    def Sender(self):
+        return FakeAddressEntry(self._session, self._r.sender_name, self._r.sender_email)
+
+    @property
+    def Recipients(self):
+        return FakeRecipients(self._session, self._r.recipients)
+
+    @property
+    def Attachments(self):
+        return FakeAttachments(self._session, self._r)
+
+    @property
+    def PropertyAccessor(self):
+        props = {PR_PREVIEW: lambda: _preview(self._r), **self._r.props}
+        return FakePropertyAccessor(self._session, props)
+
+    def Save(self):
+        pass
+
+    def Move(self, folder):
+        """Mueve el correo (emite ItemRemove en el origen e ItemAdd en el destino)."""
+        source = self._r.folder
+        if source is not None:
+            source._remove_record(self._r)
+            source._fire("OnItemRemove")
+        if self._session.move_changes_entry_id:
+            self._session.moves += 1
+            self._r.entry_id = f"{self._r.entry_id.split('~')[0]}~M{self._session.moves}"
+        folder._add_record(self._r)
+        folder._fire("OnItemAdd", self._r)
+        return FakeMailItem(self._session, self._r)
+
+    def SaveAs(self, path, save_type=None):
+        r = self._r
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"From: {r.sender_name} <{r.sender_email}>\nTo: {r.to}\n"
+                    f"Subject: {r.subject}\nDate: {r.received}\n\n{r.body}")
+
+
+class FakeAddressEntry(_FakeCom):
+    _com_name = "AddressEntry"
+
+    def __init__(self, session, name, address):
+        super().__init__(session)
+        self._name = name
+        self._address = address
+
+    Name = property(lambda self: self._name)
+    Address = property(lambda self: self._address)
+
+    def GetExchangeUser(self):
+        if "/" not in self._address:
+            return None
+        return FakeExchangeUser(self._session, _smtp_address(self._address))
+
+
+class FakeExchangeUser(_FakeCom):
+    _com_name = "ExchangeUser"
+
+    def __init__(self, session, smtp):
+        super().__init__(session)
+        self._smtp = smtp
+
+    PrimarySmtpAddress = property(lambda self: self._smtp)
+
+
+class FakeRecipients(_FakeCom):
+    _com_name = "Recipients"
+
+    def __init__(self, session, recipients):
+        super().__init__(session)
+        self._recipients = recipients
+
+    @property
+    def Count(self):
+        return len(self._recipients)
+
+    def Item(self, index):
+        return FakeRecipient(self._session, *self._recipients[index - 1])
+
+
+class FakeRecipient(_FakeCom):
+    _com_name = "Recipient"
+
+    def __init__(self, session, name, address, rtype=1):
+        super().__init__(session)
+        self._name = name
+        self._address = address
+        self._type = rtype
+
+    Name = property(lambda self: self._name)
+    Address = property(lambda self: self._address)
+    Type = property(lambda self: self._type)
+
+
+class FakeAttachments(_FakeCom):
+    _com_name = "Attachments"
+
+    def __init__(self, session, record):
+        super().__init__(session)
+        self._record = record
+
+    @property
+    def Count(self):
+        return len(self._record.attachments)
+
+    def Item(self, index):
+        return FakeAttachment(self._session, self._record, index - 1)
+
+
+class FakeAttachment(_FakeCom):
+    _com_name = "Attachment"
+
+    # Tamaño máximo escrito por SaveAsFile (el tamaño declarado puede ser mayor)
+    _MAX_CONTENT = 4096
+
+    def __init__(self, session, record, index):
+        super().__init__(session)
+        self._record = record
+        self._index = index
+
+    FileName = property(lambda self: self._record.attachments[self._index][0])
+    Size = property(lambda self: self._record.attachments[self._index][1])
+    Type = 1  # olByValue
+
+    @property
+    def PropertyAccessor(self):
+        content_id = self._record.attachments[self._index][2]
+        props = {PR_ATTACH_CONTENT_ID: content_id} if content_id else {}
+        return FakePropertyAccessor(self._session, props)
+
+    def SaveAsFile(self, path):
+        name, size, _ = self._record.attachments[self._index]
+        content = self._record.props.get(("attachment", self._index))
+        if content is None:
+            content = (f"{name}\n".encode("utf-8") * (size // max(len(name), 1) + 1))
+            content = content[: min(size, self._MAX_CONTENT)]
+        elif callable(content):
+            content = content()  # bytes o bloques de bytes (lectura por partes)
+        with open(path, "wb") as f:
+            if isinstance(content, bytes):
+                f.write(content)
+            else:
+                for block in content:
+                    f.write(block)
+
+
+class FakePropertyAccessor(_FakeCom):
+    _com_name = "PropertyAccessor"
+
+    def __init__(self, session, props):
+        super().__init__(session)
+        self._props = props
+
+    def GetProperty(self, schema):
+        if schema not in self._props:
+            raise LookupError(f"Propiedad no encontrada: {schema}")
+        value = self._props[schema]
+        return value() if callable(value) else value
+
+
+# ══════════════ Outlook simulado ══════════════
+
+class FakeOutlook:
+    """
+    Outlook completo en memoria: una o más cuentas con carpetas y correos.
+
+    Attributes:
+        application: Objeto Application (usar con OutlookClient(application=...))
+        stats: Contadores de llamadas COM (CallStats)
+    """
+
+    def __init__(self, latency: float = 0.0, account_email: str = "usuario@bancotanner.cl",
+                 move_changes_entry_id: bool = False):
+        """
+        Args:
+            latency: Segundos de latencia por llamada COM simulada
+            account_email: Dirección de la cuenta principal
+            move_changes_entry_id: MailItem.Move asigna otro EntryID (como Exchange)
+        """
+        self._session = _Session(latency)
+        self._session.move_changes_entry_id = move_changes_entry_id
+        self.stats = self._session.stats
+        self.stores = []
+        self.namespace = FakeNamespace(self._session, self.stores, account_email)
+        self.application = FakeApplication(self._session, self.namespace)
+        self.account_email = account_email
+
+    @property
+    def latency(self) -> float:
+        return self._session.latency
+
+    @latency.setter
+    def latency(self, value: float):
+        self._session.latency = value
+
+    @property
+    def move_changes_entry_id(self) -> bool:
+        return self._session.move_changes_entry_id
+
+    @move_changes_entry_id.setter
+    def move_changes_entry_id(self, value: bool):
+        self._session.move_changes_entry_id = value
+
+    def add_store(self, display_name: str, file_path: str = "", exchange: bool = True,
+                  instant_search: bool = False, default_folders: bool = True) -> FakeStore:
+        """
+        Agrega un almacén (buzón o PST), por defecto con las carpetas
+        predeterminadas (default_folders=False: solo la carpeta raíz).
+        """
+        store_id = f"S{len(self.stores) + 1:04d}"
+        store = FakeStore(self._session, display_name, store_id, file_path,
+                          0 if exchange else 3, instant_search)
+        if default_folders:
+            for folder_type, name in DEFAULT_FOLDER_NAMES.items():
+                store._default_folders[folder_type] = store._root._add_child(name)
+        self.stores.append(store)
+        return store
+
+    def folder(self, path: str) -> FakeFolder:
+        """Carpeta por ruta 'Almacén/Carpeta/Subcarpeta' (la crea si no existe)."""
+        parts = path.strip("/").split("/")
+        store = next((s for s in self.stores if s._display_name == parts[0]), None)
+        if store is None:
+            store = self.add_store(parts[0])
+        folder = store._root
+        for name in parts[1:]:
+            child = next((c for c in folder._children if c._name == name), None)
+            folder = child or folder._add_child(name)
+        return folder
+
+    def add_message(self, folder: FakeFolder, record: MailRecord):
+        """Agrega un correo a una carpeta (emite ItemAdd a los suscriptores)."""
+        folder._add_record(record)
+        folder._fire("OnItemAdd", record)
+
+    def change_message(self, record: MailRecord, **fields):
+        """Modifica campos de un correo (emite ItemChange)."""
+        for name, value in fields.items():
+            setattr(record, name, value)
+        if record.folder is not None:
+            record.folder._fire("OnItemChange", record)
+
+    def remove_message(self, record: MailRecord):
+        """Elimina un correo de su carpeta (emite ItemRemove, sin indicar cuál)."""
+        folder = record.folder
+        folder._remove_record(record)
+        folder._fire("OnItemRemove")
+
+    @classmethod
+    def with_mailbox(cls, n_items: int, latency: float = 0.0, seed: int = 42,
+                     store_name: str = "usuario@bancotanner.cl", **kwargs) -> "FakeOutlook":
+        """Crea un Outlook con un buzón sintético de n_items correos (ver generate_mailbox)."""
+        outlook = cls(latency=latency)
+        outlook.add_store(store_name)
+        generate_mailbox(outlook, store_name, n_items, seed=seed, **kwargs)
+        return outlook
+
+
+# ══════════════ Generador de buzones sintéticos ══════════════
+
+_FIRST = ["Juan", "María", "Pedro", "Camila", "Diego", "Valentina", "José", "Fernanda",
+          "Andrés", "Catalina", "Felipe", "Javiera", "Rodrigo", "Constanza", "Matías"]
+_LAST = ["Pérez", "González", "Muñoz", "Rojas", "Díaz", "Soto", "Contreras", "Silva",
+         "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes"]
+_DOMAINS = ["bancotanner.cl", "proveedor.cl", "cliente.com", "gmail.com", "empresa.cl"]
+_TOPICS = ["Factura", "Cotización", "Reunión", "Informe mensual", "Contrato", "Pago",
+           "Solicitud de crédito", "Estado de cuenta", "Newsletter", "Auditoría",
+           "Orden de compra", "Conciliación", "Reclamo", "Proyecto", "Capacitación"]
+_EXTS = [".pdf", ".xlsx", ".docx", ".png", ".zip", ".csv", ".jpg"]
+_CATEGORIES = ["", "", "", "Procesado", "Pendiente", "Importante", "Procesado, Importante"]
+_WORDS = ("el la de que y en los se del las por un para con no una su al es lo como más "
+          "pero sus le ya o este sí porque esta entre cuando muy sin sobre también me hasta "
+          "cuenta monto transferencia cliente saldo crédito plazo documento adjunto favor "
+          "revisar confirmar enviar según solicitud banco tasa cuota").split()
+
+
+def generate_mailbox(outlook: FakeOutlook, store_name: str, n_items: int, seed: int = 42,
+                     days: int = 730, attachment_ratio: float = 0.3,
+                     exchange_ratio: float = 0.2, body_words: int = 300,
+                     folders: dict = None, end: datetime = None):
+    """
+    Llena un almacén con correos sintéticos deterministas.
+
+    Args:
+        outlook: FakeOutlook destino
+        store_name: Nombre del almacén (se crea si no existe)
+        n_items: Cantidad total de correos
+        seed: Semilla del generador
+        days: Días hacia atrás en que se reparten las fechas
+        attachment_ratio: Fracción de correos con adjuntos
+        exchange_ratio: Fracción de remitentes con dirección Exchange (X500)
+        body_words: Palabras aproximadas por cuerpo (generado bajo demanda)
+        folders: Reparto {ruta relativa: fracción}; por defecto mayoría en la
+                 bandeja de entrada y algunas subcarpetas
+        end: Fecha del correo más reciente (por defecto, ahora)
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    folders = folders or {
+        "Bandeja de entrada": 0.7,
+        "Bandeja de entrada/Proyectos": 0.1,
+        "Bandeja de entrada/Facturas": 0.1,
+        "Elementos enviados": 0.1,
+    }
+    targets = [(outlook.folder(f"{store_name}/{path}"), share) for path, share in folders.items()]
+    weights = [share for _, share in targets]
+
+    people = []
+    for i in range(200):
+        first, last = rng.choice(_FIRST), rng.choice(_LAST)
+        if rng.random() < exchange_ratio:
+            email = f"/O=BANCOTANNER/OU=EXCHANGE/CN=RECIPIENTS/CN={first[0]}{last}".upper()
+        else:
+            email = f"{first.lower()}.{last.lower()}{i}@{rng.choice(_DOMAINS)}"
+        people.append((f"{first} {last}", email))
+
+    threads = max(1, n_items // 4)
+    step = days * 86400 / max(n_items, 1)
+    for i in range(n_items):
+        name, email = rng.choice(people)
+        to_name, to_email = rng.choice(people)
+        cc = rng.choice(people) if rng.random() < 0.3 else None
+        thread = rng.randrange(threads)
+        topic = f"{_TOPICS[thread % len(_TOPICS)]} {2020 + thread % 6}-{thread:05d}"
+        reply = rng.random() < 0.4
+        received = end - timedelta(seconds=int(i * step + rng.random() * step))
+
+        attachments = []
+        if rng.random() < attachment_ratio:
+            for k in range(rng.randint(1, 3)):
+                ext = rng.choice(_EXTS)
+                inline = f"img{k}@cid" if ext in (".png", ".jpg") and rng.random() < 0.5 else ""
+                attachments.append((f"{topic.split()[0].lower()}_{i}_{k}{ext}",
+                                    rng.randint(10_000, 2_000_000), inline))
+
+        body_seed = rng.random()
+        n_words = max(5, int(rng.expovariate(1 / body_words)))
+        record = MailRecord(
+            entry_id=f"{len(outlook.stores):02d}{i:012X}",
+            subject=("RE: " if reply else "") + topic,
+            sender_name=name,
+            sender_email=email,
+            to=to_name,
+            cc=cc[0] if cc else "",
+            received=received,
+            body=_lazy_body(body_seed, n_words, topic),
+            importance=rng.choices([0, 1, 2], weights=[1, 8, 1])[0],
+            categories=rng.choice(_CATEGORIES),
+            size=2_000 + n_words * 6 + sum(a[1] for a in attachments),
+            attachments=attachments,
+            recipients=[(to_name, to_email, 1)] + ([(cc[0], cc[1], 2)] if cc else []),
+            unread=rng.random() < 0.2,
+            conversation_id=f"CONV{thread:08X}",
+            conversation_topic=topic,
+        )
+        outlook.add_message(rng.choices(targets, weights=weights)[0][0], record)
+
+
+def _lazy_body(seed: float, n_words: int, topic: str):
+    """Cuerpo determinista generado solo cuando se lee (ahorra memoria)."""
+    def build():
+        rng = random.Random(seed)
+        words = [rng.choice(_WORDS) for _ in range(n_words)]
+        return f"Estimado/a,\r\n\r\nRespecto a {topic}: " + " ".join(words) + "\r\n\r\nSaludos."
+    return build
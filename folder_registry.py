@@ -0,0 +1,252 @@
+"""
+Registro de carpetas del buzón.
+Mapea rutas completas a EntryID/StoreID para resolver cualquier carpeta
+en O(1) con Namespace.GetFolderFromID, y se mantiene actualizado con
+los eventos FolderAdd/FolderRemove/FolderChange de Outlook.
+"""
+
+import threading
+
+
+class _FoldersEvents:
+    """Receptor de eventos de una colección Folders (un nivel del árbol)."""
+
+    registry = None
+    parent_path = ""
+
+    def OnFolderAdd(self, folder):
+        self.registry._rescan(self.parent_path)
+
+    def OnFolderRemove(self):
+        # FolderRemove no indica qué carpeta se eliminó: se re-escanea el padre
+        self.registry._rescan(self.parent_path)
+
+    def OnFolderChange(self, folder):
+        # Llega con cada cambio de no leídos o de cantidad: solo esa carpeta
+        self.registry._update_folder(self.parent_path, folder)
+
+
+class FolderRegistry:
+    """
+    Índice de carpetas: ruta completa -> identificadores COM.
+
+    Se construye una sola vez recorriendo Namespace.Folders. Las rutas usan
+    el formato 'Cuenta/Bandeja de entrada/Proyectos', igual que la pestaña
+    Carpetas, y la búsqueda por ruta no distingue mayúsculas.
+    """
+
+    def __init__(self, namespace):
+        """
+        Args:
+            namespace: Objeto Namespace MAPI de Outlook
+        """
+        self.namespace = namespace
+        self._lock = threading.RLock()
+        self._entries = {}   # ruta en minúsculas -> dict de la carpeta
+        self._order = []     # rutas en orden de recorrido (árbol)
+        self._sinks = {}     # ruta padre -> receptor de eventos
+        self.built = False
+
+    # === Construcción ===
+
+    def build(self, subscribe: bool = True):
+        """
+        Recorre todas las cuentas y carpetas y llena el registro.
+
+        Args:
+            subscribe: Si True, se suscribe a los eventos de cambios de carpetas
+        """
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+            for key in list(self._sinks):
+                self._drop_sink(key)
+            root = self.namespace.Folders
+            for i in range(root.Count):
+                account = root.Item(i + 1)
+                self._walk(account, "", 0, subscribe)
+            self.built = True
+
+    def _walk(self, folder, parent_path: str, depth: int, subscribe: bool):
+        """Registra una carpeta y sus subcarpetas recursivamente."""
+        name = folder.Name
+        path = f"{parent_path}/{name}" if parent_path else name
+        try:
+            item_count = folder.Items.Count if depth > 0 else 0
+        except Exception:
+            item_count = 0
+
+        entry = {
+            "name": name,
+            "path": path,
+            "entry_id": folder.EntryID,
+            "store_id": folder.StoreID,
+            "item_count": item_count,
+            "depth": depth,
+        }
+        self._entries[path.lower()] = entry
+        self._order.append(path)
+
+        try:
+            children = folder.Folders
+        except Exception:
+            return
+        if subscribe:
+            self._subscribe(children, path)
+        try:
+            for i in range(children.Count):
+                self._walk(children.Item(i + 1), path, depth + 1, subscribe)
+        except Exception:
+            pass
+
+    def _subscribe(self, folders, path: str):
+        """Registra un receptor de eventos para la colección Folders."""
+        try:
+            import win32com.client
+            sink = win32com.client.WithEvents(folders, _FoldersEvents)
+        except Exception:
+            return
+        sink.registry = self
+        sink.parent_path = path
+        # Un receptor reemplazado sin cerrar seguiría recibiendo eventos
+        self._drop_sink(path.lower())
+        self._sinks[path.lower()] = sink
+
+    def _drop_sink(self, key: str):
+        """Quita el receptor de una ruta y cancela su suscripción."""
+        sink = self._sinks.pop(key, None)
+        close = getattr(sink, "close", None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def _rescan(self, parent_path: str):
+        """Vuelve a recorrer el subárbol de una carpeta tras un evento."""
+        with self._lock:
+            key = parent_path.lower()
+            parent = self._entries.get(key)
+            if parent is None:
+                return
+            try:
+                folder = self.namespace.GetFolderFromID(
+                    parent["entry_id"], parent["store_id"]
+                )
+            except Exception:
+                return
+
+            # Eliminar descendientes actuales
+            prefix = key + "/"
+            for p in [p for p in self._entries if p.startswith(prefix)]:
+                del self._entries[p]
+                self._drop_sink(p)
+            pos = self._order.index(parent["path"])
+            end = pos + 1
+            while end < len(self._order) and self._order[end].lower().startswith(prefix):
+                end += 1
+
+            # Re-registrar el subárbol y reinsertarlo en su posición
+            before = self._order[:pos]
+            after = self._order[end:]
+            self._order = []
+            del self._entries[key]
+            grandparent = parent["path"].rsplit("/", 1)[0] if "/" in parent["path"] else ""
+            self._walk(folder, grandparent, parent["depth"], subscribe=True)
+            self._order = before + self._order + after
+
+    def _update_folder(self, parent_path: str, folder):
+        """
+        Actualiza nombre y cantidad de una carpeta tras FolderChange, sin
+        recorrer su subárbol. Si cambió el nombre se reescriben las rutas de
+        sus descendientes (sin llamadas COM).
+        """
+        with self._lock:
+            parent = self._entries.get(parent_path.lower())
+            if parent is None:
+                return
+            try:
+                entry_id = folder.EntryID
+                name = folder.Name
+            except Exception:
+                return
+            prefix = parent_path.lower() + "/"
+            entry = next((e for p, e in self._entries.items()
+                          if p.startswith(prefix) and e["depth"] == parent["depth"] + 1
+                          and e["entry_id"] == entry_id), None)
+            if entry is None:
+                self._rescan(parent_path)  # carpeta no registrada
+                return
+            try:
+                entry["item_count"] = folder.Items.Count
+            except Exception:
+                pass
+            if name != entry["name"]:
+                self._rename(entry, name, f"{parent_path}/{name}")
+
+    def _rename(self, entry: dict, name: str, new_path: str):
+        """Cambia la ruta de una carpeta y la de sus descendientes."""
+        old_path = entry["path"]
+        old_key = old_path.lower()
+        entry["name"] = name
+
+        def moved(path):
+            key = path.lower()
+            return key == old_key or key.startswith(old_key + "/")
+
+        for key in [k for k in self._entries if moved(k)]:
+            e = self._entries.pop(key)
+            e["path"] = new_path + e["path"][len(old_path):]
+            self._entries[e["path"].lower()] = e
+            sink = self._sinks.pop(key, None)
+            if sink is not None:
+                sink.parent_path = e["path"]
+                self._drop_sink(e["path"].lower())
+                self._sinks[e["path"].lower()] = sink
+        self._order = [new_path + p[len(old_path):] if moved(p) else p for p in self._order]
+
+    # === Consultas ===
+
+    def get_entry(self, path: str):
+        """Retorna el dict de una carpeta por su ruta completa, o None."""
+        with self._lock:
+            return self._entries.get(path.strip("/").lower())
+
+    def resolve(self, path: str):
+        """
+        Obtiene el objeto carpeta de una ruta registrada.
+
+        Args:
+            path: Ruta completa de la carpeta
+
+        Returns:
+            Objeto carpeta de Outlook, o None si la ruta no está registrada
+        """
+        entry = self.get_entry(path)
+        if entry is None:
+            return None
+        return self.namespace.GetFolderFromID(entry["entry_id"], entry["store_id"])
+
+    def paths(self, min_depth: int = 1) -> list:
+        """Lista las rutas registradas en orden de árbol."""
+        with self._lock:
+            return [
+                p for p in self._order
+                if self._entries[p.lower()]["depth"] >= min_depth
+            ]
+
+    def as_list(self, max_depth: int = None) -> list:
+        """
+        Retorna las carpetas en el formato de OutlookClient.list_folders.
+
+        Returns:
+            Lista de tuplas (nombre, ruta, cantidad_items, indent)
+        """
+        with self._lock:
+            rows = []
+            for p in self._order:
+                e = self._entries[p.lower()]
+                if max_depth is not None and e["depth"] > max_depth:
+                    continue
+                rows.append((e["name"], e["path"], e["item_count"], e["depth"]))
+            return rows
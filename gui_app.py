@@ -2,15 +2,28 @@
 Outlook Email Search Tool - Aplicación GUI Principal
 Ventana principal con tabs para búsqueda y carpetas.
 Usa un worker thread dedicado para operaciones COM con Outlook.
+
+Arranque: la pantalla de carga se muestra primero; la conexión COM (worker)
+y la construcción de las pestañas ocurren en paralelo, y la interfaz se
+revela cuando ambas terminan.
 """
 
+import json
+import os
+import time
+
+STARTUP_T0 = time.perf_counter()  # referencia para medir el arranque
+
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 
 from outlook_worker import OutlookWorker
-from gui_search import SearchFrame
-from gui_folders import FoldersFrame
+from session import LAST_SESSION, SESSION_SUFFIX
+
+# Variable de entorno usada por benchmarks.py: epoch (time.time()) del lanzamiento
+# del proceso. Si está definida, se imprimen los tiempos de arranque y se cierra.
+STARTUP_BENCH_ENV = "OUTLOOK_SEARCH_STARTUP_BENCH"
 
 
 class OutlookSearchApp(ttk.Window):
@@ -27,9 +40,18 @@ class OutlookSearchApp(ttk.Window):
         self.worker = None
         self.search_frame = None
         self.folders_frame = None
+        self.main_frame = None
+        self._email = None          # cuenta conectada (None = worker aún conectando)
+        self.startup_times = {}     # etapa -> segundos desde STARTUP_T0
 
         self._show_splash()
+        self.update_idletasks()
+        self._mark_startup("splash")
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self._start_worker()
+        # Construir las pestañas mientras el worker se conecta a Outlook
+        self.after(1, self._build_main_ui)
 
     def _show_splash(self):
         """Muestra pantalla de carga."""
@@ -54,17 +76,35 @@ class OutlookSearchApp(ttk.Window):
         self.splash_bar.start(15)
 
     def _start_worker(self):
-        """Inicia el worker thread de Outlook."""
+        """Inicia el worker thread de Outlook y el sondeo de progreso."""
         self.worker = OutlookWorker(self)
         self.worker.start()
+        self.after(self.worker.progress.interval_ms, self._poll_progress)
+
+    def _poll_progress(self):
+        """Único sondeo periódico del canal de progreso del worker."""
+        for kind, info in self.worker.progress.drain().items():
+            if kind == "search":
+                self._on_search_progress(info)
+            elif kind == "attachments":
+                self._on_attachment_progress(info["current"], info["total"], info["message"])
+            elif kind == "export" and self.search_frame:
+                self.search_frame.show_export_progress(info)
+            elif kind == "bulk" and self.search_frame:
+                self.search_frame.show_bulk_progress(info)
+        self.after(self.worker.progress.interval_ms, self._poll_progress)
+
+    def _mark_startup(self, stage: str):
+        """Registra el tiempo transcurrido hasta una etapa del arranque."""
+        self.startup_times[stage] = round(time.perf_counter() - STARTUP_T0, 4)
 
     # === Callbacks del worker ===
 
     def _on_worker_ready(self, email: str):
         """Worker conectado exitosamente."""
-        self.splash_bar.stop()
-        self.splash.destroy()
-        self._build_main_ui(email)
+        self._email = email
+        self._mark_startup("connected")
+        self._reveal_main_ui()
 
     def _on_worker_error(self, error_msg: str):
         """Error de conexión."""
@@ -77,10 +117,15 @@ class OutlookSearchApp(ttk.Window):
         )
         self.destroy()
 
-    def _on_search_progress(self, current, msg):
+    def _on_search_progress(self, info: dict):
         """Progreso de búsqueda — actualiza la UI."""
         if self.search_frame:
-            self.search_frame.status_var.set(f"🔍 {msg}")
+            self.search_frame.show_progress(info)
+
+    def _on_live_delta(self, delta: dict):
+        """Cambios en vivo de la carpeta de la búsqueda activa."""
+        if self.search_frame:
+            self.search_frame.apply_delta(delta)
 
     def _on_attachment_progress(self, current, total, msg):
         """Progreso de exportación de adjuntos."""
@@ -88,22 +133,34 @@ class OutlookSearchApp(ttk.Window):
 
     # === UI Principal ===
 
-    def _build_main_ui(self, email: str):
-        """Construye la interfaz principal."""
+    def _build_main_ui(self):
+        """Construye la interfaz principal (oculta hasta que el worker conecte)."""
+        # Imports diferidos: no retrasan la aparición de la pantalla de carga
+        from gui_search import SearchFrame
+        from gui_folders import FoldersFrame
+
+        self.v_email = ttk.StringVar(value="")
+        self.main_frame = ttk.Frame(self)
+        root = self.main_frame
+
         # --- Menú ---
-        menubar = ttk.Menu(self)
-        self.configure(menu=menubar)
+        self.menubar = menubar = ttk.Menu(self)
 
         file_menu = ttk.Menu(menubar, tearoff=0)
-        file_menu.add_command(label="Salir", command=self.destroy)
+        file_menu.add_command(label="📂 Abrir sesión...", command=self._open_session)
+        file_menu.add_command(label="💾 Guardar sesión como...", command=self._save_session)
+        file_menu.add_separator()
+        file_menu.add_command(label="Salir", command=self._on_close)
         menubar.add_cascade(label="Archivo", menu=file_menu)
 
         help_menu = ttk.Menu(menubar, tearoff=0)
+        help_menu.add_command(label="Estadísticas COM...", command=self._show_stats)
+        help_menu.add_separator()
         help_menu.add_command(label="Acerca de...", command=self._show_about)
         menubar.add_cascade(label="Ayuda", menu=help_menu)
 
         # --- Header ---
-        header = ttk.Frame(self, padding=(15, 10))
+        header = ttk.Frame(root, padding=(15, 10))
         header.pack(fill=X)
 
         ttk.Label(
@@ -112,29 +169,34 @@ class OutlookSearchApp(ttk.Window):
         ).pack(side=LEFT)
 
         ttk.Label(
-            header, text=f"📬 {email}",
+            header, textvariable=self.v_email,
             font=("Segoe UI", 10), foreground="gray",
         ).pack(side=RIGHT)
 
-        ttk.Separator(self).pack(fill=X)
+        ttk.Separator(root).pack(fill=X)
 
         # --- Tabs ---
-        notebook = ttk.Notebook(self, padding=5)
+        notebook = ttk.Notebook(root, padding=5)
         notebook.pack(fill=BOTH, expand=True, padx=10, pady=5)
 
         self.search_frame = SearchFrame(notebook, self.worker)
         notebook.add(self.search_frame, text="  🔍 Búsqueda  ")
 
-        self.folders_frame = FoldersFrame(notebook, self.worker)
+        def pick_folder(path):
+            self.search_frame.set_target_folder(path)
+            notebook.select(self.search_frame)
+
+        self.folders_frame = FoldersFrame(notebook, self.worker, on_pick=pick_folder)
         notebook.add(self.folders_frame, text="  📁 Carpetas  ")
 
         # --- Status bar ---
-        ttk.Separator(self).pack(fill=X, side=BOTTOM)
-        status_bar = ttk.Frame(self, padding=(15, 5))
+        ttk.Separator(root).pack(fill=X, side=BOTTOM)
+        status_bar = ttk.Frame(root, padding=(15, 5))
         status_bar.pack(fill=X, side=BOTTOM)
 
+        self.v_conn = ttk.StringVar(value="")
         ttk.Label(
-            status_bar, text=f"✓ Conectado  |  {email}",
+            status_bar, textvariable=self.v_conn,
             font=("Segoe UI", 9), foreground="gray",
         ).pack(side=LEFT)
 
@@ -143,6 +205,68 @@ class OutlookSearchApp(ttk.Window):
             font=("Segoe UI", 9), foreground="gray",
         ).pack(side=RIGHT)
 
+        self._mark_startup("ui_built")
+        self._reveal_main_ui()
+
+    def _reveal_main_ui(self):
+        """Muestra la interfaz cuando están listas las pestañas y la conexión."""
+        if self.main_frame is None or self._email is None:
+            return
+        self.splash_bar.stop()
+        self.splash.destroy()
+
+        self.v_email.set(f"📬 {self._email}")
+        self.v_conn.set(f"✓ Conectado  |  {self._email}")
+        self.configure(menu=self.menubar)
+        self.main_frame.pack(fill=BOTH, expand=True)
+        self._mark_startup("interactive")
+
+        if os.environ.get(STARTUP_BENCH_ENV):
+            self.after_idle(self._report_startup_bench)
+        elif os.path.exists(LAST_SESSION):
+            # Resultados de la vez anterior (se guardan al cerrar)
+            self.after_idle(lambda: self.search_frame.load_session(LAST_SESSION, quiet=True))
+
+    # === Sesiones ===
+
+    def _open_session(self):
+        path = filedialog.askopenfilename(
+            title="Abrir sesión", initialdir=os.path.dirname(LAST_SESSION),
+            filetypes=[("Sesión de búsqueda", f"*{SESSION_SUFFIX}"), ("Todos", "*.*")])
+        if path:
+            self.search_frame.load_session(path)
+
+    def _save_session(self):
+        path = filedialog.asksaveasfilename(
+            title="Guardar sesión", initialdir=os.path.dirname(LAST_SESSION),
+            defaultextension=SESSION_SUFFIX,
+            filetypes=[("Sesión de búsqueda", f"*{SESSION_SUFFIX}")])
+        if path:
+            self.search_frame.save_session(path)
+
+    def _on_close(self):
+        """Guarda la sesión actual (se restaura al volver a abrir) y cierra."""
+        if self.search_frame is not None and self._email is not None:
+            try:
+                self.search_frame.autosave_session(LAST_SESSION)
+            except Exception:
+                pass  # no impedir el cierre por un error al guardar
+        self.destroy()
+
+    def _report_startup_bench(self):
+        """Imprime los tiempos de arranque (modo benchmark) y cierra la app."""
+        self.update_idletasks()
+        launched = float(os.environ[STARTUP_BENCH_ENV])
+        offset = time.time() - launched - (time.perf_counter() - STARTUP_T0)
+        report = {k: round(v + offset, 4) for k, v in self.startup_times.items()}
+        report["module_import_offset"] = round(offset, 4)
+        print(json.dumps(report), flush=True)
+        self.destroy()
+
+    def _show_stats(self):
+        from gui_stats import StatsDialog
+        StatsDialog(self, self.worker)
+
     def _show_about(self):
         messagebox.showinfo(
             "Acerca de",
@@ -12,7 +12,7 @@ from tkinter import filedialog, messagebox
 class AttachmentsDialog(ttk.Toplevel):
     """Diálogo para exportar adjuntos desde los resultados de búsqueda."""
 
-    def __init__(self, parent, worker):
+    def __init__(self, parent, worker, results):
         super().__init__(parent)
         self.title("📎 Exportar Adjuntos")
         self.geometry("500x360")
@@ -21,8 +21,10 @@ class AttachmentsDialog(ttk.Toplevel):
         self.grab_set()
 
         self.worker = worker
-        n_att = len([r for r in worker.last_results if r.get("has_attachments")])
-        n_total = len(worker.last_results)
+        self._ticket = None  # exportación en curso en el worker
+        # Mismos resultados que tiene el worker (copia de la GUI, sin recorrer el disco)
+        n_att = results.with_attachments
+        n_total = len(results)
         self._build_ui(n_att, n_total)
 
         self.update_idletasks()
@@ -71,6 +73,9 @@ class AttachmentsDialog(ttk.Toplevel):
         bf.pack(fill=X)
         self.btn_export = ttk.Button(bf, text="📎 Exportar", bootstyle=SUCCESS, command=self._do_export)
         self.btn_export.pack(side=LEFT, padx=(0, 8))
+        self.btn_cancel = ttk.Button(bf, text="⛔ Cancelar", bootstyle=(DANGER, OUTLINE),
+                                     command=self._cancel, state=DISABLED)
+        self.btn_cancel.pack(side=LEFT)
         ttk.Button(bf, text="Cerrar", bootstyle=SECONDARY, command=self.destroy).pack(side=RIGHT)
 
     def _browse(self):
@@ -100,19 +105,36 @@ class AttachmentsDialog(ttk.Toplevel):
             self.v_status.set(msg)
 
         app._on_attachment_progress = progress_cb
+        self._orig_progress = original_progress
 
-        self.worker.submit(
+        self.btn_cancel.configure(state=NORMAL)
+        self._ticket = self.worker.submit(
             "export_attachments",
             {"output_dir": out, "organize_by": self.v_org.get(), "file_types": file_types},
             lambda stats: self._on_done(stats, app, original_progress),
             lambda err: self._on_err(err, app, original_progress),
         )
 
+    def _cancel(self):
+        """Detiene la exportación antes del siguiente correo."""
+        if self._ticket is None:
+            return
+        if self.worker.cancel(self._ticket):
+            self.v_status.set("⛔ Cancelando...")
+        else:  # todavía en la cola: no llegarán callbacks
+            self._on_done({"cancelled": True, "exported": 0}, self.winfo_toplevel(),
+                          self._orig_progress)
+
     def _on_done(self, stats, app, orig_cb):
         app._on_attachment_progress = orig_cb
+        self._ticket = None
+        self.btn_cancel.configure(state=DISABLED)
+        self.btn_export.configure(state=NORMAL)
+        if stats.get("cancelled"):
+            self.v_status.set(f"⛔ Cancelado: {stats['exported']} adjuntos ya guardados.")
+            return
         self.v_prog.set(100)
         self.v_status.set("✓ Completado")
-        self.btn_export.configure(state=NORMAL)
 
         msg = (f"📧 Correos: {stats['emails_with_attachments']}\n"
                f"📎 Exportados: {stats['exported']}\n")
@@ -123,6 +145,8 @@ class AttachmentsDialog(ttk.Toplevel):
 
     def _on_err(self, err, app, orig_cb):
         app._on_attachment_progress = orig_cb
+        self._ticket = None
+        self.btn_cancel.configure(state=DISABLED)
         self.v_status.set("❌ Error")
         self.btn_export.configure(state=NORMAL)
         messagebox.showerror("Error", err, parent=self)
@@ -0,0 +1,231 @@
+"""
+Diálogo de acciones masivas sobre los resultados (categoría, bandera, leído,
+mover, guardar .msg). La acción corre en el OutlookWorker por lotes; se puede
+cancelar y reanudar desde el correo donde quedó.
+"""
+
+import os
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from tkinter import filedialog, messagebox
+
+from bulk import ACTIONS
+from progress import format_eta
+
+
+class BulkDialog(ttk.Toplevel):
+    """Diálogo para aplicar una acción a todos, los filtrados o los seleccionados."""
+
+    def __init__(self, parent, worker, total, view, selected, folder_paths, on_updated=None):
+        """
+        Args:
+            parent: Ventana principal
+            worker: OutlookWorker con los resultados
+            total: Cantidad de resultados
+            view: Posiciones visibles con el filtro actual (None = sin filtro)
+            selected: Posiciones seleccionadas en la tabla
+            folder_paths: Carpetas de destino para 'move'
+            on_updated: Función({posición: campos}) para las filas que
+                        cambiaron (p. ej. EntryID nuevo tras mover)
+        """
+        super().__init__(parent)
+        self.title("⚡ Acciones masivas")
+        self.geometry("520x430")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.grab_set()
+
+        self.worker = worker
+        self.total = total
+        self.on_updated = on_updated
+        self._scopes = {"all": None, "view": view, "selected": selected}
+        self._ticket = None  # acción en curso en el worker
+        self._resume = None  # (kwargs, siguiente índice) de una acción cancelada
+        self._build_ui(total, view, selected, folder_paths)
+        self._on_action()
+
+        self.update_idletasks()
+        x = parent.winfo_rootx() + (parent.winfo_width() - 520) // 2
+        y = parent.winfo_rooty() + (parent.winfo_height() - 430) // 2
+        self.geometry(f"+{max(0, x)}+{max(0, y)}")
+
+    def _build_ui(self, total, view, selected, folder_paths):
+        m = ttk.Frame(self, padding=20)
+        m.pack(fill=BOTH, expand=True)
+
+        # Alcance
+        ttk.Label(m, text="Aplicar a:", font=("Segoe UI", 10, "bold")).pack(anchor=W)
+        sf = ttk.Frame(m)
+        sf.pack(fill=X, pady=(2, 8))
+        self.v_scope = ttk.StringVar(value="selected" if selected else "view" if view is not None else "all")
+        ttk.Radiobutton(sf, text=f"Todos ({total})", variable=self.v_scope,
+                        value="all").pack(side=LEFT, padx=(0, 12))
+        ttk.Radiobutton(sf, text=f"Filtrados ({len(view) if view is not None else '-'})",
+                        variable=self.v_scope, value="view",
+                        state=NORMAL if view is not None else DISABLED).pack(side=LEFT, padx=(0, 12))
+        ttk.Radiobutton(sf, text=f"Seleccionados ({len(selected)})", variable=self.v_scope,
+                        value="selected", state=NORMAL if selected else DISABLED).pack(side=LEFT)
+
+        # Acción
+        ttk.Label(m, text="Acción:", font=("Segoe UI", 10, "bold")).pack(anchor=W)
+        labels = list(ACTIONS.values())
+        self.v_action = ttk.StringVar(value=labels[0])
+        cb = ttk.Combobox(m, textvariable=self.v_action, values=labels, state="readonly")
+        cb.pack(fill=X, pady=(2, 8))
+        cb.bind("<<ComboboxSelected>>", lambda e: self._on_action())
+
+        # Valor (según la acción)
+        self.value_frame = ttk.Frame(m)
+        self.value_frame.pack(fill=X, pady=(0, 8))
+        self.v_value_label = ttk.StringVar()
+        ttk.Label(self.value_frame, textvariable=self.v_value_label,
+                  font=("Segoe UI", 10, "bold")).pack(anchor=W)
+        self.v_category = ttk.StringVar(value="Procesado")
+        self.e_category = ttk.Entry(self.value_frame, textvariable=self.v_category)
+        self.v_folder = ttk.StringVar()
+        self.cb_folder = ttk.Combobox(self.value_frame, textvariable=self.v_folder,
+                                      values=list(folder_paths))
+        self.dir_frame = ttk.Frame(self.value_frame)
+        self.v_dir = ttk.StringVar(value=os.path.join(os.path.expanduser("~"), "Desktop", "correos_msg"))
+        ttk.Entry(self.dir_frame, textvariable=self.v_dir).pack(side=LEFT, fill=X, expand=True, padx=(0, 4))
+        ttk.Button(self.dir_frame, text="📂", bootstyle=OUTLINE, command=self._browse, width=3).pack(side=RIGHT)
+
+        # Progreso
+        self.v_prog = ttk.DoubleVar()
+        ttk.Progressbar(m, variable=self.v_prog, bootstyle=SUCCESS).pack(fill=X, pady=(4, 3))
+        self.v_status = ttk.StringVar()
+        ttk.Label(m, textvariable=self.v_status, font=("Segoe UI", 9)).pack(anchor=W, pady=(0, 8))
+
+        # Botones
+        bf = ttk.Frame(m)
+        bf.pack(fill=X, side=BOTTOM)
+        self.btn_apply = ttk.Button(bf, text="⚡ Aplicar", bootstyle=SUCCESS, command=self._apply)
+        self.btn_apply.pack(side=LEFT, padx=(0, 8))
+        self.btn_cancel = ttk.Button(bf, text="⛔ Cancelar", bootstyle=(DANGER, OUTLINE),
+                                     command=self._cancel, state=DISABLED)
+        self.btn_cancel.pack(side=LEFT, padx=(0, 8))
+        self.btn_resume = ttk.Button(bf, text="⏯ Reanudar", bootstyle=(INFO, OUTLINE),
+                                     command=self._do_resume, state=DISABLED)
+        self.btn_resume.pack(side=LEFT)
+        ttk.Button(bf, text="Cerrar", bootstyle=SECONDARY, command=self.destroy).pack(side=RIGHT)
+
+    def _action(self):
+        label = self.v_action.get()
+        return next(a for a, text in ACTIONS.items() if text == label)
+
+    def _on_action(self):
+        """Muestra el campo de valor que corresponde a la acción elegida."""
+        for w in (self.e_category, self.cb_folder, self.dir_frame):
+            w.pack_forget()
+        action = self._action()
+        if action in ("categorize", "uncategorize"):
+            self.v_value_label.set("Categoría:")
+            self.e_category.pack(fill=X, pady=(2, 0))
+        elif action == "move":
+            self.v_value_label.set("Carpeta destino:")
+            self.cb_folder.pack(fill=X, pady=(2, 0))
+        elif action == "save_msg":
+            self.v_value_label.set("Directorio destino:")
+            self.dir_frame.pack(fill=X, pady=(2, 0))
+        else:
+            self.v_value_label.set("")
+
+    def _browse(self):
+        d = filedialog.askdirectory(title="Directorio destino", initialdir=self.v_dir.get())
+        if d: self.v_dir.set(d)
+
+    def _apply(self):
+        action = self._action()
+        value = {"categorize": self.v_category, "uncategorize": self.v_category,
+                 "move": self.v_folder, "save_msg": self.v_dir}.get(action)
+        value = value.get().strip() if value is not None else None
+        if value == "":
+            messagebox.showwarning("Atención", f"Indica el valor para '{ACTIONS[action]}'.", parent=self)
+            return
+        positions = self._scopes[self.v_scope.get()]
+        count = len(positions) if positions is not None else self.total
+        msg = f"¿{ACTIONS[action]} en {count} correo{'s' if count != 1 else ''}?"
+        if action == "move":
+            msg += f"\n\nLos correos saldrán de su carpeta actual hacia '{value}'."
+        if not messagebox.askyesno("Confirmar", msg, parent=self):
+            return
+        kwargs = {"action": action, "value": value}
+        if positions is not None:
+            kwargs["positions"] = list(positions)
+        self._submit(kwargs, 0)
+
+    def _submit(self, kwargs, start):
+        self._resume = (kwargs, start)
+        self.btn_apply.configure(state=DISABLED)
+        self.btn_resume.configure(state=DISABLED)
+        self.btn_cancel.configure(state=NORMAL)
+        if not start:
+            self.v_prog.set(0)
+        self.v_status.set(f"{ACTIONS[kwargs['action']]}...")
+        self._ticket = self.worker.submit("bulk_action", dict(kwargs, start=start),
+                                          self._on_done, self._on_err)
+
+    def _do_resume(self):
+        if self._resume is not None:
+            self._submit(*self._resume)
+
+    def _cancel(self):
+        """Detiene la acción antes del siguiente correo (se puede reanudar)."""
+        if self._ticket is None:
+            return
+        if self.worker.cancel(self._ticket):
+            self.v_status.set("⛔ Cancelando...")
+        else:  # todavía en la cola: no llegarán callbacks
+            self._ticket = None
+            self._end()
+            self.btn_resume.configure(state=NORMAL)
+            self.v_status.set("⛔ Cancelado antes de comenzar.")
+
+    def show_progress(self, info):
+        """Progreso publicado por el worker (canal 'bulk')."""
+        if self._ticket is None:
+            return
+        total = info.get("total") or 0
+        self.v_prog.set(info["current"] / total * 100 if total else 0)
+        text = info["message"]
+        eta = format_eta(info.get("eta"))
+        if eta:
+            text += f"  ·  ETA {eta}"
+        self.v_status.set(text)
+
+    def _end(self):
+        self.btn_cancel.configure(state=DISABLED)
+        self.btn_apply.configure(state=NORMAL)
+
+    def _on_done(self, stats):
+        self._ticket = None
+        self._end()
+        if stats["updated"] and self.on_updated:
+            self.on_updated(stats["updated"])
+        kwargs, _ = self._resume
+        if stats["cancelled"]:
+            self._resume = (kwargs, stats["next"])
+            self.btn_resume.configure(state=NORMAL)
+            self.v_status.set(f"⛔ Cancelado en {stats['next']}/{stats['total']}: "
+                              f"{stats['done']} modificados. Puedes reanudar.")
+            return
+        self._resume = None
+        self.v_prog.set(100)
+        self.v_status.set("✓ Completado")
+
+        msg = (f"✓ Modificados: {stats['done']}\n"
+               f"= Sin cambios: {stats['unchanged']}\n")
+        if stats["errors"]:
+            msg += f"❌ Errores: {stats['errors']}\n"
+            msg += "".join(f"   • {d}\n" for d in stats["error_details"][:5])
+        if stats["files"]:
+            msg += f"\n📁 {self.v_dir.get()}"
+        if kwargs["action"] == "move" and stats["done"]:
+            msg += "\nRepite la búsqueda para ver los correos en su nueva carpeta."
+        messagebox.showinfo("Completado", msg, parent=self)
+
+    def _on_err(self, err):
+        self._ticket = None
+        self._end()
+        self.v_status.set("❌ Error")
+        messagebox.showerror("Error", err, parent=self)
@@ -1,49 +1,190 @@
 """
 Diálogo de detalle de un correo electrónico.
-Muestra toda la información del correo en una ventana separada.
+Muestra toda la información del correo en una ventana separada. El cuerpo
+completo, los destinatarios y los tamaños de adjuntos se piden al
+OutlookWorker por EntryID (la búsqueda solo trae una vista previa) y se
+guardan en una caché LRU; las filas vecinas se precargan para navegar con
+las flechas sin esperas.
 """
 
+from collections import OrderedDict
+
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter.scrolledtext import ScrolledText
 
 
+class DetailLoader:
+    """
+    Detalles completos de correos pedidos al worker, con caché LRU.
+    Se usa solo desde el thread de la GUI.
+    """
+
+    def __init__(self, worker, maxsize: int = 200):
+        """
+        Args:
+            worker: OutlookWorker
+            maxsize: Detalles retenidos en la caché
+        """
+        self.worker = worker
+        self.maxsize = maxsize
+        self._cache = OrderedDict()  # entry_id -> detalle
+        self._pending = {}           # entry_id -> (prioridad, [(callback, on_error)])
+
+    def cached(self, entry_id: str):
+        """Detalle en caché (o None); lo marca como usado recientemente."""
+        detail = self._cache.get(entry_id)
+        if detail is not None:
+            self._cache.move_to_end(entry_id)
+        return detail
+
+    def get(self, entry_id: str, callback, on_error=None, store_id: str = None):
+        """
+        Entrega el detalle de un correo: en el acto si está en caché, si no
+        cuando el worker lo obtenga (con prioridad alta).
+
+        Args:
+            entry_id: EntryID del correo
+            callback: Función(detalle)
+            on_error: Función(mensaje) opcional
+            store_id: StoreID del correo (buzones compartidos y PST)
+        """
+        detail = self.cached(entry_id)
+        if detail is not None:
+            callback(detail)
+            return
+        self._request(entry_id, store_id, self.worker.PRIORITY_HIGH, callback, on_error)
+
+    def prefetch(self, rows):
+        """Pide en segundo plano (prioridad baja) los detalles de las filas que no estén en caché."""
+        for row in rows:
+            entry_id = row.get("entry_id")
+            if entry_id and entry_id not in self._cache and entry_id not in self._pending:
+                self._request(entry_id, row.get("store_id"), self.worker.PRIORITY_LOW)
+
+    def invalidate(self, entry_ids):
+        """Descarta detalles de correos modificados o eliminados."""
+        for entry_id in entry_ids:
+            self._cache.pop(entry_id, None)
+
+    def _request(self, entry_id, store_id, priority, callback=None, on_error=None):
+        pending = self._pending.get(entry_id)
+        if pending is not None:
+            pending[1].append((callback, on_error))
+            if priority >= pending[0]:
+                return
+            # Precarga aún en cola y ahora el usuario la espera: se vuelve a
+            # pedir con más prioridad (gana la primera respuesta)
+            self._pending[entry_id] = (priority, pending[1])
+        else:
+            self._pending[entry_id] = (priority, [(callback, on_error)])
+        self.worker.submit(
+            "get_detail",
+            {"entry_id": entry_id, "store_id": store_id,
+             "prefetch": priority == self.worker.PRIORITY_LOW},
+            lambda detail: self._on_detail(entry_id, detail),
+            lambda msg: self._on_error(entry_id, msg),
+            priority=priority,
+        )
+
+    def _on_detail(self, entry_id, detail):
+        self._cache[entry_id] = detail
+        self._cache.move_to_end(entry_id)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        _, waiting = self._pending.pop(entry_id, (None, []))
+        for callback, _ in waiting:
+            if callback:
+                callback(detail)
+
+    def _on_error(self, entry_id, msg):
+        _, waiting = self._pending.pop(entry_id, (None, []))
+        for _, on_error in waiting:
+            if on_error:
+                on_error(msg)
+
+
 class EmailDetailDialog(ttk.Toplevel):
     """Ventana de detalle de un correo."""
 
-    def __init__(self, parent, email_data: dict):
+    def __init__(self, parent, email_data: dict, loader: DetailLoader = None, navigate=None):
+        """
+        Args:
+            parent: Ventana padre
+            email_data: Fila de resultados (sin COM refs)
+            loader: DetailLoader para el detalle completo (opcional; sin él
+                    se muestra solo lo que trajo la búsqueda)
+            navigate: Función(paso) -> fila anterior (-1) o siguiente (+1) de
+                      la tabla, o None; habilita las flechas ↑/↓
+        """
         super().__init__(parent)
-        self.title(f"📧 {email_data.get('subject', 'Sin asunto')}")
         self.geometry("700x550")
         self.resizable(True, True)
         self.transient(parent)
+        self.loader = loader
+        self.navigate = navigate
+        self.data = None
+        self.main_frame = None
 
-        self._build_ui(email_data)
+        self._show(email_data)
+        self.bind("<Up>", lambda _: self._step(-1))
+        self.bind("<Down>", lambda _: self._step(1))
+        self.bind("<Escape>", lambda _: self.destroy())
 
         # Centrar respecto al padre
         self.update_idletasks()
         x = parent.winfo_rootx() + (parent.winfo_width() - 700) // 2
         y = parent.winfo_rooty() + (parent.winfo_height() - 550) // 2
         self.geometry(f"+{max(0, x)}+{max(0, y)}")
+        self.focus_set()
+
+    def _show(self, data: dict):
+        """Muestra un correo; el detalle completo sale de la caché o del worker."""
+        self.data = data
+        self.title(f"📧 {data.get('subject', 'Sin asunto')}")
+        entry_id = data.get("entry_id")
+        detail = self.loader.cached(entry_id) if self.loader and entry_id else None
+        self._build_ui(data, detail)
+        if detail is None and self.loader and entry_id:
+            self._set_body(f"{data.get('body_preview', '')}\n\n⏳ Cargando cuerpo completo...")
+            self.loader.get(entry_id, lambda d: self._on_detail(entry_id, d), self._on_detail_error,
+                            data.get("store_id"))
 
-    def _build_ui(self, data: dict):
-        """Construye la interfaz del detalle."""
-        main_frame = ttk.Frame(self, padding=15)
+    def _step(self, step: int):
+        data = self.navigate(step) if self.navigate else None
+        if data is not None:
+            self._show(data)
+        return "break"
+
+    def _build_ui(self, data: dict, detail: dict = None):
+        """Construye la interfaz del detalle (con el detalle completo si ya se tiene)."""
+        if self.main_frame is not None:
+            self.main_frame.destroy()
+        main_frame = self.main_frame = ttk.Frame(self, padding=15)
         main_frame.pack(fill=BOTH, expand=True)
 
         # --- Encabezado ---
         header_frame = ttk.LabelFrame(main_frame, text="Información del Correo", padding=10)
         header_frame.pack(fill=X, pady=(0, 10))
 
+        to, cc = data.get("to", "N/A"), data.get("cc", "N/A") or "—"
+        bcc = ""
+        if detail and detail["recipients"]:
+            to = _recipients(detail, "Para") or to
+            cc = _recipients(detail, "CC") or "—"
+            bcc = _recipients(detail, "CCO")
+
         fields = [
             ("De:", f"{data.get('sender_name', 'N/A')} <{data.get('sender_email', 'N/A')}>"),
-            ("Para:", data.get("to", "N/A")),
-            ("CC:", data.get("cc", "N/A") or "—"),
+            ("Para:", to),
+            ("CC:", cc),
             ("Fecha:", f"{data.get('date', 'N/A')}  {data.get('time', '')}"),
             ("Importancia:", data.get("importance", "Normal")),
             ("Categorías:", data.get("categories", "") or "—"),
             ("Tamaño:", f"{data.get('size_kb', 0)} KB"),
         ]
+        if bcc:
+            fields.insert(3, ("CCO:", bcc))
 
         for row, (label, value) in enumerate(fields):
             lbl = ttk.Label(header_frame, text=label, font=("Segoe UI", 10, "bold"), width=12, anchor=E)
@@ -57,8 +198,11 @@ class EmailDetailDialog(ttk.Toplevel):
             att_frame = ttk.LabelFrame(main_frame, text=f"📎 Adjuntos ({data.get('attachment_count', 0)})", padding=10)
             att_frame.pack(fill=X, pady=(0, 10))
 
-            att_names = data.get("attachment_names", [])
-            for i, name in enumerate(att_names):
+            if detail:
+                att_list = [(a["name"], f"  ({a['size_kb']} KB)") for a in detail["attachments"]]
+            else:
+                att_list = [(name, "") for name in data.get("attachment_names", [])]
+            for name, size in att_list:
                 icon = "📄"
                 ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
                 if ext in ("pdf",):
@@ -73,19 +217,49 @@ class EmailDetailDialog(ttk.Toplevel):
                     icon = "📝"
 
                 ttk.Label(
-                    att_frame, text=f"  {icon} {name}", font=("Segoe UI", 9)
+                    att_frame, text=f"  {icon} {name}{size}", font=("Segoe UI", 9)
                 ).pack(anchor=W)
 
         # --- Cuerpo ---
-        body_frame = ttk.LabelFrame(main_frame, text="Vista Previa", padding=10)
-        body_frame.pack(fill=BOTH, expand=True)
+        self.body_frame = ttk.LabelFrame(main_frame, text="Cuerpo" if detail else "Vista Previa", padding=10)
+        self.body_frame.pack(fill=BOTH, expand=True)
 
-        body_text = ScrolledText(body_frame, font=("Consolas", 9), wrap="word")
-        body_text.pack(fill=BOTH, expand=True)
-        body_text.insert("1.0", data.get("body_preview", "Sin contenido"))
-        body_text.configure(state="disabled")
+        self.body_text = ScrolledText(self.body_frame, font=("Consolas", 9), wrap="word")
+        self.body_text.pack(fill=BOTH, expand=True)
+        self._set_body(detail["body"] if detail else data.get("body_preview", "Sin contenido"))
 
-        # --- Botón cerrar ---
+        # --- Botones ---
+        bar = ttk.Frame(main_frame)
+        bar.pack(fill=X, pady=(10, 0))
+        if self.navigate:
+            ttk.Button(bar, text="▲ Anterior", bootstyle=(SECONDARY, OUTLINE),
+                       command=lambda: self._step(-1)).pack(side=LEFT)
+            ttk.Button(bar, text="▼ Siguiente", bootstyle=(SECONDARY, OUTLINE),
+                       command=lambda: self._step(1)).pack(side=LEFT, padx=4)
         ttk.Button(
-            main_frame, text="Cerrar", bootstyle=SECONDARY, command=self.destroy
-        ).pack(pady=(10, 0))
+            bar, text="Cerrar", bootstyle=SECONDARY, command=self.destroy
+        ).pack(side=RIGHT)
+
+    def _set_body(self, text: str):
+        self.body_text.configure(state="normal")
+        self.body_text.delete("1.0", "end")
+        self.body_text.insert("1.0", text or "Sin contenido")
+        self.body_text.configure(state="disabled")
+
+    def _on_detail(self, entry_id, detail: dict):
+        """Callback con el detalle completo."""
+        if not self.winfo_exists() or self.data.get("entry_id") != entry_id:
+            return  # el diálogo se cerró o ya muestra otro correo
+        self._build_ui(self.data, detail)
+
+    def _on_detail_error(self, msg):
+        if self.winfo_exists():
+            self.body_frame.configure(text="Vista Previa (no se pudo cargar el cuerpo completo)")
+
+
+def _recipients(detail: dict, rtype: str) -> str:
+    """Destinatarios de un tipo: 'Ana <ana@x.cl>; Juan <juan@x.cl>'."""
+    return "; ".join(
+        f"{r['name']} <{r['address']}>" if r["address"] and r["address"] != r["name"] else r["name"]
+        for r in detail["recipients"] if r["type"] == rtype
+    )
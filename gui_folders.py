@@ -10,9 +10,11 @@ from ttkbootstrap.constants import *
 class FoldersFrame(ttk.Frame):
     """Frame con el árbol de carpetas del buzón."""
 
-    def __init__(self, parent, worker):
+    def __init__(self, parent, worker, on_pick=None):
         super().__init__(parent, padding=10)
         self.worker = worker
+        self.on_pick = on_pick  # callback(ruta) al elegir carpeta como destino
+        self._paths = {}        # id de nodo -> ruta completa
         self._build_ui()
 
     def _build_ui(self):
@@ -36,15 +38,17 @@ class FoldersFrame(ttk.Frame):
         self.tree.configure(yscrollcommand=vsb.set)
         self.tree.pack(side=LEFT, fill=BOTH, expand=True)
         vsb.pack(side=RIGHT, fill=Y)
+        self.tree.bind("<Double-1>", lambda _: self._pick())
 
-        self.v_status = ttk.StringVar(value="Presiona 'Actualizar' para cargar.")
+        self.v_status = ttk.StringVar(value="Presiona 'Actualizar' para cargar. Doble clic = buscar en carpeta.")
         ttk.Label(self, textvariable=self.v_status, font=("Segoe UI", 9)).pack(fill=X, pady=(4, 0))
 
     def _load(self):
         self.btn_ref.configure(state=DISABLED)
         self.v_status.set("Cargando carpetas...")
         self.tree.delete(*self.tree.get_children())
-        self.worker.submit("list_folders", {"max_depth": 2}, self._on_data, self._on_err)
+        self._paths.clear()
+        self.worker.submit("list_folders", {"max_depth": 2, "refresh": True}, self._on_data, self._on_err)
 
     def _on_data(self, folders):
         parent_map = {-1: ""}
@@ -54,10 +58,20 @@ class FoldersFrame(ttk.Frame):
             nid = self.tree.insert(pid, END, text=f" {icon} {name}",
                                    values=(str(count) if count else "",), open=(indent == 0))
             parent_map[indent] = nid
+            self._paths[nid] = path
 
         self.v_status.set(f"✓ {len(folders)} carpetas cargadas")
         self.btn_ref.configure(state=NORMAL)
 
+    def _pick(self):
+        """Usa la carpeta seleccionada como destino de búsqueda."""
+        sel = self.tree.selection()
+        if not sel or not self.on_pick:
+            return
+        path = self._paths.get(sel[0])
+        if path and "/" in path:
+            self.on_pick(path)
+
     def _on_err(self, msg):
         self.v_status.set(f"❌ Error: {msg}")
         self.btn_ref.configure(state=NORMAL)
@@ -3,13 +3,41 @@ Frame de búsqueda de correos con filtros, tabla de resultados y acciones de exp
 Toda la comunicación con Outlook se hace a través del OutlookWorker.
 """
 
+import os
+
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkinter import filedialog, messagebox
+from tkinter import Menu, filedialog, messagebox, simpledialog
 
-from reports import export_to_excel, export_to_csv, generate_summary
-from gui_detail import EmailDetailDialog
+from reports import generate_summary
+from gui_detail import EmailDetailDialog, DetailLoader
 from gui_attachments import AttachmentsDialog
+from gui_bulk import BulkDialog
+from progress import format_eta
+from threads import format_participants
+from query import QueryError, compile_query, quote
+from content_match import ContentMatcher, load_terms
+from result_index import ResultIndex
+from result_store import ResultStore
+from session import open_session, save_session
+
+DEFAULT_FOLDERS = ["inbox", "sent", "drafts", "deleted", "junk", "outbox"]
+
+# Filas que se agregan a la tabla de una vez (el resto al desplazarse)
+TABLE_WINDOW = 500
+
+# Filas que se indexan por turno al restaurar una sesión (la tabla se muestra antes)
+INDEX_CHUNK = 5000
+
+# Orden de cada columna de la tabla
+SORT_KEYS = {
+    "date": lambda e: e.get("received", ""),
+    "time": lambda e: e.get("time", ""),
+    "sender": lambda e: (e.get("sender_name") or "").lower(),
+    "subject": lambda e: (e.get("subject") or "").lower(),
+    "att": lambda e: e.get("attachment_count", 0),
+    "importance": lambda e: {"Baja": 0, "Normal": 1, "Alta": 2}.get(e.get("importance"), 1),
+}
 
 
 class SearchFrame(ttk.Frame):
@@ -18,9 +46,25 @@ class SearchFrame(ttk.Frame):
     def __init__(self, parent, worker):
         super().__init__(parent, padding=10)
         self.worker = worker
-        self.last_results = []  # resultados limpios (sin COM refs)
+        self.last_results = ResultStore()  # resultados limpios (sin COM refs; los antiguos en disco)
+        self.details = DetailLoader(worker)  # detalles completos (caché LRU)
+        self._store_vars = []   # [(almacén, BooleanVar)] del selector de almacenes
+        self._threads = {}      # vista agrupada: iid de la fila -> hilo
+        self._cursor_id = None  # búsqueda paginada abierta en el worker
+        self._has_more = False
+        self._paging = False    # hay una página pedida en curso
+        self.index = ResultIndex()  # filtro instantáneo sobre last_results
+        self._view = []         # posiciones de last_results visibles, en orden
+        self._shown = 0         # cuántas de _view ya están en la tabla
+        self._sort_col = None   # (columna, descendente) elegidos en la tabla
+        self._order = None      # posiciones ordenadas por _sort_col (None: orden de llegada)
+        self._export_ticket = None  # exportación CSV/Excel en curso en el worker
+        self._params = None     # parámetros de la búsqueda mostrada (para la sesión)
+        self._bulk_dialog = None  # diálogo de acciones masivas abierto
 
         self._build_ui()
+        self._load_folder_paths()
+        self._load_stores()
 
     def _build_ui(self):
         # === Sub-tabs ===
@@ -35,6 +79,10 @@ class SearchFrame(ttk.Frame):
         notebook.add(quick, text="⚡ Búsqueda Rápida")
         self._build_quick(quick)
 
+        saved = ttk.Frame(notebook, padding=8)
+        notebook.add(saved, text="⭐ Guardadas")
+        self._build_saved(saved)
+
         # === Tabla ===
         self._build_table()
 
@@ -48,6 +96,17 @@ class SearchFrame(ttk.Frame):
     # ──────────── Filtros avanzados ────────────
 
     def _build_filters(self, parent):
+        # Row 0: consulta libre (query.py)
+        r0 = ttk.Frame(parent)
+        r0.pack(fill=X, pady=2)
+        ttk.Label(r0, text="Consulta:", width=10, anchor=E).pack(side=LEFT)
+        self.v_query = ttk.StringVar()
+        e = ttk.Entry(r0, textvariable=self.v_query, width=64)
+        e.pack(side=LEFT, padx=4)
+        e.bind("<Return>", lambda _: self._search_advanced())
+        ttk.Label(r0, text='ej: from:juan subject:"factura 2024" has:attachment -category:Procesado size>5MB',
+                  font=("Segoe UI", 8), foreground="gray").pack(side=LEFT, padx=(4, 0))
+
         # Row 1
         r1 = ttk.Frame(parent)
         r1.pack(fill=X, pady=2)
@@ -68,20 +127,26 @@ class SearchFrame(ttk.Frame):
         ttk.Label(r2, text="Hasta:", width=10, anchor=E).pack(side=LEFT)
         self.v_to = ttk.StringVar()
         ttk.Entry(r2, textvariable=self.v_to, width=12).pack(side=LEFT, padx=4)
-        ttk.Label(r2, text="DD-MM-YYYY", font=("Segoe UI", 8), foreground="gray").pack(side=LEFT)
+        ttk.Label(r2, text="DD-MM-YYYY", font=("Segoe UI", 8), foreground="gray").pack(side=LEFT, padx=(0, 12))
+        ttk.Label(r2, text="Almacenes:", anchor=E).pack(side=LEFT)
+        self.mb_stores = ttk.Menubutton(r2, text="Principal", bootstyle=(SECONDARY, OUTLINE), width=22)
+        self.mb_stores.pack(side=LEFT, padx=4)
+        self.menu_stores = Menu(self.mb_stores, tearoff=0)
+        self.mb_stores.configure(menu=self.menu_stores)
 
         # Row 3
         r3 = ttk.Frame(parent)
         r3.pack(fill=X, pady=2)
         ttk.Label(r3, text="Carpeta:", width=10, anchor=E).pack(side=LEFT)
         self.v_folder = ttk.StringVar(value="inbox")
-        ttk.Combobox(r3, textvariable=self.v_folder, width=10, state="readonly",
-                     values=["inbox", "sent", "drafts", "deleted", "junk", "outbox"]).pack(side=LEFT, padx=(4, 12))
+        self.cb_folder = ttk.Combobox(r3, textvariable=self.v_folder, width=28, state="readonly",
+                                      values=DEFAULT_FOLDERS)
+        self.cb_folder.pack(side=LEFT, padx=(4, 12))
         ttk.Label(r3, text="Adjuntos:", anchor=E).pack(side=LEFT)
         self.v_att = ttk.StringVar(value="todos")
         ttk.Combobox(r3, textvariable=self.v_att, width=8, state="readonly",
                      values=["todos", "sí", "no"]).pack(side=LEFT, padx=(4, 12))
-        ttk.Label(r3, text="Máx:", anchor=E).pack(side=LEFT)
+        ttk.Label(r3, text="Por página:", anchor=E).pack(side=LEFT)
         self.v_max = ttk.IntVar(value=100)
         ttk.Spinbox(r3, from_=10, to=1000, increment=50, textvariable=self.v_max, width=6).pack(side=LEFT, padx=4)
 
@@ -91,6 +156,18 @@ class SearchFrame(ttk.Frame):
         ttk.Label(r4, text="En cuerpo:", width=10, anchor=E).pack(side=LEFT)
         self.v_body = ttk.StringVar()
         ttk.Entry(r4, textvariable=self.v_body, width=30).pack(side=LEFT, padx=4)
+        ttk.Button(r4, text="📄 Términos...", bootstyle=(SECONDARY, OUTLINE),
+                   command=self._load_body_terms).pack(side=LEFT)
+        self.v_terms = ttk.StringVar()
+        ttk.Label(r4, textvariable=self.v_terms, font=("Segoe UI", 8),
+                  foreground="gray").pack(side=LEFT, padx=(4, 0))
+        self._body_terms, self._body_regex = [], []
+        self.v_live = ttk.BooleanVar(value=True)
+        ttk.Checkbutton(r4, text="En vivo", variable=self.v_live,
+                        bootstyle="round-toggle").pack(side=LEFT, padx=(12, 0))
+        self.v_group = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(r4, text="Agrupar conversaciones", variable=self.v_group,
+                        bootstyle="round-toggle").pack(side=LEFT, padx=(12, 0))
 
         self.btn_stop_adv = ttk.Button(r4, text="⛔ Detener", bootstyle=DANGER,
                                        command=self._cancel_search, width=12)
@@ -122,14 +199,91 @@ class SearchFrame(ttk.Frame):
                                     command=self._search_quick, width=12)
         self.btn_quick.pack(side=RIGHT)
 
+    # ──────────── Búsquedas guardadas ────────────
+
+    def _build_saved(self, parent):
+        f = ttk.Frame(parent)
+        f.pack(fill=X)
+        ttk.Label(f, text="Búsqueda:", width=10, anchor=E).pack(side=LEFT)
+        self.v_saved = ttk.StringVar()
+        self.cb_saved = ttk.Combobox(f, textvariable=self.v_saved, width=36, state="readonly",
+                                     postcommand=self._reload_saved_names)
+        self.cb_saved.pack(side=LEFT, padx=4)
+
+        self.btn_refresh_saved = ttk.Button(f, text="🔄 Actualizar", bootstyle=SUCCESS,
+                                            command=self._refresh_saved, width=12)
+        self.btn_refresh_saved.pack(side=LEFT, padx=(8, 4))
+        ttk.Button(f, text="🗑", bootstyle=(DANGER, OUTLINE), command=self._delete_saved,
+                   width=3).pack(side=LEFT)
+        self.btn_save_search = ttk.Button(f, text="💾 Guardar búsqueda actual", bootstyle=(PRIMARY, OUTLINE),
+                                          command=self._save_current, state=DISABLED)
+        self.btn_save_search.pack(side=RIGHT)
+
+        ttk.Label(parent, text="Actualizar solo consulta los correos posteriores a la última "
+                               "actualización; los nuevos se marcan en verde.",
+                  font=("Segoe UI", 8), foreground="gray").pack(anchor=W, pady=(4, 0))
+        self._reload_saved_names()
+
+    def _reload_saved_names(self):
+        self.cb_saved.configure(values=self.worker.saved.list_names())
+
+    def _save_current(self):
+        name = simpledialog.askstring("Guardar búsqueda", "Nombre de la búsqueda:", parent=self)
+        if not name or not name.strip():
+            return
+        self.worker.submit("save_search", {"name": name.strip()}, self._on_saved, self._on_error)
+
+    def _on_saved(self, name):
+        self._reload_saved_names()
+        self.v_saved.set(name)
+        self.status_var.set(f"💾 Búsqueda guardada: {name}")
+
+    def _refresh_saved(self):
+        name = self.v_saved.get()
+        if not name:
+            messagebox.showwarning("Atención", "Selecciona una búsqueda guardada.", parent=self)
+            return
+        self._set_searching(True)
+        self.status_var.set(f"🔄 Actualizando '{name}'...")
+        self._set_action_buttons(DISABLED)
+        self._drop_cursor()
+        self._params = None
+        self.worker.submit("refresh_saved_search", {"name": name},
+                           self._on_refreshed, self._on_error)
+
+    def _on_refreshed(self, cursor_id, clean_results, has_more, cancelled, total, n_new):
+        self._on_first_page(cursor_id, clean_results, has_more, cancelled)
+        if not cancelled:
+            self.status_var.set(f"✓ {total} correos, {n_new} nuevo{'s' if n_new != 1 else ''} "
+                                f"desde la última actualización.")
+
+    def _delete_saved(self):
+        name = self.v_saved.get()
+        if name and messagebox.askyesno("Eliminar", f"¿Eliminar la búsqueda '{name}'?", parent=self):
+            self.worker.saved.delete(name)
+            self.v_saved.set("")
+            self._reload_saved_names()
+
     # ──────────── Tabla de resultados ────────────
 
     def _build_table(self):
+        fb = ttk.Frame(self)
+        fb.pack(fill=X, pady=(0, 4))
+        ttk.Label(fb, text="🔎 Filtrar:").pack(side=LEFT, padx=(0, 4))
+        self.v_filter = ttk.StringVar()
+        self.e_filter = ttk.Entry(fb, textvariable=self.v_filter, width=40)
+        self.e_filter.pack(side=LEFT, fill=X, expand=True)
+        ttk.Button(fb, text="✕", bootstyle=(SECONDARY, LINK), width=3,
+                   command=lambda: self.v_filter.set("")).pack(side=LEFT)
+        ttk.Label(fb, text="asunto, remitente, destinatarios o adjuntos (sin consultar Outlook)",
+                  font=("Segoe UI", 8), foreground="gray").pack(side=LEFT, padx=(6, 0))
+        self.v_filter.trace_add("write", lambda *_: self._apply_filter())
+
         tf = ttk.Frame(self)
         tf.pack(fill=BOTH, expand=True)
 
         cols = ("num", "date", "time", "sender", "subject", "att", "importance")
-        self.tree = ttk.Treeview(tf, columns=cols, show="headings", selectmode="browse", height=16)
+        self.tree = ttk.Treeview(tf, columns=cols, show="headings", selectmode="extended", height=16)
 
         cfg = {
             "num": ("#", 40, CENTER), "date": ("Fecha", 90, CENTER),
@@ -141,16 +295,21 @@ class SearchFrame(ttk.Frame):
             self.tree.heading(cid, text=hd, command=lambda c=cid: self._sort(c))
             self.tree.column(cid, width=w, anchor=anch, minwidth=30)
 
-        vsb = ttk.Scrollbar(tf, orient=VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
+        self.vsb = ttk.Scrollbar(tf, orient=VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
 
         self.tree.grid(row=0, column=0, sticky=NSEW)
-        vsb.grid(row=0, column=1, sticky=NS)
+        self.vsb.grid(row=0, column=1, sticky=NS)
         tf.grid_rowconfigure(0, weight=1)
         tf.grid_columnconfigure(0, weight=1)
 
-        self.tree.bind("<Double-1>", lambda _: self._view_detail())
+        # En filas de conversación el doble clic solo expande (binding nativo)
+        self.tree.bind("<Double-1>", lambda _: None if self.tree.focus() in self._threads
+                       else self._view_detail())
+        self.tree.bind("<<TreeviewOpen>>", lambda _: self._expand_thread(self.tree.focus()))
+        self.tree.column("#0", width=24, minwidth=24, stretch=False)
         self.tree.tag_configure("alta", foreground="#e74c3c")
+        self.tree.tag_configure("nuevo", foreground="#27ae60")
 
     # ──────────── Botones de acción ────────────
 
@@ -176,7 +335,14 @@ class SearchFrame(ttk.Frame):
 
         self.btn_sum = ttk.Button(bar, text="📈 Resumen", bootstyle=(DARK, OUTLINE),
                                   command=self._show_summary, state=DISABLED)
-        self.btn_sum.pack(side=LEFT)
+        self.btn_sum.pack(side=LEFT, padx=(0, 4))
+
+        self.btn_bulk = ttk.Button(bar, text="⚡ Acciones", bootstyle=(PRIMARY, OUTLINE),
+                                   command=self._open_bulk, state=DISABLED)
+        self.btn_bulk.pack(side=LEFT)
+
+        self.btn_stop_export = ttk.Button(bar, text="⛔ Cancelar exportación", bootstyle=DANGER,
+                                          command=self._cancel_export)
 
         self.v_count = ttk.StringVar()
         ttk.Label(bar, textvariable=self.v_count, font=("Segoe UI", 10, "bold")).pack(side=RIGHT)
@@ -193,16 +359,75 @@ class SearchFrame(ttk.Frame):
         if s: kwargs["date_from"] = s
         s = self.v_to.get().strip()
         if s: kwargs["date_to"] = s
-        kwargs["folder"] = self.v_folder.get()
+        folder = self.v_folder.get()
+        if folder in DEFAULT_FOLDERS:
+            kwargs["folder"] = folder
+        else:
+            kwargs["folder_path"] = folder
         att = self.v_att.get()
         if att == "sí": kwargs["has_attachments"] = True
         elif att == "no": kwargs["has_attachments"] = False
         s = self.v_body.get().strip()
         if s: kwargs["body_contains"] = s
+        if self._body_terms or self._body_regex:
+            if self.v_group.get():
+                messagebox.showwarning(
+                    "Atención", "La vista agrupada no admite listas de términos.", parent=self)
+                return
+            kwargs["body_terms"] = self._body_terms
+            kwargs["body_regex"] = self._body_regex
+        s = self.v_query.get().strip()
+        if s:
+            try:
+                compile_query(s)  # validar antes de enviar al worker
+            except QueryError as e:
+                messagebox.showwarning("Consulta inválida", str(e), parent=self)
+                return
+            kwargs["query"] = s
         kwargs["max_results"] = self.v_max.get()
 
+        stores = [store for store, var in self._store_vars if var.get()]
+        if self._store_vars and not stores:
+            messagebox.showwarning("Atención", "Selecciona al menos un almacén.", parent=self)
+            return
+        if len(stores) == 1 and stores[0] is not self._store_vars[0][0]:
+            kwargs["store_id"] = stores[0]["store_id"]  # un solo almacén no predeterminado
+        elif len(stores) > 1:
+            if "folder_path" in kwargs:
+                messagebox.showwarning(
+                    "Atención", "Para buscar en varios almacenes elige un tipo de carpeta "
+                    f"({', '.join(DEFAULT_FOLDERS)}).", parent=self)
+                return
+            if self.v_group.get():
+                messagebox.showwarning(
+                    "Atención", "La vista agrupada busca en un almacén a la vez.", parent=self)
+                return
+            kwargs["stores"] = stores
+            self._submit_search("search_stores", kwargs)
+            return
+
         self._submit_search("search", kwargs)
 
+    def _load_body_terms(self):
+        """Carga un archivo de términos/expresiones para buscar en el cuerpo."""
+        path = filedialog.askopenfilename(
+            title="Términos a buscar en el cuerpo",
+            filetypes=[("Texto", "*.txt"), ("Todos", "*.*")], parent=self)
+        if not path:
+            if (self._body_terms or self._body_regex) and messagebox.askyesno(
+                    "Términos", "¿Quitar la lista de términos cargada?", parent=self):
+                self._body_terms, self._body_regex = [], []
+                self.v_terms.set("")
+            return
+        try:
+            terms, regexes = load_terms(path)
+            ContentMatcher(terms, regexes)  # validar las expresiones antes de buscar
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("Términos", str(e), parent=self)
+            return
+        self._body_terms, self._body_regex = terms, regexes
+        self.v_terms.set(f"{len(terms)} términos, {len(regexes)} expr.")
+
     def _search_quick(self):
         term = self.v_quick.get().strip()
         if not term:
@@ -215,28 +440,59 @@ class SearchFrame(ttk.Frame):
         elif scope == "sender":
             self._submit_search("search", {"sender": term, "max_results": 50})
         else:
-            self._submit_search("quick_search_all", {"term": term, "max_results": 50})
+            self._submit_search("search", {"query": f"subject:{quote(term)} OR from:{quote(term)}",
+                                           "max_results": 50})
 
     def _submit_search(self, task_name, kwargs):
+        self._params = None if task_name == "search" and self.v_group.get() else dict(kwargs)
+        on_success = self._on_results
+        if task_name == "search_stores":
+            on_success = self._on_store_results
+        elif task_name == "search" and self.v_group.get():
+            task_name, on_success = "search_threads", self._on_threads
+            kwargs["max_threads"] = kwargs.pop("max_results", 200)
+        elif task_name == "search":
+            # Búsqueda paginada: max_results es el tamaño de cada página
+            task_name, on_success = "open_cursor", self._on_first_page
+            kwargs["page_size"] = kwargs.pop("max_results", 100)
+            kwargs["live"] = self.v_live.get()  # seguir la carpeta tras la búsqueda
+        self._drop_cursor()
         self._set_searching(True)
         self.status_var.set("🔍 Buscando correos...")
+        if self.v_filter.get():
+            self.v_filter.set("")
         self.tree.delete(*self.tree.get_children())
         self._set_action_buttons(DISABLED)
-        self.worker.submit(task_name, kwargs, self._on_results, self._on_error)
+        self.worker.submit(task_name, kwargs, on_success, self._on_error)
 
     def _cancel_search(self):
         """Detiene la búsqueda en curso."""
         self.worker.cancel_search()
         self.status_var.set("⛔ Deteniendo búsqueda...")
 
+    def show_progress(self, info):
+        """Muestra el progreso estructurado de la búsqueda en curso."""
+        parts = [f"🔍 Encontrados: {info.get('matched', 0)}"]
+        total = info.get("total")
+        parts.append(f"revisados {info['current']:,}" + (f"/{total:,}" if total else ""))
+        stores = info.get("stores")
+        if stores:
+            done = sum(s["done"] for s in stores.values())
+            parts.append(f"{done}/{len(stores)} almacenes")
+        if info.get("rate"):
+            parts.append(f"{info['rate']:,.0f}/s")
+        eta = format_eta(info.get("eta"))
+        if eta:
+            parts.append(f"ETA {eta}")
+        self.status_var.set("  ·  ".join(parts).replace(",", "."))
+
     def _on_results(self, clean_results, cancelled=False):
         """Callback con resultados limpios del worker."""
-        self.last_results = clean_results
-        self._fill_table(clean_results)
+        self._set_results(clean_results)
+        self._fill_table(self.last_results)
         self._set_searching(False)
 
         n = len(clean_results)
-        self.v_count.set(f"{n} correo{'s' if n != 1 else ''}")
         if cancelled:
             self.status_var.set(f"⛔ Búsqueda detenida. {n} correos parciales.")
             if n > 0:
@@ -248,34 +504,438 @@ class SearchFrame(ttk.Frame):
             self.status_var.set("No se encontraron correos con esos filtros.")
             self._set_action_buttons(DISABLED)
 
+    def _on_store_results(self, cursor_id, clean_results, has_more, cancelled, total, stats):
+        """
+        Callback de la búsqueda en varios almacenes (con tiempos por almacén).
+        Llega la primera página; el resto se pide al desplazarse, como en la
+        búsqueda paginada.
+        """
+        self._on_first_page(cursor_id, clean_results, has_more, cancelled)
+        if cancelled or not stats:
+            return
+        slowest = max(stats, key=lambda s: s["seconds"])
+        parts = [f"✓ {total} correos de {len(stats)} almacenes",
+                 f"más lento: {slowest['store']} ({slowest['seconds']:.1f} s)"]
+        failed = [s["store"] for s in stats if s["error"]]
+        if failed:
+            parts.append(f"⚠ sin resultados por error: {', '.join(failed)}")
+        self.status_var.set("  ·  ".join(parts))
+
+    def _on_first_page(self, cursor_id, clean_results, has_more, cancelled=False):
+        """Callback con la primera página de una búsqueda paginada."""
+        self._cursor_id = cursor_id if has_more else None
+        self._has_more = has_more
+        self._on_results(clean_results, cancelled)
+        if has_more and not cancelled:
+            self._show_page_status()
+
+    def _on_scroll(self, first, last):
+        """
+        Scroll de la tabla: al llegar al final se agregan las filas cargadas que
+        faltan mostrar y, si ya están todas, se pide la página siguiente.
+        """
+        self.vsb.set(first, last)
+        if float(last) >= 0.999:
+            if self._shown < len(self._view):
+                self._render_more()
+            else:
+                self._fetch_next_page()
+
+    def _fetch_next_page(self):
+        if self._cursor_id is None or not self._has_more or self._paging:
+            return
+        self._paging = True
+        self.status_var.set("⏬ Cargando más correos...")
+        self._set_searching(True)
+        self.worker.submit("fetch_page", {"cursor_id": self._cursor_id},
+                           self._on_page, self._on_page_error)
+
+    def _on_page(self, rows, has_more, cancelled=False):
+        """Agrega una página de resultados al final de la tabla."""
+        self._paging = False
+        self._set_searching(False)
+        self._has_more = has_more and not cancelled
+        if not self._has_more:
+            self._cursor_id = None
+        start = len(self.last_results)
+        self.last_results.extend(rows)
+        self.index.add(rows)
+        added = range(start, len(self.last_results))
+        if self._order is not None:
+            self._order.extend(added)  # las páginas nuevas quedan al final
+        matches = self.index.search(self.v_filter.get())
+        self._view.extend(p for p in added if matches is None or p in matches)
+        self._render_more()
+        self._update_count()
+
+        n = len(self.last_results)
+        if cancelled:
+            self.status_var.set(f"⛔ Búsqueda detenida. {n} correos cargados.")
+        elif self._has_more:
+            self._show_page_status()
+        else:
+            self.status_var.set(f"✓ {n} correos encontrados (todos cargados).")
+
+    def _on_page_error(self, msg):
+        self._paging = False
+        self._has_more = False
+        self._cursor_id = None
+        self._on_error(msg)
+
+    def _show_page_status(self):
+        n = len(self.last_results)
+        self.status_var.set(f"✓ {n} correos cargados. Desplázate al final para ver más.")
+
+    def _drop_cursor(self):
+        """Cierra en el worker la búsqueda paginada anterior."""
+        if self._cursor_id is not None:
+            self.worker.submit("close_cursor", {"cursor_id": self._cursor_id},
+                               lambda *_: None, lambda _: None)
+        self._cursor_id = None
+        self._has_more = False
+        self._paging = False
+
+    def _on_threads(self, threads, cancelled=False):
+        """Callback con los hilos de la búsqueda agrupada."""
+        self._set_results([])
+        self.index.clear()
+        self._view, self._shown = [], 0
+        self.e_filter.configure(state=DISABLED)  # el filtro es para la vista plana
+        self._set_searching(False)
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(show="tree headings")
+        self._threads = {}
+        for t in threads:
+            iid = self.tree.insert("", END, values=(
+                "", t["date"], t["time"],
+                _trunc(format_participants(t["participants"]), 30),
+                _trunc(f"{t['topic']}  ({t['count']})", 50),
+                "✓" if t["has_attachments"] else "", "",
+            ))
+            self.tree.insert(iid, END, values=("", "", "", "", "Cargando..."))
+            self._threads[iid] = t
+
+        n, total = len(threads), sum(t["count"] for t in threads)
+        self.v_count.set(f"{n} conversacion{'es' if n != 1 else ''}")
+        if cancelled:
+            self.status_var.set(f"⛔ Búsqueda detenida. {n} conversaciones parciales.")
+        elif n:
+            self.status_var.set(f"✓ {n} conversaciones ({total} correos). "
+                                f"Expande una para ver sus correos.")
+        else:
+            self.status_var.set("No se encontraron correos con esos filtros.")
+
+    def _expand_thread(self, iid):
+        thread = self._threads.get(iid)
+        if thread is None or thread.get("loaded"):
+            return
+        thread["loaded"] = True
+        self.worker.submit(
+            "expand_thread",
+            {"entry_ids": thread["entry_ids"], "store_id": thread["store_id"]},
+            lambda rows: self._on_thread_rows(iid, rows), self._on_error,
+        )
+
+    def _on_thread_rows(self, iid, rows):
+        """
+        Inserta los correos de un hilo expandido bajo su fila. El worker
+        entrega solo los que agregó a sus resultados (sin repetidos), así
+        que las posiciones coinciden con las suyas.
+        """
+        if iid not in self._threads:
+            return  # la tabla cambió mientras se cargaba
+        self.tree.delete(*self.tree.get_children(iid))
+        start = len(self.last_results)
+        self.last_results.extend(rows)
+        for i, e in enumerate(rows, start + 1):
+            self.tree.insert(iid, END, values=self._row_values(i, e), tags=self._row_tags(e))
+        self._set_action_buttons(NORMAL)
+
+    def apply_delta(self, delta):
+        """
+        Aplica un cambio en vivo de la carpeta a los resultados abiertos.
+
+        Args:
+            delta: {'added': [...], 'changed': [...], 'removed': [entry_ids]}
+        """
+        removed = set(delta["removed"])
+        changed = {r["entry_id"]: r for r in delta["changed"]}
+        self.details.invalidate(removed | set(changed))
+        rows = [changed.get(r.get("entry_id"), r) for r in self.last_results
+                if r.get("entry_id") not in removed]
+        self._set_results(list(delta["added"]) + rows)
+        self._fill_table(self.last_results)
+
+        n = len(self.last_results)
+        self._set_action_buttons(NORMAL if n else DISABLED)
+        n_new = len(delta["added"])
+        if n_new:
+            self.status_var.set(f"📬 {n_new} correo{'s' if n_new != 1 else ''} "
+                                f"nuevo{'s' if n_new != 1 else ''} en la carpeta.")
+        elif removed:
+            self.status_var.set(f"🗑 {len(removed)} correo{'s' if len(removed) != 1 else ''} "
+                                f"ya no está{'n' if len(removed) != 1 else ''} en la carpeta.")
+
     def _on_error(self, msg):
         self._set_searching(False)
-        self.status_var.set(f"❌ Error")
+        self.status_var.set("❌ Error")
         messagebox.showerror("Error de Búsqueda", msg, parent=self)
 
+    # ══════════════ Carpetas ══════════════
+
+    def _load_folder_paths(self):
+        """Pide al worker las rutas del registro de carpetas para el selector."""
+        self.worker.submit("folder_paths", {}, self._on_folder_paths, lambda _: None)
+
+    def _on_folder_paths(self, paths):
+        self.cb_folder.configure(values=DEFAULT_FOLDERS + list(paths))
+
+    def _load_stores(self):
+        """Pide al worker los almacenes del perfil (buzones y archivos PST)."""
+        self.worker.submit("list_stores", {}, self._on_stores, lambda _: None)
+
+    def _on_stores(self, stores):
+        self.menu_stores.delete(0, "end")
+        self._store_vars = []
+        for i, store in enumerate(stores):
+            var = ttk.BooleanVar(value=i == 0)  # el primero es el predeterminado
+            self._store_vars.append((store, var))
+            self.menu_stores.add_checkbutton(
+                label=f"{store['name']}  ({store['kind']})", variable=var,
+                command=self._update_stores_label,
+            )
+        self._update_stores_label()
+
+    def _update_stores_label(self):
+        selected = [store["name"] for store, var in self._store_vars if var.get()]
+        if len(selected) == 1:
+            text = selected[0]
+        elif selected:
+            text = f"{len(selected)} almacenes"
+        else:
+            text = "(ninguno)"
+        self.mb_stores.configure(text=_trunc(text, 22))
+
+    def set_target_folder(self, path):
+        """Selecciona una carpeta del registro como destino de búsqueda."""
+        values = list(self.cb_folder.cget("values"))
+        if path not in values:
+            self.cb_folder.configure(values=values + [path])
+        self.v_folder.set(path)
+        self.status_var.set(f"📁 Carpeta de búsqueda: {path}")
+
     # ══════════════ Tabla ══════════════
 
+    def _set_results(self, rows):
+        """Reemplaza los resultados (el almacén anterior libera su archivo)."""
+        self.last_results.close()
+        self.last_results = ResultStore(rows)
+
     def _fill_table(self, results):
+        """Reindexa los resultados y muestra los que pasan el filtro."""
+        self.tree.configure(show="headings")
+        self._threads = {}
+        self.e_filter.configure(state=NORMAL)
+        self.index.clear()
+        self.index.add(results)
+        self._order = self._sorted_order()
+        self._apply_filter()
+
+    def _apply_filter(self):
+        """Rearma la vista con el filtro y el orden actuales (en cada tecla)."""
+        if self._threads:
+            return
+        matches = self.index.search(self.v_filter.get())
+        order = self._order if self._order is not None else range(len(self.last_results))
+        self._view = list(order) if matches is None else [p for p in order if p in matches]
+        self._shown = 0
         self.tree.delete(*self.tree.get_children())
-        for i, e in enumerate(results, 1):
-            att = "✓" if e.get("has_attachments") else ""
-            imp = e.get("importance", "Normal")
-            tags = ("alta",) if imp == "Alta" else ()
-            self.tree.insert("", END, values=(
-                i, e.get("date", ""), e.get("time", ""),
-                _trunc(e.get("sender_name", ""), 30),
-                _trunc(e.get("subject", ""), 50),
-                att, imp,
-            ), tags=tags)
+        self._render_more()
+        self._update_count()
+
+    def _sorted_order(self):
+        if self._sort_col is None:
+            return None
+        col, reverse = self._sort_col
+        key = SORT_KEYS.get(col)
+        if key is None:
+            return sorted(range(len(self.last_results)), reverse=reverse)
+        keys = [key(e) for e in self.last_results]  # un solo recorrido (disco incluido)
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+    def _render_more(self):
+        """Agrega a la tabla la siguiente ventana de filas de la vista."""
+        end = min(len(self._view), self._shown + TABLE_WINDOW)
+        for p in self._view[self._shown:end]:
+            e = self.last_results[p]
+            self.tree.insert("", END, values=self._row_values(p + 1, e), tags=self._row_tags(e))
+        self._shown = end
+
+    def _update_count(self):
+        n = len(self.last_results)
+        text = f"{n} correo{'s' if n != 1 else ''}"
+        if self.v_filter.get().strip():
+            text = f"{len(self._view)} de {text}"
+        self.v_count.set(text)
+
+    @staticmethod
+    def _row_values(i, e):
+        return (
+            i, e.get("date", ""), e.get("time", ""),
+            _trunc(e.get("sender_name", ""), 30),
+            _trunc(e.get("subject", ""), 50),
+            "✓" if e.get("has_attachments") else "", e.get("importance", "Normal"),
+        )
+
+    @staticmethod
+    def _row_tags(e):
+        tags = ("alta",) if e.get("importance") == "Alta" else ()
+        if e.get("is_new"):
+            tags += ("nuevo",)
+        return tags
 
     def _sort(self, col):
-        items = [(self.tree.set(k, col), k) for k in self.tree.get_children("")]
+        """Ordena por la columna (un segundo clic invierte el orden)."""
+        if self._threads:
+            items = [(self.tree.set(k, col), k) for k in self.tree.get_children("")]
+            try:
+                items.sort(key=lambda t: int(t[0]))
+            except ValueError:
+                items.sort(key=lambda t: t[0].lower())
+            for idx, (_, k) in enumerate(items):
+                self.tree.move(k, "", idx)
+            return
+        self._sort_col = (col, self._sort_col == (col, False))
+        self._order = self._sorted_order()
+        self._apply_filter()
+
+    # ══════════════ Sesiones ══════════════
+
+    def save_session(self, path):
+        """Guarda resultados y estado de la tabla en un archivo de sesión (en el worker)."""
+        if not self._can_save_session():
+            messagebox.showwarning("Sesión", "No hay resultados para guardar (la vista agrupada "
+                                   "no se guarda como sesión).", parent=self)
+            return
+        self.status_var.set("💾 Guardando sesión...")
+        self.worker.submit("save_session",
+                           {"path": path, "state": self._session_state(), "order": self._order},
+                           self._on_session_saved, self._on_error)
+
+    def autosave_session(self, path) -> bool:
+        """Guarda la sesión en este thread (al cerrar la aplicación). Retorna si se guardó."""
+        if not self._can_save_session():
+            return False
+        save_session(path, self.last_results, self._session_state(), self._order)
+        return True
+
+    def load_session(self, path, quiet=False) -> bool:
+        """
+        Muestra una sesión guardada: la tabla aparece de inmediato y el índice
+        del filtro se completa por partes. El worker adopta las mismas filas.
+
+        Args:
+            path: Archivo de sesión
+            quiet: No avisar si el archivo no se puede abrir (restauración al iniciar)
+        """
         try:
-            items.sort(key=lambda t: int(t[0]))
-        except ValueError:
-            items.sort(key=lambda t: t[0].lower())
-        for idx, (_, k) in enumerate(items):
-            self.tree.move(k, "", idx)
+            rows = open_session(path)
+        except (OSError, ValueError) as e:
+            if not quiet:
+                messagebox.showwarning("Sesión", str(e), parent=self)
+            return False
+        state = rows.state
+        self._drop_cursor()
+        self._has_more = False
+        self.last_results.close()
+        self.last_results = rows
+        self._params = state.get("params")
+        self._restore_form(state.get("form") or {})
+
+        sort = state.get("sort")
+        self._sort_col = tuple(sort) if sort else None
+        order = rows.order
+        self._order = order if order is not None and len(order) == len(rows) else self._sorted_order()
+        self.tree.configure(show="headings")
+        self._threads = {}
+        self.index.clear()
+        if self.v_filter.get():
+            self.v_filter.set("")
+        self.e_filter.configure(state=DISABLED)  # hasta terminar de indexar
+        self._apply_filter()
+        self._select_position(state.get("selected"))
+        self.after(1, self._index_session, rows, state.get("filter") or "")
+
+        self.worker.submit("use_results", {"rows": rows, "params": self._params},
+                           lambda n: None, self._on_error)
+        self._set_action_buttons(NORMAL)
+        self.status_var.set(f"📂 Sesión del {rows.saved_at}: {len(rows)} correos")
+        return True
+
+    def _index_session(self, rows, filter_text):
+        """Indexa la sesión por partes sin bloquear la ventana; luego aplica su filtro."""
+        if rows is not self.last_results:
+            return  # llegaron otros resultados
+        start = self.index.rows
+        self.index.add(rows[start:start + INDEX_CHUNK])
+        if self.index.rows < len(rows):
+            self.after(1, self._index_session, rows, filter_text)
+            return
+        self.e_filter.configure(state=NORMAL)
+        if filter_text:
+            self.v_filter.set(filter_text)
+
+    def _can_save_session(self):
+        return bool(self.last_results) and not self._threads
+
+    def _session_state(self) -> dict:
+        """Estado de la búsqueda y de la tabla que se guarda con la sesión."""
+        selected = None
+        sel = self.tree.selection()
+        if sel:
+            try:
+                selected = int(self.tree.set(sel[0], "num")) - 1
+            except (ValueError, TypeError):
+                pass
+        return {
+            "params": self._params,
+            "form": {
+                "subject": self.v_subject.get(), "sender": self.v_sender.get(),
+                "date_from": self.v_from.get(), "date_to": self.v_to.get(),
+                "folder": self.v_folder.get(), "attachments": self.v_att.get(),
+                "body": self.v_body.get(), "query": self.v_query.get(),
+                "body_terms": self._body_terms, "body_regex": self._body_regex,
+            },
+            "sort": list(self._sort_col) if self._sort_col else None,
+            "filter": self.v_filter.get(),
+            "selected": selected,
+        }
+
+    def _restore_form(self, form):
+        for key, var in (("subject", self.v_subject), ("sender", self.v_sender),
+                         ("date_from", self.v_from), ("date_to", self.v_to),
+                         ("folder", self.v_folder), ("attachments", self.v_att),
+                         ("body", self.v_body), ("query", self.v_query)):
+            if key in form:
+                var.set(form[key])
+        self._body_terms = form.get("body_terms") or []
+        self._body_regex = form.get("body_regex") or []
+        self.v_terms.set(f"{len(self._body_terms)} términos, {len(self._body_regex)} expr."
+                         if self._body_terms or self._body_regex else "")
+
+    def _select_position(self, position):
+        """Selecciona la fila de esa posición si está entre las ya mostradas."""
+        if position is None:
+            return
+        for iid in self.tree.get_children(""):
+            if self.tree.set(iid, "num") == str(position + 1):
+                self.tree.selection_set(iid)
+                self.tree.focus(iid)
+                self.tree.see(iid)
+                return
+
+    def _on_session_saved(self, path, size):
+        self.status_var.set(f"💾 Sesión guardada: {os.path.basename(path)} ({size // 1024 + 1} KB)")
 
     # ══════════════ Acciones ══════════════
 
@@ -285,11 +945,7 @@ class SearchFrame(ttk.Frame):
             title="Guardar Excel", defaultextension=".xlsx",
             filetypes=[("Excel", "*.xlsx")], initialfile="busqueda_outlook.xlsx", parent=self)
         if not fp: return
-        try:
-            path = export_to_excel(self.last_results, fp)
-            messagebox.showinfo("Exportado", f"Guardado en:\n{path}", parent=self)
-        except Exception as e:
-            messagebox.showerror("Error", str(e), parent=self)
+        self._submit_export({"xlsx_path": fp})
 
     def _export_csv(self):
         if not self.last_results: return
@@ -297,24 +953,147 @@ class SearchFrame(ttk.Frame):
             title="Guardar CSV", defaultextension=".csv",
             filetypes=[("CSV", "*.csv")], initialfile="busqueda_outlook.csv", parent=self)
         if not fp: return
-        try:
-            path = export_to_csv(self.last_results, fp)
-            messagebox.showinfo("Exportado", f"Guardado en:\n{path}", parent=self)
-        except Exception as e:
-            messagebox.showerror("Error", str(e), parent=self)
+        self._submit_export({"csv_path": fp})
+
+    def _submit_export(self, kwargs):
+        """
+        Exporta en el worker los resultados que ya tiene cargados (sin copiarlos
+        desde la GUI); la tabla sigue disponible mientras se escribe el archivo.
+        """
+        self.btn_excel.configure(state=DISABLED)
+        self.btn_csv.configure(state=DISABLED)
+        self.btn_stop_export.pack(side=RIGHT, padx=(4, 0))
+        self.status_var.set("💾 Exportando...")
+        self._export_ticket = self.worker.submit("export_rows", kwargs,
+                                                 self._on_exported, self._on_export_error)
+
+    def _cancel_export(self):
+        if self._export_ticket is None:
+            return
+        if self.worker.cancel(self._export_ticket):
+            self.status_var.set("⛔ Cancelando exportación...")
+        else:  # todavía en la cola: no llegarán callbacks
+            self._on_exported({"cancelled": True})
+
+    def show_export_progress(self, info):
+        """Progreso de la exportación en curso (filas escritas)."""
+        if self._export_ticket is None:
+            return
+        total = info.get("total")
+        text = f"💾 {info['message']}"
+        if total:
+            text += f"  ·  {info['current'] * 100 // total}%"
+        eta = format_eta(info.get("eta"))
+        if eta:
+            text += f"  ·  ETA {eta}"
+        self.status_var.set(text)
+
+    def _end_export(self):
+        self._export_ticket = None
+        self.btn_stop_export.pack_forget()
+        state = NORMAL if self.last_results else DISABLED
+        self.btn_excel.configure(state=state)
+        self.btn_csv.configure(state=state)
+
+    def _on_exported(self, stats):
+        self._end_export()
+        if stats["cancelled"]:
+            self.status_var.set("⛔ Exportación cancelada (archivo descartado).")
+            return
+        path = stats["xlsx"] or stats["csv"]
+        self.status_var.set(f"✓ {stats['rows']} correos exportados.")
+        messagebox.showinfo("Exportado", f"Guardado en:\n{path}", parent=self)
+
+    def _on_export_error(self, msg):
+        self._end_export()
+        self.status_var.set("❌ Error")
+        messagebox.showerror("Error", msg, parent=self)
 
     def _export_attachments(self):
         if not self.last_results: return
-        AttachmentsDialog(self.winfo_toplevel(), self.worker)
+        AttachmentsDialog(self.winfo_toplevel(), self.worker, self.last_results)
+
+    def _open_bulk(self):
+        """Acciones masivas sobre todos, los filtrados o los seleccionados."""
+        if not self.last_results: return
+        if self._threads:
+            messagebox.showinfo("Info", "Las acciones masivas se aplican en la vista de lista "
+                                "(desactiva 'Agrupar conversaciones').", parent=self)
+            return
+        selected = [self._row_index(iid) for iid in self.tree.selection()]
+        selected = [i for i in selected if i is not None]
+        view = self._view if self.v_filter.get().strip() else None
+        paths = [p for p in self.cb_folder.cget("values") if p not in DEFAULT_FOLDERS]
+        self._bulk_dialog = BulkDialog(self.winfo_toplevel(), self.worker, len(self.last_results),
+                                       view, selected, ["deleted"] + paths, self._on_bulk_updated)
+
+    def _on_bulk_updated(self, updated):
+        """Filas que cambiaron con una acción masiva (EntryID nuevo tras mover)."""
+        old = set()
+        for position, changes in updated.items():
+            old.add(self.last_results[position].get("entry_id"))
+            self.last_results.update_row(position, changes)
+        self.details.invalidate(old)
+
+    def show_bulk_progress(self, info):
+        """Progreso de la acción masiva en curso (lo muestra el diálogo)."""
+        dialog = self._bulk_dialog
+        if dialog is not None and dialog.winfo_exists():
+            dialog.show_progress(info)
 
     def _view_detail(self):
         sel = self.tree.selection()
         if not sel:
             messagebox.showinfo("Info", "Selecciona un correo.", parent=self)
             return
-        idx = int(self.tree.set(sel[0], "num")) - 1
-        if 0 <= idx < len(self.last_results):
-            EmailDetailDialog(self.winfo_toplevel(), self.last_results[idx])
+        if sel[0] in self._threads:  # fila de conversación: expandir
+            self.tree.item(sel[0], open=True)
+            self._expand_thread(sel[0])
+            return
+        row = self._row_for(sel[0])
+        if row is not None:
+            EmailDetailDialog(self.winfo_toplevel(), row, self.details, self._detail_step)
+            self._prefetch_around(sel[0])
+
+    def _row_for(self, iid):
+        """Fila de resultados mostrada en un ítem de la tabla (None en hilos)."""
+        idx = self._row_index(iid)
+        return None if idx is None else self.last_results[idx]
+
+    def _row_index(self, iid):
+        """Posición en last_results de un ítem de la tabla (None en hilos)."""
+        try:
+            idx = int(self.tree.set(iid, "num")) - 1
+        except (ValueError, TypeError):
+            return None
+        return idx if 0 <= idx < len(self.last_results) else None
+
+    def _detail_step(self, step):
+        """Navegación del detalle: selecciona la fila vecina y la retorna."""
+        iid = self.tree.focus()
+        while iid:
+            iid = self.tree.next(iid) if step > 0 else self.tree.prev(iid)
+            row = self._row_for(iid) if iid else None
+            if row is not None:
+                self.tree.selection_set(iid)
+                self.tree.focus(iid)
+                self.tree.see(iid)  # al llegar al final pide la página siguiente
+                self._prefetch_around(iid)
+                return row
+        return None
+
+    def _prefetch_around(self, iid, ahead=2, behind=1):
+        """Precarga el detalle de las filas vecinas a la seleccionada."""
+        ids = []
+        nxt = prv = iid
+        for _ in range(ahead):
+            nxt = nxt and self.tree.next(nxt)
+            ids.append(nxt)
+        for _ in range(behind):
+            prv = prv and self.tree.prev(prv)
+            ids.append(prv)
+        rows = (self._row_for(i) for i in ids if i)
+        self.details.prefetch(r for r in rows if r)
 
     def _show_summary(self):
         if not self.last_results: return
@@ -348,7 +1127,8 @@ class SearchFrame(ttk.Frame):
             self.btn_quick.pack(side=RIGHT)
 
     def _set_action_buttons(self, state):
-        for b in (self.btn_excel, self.btn_csv, self.btn_att, self.btn_det, self.btn_sum):
+        for b in (self.btn_excel, self.btn_csv, self.btn_att, self.btn_det, self.btn_sum,
+                  self.btn_bulk, self.btn_save_search):
             b.configure(state=state)
 
 
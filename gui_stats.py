@@ -0,0 +1,109 @@
+"""
+Diálogo de estadísticas de llamadas COM (Ayuda > Estadísticas COM).
+Muestra en vivo las métricas de la instrumentación del OutlookWorker.
+"""
+
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+
+class StatsDialog(ttk.Toplevel):
+    """Vista en vivo de llamadas COM: acumulado y última tarea."""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, parent, worker):
+        super().__init__(parent)
+        self.title("📊 Estadísticas COM")
+        self.geometry("720x520")
+        self.transient(parent)
+
+        self.worker = worker
+        self.instr = worker.instrumentation
+        self._build_ui()
+        self._refresh()
+
+    def _build_ui(self):
+        m = ttk.Frame(self, padding=12)
+        m.pack(fill=BOTH, expand=True)
+
+        # --- Configuración ---
+        top = ttk.Frame(m)
+        top.pack(fill=X, pady=(0, 8))
+        self.v_enabled = ttk.BooleanVar(value=self.instr.enabled)
+        ttk.Checkbutton(top, text="Instrumentación activa", variable=self.v_enabled,
+                        bootstyle="round-toggle").pack(side=LEFT)
+        ttk.Label(top, text="Umbral lento (ms):").pack(side=LEFT, padx=(16, 4))
+        self.v_slow = ttk.IntVar(value=int(self.instr.slow_ms))
+        ttk.Spinbox(top, from_=100, to=600000, increment=500, textvariable=self.v_slow,
+                    width=8).pack(side=LEFT)
+        ttk.Button(top, text="Aplicar", bootstyle=PRIMARY, command=self._apply).pack(side=LEFT, padx=8)
+        ttk.Button(top, text="Reiniciar", bootstyle=(SECONDARY, OUTLINE),
+                   command=self.instr.totals.reset).pack(side=RIGHT)
+
+        ttk.Label(m, text=f"Log de operaciones lentas: {self.instr.log_path}",
+                  font=("Segoe UI", 8), foreground="gray").pack(anchor=W)
+
+        # --- Vista ---
+        vf = ttk.Frame(m)
+        vf.pack(fill=X, pady=(8, 4))
+        self.v_view = ttk.StringVar(value="totals")
+        ttk.Radiobutton(vf, text="Acumulado", variable=self.v_view, value="totals",
+                        command=self._refresh_now).pack(side=LEFT, padx=(0, 12))
+        ttk.Radiobutton(vf, text="Última tarea", variable=self.v_view, value="last",
+                        command=self._refresh_now).pack(side=LEFT)
+
+        tf = ttk.Frame(m)
+        tf.pack(fill=BOTH, expand=True)
+        cols = ("member", "count", "total", "avg", "max")
+        self.tree = ttk.Treeview(tf, columns=cols, show="headings", height=14)
+        for cid, hd, w, anch in [("member", "Miembro", 280, W), ("count", "Llamadas", 80, E),
+                                 ("total", "Total ms", 90, E), ("avg", "Prom. ms", 80, E),
+                                 ("max", "Máx. ms", 80, E)]:
+            self.tree.heading(cid, text=hd)
+            self.tree.column(cid, width=w, anchor=anch)
+        vsb = ttk.Scrollbar(tf, orient=VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+        vsb.pack(side=RIGHT, fill=Y)
+
+        self.v_summary = ttk.StringVar()
+        ttk.Label(m, textvariable=self.v_summary, font=("Segoe UI", 9)).pack(anchor=W, pady=(6, 0))
+
+        ttk.Button(m, text="Cerrar", bootstyle=SECONDARY, command=self.destroy).pack(pady=(8, 0))
+
+    def _apply(self):
+        self.worker.submit(
+            "set_instrumentation",
+            {"enabled": self.v_enabled.get(), "slow_ms": self.v_slow.get()},
+            lambda _: self._refresh_now(), lambda _: None,
+        )
+
+    def _refresh(self):
+        if not self.winfo_exists():
+            return
+        self._refresh_now()
+        self.after(self.REFRESH_MS, self._refresh)
+
+    def _refresh_now(self):
+        snap = self.instr.snapshot()
+        last = snap["last_task"]
+        if self.v_view.get() == "last":
+            members = (last or {}).get("top", {})
+        else:
+            members = snap["totals"]
+
+        self.tree.delete(*self.tree.get_children())
+        for key, m in sorted(members.items(), key=lambda kv: kv[1]["total_ms"], reverse=True):
+            self.tree.insert("", END, values=(key, m["count"], m["total_ms"], m["avg_ms"], m["max_ms"]))
+
+        if not snap["enabled"]:
+            self.v_summary.set("Instrumentación desactivada.")
+        elif last:
+            self.v_summary.set(
+                f"Última tarea: {last['task']} — {last['elapsed_ms']} ms, "
+                f"{last['com_calls']} llamadas COM ({last['com_ms']} ms)"
+                + (f", {last['rows']} filas" if "rows" in last else "")
+            )
+        else:
+            self.v_summary.set("Sin tareas medidas todavía.")
@@ -0,0 +1,1109 @@
+"""
+Origen de correo IMAP (buzones que solo son accesibles por IMAP, o Exchange
+sin Outlook).
+
+Como archive.py, arma en memoria el modelo de objetos de Outlook de
+fake_outlook, pero las carpetas consultan al servidor:
+
+    Items.Restrict   el filtro DASL se traduce a criterios IMAP SEARCH y el
+                     servidor filtra; lo que no tiene equivalente exacto
+                     (importancia, categorías, adjuntos, horas) se revisa
+                     localmente sobre los candidatos
+    Orden            UID SORT (REVERSE ARRIVAL) si el servidor lo soporta;
+                     si no, INTERNALDATE de los candidatos
+    Enumeración      UID FETCH por lotes de FETCH_BATCH correos con solo lo
+                     que usa la tabla (ENVELOPE, BODYSTRUCTURE, FLAGS, tamaño
+                     y tres encabezados) más una vista previa parcial del
+                     texto; el lote siguiente se pide en paralelo por otra
+                     conexión mientras se procesa el actual
+    Cuerpo/adjuntos  se piden por sección (BODY.PEEK[n]) al abrir el detalle;
+                     los adjuntos se descargan por tramos al guardarlos
+
+Las conexiones autenticadas se reparten desde un pool (ImapPool): la
+consulta de carpetas al conectar, las búsquedas de varios threads y la
+lectura anticipada usan conexiones distintas. El acceso es de solo lectura
+(EXAMINE). Ejemplo:
+
+    backend = ImapBackend("imap.empresa.cl", "ana@empresa.cl", "secreta")
+    EmailSearch(backend).search(folder="inbox", query="from:juan has:attachment")
+
+fake_imap.FakeImapServer es un servidor IMAP en proceso para probarlo sin
+un servidor real.
+"""
+
+import base64
+import copy
+import hashlib
+import imaplib
+import itertools
+import queue
+import quopri
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from urllib.parse import unquote
+
+import dasl
+from archive import (ARCHIVE_FOLDER_NAMES, SUBJECT_PREFIX_RE, header_importance,
+                     html_to_text, preview_text)
+from fake_outlook import FakeFolder, FakeItems, FakeMailItem, FakeOutlook, FakeTable, MailRecord, PR_PREVIEW
+from outlook_client import OutlookClient
+
+IMAP_PORT = 143
+IMAPS_PORT = 993
+TIMEOUT = 60
+POOL_SIZE = 4
+# Correos por UID FETCH
+FETCH_BATCH = 100
+# Bytes del texto leídos para la vista previa
+PREVIEW_BYTES = 1024
+# Tramo de descarga de adjuntos
+ATTACHMENT_CHUNK = 256 * 1024
+# Segundos que se reutiliza la cantidad de correos de STATUS
+STATUS_TTL = 30
+
+HEADER_FIELDS = "IMPORTANCE X-PRIORITY REFERENCES"
+FETCH_ITEMS = (f"(UID FLAGS INTERNALDATE RFC822.SIZE ENVELOPE BODYSTRUCTURE "
+               f"BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])")
+
+# Atributos SPECIAL-USE (RFC 6154) -> carpeta predeterminada de Outlook
+SPECIAL_USE = {"\\SENT": 5, "\\DRAFTS": 16, "\\TRASH": 3, "\\JUNK": 23}
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_ATOM_RE = re.compile(rb'(?:\[[^\]]*\]|[^\s()\[\]"{])+')
+
+
+# ══════════════ Conexiones ══════════════
+
+class ImapPool:
+    """Conexiones IMAP autenticadas reutilizables (thread-safe)."""
+
+    def __init__(self, connect, size: int = POOL_SIZE):
+        """
+        Args:
+            connect: Función sin argumentos que abre y autentica una conexión
+            size: Máximo de conexiones abiertas a la vez
+        """
+        self.size = size
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Presta una conexión (espera si todas están en uso)."""
+        self._slots.acquire()
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            yield conn
+        except (imaplib.IMAP4.abort, OSError):
+            _logout(conn)  # conexión caída: no vuelve al pool
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def close(self):
+        """Cierra las conexiones libres."""
+        while True:
+            try:
+                _logout(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _logout(conn):
+    if conn is None:
+        return
+    try:
+        conn.logout()
+    except Exception:
+        pass
+
+
+# ══════════════ Origen IMAP ══════════════
+
+class ImapBackend(OutlookClient):
+    """
+    Cuenta IMAP con la misma interfaz que OutlookClient (ver
+    backend.MailBackend). Un solo almacén con las carpetas del servidor.
+
+    Attributes:
+        host, port, user: Datos de conexión
+        capabilities: Capacidades anunciadas por el servidor
+        pool: ImapPool de conexiones autenticadas
+        model: FakeOutlook con las carpetas y los correos ya leídos
+    """
+
+    server_body_search = True
+
+    def __init__(self, host: str, user: str, password: str, port: int = None,
+                 ssl: bool = True, pool_size: int = POOL_SIZE):
+        """
+        Args:
+            host: Servidor IMAP
+            user: Usuario
+            password: Contraseña
+            port: Puerto (por defecto 993 con SSL, 143 sin)
+            ssl: Usar IMAP sobre TLS
+            pool_size: Conexiones simultáneas
+
+        Raises:
+            ConnectionError: si no se puede conectar o autenticar
+        """
+        self.host = host
+        self.user = user
+        self.port = port or (IMAPS_PORT if ssl else IMAP_PORT)
+        self.ssl = ssl
+        self._password = password
+        self.capabilities = ()
+        self.utf8 = False
+        self.pool = ImapPool(self._open, pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="imap")
+        self.model = FakeOutlook(account_email=user)
+        try:
+            self._build_folders()
+        except (imaplib.IMAP4.error, OSError) as e:
+            detail = e.args[0] if e.args else e
+            if isinstance(detail, bytes):  # imaplib deja el texto del servidor en bytes
+                detail = detail.decode("utf-8", "replace")
+            raise ConnectionError(f"No se pudo conectar al servidor IMAP {host}:{self.port}. Error: {detail}")
+        super().__init__(application=self.model.application)
+
+    def new_session(self) -> "ImapBackend":
+        """Misma cuenta para otro thread (comparte el modelo y el pool)."""
+        session = copy.copy(self)
+        session.registry = None
+        return session
+
+    def close(self):
+        """Cierra las conexiones del pool."""
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+    def _open(self):
+        cls = imaplib.IMAP4_SSL if self.ssl else imaplib.IMAP4
+        conn = cls(self.host, self.port, timeout=TIMEOUT)
+        try:
+            conn.login(self.user, self._password)
+            if "ENABLE" in conn.capabilities and "UTF8=ACCEPT" in conn.capabilities:
+                conn.enable("UTF8=ACCEPT")
+        except Exception:
+            _logout(conn)
+            raise
+        conn.selected_folder = None
+        self.capabilities = conn.capabilities
+        self.utf8 = conn.utf8_enabled
+        return conn
+
+    def _call(self, folder, fn):
+        """
+        Ejecuta fn(conexión) con una conexión del pool, con la carpeta
+        seleccionada (EXAMINE) si se indica. Reintenta una vez si la conexión
+        se cayó.
+        """
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    if folder is not None and conn.selected_folder is not folder:
+                        conn.selected_folder = None
+                        typ, data = conn.select(self.quote_mailbox(folder._mailbox), readonly=True)
+                        if typ != "OK":
+                            raise LookupError(f"No se pudo abrir la carpeta {folder._mailbox}: {data}")
+                        validity = conn.untagged_responses.get("UIDVALIDITY", [b"0"])[-1]
+                        folder._check_validity(int(validity))
+                        conn.selected_folder = folder
+                    return fn(conn)
+            except (imaplib.IMAP4.abort, OSError):
+                if attempt:
+                    raise
+
+    def quote_mailbox(self, name: str) -> str:
+        """Nombre de carpeta para un comando (UTF-7 modificado si el servidor no acepta UTF-8)."""
+        return _quote(name if self.utf8 else encode_mailbox(name))
+
+    # === Carpetas ===
+
+    def _build_folders(self):
+        typ, data = self._call(None, lambda conn: conn.list('""', '"*"'))
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"LIST falló: {data}")
+        values = parse_values(_join(data))
+        mailboxes = []
+        for i in range(0, len(values) - 2, 3):
+            flags, delimiter, name = values[i:i + 3]
+            name = name.decode("utf-8", errors="replace")
+            if not self.utf8:
+                name = decode_mailbox(name)
+            mailboxes.append(([f.decode().upper() for f in flags or []],
+                              (delimiter or b"").decode(), name))
+
+        store = self.model.add_store(self.user, file_path=f"imap://{self.host}",
+                                     exchange=False, default_folders=False)
+        folders = {}
+        for flags, delimiter, name in sorted(mailboxes, key=lambda m: m[2].lower()):
+            folder = self._folder(store, folders, name, delimiter)
+            if "\\NOSELECT" not in flags and "\\NONEXISTENT" not in flags:
+                folder._mailbox = name
+            for flag in flags:
+                if flag in SPECIAL_USE:
+                    store._default_folders.setdefault(SPECIAL_USE[flag], folder)
+            if name.upper() == "INBOX":
+                store._default_folders[6] = folder
+
+        for folder_type, names in ARCHIVE_FOLDER_NAMES.items():
+            if folder_type not in store._default_folders:
+                match = next((f for f in folders.values()
+                              if f._mailbox and f.Name.lower() in names), None)
+                if match is not None:
+                    store._default_folders[folder_type] = match
+
+        # Cantidad de correos de todas las carpetas, en paralelo por el pool
+        selectable = [f for f in folders.values() if f._mailbox]
+        list(self.executor.map(lambda f: f._message_count(), selectable))
+
+    def _folder(self, store, folders, name, delimiter):
+        """Carpeta del modelo para un nombre IMAP (crea las intermedias)."""
+        folder = folders.get(name)
+        if folder is not None:
+            return folder
+        if delimiter and delimiter in name:
+            parent_name, leaf = name.rsplit(delimiter, 1)
+            parent = self._folder(store, folders, parent_name, delimiter)
+        else:
+            parent, leaf = store._root, name
+        folder = folders[name] = ImapFolder(self.model._session, store, leaf, parent, self)
+        parent._children.append(folder)
+        return folder
+
+
+class ImapFolder(FakeFolder):
+    """Carpeta IMAP: Items y GetTable consultan al servidor."""
+
+    def __init__(self, session, store, name, parent, backend):
+        super().__init__(session, store, name, parent)
+        self._backend = backend
+        self._mailbox = None      # None = carpeta que no se puede seleccionar
+        self._validity = None
+        self._count = (0, None)   # (cantidad, monotonic de STATUS)
+        self._by_uid = {}         # uid -> MailRecord
+        self._dates = {}          # uid -> INTERNALDATE (sin SORT en el servidor)
+        self._inflight = {}       # uid -> Future de la lectura anticipada
+        self._lock = threading.RLock()
+
+    @property
+    def Items(self):
+        return ImapItems(self._session, self)
+
+    def GetTable(self, filter_str="", table_contents=0):
+        return ImapTable(self._session, _LazyRecords(self, filter_str))
+
+    def _message_count(self) -> int:
+        count, when = self._count
+        if self._mailbox is None or (when is not None and time.monotonic() - when < STATUS_TTL):
+            return count
+
+        def status(conn):
+            typ, data = conn.status(self._backend.quote_mailbox(self._mailbox), "(MESSAGES UIDVALIDITY)")
+            if typ != "OK":
+                raise LookupError(f"STATUS falló para {self._mailbox}: {data}")
+            values = parse_values(_join(data))[-1]
+            return dict(zip((k.decode().upper() for k in values[::2]), (int(v) for v in values[1::2])))
+
+        info = self._backend._call(None, status)
+        self._check_validity(info.get("UIDVALIDITY"))
+        self._count = (info.get("MESSAGES", 0), time.monotonic())
+        return self._count[0]
+
+    def _check_validity(self, validity):
+        """Descarta lo leído si cambió UIDVALIDITY (los UID ya no son válidos)."""
+        with self._lock:
+            if validity and self._validity not in (None, validity):
+                for record in list(self._records):
+                    self._remove_record(record)
+                self._by_uid.clear()
+                self._dates.clear()
+            if validity:
+                self._validity = validity
+
+    # === Búsqueda ===
+
+    def _search(self, filter_str: str, descending: bool):
+        """
+        UIDs que cumplen el filtro según el servidor, ordenados por llegada.
+
+        Returns:
+            Tupla (uids, predicado local o None si el servidor filtró todo)
+        """
+        if self._mailbox is None:
+            return [], None
+        key, residual = ("ALL", None)
+        if filter_str:
+            key, residual = imap_criteria(filter_str, utf8=self._backend.utf8)
+        predicate = dasl.compile_node(residual) if residual is not None else None
+
+        def run(conn):
+            if "SORT" in self._backend.capabilities:
+                order = "(REVERSE ARRIVAL)" if descending else "(ARRIVAL)"
+                typ, data = conn.uid("SORT", order, "UTF-8", key)
+                if typ != "OK":
+                    raise RuntimeError(f"SORT falló: {data}")
+                return [int(u) for u in b" ".join(d for d in data if d).split()]
+            typ, data = conn.uid("SEARCH", key)
+            if typ != "OK":
+                raise RuntimeError(f"SEARCH falló: {data}")
+            uids = [int(u) for u in b" ".join(d for d in data if d).split()]
+            missing = [u for u in uids if u not in self._dates]
+            for i in range(0, len(missing), FETCH_BATCH * 50):
+                typ, data = conn.uid("FETCH", uid_set(missing[i:i + FETCH_BATCH * 50]), "(UID INTERNALDATE)")
+                for item in fetch_items(data):
+                    self._dates[int(item["UID"])] = parse_internaldate(item["INTERNALDATE"])
+            far = datetime.min
+            return sorted(uids, key=lambda u: (self._dates.get(u, far), u), reverse=descending)
+
+        return self._backend._call(self, run), predicate
+
+    # === Lectura por lotes ===
+
+    def _window(self, uids, start, stop, read_ahead=True) -> list:
+        """
+        Correos de uids[start:stop] (los que sigan existiendo). Lee los que
+        falten en lotes de FETCH_BATCH y, con read_ahead, pide el lote
+        siguiente en segundo plano.
+        """
+        batch = uids[start:stop]
+        self._wait(batch)
+        with self._lock:
+            missing = [u for u in batch if u not in self._by_uid]
+        for i in range(0, len(missing), FETCH_BATCH):
+            self._fetch(missing[i:i + FETCH_BATCH])
+        if read_ahead:
+            self._prefetch(uids[stop:stop + FETCH_BATCH])
+        with self._lock:
+            return [self._by_uid[u] for u in batch if u in self._by_uid]
+
+    def _prefetch(self, uids):
+        with self._lock:
+            missing = [u for u in uids if u not in self._by_uid and u not in self._inflight]
+            if not missing:
+                return
+            future = self._backend.executor.submit(self._fetch, missing)
+            for u in missing:
+                self._inflight[u] = future
+
+    def _wait(self, uids):
+        with self._lock:
+            futures = {self._inflight[u] for u in uids if u in self._inflight}
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass  # se vuelve a leer en el thread que lo necesita
+
+    def _fetch(self, uids):
+        """UID FETCH de un lote: encabezados, estructura y vista previa."""
+        try:
+            summaries = self._backend._call(self, lambda conn: _fetch_summaries(conn, uids))
+            with self._lock:
+                for uid, summary in summaries.items():
+                    if uid not in self._by_uid:
+                        record = self._record(uid, summary)
+                        self._by_uid[uid] = record
+                        self._add_record(record)
+        finally:
+            with self._lock:
+                for u in uids:
+                    self._inflight.pop(u, None)
+
+    def _record(self, uid: int, s: dict) -> MailRecord:
+        key = f"{self._store._store_id}:{self._mailbox}:{self._validity}:{uid}"
+        props = {PR_PREVIEW: s["preview"]}
+        for i, part in enumerate(s["parts"]):
+            props[("attachment", i)] = self._attachment_loader(uid, part)
+        return MailRecord(
+            entry_id=hashlib.sha1(key.encode("utf-8")).hexdigest()[:24].upper(),
+            subject=s["subject"],
+            sender_name=s["sender_name"],
+            sender_email=s["sender_email"],
+            to="; ".join(r[0] for r in s["recipients"] if r[2] == 1),
+            cc="; ".join(r[0] for r in s["recipients"] if r[2] == 2),
+            received=s["received"],
+            body=self._body_loader(uid, s["text"]),
+            importance=s["importance"],
+            categories=s["categories"],
+            size=s["size"],
+            attachments=s["attachments"],
+            recipients=s["recipients"],
+            unread=s["unread"],
+            conversation_id=hashlib.sha1(s["thread"].encode("utf-8")).hexdigest()[:16].upper(),
+            conversation_topic=SUBJECT_PREFIX_RE.sub("", s["subject"]),
+            props=props,
+        )
+
+    def _body_loader(self, uid, text):
+        def load():
+            if text is None:
+                return ""
+            section, encoding, charset, subtype = text
+
+            def run(conn):
+                typ, data = conn.uid("FETCH", str(uid), f"(UID BODY.PEEK[{section}])")
+                items = fetch_items(data)
+                return items[0].get(f"BODY[{section}]") if items else None
+
+            raw = self._backend._call(self, run) or b""
+            content = decode_text(decode_transfer(raw, encoding), charset)
+            return html_to_text(content) if subtype == "html" else content
+        return load
+
+    def _attachment_loader(self, uid, part):
+        section, encoding = part
+
+        def stream():
+            """Contenido decodificado, leído del servidor por tramos."""
+            decoder = _TransferDecoder(encoding)
+            offset = 0
+            while True:
+                def run(conn, offset=offset):
+                    typ, data = conn.uid("FETCH", str(uid),
+                                         f"(UID BODY.PEEK[{section}]<{offset}.{ATTACHMENT_CHUNK}>)")
+                    items = fetch_items(data)
+                    return items[0].get(f"BODY[{section}]") if items else None
+
+                chunk = self._backend._call(self, run) or b""
+                offset += len(chunk)
+                block = decoder.feed(chunk)
+                if block:
+                    yield block
+                if len(chunk) < ATTACHMENT_CHUNK:
+                    break
+            block = decoder.flush()
+            if block:
+                yield block
+
+        return stream
+
+
+class _LazyRecords:
+    """
+    Resultado de una búsqueda en el servidor: secuencia de MailRecord que se
+    lee por lotes a medida que se recorre.
+    """
+
+    def __init__(self, folder, filter_str="", descending=True):
+        self.folder = folder
+        self.filter = filter_str
+        self.descending = descending
+        self._uids = None
+        self._predicate = None
+        self._matched = None      # con predicado: coincidencias ya revisadas
+        self._scanned = 0
+
+    def _plan(self):
+        if self._uids is None:
+            self._uids, self._predicate = self.folder._search(self.filter, self.descending)
+            if self._predicate is not None:
+                self._matched = []
+
+    def ordered(self, descending: bool) -> "_LazyRecords":
+        """La misma búsqueda en el orden pedido (sin volver a consultar si ya se hizo)."""
+        if descending == self.descending:
+            return self
+        other = _LazyRecords(self.folder, self.filter, descending)
+        if self._uids is not None:
+            other._uids, other._predicate = self._uids[::-1], self._predicate
+            other._matched = [] if self._predicate is not None else None
+        return other
+
+    @property
+    def known_length(self):
+        """Largo sin leer correos (None si hay un predicado local pendiente)."""
+        self._plan()
+        return len(self._uids) if self._predicate is None else None
+
+    def _fill(self, n=None):
+        """Revisa lotes hasta tener n coincidencias (None = todas)."""
+        while (n is None or len(self._matched) < n) and self._scanned < len(self._uids):
+            start = self._scanned
+            self._scanned = min(start + FETCH_BATCH, len(self._uids))
+            for record in self.folder._window(self._uids, start, self._scanned):
+                if self._predicate(record.get):
+                    self._matched.append(record)
+
+    def __len__(self):
+        self._plan()
+        if self._predicate is None:
+            return len(self._uids)
+        self._fill()
+        return len(self._matched)
+
+    def __getitem__(self, index):
+        self._plan()
+        if self._predicate is not None:
+            if isinstance(index, slice):
+                bounded = index.stop is not None and index.stop >= 0 and (index.start or 0) >= 0
+                self._fill(index.stop if bounded else None)
+            else:
+                self._fill(index + 1 if index >= 0 else None)
+            return self._matched[index]
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self._uids))
+            return self.folder._window(self._uids, start, stop) if start < stop else []
+        pos = index + len(self._uids) if index < 0 else index
+        if not 0 <= pos < len(self._uids):
+            raise IndexError(index)
+        records = self.folder._window(self._uids, pos, pos + 1, read_ahead=False)
+        if not records:
+            raise IndexError(index)  # eliminado en el servidor después de buscar
+        return records[0]
+
+    def __iter__(self):
+        self._plan()
+        if self._predicate is None:
+            for start in range(0, len(self._uids), FETCH_BATCH):
+                yield from self.folder._window(self._uids, start, start + FETCH_BATCH)
+            return
+        i = 0
+        while True:
+            self._fill(i + 1)
+            if i >= len(self._matched):
+                return
+            yield self._matched[i]
+            i += 1
+
+
+class ImapItems(FakeItems):
+    """Items de una carpeta IMAP: Restrict y Sort por fecha se resuelven en el servidor."""
+
+    _com_name = "Items"
+
+    def __init__(self, session, folder, records=None):
+        super().__init__(session, records if records is not None else _LazyRecords(folder),
+                         folder=folder)
+
+    @property
+    def Count(self):
+        records = self._records
+        if isinstance(records, _LazyRecords) and not records.filter and records._uids is None:
+            return self._folder._message_count()
+        return len(records)
+
+    def Sort(self, prop, descending=False):
+        if prop.strip("[]") == "ReceivedTime" and isinstance(self._records, _LazyRecords):
+            self._records = self._records.ordered(bool(descending))
+            return
+        self._records = list(self._records)
+        super().Sort(prop, descending)
+
+    def Restrict(self, filter_str):
+        records = self._records
+        if not isinstance(records, _LazyRecords):
+            return super().Restrict(filter_str)
+        if not filter_str.upper().startswith("@SQL="):
+            raise ValueError("El origen IMAP solo soporta filtros DASL (@SQL=)")
+        combined = _and_filters(records.filter, filter_str)
+        return ImapItems(self._session, self._folder,
+                         _LazyRecords(self._folder, combined, records.descending))
+
+    def Find(self, filter_str):
+        self._find_iter = iter(self.Restrict(filter_str)._records)
+        return self.FindNext()
+
+    def FindNext(self):
+        found = getattr(self, "_find_iter", None)
+        record = next(found, None) if found is not None else None
+        return FakeMailItem(self._session, record) if record is not None else None
+
+    def __iter__(self):
+        for record in self._records:
+            self._session.touch("Items.Next")
+            yield FakeMailItem(self._session, record)
+
+
+class ImapTable(FakeTable):
+    """Folder.GetTable de una carpeta IMAP: las filas se leen por lotes."""
+
+    def __init__(self, session, records):
+        super().__init__(session, [])
+        self._records = records
+
+    def Sort(self, prop, descending=False):
+        if prop.strip("[]") == "ReceivedTime" and isinstance(self._records, _LazyRecords):
+            self._records = self._records.ordered(bool(descending))
+            return
+        self._records = list(self._records)
+        super().Sort(prop, descending)
+
+
+def _and_filters(*filters) -> str:
+    parts = [f[5:] if f.upper().startswith("@SQL=") else f for f in filters if f]
+    if not parts:
+        return ""
+    if len(parts) == 1:
+        return "@SQL=" + parts[0]
+    return "@SQL=" + " AND ".join(f"({p})" for p in parts)
+
+
+# ══════════════ DASL -> IMAP SEARCH ══════════════
+
+# Propiedad -> criterio IMAP y si la coincidencia por subcadena del servidor
+# equivale a LIKE '%texto%' (si no, el servidor solo descarta candidatos)
+_TEXT_KEYS = {
+    "Subject": ("SUBJECT", True),
+    "Body": ("BODY", True),
+    "SenderEmailAddress": ("FROM", False),
+    "SenderName": ("FROM", False),
+    "To": ("TO", False),
+    "CC": ("CC", False),
+}
+
+
+def imap_criteria(filter_str: str, utf8: bool = True):
+    """
+    Traduce un filtro DASL a criterios IMAP SEARCH.
+
+    Args:
+        filter_str: Filtro '@SQL=...'
+        utf8: El servidor acepta texto UTF-8 (UTF8=ACCEPT); si no, los
+              términos no ASCII se revisan solo localmente
+
+    Returns:
+        Tupla (criterio, residuo): criterio es una clave de búsqueda IMAP
+        (p. ej. '(SUBJECT "factura" SINCE 1-Mar-2024)') que devuelve un
+        superconjunto de las coincidencias; residuo es el árbol DASL (ver
+        dasl.parse) que falta revisar en cada candidato, o None si el
+        servidor filtró con exactitud
+    """
+    return _translate(dasl.parse(filter_str), utf8)
+
+
+def _translate(node, utf8):
+    kind = node[0]
+    if kind == "and":
+        parts = [_translate(child, utf8) for child in node[1]]
+        keys = [key for key, _ in parts if key != "ALL"]
+        residual = [r for _, r in parts if r is not None]
+        key = keys[0] if len(keys) == 1 else f"({' '.join(keys)})" if keys else "ALL"
+        if not residual:
+            return key, None
+        return key, residual[0] if len(residual) == 1 else ("and", residual)
+    if kind == "or":
+        parts = [_translate(child, utf8) for child in node[1]]
+        if any(key == "ALL" for key, _ in parts):
+            return "ALL", node
+        key = parts[-1][0]
+        for other, _ in reversed(parts[:-1]):
+            key = f"OR {other} {key}"
+        return key, None if all(r is None for _, r in parts) else node
+    if kind == "not":
+        key, residual = _translate(node[1], utf8)
+        if residual is None and key != "ALL":
+            return f"NOT {key}", None
+        return "ALL", node
+    return _translate_cmp(node, utf8)
+
+
+def _translate_cmp(node, utf8):
+    _, prop, op, value = node
+    name = dasl.PROPERTY_MAP.get(prop) or dasl.PROPERTY_MAP.get(prop.lower())
+
+    if name in _TEXT_KEYS and op in ("LIKE", "CI_STARTSWITH", "CI_PHRASEMATCH", "="):
+        text = str(value)
+        exact = _TEXT_KEYS[name][1]
+        if op == "LIKE":
+            pieces = [p for p in re.split(r"[%_]", text) if p]
+            exact = exact and re.fullmatch(r"%[^%_]+%", text) is not None
+            text = max(pieces, key=len) if pieces else ""
+        elif op != "CI_PHRASEMATCH":
+            exact = False
+        if not text or not (utf8 or text.isascii()):
+            return "ALL", node
+        return f"{_TEXT_KEYS[name][0]} {_quote(text)}", None if exact else node
+
+    if name == "ReceivedTime" and op in ("<", "<=", ">", ">="):
+        # El servidor compara solo el día, en su zona horaria: se amplía un
+        # día a cada lado y la hora exacta se revisa localmente
+        day = dasl.parse_date(value).date()
+        if op in (">", ">="):
+            return f"SINCE {imap_date(day - timedelta(days=1))}", node
+        return f"BEFORE {imap_date(day + timedelta(days=2))}", node
+
+    if name == "Read" and op in ("=", "<>"):
+        seen = bool(int(value)) == (op == "=")
+        return ("SEEN" if seen else "UNSEEN"), None
+
+    if name == "Size" and isinstance(value, (int, float)):
+        # No todos los servidores calculan LARGER/SMALLER igual que
+        # RFC822.SIZE: el servidor descarta candidatos y el tamaño se revisa
+        # localmente
+        value = int(value)
+        keys = {">": f"LARGER {value}", ">=": f"LARGER {value - 1}",
+                "<": f"SMALLER {value}", "<=": f"SMALLER {value + 1}",
+                "=": f"(LARGER {value - 1} SMALLER {value + 1})"}
+        if op in keys:
+            return keys[op], node
+
+    # Importancia, categorías, adjuntos, ...: solo localmente
+    return "ALL", node
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def imap_date(day) -> str:
+    """Fecha en formato IMAP ('1-Mar-2024')."""
+    return f"{day.day}-{_MONTHS[day.month - 1]}-{day.year}"
+
+
+def uid_set(uids) -> str:
+    """Conjunto de UIDs compacto ('1:5,8,10:12')."""
+    uids = sorted(uids)
+    ranges = []
+    start = prev = uids[0]
+    for uid in uids[1:]:
+        if uid != prev + 1:
+            ranges.append(f"{start}:{prev}" if start != prev else str(start))
+            start = uid
+        prev = uid
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(ranges)
+
+
+# ══════════════ Respuestas IMAP ══════════════
+
+def parse_values(buf: bytes) -> list:
+    """
+    Valores de una respuesta IMAP: listas (list), átomos y strings (bytes,
+    literales incluidos) y NIL (None).
+    """
+    values = []
+    stack = []
+    current = values
+    pos, n = 0, len(buf)
+    while pos < n:
+        c = buf[pos]
+        if c in b" \r\n":
+            pos += 1
+        elif c == 0x28:  # (
+            child = []
+            current.append(child)
+            stack.append(current)
+            current = child
+            pos += 1
+        elif c == 0x29:  # )
+            current = stack.pop() if stack else values
+            pos += 1
+        elif c == 0x22:  # "
+            out = bytearray()
+            pos += 1
+            while pos < n and buf[pos] != 0x22:
+                if buf[pos] == 0x5C:  # \
+                    pos += 1
+                out.append(buf[pos])
+                pos += 1
+            current.append(bytes(out))
+            pos += 1
+        elif c == 0x7B:  # {n}
+            end = buf.index(b"}", pos)
+            size = int(buf[pos + 1:end].rstrip(b"+"))
+            start = buf.index(b"\n", end) + 1
+            current.append(buf[start:start + size])
+            pos = start + size
+        else:
+            m = _ATOM_RE.match(buf, pos)
+            if m is None:
+                pos += 1
+                continue
+            atom = m.group()
+            current.append(None if atom.upper() == b"NIL" else atom)
+            pos = m.end()
+    return values
+
+
+def _join(data) -> bytes:
+    """Une la respuesta de imaplib (líneas y tuplas con literales) en un solo buffer."""
+    out = bytearray()
+    for part in data or ():
+        if isinstance(part, tuple):
+            out += part[0] + b"\r\n" + part[1]
+        elif part:
+            out += part + b"\r\n"
+    return bytes(out)
+
+
+def fetch_items(data) -> list:
+    """
+    Respuestas FETCH como diccionarios {'UID': ..., 'ENVELOPE': ..., 'BODY[1]': ...}
+    (las claves de sección sin el sufijo <origen>).
+    """
+    values = parse_values(_join(data))
+    items = []
+    for i in range(1, len(values), 2):
+        pairs = values[i]
+        if not isinstance(pairs, list):
+            continue
+        item = {}
+        for k in range(0, len(pairs) - 1, 2):
+            key = pairs[k].decode("utf-8", errors="replace").upper()
+            key = re.sub(r"<\d+>$", "", key.replace("BODY.PEEK[", "BODY["))
+            item[key] = pairs[k + 1]
+        if "UID" in item:
+            items.append(item)
+    return items
+
+
+def parse_internaldate(value: bytes) -> datetime:
+    """INTERNALDATE ('17-Jul-1996 02:44:25 -0700') en hora local sin zona."""
+    text = value.decode().strip()
+    day, month, rest = text.split("-", 2)
+    year, clock, zone = rest.split()
+    offset = int(zone[1:3]) * 60 + int(zone[3:5])
+    tz = timezone(timedelta(minutes=-offset if zone[0] == "-" else offset))
+    hour, minute, second = (int(x) for x in clock.split(":"))
+    date = datetime(int(year), _MONTHS.index(month.title()) + 1, int(day),
+                    hour, minute, second, tzinfo=tz)
+    return date.astimezone().replace(tzinfo=None)
+
+
+def _fetch_summaries(conn, uids) -> dict:
+    """Lee un lote de correos: {uid: resumen} (ver _summary)."""
+    typ, data = conn.uid("FETCH", uid_set(uids), FETCH_ITEMS)
+    if typ != "OK":
+        raise RuntimeError(f"FETCH falló: {data}")
+    summaries = {}
+    for item in fetch_items(data):
+        uid = int(item["UID"])
+        summaries[uid] = _summary(item)
+
+    # Vista previa: primeros bytes de la parte de texto, un FETCH por sección
+    by_section = {}
+    for uid, s in summaries.items():
+        if s["text"] is not None:
+            by_section.setdefault(s["text"][0], []).append(uid)
+    for section, group in by_section.items():
+        typ, data = conn.uid("FETCH", uid_set(group), f"(UID BODY.PEEK[{section}]<0.{PREVIEW_BYTES}>)")
+        for item in fetch_items(data):
+            s = summaries.get(int(item["UID"]))
+            raw = item.get(f"BODY[{section}]")
+            if s is None or raw is None:
+                continue
+            _, encoding, charset, subtype = s["text"]
+            text = decode_text(_TransferDecoder(encoding).feed(raw), charset)
+            s["preview"] = preview_text(html_to_text(text) if subtype == "html" else text)
+    return summaries
+
+
+def _summary(item: dict) -> dict:
+    """Campos de la tabla a partir de ENVELOPE, BODYSTRUCTURE y encabezados."""
+    envelope = item.get("ENVELOPE") or [None] * 10
+    headers = BytesHeaderParser().parsebytes(next(
+        (v for k, v in item.items() if k.startswith("BODY[HEADER.FIELDS")), b"") or b"")
+    senders = _addresses(envelope[2])
+    recipients = [(name, address, rtype)
+                  for field, rtype in ((5, 1), (6, 2), (7, 3))
+                  for name, address in _addresses(envelope[field])]
+    text, attachments, parts = _structure(item.get("BODYSTRUCTURE") or [])
+    flags = [f.decode("utf-8", errors="replace") for f in item.get("FLAGS") or []]
+    references = str(headers.get("References", "") or "").split()
+    in_reply_to = (envelope[8] or b"").decode("utf-8", errors="replace").strip()
+    message_id = (envelope[9] or b"").decode("utf-8", errors="replace").strip()
+    return {
+        "subject": decode_words(envelope[1]),
+        "sender_name": senders[0][0] if senders else "",
+        "sender_email": senders[0][1] if senders else "",
+        "recipients": recipients,
+        "received": parse_internaldate(item["INTERNALDATE"]),
+        "importance": header_importance(headers),
+        # Palabras clave IMAP ($Label1, \Seen, ... excluidas) como categorías
+        "categories": ", ".join(f.replace("_", " ") for f in flags if f[:1] not in ("\\", "$")),
+        "unread": "\\Seen" not in flags,
+        "size": int(item.get("RFC822.SIZE") or 0),
+        "attachments": attachments,
+        "parts": parts,
+        "text": text,
+        "thread": references[0] if references else in_reply_to or message_id or str(item["UID"]),
+        "preview": "",
+    }
+
+
+def _addresses(values) -> list:
+    """Direcciones de un campo de ENVELOPE: [(nombre, dirección)]."""
+    out = []
+    for entry in values or ():
+        if not isinstance(entry, list) or len(entry) < 4 or entry[3] is None:
+            continue  # inicio/fin de grupo
+        address = f"{(entry[2] or b'').decode('utf-8', 'replace')}@{entry[3].decode('utf-8', 'replace')}"
+        out.append((decode_words(entry[0]) or address, address))
+    return out
+
+
+def _structure(structure):
+    """
+    Recorre BODYSTRUCTURE.
+
+    Returns:
+        Tupla (texto, adjuntos, partes): texto = (sección, codificación,
+        charset, subtipo) de la parte a mostrar o None; adjuntos = [(nombre,
+        tamaño, content_id si es inline)]; partes = [(sección, codificación)]
+        de cada adjunto
+    """
+    plain = html = None
+    attachments, parts = [], []
+    for section, leaf in _leaves(structure):
+        maintype = (leaf[0] or b"").decode().lower()
+        subtype = (leaf[1] or b"").decode().lower()
+        params = _params(leaf[2])
+        content_id = (leaf[3] or b"").decode("utf-8", "replace").strip("<> ")
+        encoding = (leaf[5] or b"7bit").decode().lower()
+        size = int(leaf[6] or 0)
+        dsp_index = 9 if maintype == "text" else 11 if (maintype, subtype) == ("message", "rfc822") else 8
+        disposition = leaf[dsp_index] if len(leaf) > dsp_index else None
+        dsp_type, dsp_params = "", {}
+        if isinstance(disposition, list) and disposition:
+            dsp_type = (disposition[0] or b"").decode().lower()
+            dsp_params = _params(disposition[1] if len(disposition) > 1 else None)
+        filename = dsp_params.get("filename") or params.get("name")
+
+        if maintype == "text" and dsp_type != "attachment" and not filename:
+            text = (section, encoding, params.get("charset", "utf-8"), subtype)
+            if subtype == "plain" and plain is None:
+                plain = text
+            elif subtype == "html" and html is None:
+                html = text
+            continue
+        if encoding == "base64":
+            size = size * 3 // 4
+        name = filename or f"adjunto{len(attachments) + 1}"
+        inline = content_id if dsp_type != "attachment" and content_id else ""
+        attachments.append((name, size, inline))
+        parts.append((section, encoding))
+    return plain or html, attachments, parts
+
+
+def _leaves(structure, section=""):
+    """Partes hoja de BODYSTRUCTURE con su número de sección ('1', '2.1', ...)."""
+    if not structure:
+        return
+    if isinstance(structure[0], list):
+        # Multipart: las partes van antes del subtipo; después vienen los
+        # campos de extensión (parámetros, disposición...), también listas
+        children = itertools.takewhile(lambda c: isinstance(c, list), structure)
+        for i, child in enumerate(children):
+            yield from _leaves(child, f"{section}.{i + 1}" if section else str(i + 1))
+        return
+    yield section or "1", structure
+
+
+def _params(values) -> dict:
+    """Lista de parámetros ('charset' 'utf-8' ...) como diccionario."""
+    params = {}
+    if not isinstance(values, list):
+        return params
+    for key, value in zip(values[::2], values[1::2]):
+        key = (key or b"").decode("utf-8", "replace").lower()
+        value = (value or b"").decode("utf-8", "replace")
+        if key.endswith("*"):  # RFC 2231: charset'idioma'texto%XX
+            key = key[:-1]
+            value = unquote(value.split("'", 2)[-1])
+        params[key] = decode_words(value.encode("utf-8"))
+    return params
+
+
+def decode_words(value) -> str:
+    """Encabezado con palabras codificadas (=?utf-8?...?=) como texto."""
+    if value is None:
+        return ""
+    text = value.decode("utf-8", errors="replace") if isinstance(value, bytes) else value
+    try:
+        return str(make_header(decode_header(text)))
+    except Exception:
+        return text
+
+
+def decode_text(data: bytes, charset: str) -> str:
+    try:
+        return data.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+
+def decode_transfer(data: bytes, encoding: str) -> bytes:
+    """Contenido completo de una parte según Content-Transfer-Encoding."""
+    return _TransferDecoder(encoding).feed(data, final=True)
+
+
+class _TransferDecoder:
+    """Decodifica base64/quoted-printable por tramos (límites arbitrarios)."""
+
+    def __init__(self, encoding: str):
+        self.encoding = (encoding or "").lower()
+        self._pending = b""
+
+    def feed(self, chunk: bytes, final: bool = False) -> bytes:
+        data = self._pending + chunk
+        if self.encoding == "base64":
+            data = re.sub(rb"\s+", b"", data)
+            cut = len(data) if final else len(data) - len(data) % 4
+            self._pending = data[cut:]
+            data = data[:cut]
+            if final and len(data) % 4:
+                data += b"=" * (-len(data) % 4)
+            try:
+                return base64.b64decode(data)
+            except ValueError:
+                return b""
+        if self.encoding == "quoted-printable":
+            cut = len(data) if final else data.rfind(b"\n") + 1
+            self._pending = data[cut:]
+            return quopri.decodestring(data[:cut])
+        self._pending = b""
+        return data
+
+    def flush(self) -> bytes:
+        return self.feed(b"", final=True) if self._pending else b""
+
+
+# ══════════════ Nombres de carpeta (UTF-7 modificado, RFC 3501) ══════════════
+
+def encode_mailbox(name: str) -> str:
+    """Nombre de carpeta en UTF-7 modificado ('Notificación' -> 'Notificaci&APM-n')."""
+    out, pending = [], []
+
+    def flush():
+        if pending:
+            b64 = base64.b64encode("".join(pending).encode("utf-16-be")).decode()
+            out.append("&" + b64.rstrip("=").replace("/", ",") + "-")
+            pending.clear()
+
+    for ch in name:
+        if 0x20 <= ord(ch) <= 0x7E:
+            flush()
+            out.append("&-" if ch == "&" else ch)
+        else:
+            pending.append(ch)
+    flush()
+    return "".join(out)
+
+
+def decode_mailbox(name: str) -> str:
+    """Nombre de carpeta desde UTF-7 modificado."""
+    def replace(m):
+        b64 = m.group(1)
+        if not b64:
+            return "&"
+        b64 = b64.replace(",", "/")
+        return base64.b64decode(b64 + "=" * (-len(b64) % 4)).decode("utf-16-be")
+    return re.sub(r"&([^-]*)-", replace, name)
@@ -0,0 +1,342 @@
+"""
+Instrumentación de llamadas COM y registro de operaciones lentas.
+Envuelve los objetos de Outlook en proxies que cuentan y cronometran cada
+propiedad/método, agrega las métricas por tarea del OutlookWorker y escribe
+un log JSON lines con las tareas que superan un umbral.
+
+Desactivada, no se crea ningún proxy: los objetos COM se usan directamente.
+Se activa con la variable de entorno OUTLOOK_SEARCH_INSTRUMENT=1 o desde
+Ayuda > Estadísticas COM.
+"""
+
+import json
+import os
+import threading
+import time
+import types
+from contextlib import contextmanager
+from datetime import datetime
+
+
+INSTRUMENT_ENV = "OUTLOOK_SEARCH_INSTRUMENT"
+SLOW_MS_ENV = "OUTLOOK_SEARCH_SLOW_MS"
+SLOW_LOG_ENV = "OUTLOOK_SEARCH_SLOW_LOG"
+
+DEFAULT_SLOW_MS = 2000
+DEFAULT_SLOW_LOG = os.path.join(os.path.expanduser("~"), ".outlook_search", "slow_ops.jsonl")
+
+# Tipos que se devuelven tal cual (no son objetos COM)
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None), datetime, tuple, list, dict)
+_METHOD_TYPES = (types.MethodType, types.FunctionType, types.BuiltinFunctionType)
+
+# Clase COM del objeto devuelto por un miembro: (clase padre, miembro) -> clase
+_CHILD_CLASS = {
+    "GetNamespace": "Namespace",
+    "Folders": "Folders",
+    "GetDefaultFolder": "Folder",
+    "GetFolderFromID": "Folder",
+    "GetRootFolder": "Folder",
+    "Parent": "Folder",
+    "Items": "Items",
+    "Restrict": "Items",
+    "Attachments": "Attachments",
+    "Recipients": "Recipients",
+    "Sender": "AddressEntry",
+    "GetExchangeUser": "ExchangeUser",
+    "PropertyAccessor": "PropertyAccessor",
+    "Stores": "Stores",
+    "Store": "Store",
+    "Accounts": "Accounts",
+    "GetItemFromID": "MailItem",
+    "GetFirst": "MailItem",
+    "GetNext": "MailItem",
+    "GetLast": "MailItem",
+    "Find": "MailItem",
+    "FindNext": "MailItem",
+    "AdvancedSearch": "Search",
+    "Results": "Items",
+    "GetTable": "Table",
+    "GetNextRow": "Row",
+}
+_ITEM_CLASS = {
+    "Folders": "Folder",
+    "Items": "MailItem",
+    "Attachments": "Attachment",
+    "Recipients": "Recipient",
+    "Stores": "Store",
+    "Accounts": "Account",
+}
+
+
+# Claves que no son llamadas COM: bloques Python (span) y callbacks de Tk
+_NON_COM_PREFIXES = ("py:", "Tk.")
+
+
+class ComStats:
+    """Contadores thread-safe: miembro -> [llamadas, segundos, máximo]."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def record(self, key: str, elapsed: float):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._data[key] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self) -> dict:
+        """{'Clase.Miembro': {'count', 'total_ms', 'avg_ms', 'max_ms'}}"""
+        with self._lock:
+            return {
+                k: {
+                    "count": c,
+                    "total_ms": round(t * 1000, 3),
+                    "avg_ms": round(t * 1000 / c, 4),
+                    "max_ms": round(m * 1000, 3),
+                }
+                for k, (c, t, m) in self._data.items()
+            }
+
+    def totals(self) -> tuple:
+        """(llamadas, segundos) acumulados de llamadas COM (sin bloques Python ni Tk)."""
+        with self._lock:
+            com = [v for k, v in self._data.items() if not k.startswith(_NON_COM_PREFIXES)]
+            return sum(v[0] for v in com), sum(v[1] for v in com)
+
+
+class ComProxy:
+    """Proxy que cronometra cada acceso a un objeto COM y envuelve sus hijos."""
+
+    __slots__ = ("_obj", "_cls", "_instr")
+
+    def __init__(self, obj, com_class: str, instr: "Instrumentation"):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_cls", com_class)
+        object.__setattr__(self, "_instr", instr)
+
+    def __getattr__(self, name):
+        t = time.perf_counter()
+        value = getattr(self._obj, name)
+        elapsed = time.perf_counter() - t
+        if isinstance(value, _METHOD_TYPES):
+            return self._method(name, value)
+        self._instr.record(f"{self._cls}.{name}", elapsed)
+        return self._instr._wrap_child(value, _CHILD_CLASS.get(name, name))
+
+    def _method(self, name, fn):
+        instr, cls = self._instr, self._cls
+        child_cls = (
+            _ITEM_CLASS.get(cls, "Item") if name == "Item" else _CHILD_CLASS.get(name, name)
+        )
+
+        def call(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                instr.record(f"{cls}.{name}()", time.perf_counter() - t)
+            return instr._wrap_child(result, child_cls)
+
+        return call
+
+    def __setattr__(self, name, value):
+        t = time.perf_counter()
+        setattr(self._obj, name, value)
+        self._instr.record(f"{self._cls}.{name}=", time.perf_counter() - t)
+
+    def __getitem__(self, key):
+        t = time.perf_counter()
+        value = self._obj[key]
+        self._instr.record(f"{self._cls}[]", time.perf_counter() - t)
+        return self._instr._wrap_child(value, _ITEM_CLASS.get(self._cls, "Item"))
+
+    def __iter__(self):
+        it = iter(self._obj)
+        child_cls = _ITEM_CLASS.get(self._cls, "Item")
+        key = f"{self._cls}.Next"
+        while True:
+            t = time.perf_counter()
+            try:
+                value = next(it)
+            except StopIteration:
+                return
+            self._instr.record(key, time.perf_counter() - t)
+            yield self._instr._wrap_child(value, child_cls)
+
+    def __bool__(self):
+        return bool(self._obj)
+
+    def __repr__(self):
+        return f"<ComProxy {self._cls} {self._obj!r}>"
+
+
+class Instrumentation:
+    """
+    Configuración y métricas de instrumentación.
+
+    Attributes:
+        enabled: Si False, wrap() devuelve los objetos sin proxy
+        slow_ms: Umbral (ms) a partir del cual una tarea se registra en el log
+        log_path: Archivo JSON lines del log de operaciones lentas
+        totals: Métricas acumuladas desde que se activó
+        last_task: Resumen de la última tarea terminada (dict)
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = DEFAULT_SLOW_MS,
+                 log_path: str = DEFAULT_SLOW_LOG):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.totals = ComStats()
+        self.last_task = None
+        self._task = None   # métricas de la tarea en curso
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Instrumentation":
+        """Configura la instrumentación desde variables de entorno."""
+        return cls(
+            enabled=os.environ.get(INSTRUMENT_ENV, "") not in ("", "0"),
+            slow_ms=float(os.environ.get(SLOW_MS_ENV, DEFAULT_SLOW_MS)),
+            log_path=os.environ.get(SLOW_LOG_ENV, DEFAULT_SLOW_LOG),
+        )
+
+    # === Proxies ===
+
+    def wrap(self, obj, com_class: str):
+        """Envuelve un objeto COM si la instrumentación está activa."""
+        if not self.enabled or obj is None or isinstance(obj, ComProxy):
+            return obj
+        return ComProxy(obj, com_class, self)
+
+    def _wrap_child(self, value, com_class: str):
+        if isinstance(value, _PLAIN_TYPES) or isinstance(value, ComProxy):
+            return value
+        return ComProxy(value, com_class, self)
+
+    def record(self, key: str, elapsed: float):
+        """Registra una llamada en los acumulados y en la tarea en curso."""
+        self.totals.record(key, elapsed)
+        task = self._task
+        if task is not None:
+            task["stats"].record(key, elapsed)
+
+    @contextmanager
+    def span(self, key: str):
+        """Cronometra un bloque de código Python (no COM) bajo la clave 'py:<key>'."""
+        if not self.enabled:
+            yield
+            return
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(f"py:{key}", time.perf_counter() - t)
+
+    def wrap_callback(self, fn):
+        """Envuelve un callback de Tk para medir su duración en el hilo de la GUI."""
+        if not self.enabled:
+            return fn
+        key = f"Tk.{getattr(fn, '__name__', 'callback')}"
+
+        def timed(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(key, time.perf_counter() - t)
+
+        return timed
+
+    # === Tareas ===
+
+    def begin_task(self, name: str, params: dict):
+        """Inicia la medición de una tarea del worker."""
+        if not self.enabled:
+            return
+        self._task = {
+            "task": name,
+            "params": _jsonable(params),
+            "started": time.perf_counter(),
+            "stats": ComStats(),
+            "info": {},
+        }
+
+    def note(self, **info):
+        """Agrega datos a la tarea en curso (p. ej. rows=, folder=)."""
+        task = self._task
+        if task is not None:
+            task["info"].update(info)
+
+    def end_task(self, error: str = None):
+        """Cierra la tarea en curso y la registra en el log si fue lenta."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        elapsed_ms = (time.perf_counter() - task["started"]) * 1000
+        calls, com_seconds = task["stats"].totals()
+        members = task["stats"].snapshot()
+        top = dict(sorted(members.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:15])
+        summary = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "task": task["task"],
+            "filters": task["params"],
+            "elapsed_ms": round(elapsed_ms, 1),
+            "com_calls": calls,
+            "com_ms": round(com_seconds * 1000, 1),
+            **task["info"],
+            "top": top,
+        }
+        if error:
+            summary["error"] = error
+        with self._lock:
+            self.last_task = summary
+        if elapsed_ms >= self.slow_ms:
+            self._write_slow(summary)
+
+    def _write_slow(self, summary: dict):
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            pass
+
+    def snapshot(self) -> dict:
+        """Estado para la vista de estadísticas (seguro desde cualquier thread)."""
+        with self._lock:
+            last = self.last_task
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "log_path": self.log_path,
+            "totals": self.totals.snapshot(),
+            "last_task": last,
+        }
+
+
+def _jsonable(params: dict) -> dict:
+    """Copia de los parámetros de una tarea sin valores no serializables."""
+    clean = {}
+    for k, v in (params or {}).items():
+        if isinstance(v, (str, int, float, bool, type(None))):
+            clean[k] = v
+        elif isinstance(v, (list, tuple)) and all(isinstance(x, (str, int, float)) for x in v):
+            clean[k] = list(v)
+        else:
+            clean[k] = type(v).__name__
+    return clean
+
+
+# Instancia compartida por OutlookClient, EmailSearch y OutlookWorker
+INSTRUMENTATION = Instrumentation.from_env()
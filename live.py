@@ -0,0 +1,189 @@
+"""
+Suscripción en vivo a los cambios de la carpeta buscada.
+Tras una búsqueda, el OutlookWorker se suscribe a Items.ItemAdd/ItemChange/
+ItemRemove de la carpeta. Cada correo nuevo o modificado se evalúa contra el
+predicado de la búsqueda activa (en Python, sin consultar Outlook) y los
+cambios se entregan como deltas incrementales a los resultados abiertos.
+
+Los eventos COM se reciben en el thread del worker mientras bombea mensajes
+(pythoncom.PumpWaitingMessages) entre tareas.
+"""
+
+import time
+from typing import Callable
+
+from instrumentation import ComProxy
+from threads import read_table
+
+
+class _ItemsEvents:
+    """Receptor de eventos de una colección Items."""
+
+    subscription = None
+
+    def OnItemAdd(self, item):
+        self.subscription._on_add(item)
+
+    def OnItemChange(self, item):
+        self.subscription._on_change(item)
+
+    def OnItemRemove(self):
+        # ItemRemove no indica qué correo se eliminó: se verifica después
+        self.subscription._on_remove()
+
+
+class LiveSubscription:
+    """
+    Mantiene los resultados de la búsqueda activa al día con la carpeta.
+
+    Cada delta es un diccionario con listas 'added' (filas nuevas),
+    'changed' (filas actualizadas) y 'removed' (EntryIDs eliminados).
+    """
+
+    # Segundos de espera tras un ItemRemove antes de verificar (agrupa ráfagas)
+    REMOVE_DEBOUNCE = 1.0
+
+    def __init__(self, searcher, on_delta: Callable):
+        """
+        Args:
+            searcher: Instancia de EmailSearch (extracción y predicados)
+            on_delta: Función(results, delta) llamada en el thread del worker;
+                      results es la lista de resultados (con COM refs) ya
+                      actualizada
+        """
+        self.searcher = searcher
+        self.on_delta = on_delta
+        self.listeners = []   # funciones(delta) adicionales
+        self.results = None
+        self._predicate = None
+        self._folder = None
+        self._items = None
+        self._sink = None
+        self._remove_pending_since = None
+
+    @property
+    def active(self) -> bool:
+        return self._sink is not None
+
+    def watch(self, folder, filters: dict, results: list):
+        """
+        Se suscribe a los cambios de una carpeta para una búsqueda.
+
+        Args:
+            folder: Carpeta buscada (objeto COM)
+            filters: Parámetros de la búsqueda (kwargs de EmailSearch.search)
+            results: Lista de resultados a mantener (se modifica en el lugar)
+        """
+        self.stop()
+        self._predicate = self.searcher.compile_predicate(**filters)
+        self._folder = folder
+        self.results = results
+        # La colección Items debe seguir referenciada para que lleguen los eventos
+        self._items = folder.Items
+        self._sink = self._connect(self._items)
+
+    def stop(self):
+        """Cancela la suscripción actual."""
+        if self._sink is not None:
+            close = getattr(self._sink, "close", None)
+            if close:
+                close()
+        self._sink = self._items = self._folder = self._predicate = None
+        self.results = None
+        self._remove_pending_since = None
+
+    def _connect(self, items):
+        if isinstance(items, ComProxy):
+            items = items._obj  # los eventos se conectan al objeto COM real
+        subscribe = getattr(items, "_subscribe", None)  # Outlook simulado
+        if subscribe is not None:
+            handler = _ItemsEvents()
+            handler.subscription = self
+            subscribe(handler)
+            return handler
+        import win32com.client
+        sink = win32com.client.WithEvents(items, _ItemsEvents)
+        sink.subscription = self
+        return sink
+
+    # === Eventos ===
+
+    def _index_of(self, entry_id: str) -> int:
+        for i, r in enumerate(self.results):
+            if r.get("entry_id") == entry_id:
+                return i
+        return -1
+
+    def _on_add(self, item):
+        if self.results is None or not self._predicate(item):
+            return
+        row = self.searcher._extract_email_data(item)
+        row["is_new"] = True
+        self.results.insert(0, row)
+        self._emit({"added": [row]})
+
+    def _on_change(self, item):
+        if self.results is None:
+            return
+        try:
+            entry_id = item.EntryID
+        except Exception:
+            return
+        idx = self._index_of(entry_id)
+        matches = self._predicate(item)
+        if idx < 0:
+            if matches:
+                self._on_add(item)
+            return
+        if matches:
+            row = self.searcher._extract_email_data(item)
+            row["is_new"] = self.results[idx].get("is_new", False)
+            self.results[idx] = row
+            self._emit({"changed": [row]})
+        else:
+            del self.results[idx]
+            self._emit({"removed": [entry_id]})
+
+    def _on_remove(self):
+        if self.results is not None and self._remove_pending_since is None:
+            self._remove_pending_since = time.monotonic()
+
+    def process_pending(self):
+        """
+        Verifica eliminaciones pendientes. El worker la llama entre tareas:
+        lee los EntryIDs que siguen en la carpeta (Folder.GetTable, por
+        bloques) y solo abre por EntryID los resultados que ya no aparecen.
+        """
+        since = self._remove_pending_since
+        if since is None or time.monotonic() - since < self.REMOVE_DEBOUNCE:
+            return
+        self._remove_pending_since = None
+        folder_id = self._folder.EntryID
+        folder_store = self._folder.StoreID
+        try:
+            present = {row[0] for row in read_table(self._folder, columns=("EntryID",))}
+        except Exception:
+            present = set()  # origen sin GetTable: se verifica cada resultado
+        namespace = self.searcher.client.namespace
+        removed = []
+        for r in list(self.results):
+            entry_id = r.get("entry_id")
+            if not entry_id or entry_id in present:
+                continue
+            try:
+                item = namespace.GetItemFromID(entry_id, r.get("store_id") or folder_store)
+                still_here = item.Parent.EntryID == folder_id
+            except Exception:
+                still_here = False
+            if not still_here:
+                removed.append(entry_id)
+        if removed:
+            gone = set(removed)
+            self.results[:] = [r for r in self.results if r.get("entry_id") not in gone]
+            self._emit({"removed": removed})
+
+    def _emit(self, delta: dict):
+        delta = {"added": [], "changed": [], "removed": [], **delta}
+        for listener in self.listeners:
+            listener(delta)
+        self.on_delta(self.results, delta)
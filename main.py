@@ -1,9 +1,17 @@
 """
 Outlook Email Search Tool - Punto de Entrada
-Lanza la interfaz gráfica de la aplicación.
+Sin argumentos lanza la interfaz gráfica; con argumentos ejecuta el modo
+línea de comandos (ver cli.py) sin cargar Tk.
 """
 
-from gui_app import main
+import multiprocessing
+import sys
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # procesos del pool en el ejecutable empaquetado
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from gui_app import main
     main()
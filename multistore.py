@@ -0,0 +1,193 @@
+"""
+Búsqueda simultánea en varios almacenes (buzón principal, buzones
+compartidos y archivos PST).
+Cada almacén se recorre en su propio thread con su propia sesión COM
+(OutlookClient.new_session + EmailSearch). Los resultados de cada almacén ya
+vienen ordenados por fecha (más recientes primero) y se combinan con
+heapq.merge bajo un único límite global, así que una búsqueda en 10 archivos
+tarda lo que el más lento y no la suma.
+
+Las filas que se entregan no llevan '_outlook_item': los objetos COM de un
+thread no se pueden usar desde otro. EmailSearch.hydrate los vuelve a abrir
+por EntryID/StoreID cuando hacen falta (p. ej. para exportar adjuntos).
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Optional
+
+from search import EmailSearch
+
+
+def search_stores(
+    client,
+    stores: list,
+    max_results: int = 500,
+    progress_callback: Optional[Callable] = None,
+    cancel_event: Optional[threading.Event] = None,
+    out: Optional[list] = None,
+    **filters,
+):
+    """
+    Busca en varios almacenes a la vez.
+
+    Args:
+        client: OutlookClient del thread que llama (se usa para abrir una
+                sesión nueva por almacén)
+        stores: Almacenes a recorrer (diccionarios de OutlookClient.list_stores;
+                basta con 'store_id' y 'name')
+        max_results: Límite global de resultados
+        progress_callback: Función (current, message, scanned=, total=, stores=)
+                           con el progreso sumado; stores = {store_id: {'name',
+                           'matched', 'scanned', 'total', 'done'}}. Se llama
+                           desde los threads de cada almacén
+        cancel_event: Evento que detiene todas las búsquedas
+        out: Lista (o ResultStore) donde se agregan los resultados combinados;
+             None = una lista nueva
+        **filters: Mismos argumentos que EmailSearch.iter_search (folder,
+                   subject, query, ...); la carpeta se resuelve en cada almacén
+
+    Returns:
+        Tupla (resultados, estadísticas): resultados ordenados por fecha con
+        las claves adicionales 'store' y 'store_id'; estadísticas es una lista
+        por almacén con store, store_id, rows, scanned, seconds, strategy y
+        error (None si terminó bien)
+    """
+    filters.pop("store_id", None)
+    filters.pop("progress_callback", None)
+    progress = _StoreProgress(stores, progress_callback)
+    per_store = [[] for _ in stores]
+    stats = [None] * len(stores)
+
+    workers = [
+        threading.Thread(
+            target=_scan_store,
+            args=(client, store, filters, max_results, cancel_event, progress,
+                  per_store[i], stats, i),
+            name=f"store-{store['name']}",
+            daemon=True,
+        )
+        for i, store in enumerate(stores)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    merged = heapq.merge(*per_store, key=lambda r: r.get("received", ""), reverse=True)
+    out = [] if out is None else out
+    out.extend(itertools.islice(merged, max_results))
+    return out, stats
+
+
+def select_stores(stores: list, names) -> list:
+    """
+    Almacenes por nombre.
+
+    Args:
+        stores: Almacenes disponibles (OutlookClient.list_stores)
+        names: Lista de nombres (sin distinguir mayúsculas) o 'all' para todos
+
+    Raises:
+        ValueError: si algún nombre no corresponde a un almacén
+    """
+    if names == "all":
+        return stores
+    by_name = {s["name"].lower(): s for s in stores}
+    missing = [n for n in names if n.lower() not in by_name]
+    if missing:
+        raise ValueError(f"Almacenes no encontrados: {', '.join(missing)}. "
+                         f"Disponibles: {', '.join(s['name'] for s in stores)}")
+    return [by_name[n.lower()] for n in names]
+
+
+def _scan_store(client, store, filters, max_results, cancel_event, progress, out, stats, index):
+    """Recorre un almacén en un thread con su propia sesión COM."""
+    try:
+        import pythoncom
+    except ImportError:
+        pythoncom = None  # Outlook simulado fuera de Windows
+    if pythoncom is not None:
+        pythoncom.CoInitialize()
+
+    started = time.perf_counter()
+    name, store_id = store["name"], store["store_id"]
+    stat = {"store": name, "store_id": store_id, "rows": 0, "scanned": 0,
+            "seconds": 0.0, "strategy": None, "error": None}
+    try:
+        searcher = EmailSearch(client.new_session())
+
+        def report(current, message, scanned=None, total=None):
+            progress.update(store_id, current, scanned, total)
+
+        for row in searcher.iter_search(
+            store_id=store_id,
+            max_results=max_results,
+            progress_callback=report,
+            cancel_event=cancel_event,
+            **filters,
+        ):
+            row.pop("_outlook_item", None)  # no debe salir de este thread
+            row["store"] = name
+            row["store_id"] = store_id
+            out.append(row)
+        plan = searcher.last_plan
+        if plan is not None:
+            stat["strategy"] = plan.strategy
+            stat["scanned"] = plan.actual.get("scanned", 0)
+    except Exception as e:
+        stat["error"] = str(e)
+    finally:
+        stat["rows"] = len(out)
+        stat["seconds"] = round(time.perf_counter() - started, 3)
+        stats[index] = stat
+        progress.done(store_id, len(out))
+        searcher = None  # liberar los objetos COM antes de CoUninitialize
+        if pythoncom is not None:
+            pythoncom.CoUninitialize()
+
+
+class _StoreProgress:
+    """Suma el progreso de los almacenes (llamado desde varios threads)."""
+
+    def __init__(self, stores, callback):
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._stores = {s["store_id"]: {"name": s["name"], "matched": 0, "scanned": 0,
+                                        "total": None, "done": False}
+                        for s in stores}
+
+    def update(self, store_id, matched, scanned=None, total=None):
+        with self._lock:
+            entry = self._stores[store_id]
+            entry["matched"] = matched
+            entry["scanned"] = scanned if scanned is not None else matched
+            entry["total"] = total
+        self._publish()
+
+    def done(self, store_id, matched):
+        with self._lock:
+            entry = self._stores[store_id]
+            entry["matched"] = matched
+            entry["done"] = True
+            if entry["total"] is not None:
+                entry["scanned"] = entry["total"]
+        self._publish()
+
+    def _publish(self):
+        if self.callback is None:
+            return
+        with self._lock:
+            snapshot = {store_id: dict(e) for store_id, e in self._stores.items()}
+        matched = sum(e["matched"] for e in snapshot.values())
+        scanned = sum(e["scanned"] for e in snapshot.values())
+        totals = [e["total"] for e in snapshot.values()]
+        total = sum(totals) if all(t is not None for t in totals) else None
+        finished = sum(e["done"] for e in snapshot.values())
+        self.callback(
+            matched,
+            f"Encontrados: {matched} correos ({finished}/{len(snapshot)} almacenes)...",
+            scanned=scanned, total=total, stores=snapshot,
+        )
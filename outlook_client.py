@@ -3,12 +3,13 @@ Módulo de conexión a Outlook via COM (win32com).
 Gestiona la conexión al cliente de Outlook y acceso a carpetas del buzón.
 """
 
-import win32com.client
-import pythoncom
+from backend import MailBackend
+from folder_registry import FolderRegistry
+from instrumentation import INSTRUMENTATION
 
 
-class OutlookClient:
-    """Cliente para interactuar con Microsoft Outlook via COM."""
+class OutlookClient(MailBackend):
+    """Cliente para interactuar con Microsoft Outlook via COM (ver backend.MailBackend)."""
 
     # Constantes de tipos de carpeta de Outlook
     FOLDER_TYPES = {
@@ -22,14 +23,62 @@ class OutlookClient:
         "contacts": 10,      # olFolderContacts
     }
 
-    def __init__(self):
-        """Inicializa la conexión con Outlook."""
+    # Tipos de almacén (OlExchangeStoreType)
+    STORE_KINDS = {
+        0: "Buzón",              # olPrimaryExchangeMailbox
+        1: "Buzón compartido",   # olExchangeMailbox
+        2: "Carpetas públicas",  # olExchangePublicFolder
+        3: "Archivo",            # olNotExchange (PST, IMAP, ...)
+        4: "Buzón adicional",    # olAdditionalExchangeMailbox
+    }
+
+    def __init__(self, application=None):
+        """
+        Inicializa la conexión con Outlook.
+
+        Args:
+            application: Objeto Application ya creado (p. ej. el de
+                         fake_outlook.FakeOutlook). None = conectar via COM.
+        """
         self.outlook = None
         self.namespace = None
-        self._connect()
+        self.registry = None
+        self._application = application
+        if application is not None:
+            self.outlook = application
+            self.namespace = application.GetNamespace("MAPI")
+        else:
+            self._connect()
+        self._raw_namespace = self.namespace
+        self.namespace = INSTRUMENTATION.wrap(self.namespace, "Namespace")
+
+    def new_session(self) -> "OutlookClient":
+        """
+        Nueva conexión para usar desde otro thread (cada thread COM necesita
+        su propio Dispatch; el thread debe haber llamado CoInitialize).
+        Con una Application inyectada (Outlook simulado) se reutiliza esa.
+        """
+        return OutlookClient(application=self._application)
+
+    def set_instrumentation(self, enabled: bool):
+        """
+        Activa o desactiva la instrumentación de llamadas COM.
+        Los objetos obtenidos a partir de ahora quedan (o no) envueltos en proxies.
+        """
+        INSTRUMENTATION.enabled = enabled
+        self.namespace = (
+            INSTRUMENTATION.wrap(self._raw_namespace, "Namespace")
+            if enabled else self._raw_namespace
+        )
+        if self.registry is not None:
+            self.registry.namespace = self.namespace
 
     def _connect(self):
         """Establece la conexión COM con Outlook."""
+        # Import diferido: win32com tarda en cargar y no se necesita para mostrar la GUI
+        import win32com.client
+        import pythoncom
+
         try:
             pythoncom.CoInitialize()
             self.outlook = win32com.client.Dispatch("Outlook.Application")
@@ -40,12 +89,14 @@ class OutlookClient:
                 f"Asegúrate de que Outlook esté abierto y configurado. Error: {e}"
             )
 
-    def get_default_folder(self, folder_type: str = "inbox"):
+    def get_default_folder(self, folder_type: str = "inbox", store_id: str = None):
         """
         Obtiene una carpeta predeterminada de Outlook.
         
         Args:
             folder_type: Tipo de carpeta ('inbox', 'sent', 'drafts', etc.)
+            store_id: StoreID de otro almacén (buzón compartido, PST); None =
+                      almacén predeterminado
         
         Returns:
             Objeto carpeta de Outlook
@@ -56,12 +107,81 @@ class OutlookClient:
                 f"Tipo de carpeta '{folder_type}' no reconocido. "
                 f"Opciones: {', '.join(self.FOLDER_TYPES.keys())}"
             )
-        return self.namespace.GetDefaultFolder(folder_id)
+        if not store_id:
+            return self.namespace.GetDefaultFolder(folder_id)
+
+        store = self.get_store(store_id)
+        try:
+            return store.GetDefaultFolder(folder_id)
+        except Exception:
+            pass
+        # Los archivos PST no tienen carpetas predeterminadas: se usa la
+        # carpeta raíz con el mismo nombre que en el almacén principal
+        name = self.namespace.GetDefaultFolder(folder_id).Name.lower()
+        folders = store.GetRootFolder().Folders
+        for i in range(folders.Count):
+            folder = folders.Item(i + 1)
+            if folder.Name.lower() == name:
+                return folder
+        raise ValueError(f"El almacén '{store.DisplayName}' no tiene la carpeta '{folder_type}'")
+
+    def list_stores(self) -> list:
+        """
+        Lista los almacenes del perfil: buzón principal, buzones compartidos
+        y archivos PST.
+
+        Returns:
+            Lista de diccionarios con name, store_id, kind y file_path
+        """
+        stores = []
+        namespace_stores = self.namespace.Stores
+        for i in range(namespace_stores.Count):
+            store = namespace_stores.Item(i + 1)
+            try:
+                kind = self.STORE_KINDS.get(store.ExchangeStoreType, "Archivo")
+            except Exception:
+                kind = "Archivo"
+            try:
+                file_path = store.FilePath or ""
+            except Exception:
+                file_path = ""
+            stores.append({
+                "name": store.DisplayName,
+                "store_id": store.StoreID,
+                "kind": kind,
+                "file_path": file_path,
+            })
+        return stores
+
+    def get_store(self, store_id: str):
+        """Almacén por StoreID."""
+        namespace_stores = self.namespace.Stores
+        for i in range(namespace_stores.Count):
+            store = namespace_stores.Item(i + 1)
+            if store.StoreID == store_id:
+                return store
+        raise ValueError(f"No se encontró el almacén: {store_id}")
+
+    def get_registry(self, rebuild: bool = False) -> FolderRegistry:
+        """
+        Retorna el registro de carpetas, construyéndolo la primera vez.
+
+        Args:
+            rebuild: Si True, vuelve a recorrer todas las carpetas
+        """
+        if self.registry is None:
+            self.registry = FolderRegistry(self.namespace)
+        if rebuild or not self.registry.built:
+            self.registry.build()
+        return self.registry
 
     def get_folder_by_path(self, path: str):
         """
         Obtiene una carpeta por su ruta completa.
         Ejemplo: 'Bandeja de entrada/Proyectos/2024'
+
+        Las rutas registradas ('Cuenta/Bandeja de entrada/Proyectos') se
+        resuelven directamente por EntryID; el resto se navega nivel a nivel.
         
         Args:
             path: Ruta de la carpeta separada por '/'
@@ -69,6 +189,13 @@ class OutlookClient:
         Returns:
             Objeto carpeta de Outlook
         """
+        try:
+            folder = self.get_registry().resolve(path)
+        except Exception:
+            folder = None
+        if folder is not None:
+            return folder
+
         parts = path.strip("/").split("/")
         folder = self.get_default_folder("inbox")
 
@@ -103,6 +230,7 @@ class OutlookClient:
     def list_folders(self, parent=None, indent=0, max_depth=3):
         """
         Lista las carpetas disponibles en el buzón.
+        Sin carpeta padre, usa el registro de carpetas (rutas completas).
         
         Args:
             parent: Carpeta padre (None = raíz)
@@ -112,6 +240,9 @@ class OutlookClient:
         Returns:
             Lista de tuplas (nombre, ruta, cantidad_items, indent)
         """
+        if parent is None and indent == 0:
+            return self.get_registry().as_list(max_depth)
+
         folders_info = []
 
         if parent is None:
@@ -6,133 +6,650 @@ evitando problemas de threading COM y manteniendo la GUI responsive.
 
 import threading
 import queue
-import pythoncom
+import itertools
 
 from outlook_client import OutlookClient
 from search import EmailSearch
 from attachments import export_attachments as _export_attachments
+from reports import export_rows
+from bulk import bulk_action
+from result_store import ResultStore, StoreCursor
+from session import SessionRows, save_session
+from instrumentation import INSTRUMENTATION
+from progress import ProgressChannel, ProgressTracker
+from saved_searches import SavedSearchStore
+from live import LiveSubscription
+from multistore import search_stores
+from query import quote
 
 
 class OutlookWorker(threading.Thread):
     """
     Thread dedicado que posee todos los objetos COM de Outlook.
     Recibe tareas via queue y devuelve resultados via root.after().
+    El progreso no usa root.after(): se publica en self.progress y la GUI lo
+    sondea a frecuencia fija.
+
+    Sin app (uso fuera de Tk, ver async_client) los callbacks se llaman en el
+    thread del worker y deben ser thread-safe; el fin de la conexión se
+    señala con self.ready (y self.startup_error si falló).
     """
 
-    def __init__(self, app):
+    # Prioridad de las tareas en la cola (menor = antes)
+    PRIORITY_HIGH = 0     # pedidas por el usuario con la GUI esperando (detalle)
+    PRIORITY_NORMAL = 1   # búsquedas, exportaciones, etc.
+    PRIORITY_LOW = 2      # precarga especulativa
+
+    # Segundos sin pedir páginas tras los que se cierra un cursor (libera COM)
+    CURSOR_IDLE_TIMEOUT = 300
+    # Cursores abiertos a la vez; al abrir uno más se cierra el menos usado
+    MAX_CURSORS = 4
+
+    def __init__(self, app, client_factory=None):
+        """
+        Args:
+            app: Ventana Tk que recibe los callbacks (None = sin GUI)
+            client_factory: Función sin argumentos que crea el origen de
+                            correo en este thread (por defecto OutlookClient)
+        """
         super().__init__(daemon=True)
         self.app = app
-        self.tasks = queue.Queue()
+        self.client_factory = client_factory or OutlookClient
+        self.tasks = queue.PriorityQueue()
+        self._task_seq = itertools.count()  # desempate: FIFO dentro de una prioridad
+        self.current_ticket = None  # número de la tarea en curso
+        self._queued = set()        # tareas en la cola, todavía sin empezar
+        self._dropped = set()       # de ellas, las canceladas
+        self._cancel_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.account_email = None
+        self.startup_error = None
         self.client = None
         self.searcher = None
-        self.last_results = []  # resultados CON _outlook_item (viven en este thread)
+        self.last_results = ResultStore()  # resultados CON _outlook_item (viven en este thread)
+        self.last_params = None  # parámetros de la última búsqueda (para guardarla)
+        self.saved = SavedSearchStore()
         self.cancel_event = threading.Event()  # señal para detener búsqueda
+        self.instrumentation = INSTRUMENTATION
+        self.progress = ProgressChannel()
+        # Suscripción a la carpeta de la última búsqueda (usa el searcher actual al suscribirse)
+        self.live = LiveSubscription(None, self._on_live_delta)
+        self.cursors = {}  # cursor_id -> ResultCursor (búsquedas paginadas abiertas)
+        self.results_cursor = (None, None)  # (cursor_id, lista) dueño de last_results
+        self._cursor_ids = itertools.count(1)
 
     def run(self):
         """Loop principal del worker thread."""
-        pythoncom.CoInitialize()
         try:
-            self.client = OutlookClient()
+            import pythoncom  # diferido: se carga en este thread, no al iniciar la GUI
+            pythoncom.CoInitialize()
+        except ImportError:
+            pythoncom = None  # origen sin COM (archivos, IMAP, Outlook simulado)
+
+        try:
+            self.client = self.client_factory()
             self.searcher = EmailSearch(self.client)
-            email = self.client.get_account_email()
-            self.app.after(0, self.app._on_worker_ready, email)
+            self.account_email = self.client.get_account_email()
         except Exception as e:
-            self.app.after(0, self.app._on_worker_error, str(e))
+            self.startup_error = str(e)
+            self.ready.set()
+            if self.app is not None:
+                self._post(self.app._on_worker_error, str(e))
             return
+        self.ready.set()
+        if self.app is not None:
+            self._post(self.app._on_worker_ready, self.account_email)
 
-        # Procesar tareas indefinidamente
+        # Precalentar el registro de carpetas mientras la GUI termina de mostrarse
+        try:
+            self.client.get_registry()
+        except Exception:
+            pass
+
+        # Procesar tareas indefinidamente, bombeando mensajes COM entre
+        # tareas para recibir los eventos de Outlook (p. ej. FolderAdd, ItemAdd)
         while True:
-            task = self.tasks.get()
+            try:
+                _, ticket, task = self.tasks.get(timeout=0.1)
+            except queue.Empty:
+                if pythoncom is not None:
+                    pythoncom.PumpWaitingMessages()
+                self._process_live()
+                self._expire_cursors()
+                continue
             if task is None:
                 break
 
             task_name, kwargs, on_success, on_error = task
+            with self._cancel_lock:
+                self._queued.discard(ticket)
+                if ticket in self._dropped:
+                    self._dropped.discard(ticket)
+                    continue
+                self.current_ticket = ticket
+                self.cancel_event.clear()  # la cancelación aplica a la tarea en curso
+            self.instrumentation.begin_task(task_name, kwargs)
+            error = None
             try:
                 if task_name == "search":
                     self._do_search(kwargs, on_success)
+                elif task_name == "open_cursor":
+                    self._do_open_cursor(kwargs, on_success)
+                elif task_name == "fetch_page":
+                    self._do_fetch_page(kwargs, on_success)
+                elif task_name == "close_cursor":
+                    self._close_cursor(kwargs["cursor_id"])
+                elif task_name == "search_stores":
+                    self._do_search_stores(kwargs, on_success)
+                elif task_name == "list_stores":
+                    self._do_list_stores(kwargs, on_success)
+                elif task_name == "search_threads":
+                    self._do_search_threads(kwargs, on_success)
+                elif task_name == "expand_thread":
+                    self._do_expand_thread(kwargs, on_success)
+                elif task_name == "get_detail":
+                    self._do_get_detail(kwargs, on_success)
                 elif task_name == "quick_search_all":
                     self._do_quick_search_all(kwargs, on_success)
                 elif task_name == "export_attachments":
                     self._do_export_attachments(kwargs, on_success)
+                elif task_name == "export_rows":
+                    self._do_export_rows(kwargs, on_success)
+                elif task_name == "bulk_action":
+                    self._do_bulk_action(kwargs, on_success)
                 elif task_name == "list_folders":
                     self._do_list_folders(kwargs, on_success)
+                elif task_name == "folder_paths":
+                    self._do_folder_paths(kwargs, on_success)
+                elif task_name == "save_search":
+                    self._do_save_search(kwargs, on_success)
+                elif task_name == "save_session":
+                    self._do_save_session(kwargs, on_success)
+                elif task_name == "use_results":
+                    self._do_use_results(kwargs, on_success)
+                elif task_name == "refresh_saved_search":
+                    self._do_refresh_saved_search(kwargs, on_success)
+                elif task_name == "set_instrumentation":
+                    self._do_set_instrumentation(kwargs, on_success)
             except Exception as e:
-                self.app.after(0, on_error, str(e))
+                error = str(e)
+                self._post(on_error, error)
+            finally:
+                with self._cancel_lock:
+                    self.current_ticket = None
+                self.instrumentation.end_task(error)
+
+    def submit(self, task_name, kwargs, on_success, on_error, priority=PRIORITY_NORMAL) -> int:
+        """
+        Envía una tarea al worker thread.
 
-    def submit(self, task_name, kwargs, on_success, on_error):
-        """Envía una tarea al worker thread."""
-        self.cancel_event.clear()  # resetear señal de cancelación
-        self.tasks.put((task_name, kwargs, on_success, on_error))
+        Args:
+            task_name: Nombre de la tarea
+            kwargs: Parámetros de la tarea
+            on_success: Callback (en el thread de la GUI) con el resultado
+            on_error: Callback (en el thread de la GUI) con el mensaje de error
+            priority: PRIORITY_HIGH, PRIORITY_NORMAL o PRIORITY_LOW; no
+                      interrumpe la tarea en curso, solo adelanta en la cola
+
+        Returns:
+            Número de la tarea (para cancel)
+        """
+        ticket = next(self._task_seq)
+        with self._cancel_lock:
+            self._queued.add(ticket)
+        self.tasks.put((priority, ticket, (task_name, kwargs, on_success, on_error)))
+        return ticket
 
     def cancel_search(self):
         """Detiene la búsqueda en curso."""
         self.cancel_event.set()
 
+    def cancel(self, ticket: int):
+        """
+        Cancela una tarea: si está en curso detiene su búsqueda (como
+        cancel_search); si espera en la cola, se descarta sin ejecutarla ni
+        llamar a sus callbacks. Una tarea que ya terminó no se modifica.
+
+        Returns:
+            True si la tarea estaba en curso (sus callbacks todavía llegan)
+        """
+        with self._cancel_lock:
+            if ticket == self.current_ticket:
+                self.cancel_event.set()
+                return True
+            if ticket in self._queued:
+                self._dropped.add(ticket)
+            return False
+
+    def stop(self):
+        """Termina el worker después de la tarea en curso (las pendientes se descartan)."""
+        self.tasks.put((self.PRIORITY_HIGH - 1, next(self._task_seq), None))
+
+    def _post(self, callback, *args):
+        """Entrega un callback al thread de la GUI (medido si hay instrumentación)."""
+        if self.app is None:
+            callback(*args)
+            return
+        self.app.after(0, self.instrumentation.wrap_callback(callback), *args)
+
     # === Tareas ===
 
+    def _search_progress(self):
+        """Callback de progreso de EmailSearch que publica en el canal 'search'."""
+        tracker = ProgressTracker(self.progress, "search")
+
+        def progress_cb(current, msg, scanned=None, total=None, **extra):
+            tracker.update(scanned if scanned is not None else current, total,
+                           msg, matched=current, **extra)
+
+        return tracker, progress_cb
+
     def _do_search(self, kwargs, on_success):
         """Ejecuta búsqueda y almacena resultados con refs COM."""
-        def progress_cb(current, msg):
-            self.app.after(0, self.app._on_search_progress, current, msg)
+        kwargs = dict(kwargs)
+        live = kwargs.pop("live", False)
+        self.live.stop()
+        tracker, progress_cb = self._search_progress()
+        results = ResultStore()  # las filas pasan directo al almacén (acotado en memoria)
+        try:
+            results.extend(self.searcher.iter_search(
+                progress_callback=progress_cb,
+                cancel_event=self.cancel_event,
+                **kwargs,
+            ))
+        except Exception:
+            results.close()
+            raise
+        finally:
+            tracker.finish()
+        results = self._keep(results)
+        self.last_params = dict(kwargs)
+        plan = self.searcher.last_plan
+        self.instrumentation.note(
+            rows=len(results), folder=kwargs.get("folder_path") or kwargs.get("folder", "inbox"),
+            plan=plan.strategy, est_scanned=round(plan.est_scanned),
+            scanned=plan.actual.get("scanned", 0),
+        )
 
-        results = self.searcher.search(
-            progress_callback=progress_cb,
-            cancel_event=self.cancel_event,
-            **kwargs,
+        cancelled = self.cancel_event.is_set()
+        if live and not cancelled and not results.spilled:
+            self._watch(kwargs, results)
+        self._post(on_success, *self._first_page(results), cancelled, len(results))
+
+    def _do_open_cursor(self, kwargs, on_success):
+        """
+        Abre una búsqueda paginada y entrega la primera página.
+        La posición queda abierta en self.cursors; las páginas siguientes se
+        piden con fetch_page y se agregan a last_results.
+        """
+        kwargs = dict(kwargs)
+        live = kwargs.pop("live", False)
+        page_size = kwargs.pop("page_size", None) or kwargs.pop("max_results", 100)
+        kwargs.pop("max_results", None)
+        self.live.stop()
+        cursor = self.searcher.open_cursor(page_size=page_size, **kwargs)
+        cursor_id = self._add_cursor(cursor)
+        tracker, progress_cb = self._search_progress()
+        try:
+            results = cursor.fetch(progress_callback=progress_cb, cancel_event=self.cancel_event)
+        except Exception:
+            self._close_cursor(cursor_id)
+            raise
+        finally:
+            tracker.finish()
+        results = self._keep(results)
+        self.results_cursor = (cursor_id, results)
+        self.last_params = dict(kwargs)
+        plan = cursor.plan
+        self.instrumentation.note(
+            rows=len(results), folder=kwargs.get("folder_path") or kwargs.get("folder", "inbox"),
+            plan=plan.strategy if plan else None, cursor=cursor_id,
         )
-        self.last_results = results
 
-        # Enviar resultados limpios (sin COM refs) a la GUI
+        if not cursor.has_more:
+            self._close_cursor(cursor_id)
+        if live and not cursor.cancelled and not results.spilled:
+            self._watch(kwargs, results)
         clean = self.searcher.get_results_without_item(results)
-        cancelled = self.cancel_event.is_set()
-        self.app.after(0, on_success, clean, cancelled)
+        self._post(on_success, cursor_id, clean, cursor.has_more, cursor.cancelled)
 
-    def _do_quick_search_all(self, kwargs, on_success):
-        """Búsqueda rápida en subject + sender, combinada."""
-        term = kwargs["term"]
-        max_results = kwargs.get("max_results", 50)
+    def _do_fetch_page(self, kwargs, on_success):
+        """Siguiente página de un cursor abierto; se agrega a last_results."""
+        cursor_id = kwargs["cursor_id"]
+        cursor = self.cursors.get(cursor_id)
+        if cursor is None:
+            raise RuntimeError("La búsqueda expiró por inactividad. Vuelve a buscar.")
+        tracker, progress_cb = self._search_progress()
+        try:
+            rows = cursor.fetch(kwargs.get("page_size"), progress_callback=progress_cb,
+                                cancel_event=self.cancel_event)
+        except Exception:
+            self._close_cursor(cursor_id)
+            raise
+        finally:
+            tracker.finish()
+        # Misma lista que vigila la suscripción en vivo: sin repetir correos
+        # que ya llegaron por un evento ItemAdd. Si después se abrió otra
+        # búsqueda (varios clientes, ver async_client) last_results es de
+        # ella y la página se entrega tal cual
+        owner_id, owner_rows = self.results_cursor
+        if owner_id == cursor_id and owner_rows is self.last_results:
+            known = self.last_results.known_entries(r.get("entry_id") for r in rows)
+            rows = [r for r in rows if r.get("entry_id") not in known]
+            self.last_results.extend(rows)
+            if self.last_results.spilled:
+                self.live.stop()  # los eventos no pueden modificar filas en disco
+        self.instrumentation.note(rows=len(rows), cursor=cursor_id, fetched=cursor.fetched)
+        if not cursor.has_more:
+            self._close_cursor(cursor_id)
+        clean = self.searcher.get_results_without_item(rows)
+        self._post(on_success, clean, cursor.has_more, cursor.cancelled)
 
-        def progress_cb(current, msg):
-            self.app.after(0, self.app._on_search_progress, current, msg)
+    def _add_cursor(self, cursor) -> int:
+        """Registra un cursor; si ya hay MAX_CURSORS se cierra el menos usado."""
+        if len(self.cursors) >= self.MAX_CURSORS:
+            oldest = min(self.cursors, key=lambda cid: self.cursors[cid].last_used)
+            self._close_cursor(oldest)
+        cursor_id = next(self._cursor_ids)
+        self.cursors[cursor_id] = cursor
+        return cursor_id
 
-        results = self.searcher.search(
-            subject=term, max_results=max_results,
-            progress_callback=progress_cb, cancel_event=self.cancel_event,
-        )
-        if self.cancel_event.is_set():
-            clean = self.searcher.get_results_without_item(results)
-            self.app.after(0, on_success, clean, True)
+    def _first_page(self, results: ResultStore) -> tuple:
+        """
+        Primera página limpia (sin COM refs) de resultados ya guardados en
+        last_results. Si hay más, quedan en un StoreCursor que se lee con
+        fetch_page, así la GUI no recibe una copia completa de una vez.
+
+        Returns:
+            Tupla (cursor_id o None, filas, quedan_más)
+        """
+        cursor = StoreCursor(results)
+        page = self.searcher.get_results_without_item(cursor.fetch())
+        if not cursor.has_more:
+            return None, page, False
+        return self._add_cursor(cursor), page, True
+
+    def _close_cursor(self, cursor_id):
+        cursor = self.cursors.pop(cursor_id, None)
+        if cursor is None:
             return
-        results_sender = self.searcher.search(
-            sender=term, max_results=max_results,
+        store = cursor.store if isinstance(cursor, StoreCursor) else None
+        cursor.close()
+        if store is not None and store is not self.last_results:
+            store.close()  # _keep lo dejó abierto para este cursor
+
+    def _expire_cursors(self):
+        """Cierra los cursores sin uso reciente (en tiempo ocioso)."""
+        for cursor_id, cursor in list(self.cursors.items()):
+            if isinstance(cursor, StoreCursor):
+                continue  # no retiene objetos COM: sus filas ya están en last_results
+            if cursor.idle_seconds() > self.CURSOR_IDLE_TIMEOUT:
+                self._close_cursor(cursor_id)
+
+    def _do_search_stores(self, kwargs, on_success):
+        """
+        Búsqueda en varios almacenes a la vez (un thread y una sesión COM por
+        almacén). Los resultados no traen COM refs: se abren por EntryID al
+        exportar (EmailSearch.hydrate).
+        """
+        kwargs = dict(kwargs)
+        stores = kwargs.pop("stores")
+        kwargs.pop("live", None)  # la suscripción en vivo es de una sola carpeta
+        self.live.stop()
+        tracker, progress_cb = self._search_progress()
+        results, stats = search_stores(
+            self.client, stores,
+            progress_callback=progress_cb,
             cancel_event=self.cancel_event,
+            out=ResultStore(),
+            **kwargs,
+        )
+        tracker.finish()
+        self._keep(results)
+        self.last_params = None  # las búsquedas guardadas son de una carpeta
+        self.instrumentation.note(
+            rows=len(results), stores=len(stores),
+            slowest=max((s["seconds"] for s in stats), default=0),
+            total_seconds=round(sum(s["seconds"] for s in stats), 3),
         )
+        self._post(on_success, *self._first_page(results), self.cancel_event.is_set(),
+                   len(results), stats)
 
-        seen = {(r["subject"], r["date"], r["time"]) for r in results}
-        for r in results_sender:
-            key = (r["subject"], r["date"], r["time"])
-            if key not in seen:
-                results.append(r)
-                seen.add(key)
+    def _do_quick_search_all(self, kwargs, on_success):
+        """Búsqueda rápida en subject + sender: una sola consulta con OR."""
+        term = quote(kwargs["term"])
+        params = {
+            "query": f"subject:{term} OR from:{term}",
+            "max_results": kwargs.get("max_results", 50),
+            "live": kwargs.get("live", False),
+        }
+        self._do_search(params, on_success)
+
+    def _do_search_threads(self, kwargs, on_success):
+        """Búsqueda agrupada por conversación (una fila por hilo)."""
+        self.live.stop()
+        found = self.searcher.search_threads(cancel_event=self.cancel_event, **kwargs)
+        self._keep([])  # se llena con los hilos que se expanden
+        self.last_params = None
+        self.instrumentation.note(
+            threads=len(found), rows=sum(t["count"] for t in found),
+            folder=kwargs.get("folder_path") or kwargs.get("folder", "inbox"),
+        )
+        self._post(on_success, found, self.cancel_event.is_set())
 
+    def _do_expand_thread(self, kwargs, on_success):
+        """Abre los correos de un hilo y los agrega a los resultados actuales."""
+        rows = self.searcher.expand_thread(kwargs["entry_ids"], kwargs.get("store_id"))
+        # Solo se entregan los correos agregados, para que la lista de la GUI
+        # siga alineada con last_results
+        known = self.last_results.known_entries(r.get("entry_id") for r in rows)
+        rows = [r for r in rows if r.get("entry_id") not in known]
+        self.last_results.extend(rows)
+        self.instrumentation.note(rows=len(rows))
+        self._post(on_success, self.searcher.get_results_without_item(rows))
+
+    def _do_get_detail(self, kwargs, on_success):
+        """Detalle completo de un correo (cuerpo, destinatarios, adjuntos)."""
+        detail = self.searcher.get_detail(kwargs["entry_id"], kwargs.get("store_id"))
+        self.instrumentation.note(chars=len(detail["body"]), prefetch=kwargs.get("prefetch", False))
+        self._post(on_success, detail)
+
+    def _keep(self, results) -> ResultStore:
+        """
+        Reemplaza last_results por un ResultStore con los resultados dados
+        (las filas que exceden el presupuesto de memoria van a disco) y libera
+        el anterior. Las filas de una sesión (SessionRows) se usan tal cual.
+        """
+        if results is self.last_results:
+            return results
+        # Si un StoreCursor todavía entrega sus páginas, lo cierra _close_cursor
+        if not any(isinstance(c, StoreCursor) and c.store is self.last_results
+                   for c in self.cursors.values()):
+            self.last_results.close()
+        if not isinstance(results, (ResultStore, SessionRows)):
+            results = ResultStore(results)
         self.last_results = results
-        clean = self.searcher.get_results_without_item(results)
-        cancelled = self.cancel_event.is_set()
-        self.app.after(0, on_success, clean, cancelled)
+        return self.last_results
 
-    def _do_export_attachments(self, kwargs, on_success):
-        """Exporta adjuntos usando las refs COM almacenadas."""
-        def progress_cb(current, total, msg):
-            self.app.after(0, self.app._on_attachment_progress, current, total, msg)
+    def _watch(self, params, results):
+        """Suscribe la búsqueda a los cambios de su carpeta (resultados en vivo)."""
+        try:
+            folder = self.searcher.resolve_folder(
+                params.get("folder", "inbox"), params.get("folder_path"), params.get("subfolder"),
+                params.get("store_id"),
+            )
+            self.live.searcher = self.searcher
+            self.live.watch(folder, params, results)
+        except Exception:
+            self.live.stop()  # sin eventos disponibles: resultados estáticos
 
+    def _process_live(self):
+        """Verificaciones pendientes de la suscripción (en tiempo ocioso)."""
+        if self.live.active:
+            try:
+                self.live.process_pending()
+            except Exception:
+                pass
+
+    def _on_live_delta(self, results, delta):
+        """Cambio en la carpeta de la búsqueda activa: se envía a la GUI."""
+        self._keep(results)
+        if results.spilled:
+            self.live.stop()  # ver _do_fetch_page
+        if self.app is None:
+            return
+        clean = {
+            "added": self.searcher.get_results_without_item(delta["added"]),
+            "changed": self.searcher.get_results_without_item(delta["changed"]),
+            "removed": list(delta["removed"]),
+        }
+        self._post(self.app._on_live_delta, clean)
+
+    def _do_export_attachments(self, kwargs, on_success):
+        """
+        Exporta adjuntos usando las refs COM almacenadas, o de las filas
+        recibidas en kwargs['results'] (sin COM refs: se abren por EntryID).
+        """
+        kwargs = dict(kwargs)
+        rows = kwargs.pop("results", None)
+        tracker = ProgressTracker(self.progress, "attachments")
         stats = _export_attachments(
-            results=self.last_results,
-            progress_callback=progress_cb,
+            results=self.last_results if rows is None else rows,
+            progress_callback=tracker.update,
+            cancel_event=self.cancel_event,
+            resolve_item=self.searcher.get_item,  # filas en disco o recibidas sin COM
             **kwargs,
         )
-        self.app.after(0, on_success, stats)
+        tracker.finish()
+        self.instrumentation.note(rows=stats["exported"], errors=stats["errors"])
+        self._post(on_success, stats)
+
+    def _do_export_rows(self, kwargs, on_success):
+        """
+        Exporta a CSV/Excel los resultados que ya tiene el worker, en streaming
+        y sin copiarlos a la GUI: solo vuelven las rutas y el conteo.
+        Se cancela con cancel(ticket) o cancel_search().
+        """
+        tracker = ProgressTracker(self.progress, "export")
+        stats = export_rows(
+            self.last_results,
+            csv_path=kwargs.get("csv_path"),
+            xlsx_path=kwargs.get("xlsx_path"),
+            progress_callback=tracker.update,
+            cancel_event=self.cancel_event,
+        )
+        tracker.finish()
+        self.instrumentation.note(rows=stats["rows"], cancelled=stats["cancelled"])
+        self._post(on_success, stats)
+
+    def _do_bulk_action(self, kwargs, on_success):
+        """
+        Aplica una acción masiva (bulk.ACTIONS) a los resultados actuales por
+        lotes, atendiendo los mensajes COM entre lotes. Para 'move' el valor
+        es la ruta de la carpeta destino o una predeterminada ('deleted').
+        Se cancela con cancel(ticket) y se reanuda enviando start=stats['next'].
+        """
+        kwargs = dict(kwargs)
+        action = kwargs.pop("action")
+        value = kwargs.pop("value", None)
+        if action == "move" and value:
+            if value.lower() in self.client.FOLDER_TYPES:
+                value = self.searcher.resolve_folder(folder=value)
+            else:
+                value = self.searcher.resolve_folder(folder_path=value)
+        # Sin seguimiento en vivo: las posiciones (y la reanudación) no cambian
+        self.live.stop()
+        tracker = ProgressTracker(self.progress, "bulk")
+        stats = bulk_action(
+            self.last_results, action, value,
+            progress_callback=tracker.update,
+            cancel_event=self.cancel_event,
+            resolve_item=self.searcher.get_item,
+            between_batches=_pump_messages,
+            **kwargs,
+        )
+        tracker.finish()
+        self.instrumentation.note(action=action, rows=stats["done"], errors=stats["errors"],
+                                  cancelled=stats["cancelled"])
+        self._post(on_success, stats)
+
+    def _do_save_search(self, kwargs, on_success):
+        """Guarda la última búsqueda (parámetros + resultados + marca de agua)."""
+        if self.last_params is None:
+            raise ValueError("Solo se pueden guardar búsquedas con filtros.")
+        clean = self.searcher.get_results_without_item(self.last_results)
+        record = self.saved.save(kwargs["name"], self.last_params, clean)
+        self._post(on_success, record["name"])
+
+    def _do_save_session(self, kwargs, on_success):
+        """Guarda los resultados actuales y el estado de la tabla en un archivo de sesión."""
+        size = save_session(kwargs["path"], self.last_results, kwargs.get("state"), kwargs.get("order"))
+        self.instrumentation.note(rows=len(self.last_results), bytes=size)
+        self._post(on_success, kwargs["path"], size)
+
+    def _do_use_results(self, kwargs, on_success):
+        """
+        Adopta como last_results las filas de una sesión abierta por la GUI
+        (mismo objeto, de solo lectura). Los objetos COM se abren por EntryID
+        solo al ver el detalle o exportar adjuntos.
+        """
+        self.live.stop()
+        self._keep(kwargs["rows"])
+        self.results_cursor = (None, None)
+        self.last_params = kwargs.get("params")
+        self._post(on_success, len(self.last_results))
+
+    def _do_refresh_saved_search(self, kwargs, on_success):
+        """Actualiza una búsqueda guardada consultando solo correos nuevos."""
+        name = kwargs["name"]
+        self.live.stop()
+        tracker, progress_cb = self._search_progress()
+        results = ResultStore()
+        try:
+            results, n_new = self.saved.refresh(
+                name, self.searcher, progress_callback=progress_cb,
+                cancel_event=self.cancel_event, out=results,
+            )
+        except Exception:
+            results.close()
+            raise
+        finally:
+            tracker.finish()
+        self._keep(results)
+        self.last_params = self.saved.load(name)["params"]
+        self.instrumentation.note(rows=len(results), new_rows=n_new, saved_search=name)
+        self._post(on_success, *self._first_page(results), self.cancel_event.is_set(),
+                   len(results), n_new)
 
     def _do_list_folders(self, kwargs, on_success):
         """Lista carpetas del buzón."""
+        kwargs = dict(kwargs)
+        if kwargs.pop("refresh", False):
+            self.client.get_registry(rebuild=True)
         folders = self.client.list_folders(**kwargs)
-        self.app.after(0, on_success, folders)
+        self._post(on_success, folders)
+
+    def _do_list_stores(self, kwargs, on_success):
+        """Almacenes del perfil (buzones y archivos PST) para elegir dónde buscar."""
+        self._post(on_success, self.client.list_stores())
+
+    def _do_folder_paths(self, kwargs, on_success):
+        """Rutas completas de todas las carpetas (destinos de búsqueda)."""
+        paths = self.client.get_registry().paths()
+        self._post(on_success, paths)
+
+    def _do_set_instrumentation(self, kwargs, on_success):
+        """Activa/desactiva la instrumentación COM y ajusta el umbral de lentitud."""
+        if "slow_ms" in kwargs:
+            self.instrumentation.slow_ms = float(kwargs["slow_ms"])
+        self.client.set_instrumentation(bool(kwargs.get("enabled", False)))
+        self._post(on_success, self.instrumentation.snapshot())
+
+
+def _pump_messages():
+    """Atiende los mensajes COM pendientes del thread (no-op sin pywin32)."""
+    try:
+        import pythoncom
+    except ImportError:
+        return
+    pythoncom.PumpWaitingMessages()
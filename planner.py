@@ -0,0 +1,400 @@
+"""
+Planificador de consultas.
+Elige cómo ejecutar una búsqueda según un modelo de costos en "llamadas COM
+equivalentes", a partir de estadísticas de la carpeta (cantidad de ítems,
+rango de fechas, si el almacén tiene índice de contenido) y de la
+selectividad estimada del filtro DASL.
+
+Estrategias:
+    restrict         Items.Sort + Items.Restrict + enumeración (la de siempre)
+    find             Items.Find/FindNext: se detiene al juntar max_results
+    table            Folder.GetTable: Outlook filtra y ordena solo las
+                     coincidencias; la fila sale de las columnas de la tabla
+                     y el correo se abre por EntryID solo si hace falta
+    advanced_search  Application.AdvancedSearch: usa el índice de contenido
+                     del almacén (solo almacenes indexados)
+"""
+
+import time
+
+from dasl import parse, parse_date, PROPERTY_MAP, DaslError
+
+
+STRATEGIES = ("restrict", "find", "table", "advanced_search")
+
+# Costos unitarios (llamadas COM equivalentes)
+COST_SERVER_SCAN = 0.01    # por ítem evaluado por Outlook (Restrict/Find/GetTable)
+COST_SORT = 0.005          # por ítem ordenado
+COST_NEXT = 1.0            # por ítem enumerado
+COST_FIND_NEXT = 3.0       # por coincidencia con Find/FindNext
+COST_GET_ITEM = 2.0        # GetItemFromID
+COST_TABLE_CHUNK = 1.0     # por bloque de Table.GetArray
+COST_EXTRACT = 15.0        # extraer los datos de un correo
+COST_TABLE_ROW = 3.0       # armar la fila desde la tabla (abre los que tienen adjuntos)
+COST_LOCAL_CHECK = 3.0     # filtro local (cuerpo, destinatarios) por ítem revisado
+COST_ADVANCED_FIXED = 50.0 # búsqueda asíncrona + evento de término
+
+TABLE_CHUNK = 500
+
+# Selectividad por defecto de un LIKE sobre cada propiedad
+_LIKE_SELECTIVITY = {
+    "Subject": 0.05, "SenderName": 0.05, "SenderEmailAddress": 0.05,
+    "To": 0.1, "CC": 0.1, "Body": 0.03, "Categories": 0.1,
+}
+_DEFAULT_SELECTIVITY = 0.3
+
+# Selectividad de filtros que se evalúan en Python (no en Outlook)
+LOCAL_SELECTIVITY = {"body_contains": 0.03, "recipient": 0.1, "query": 0.1}
+
+STATS_TTL = 300        # segundos de validez de las estadísticas de una carpeta
+
+
+class Plan:
+    """
+    Plan de ejecución elegido, con las estimaciones de cada estrategia.
+
+    Attributes:
+        strategy: Estrategia elegida (ver STRATEGIES)
+        estimates: {estrategia: {'cost', 'rows'} o {'unavailable': motivo}}
+        stats: Estadísticas de la carpeta usadas
+        est_matches: Coincidencias estimadas del filtro DASL
+        est_scanned: Ítems que se estima revisar para juntar max_results
+        actual: Métricas reales tras ejecutar (scanned, matched, seconds)
+    """
+
+    def __init__(self, strategy, estimates, stats, dasl_filter, selectivity,
+                 est_matches, est_scanned, max_results, forced=False):
+        self.strategy = strategy
+        self.estimates = estimates
+        self.stats = stats
+        self.dasl_filter = dasl_filter
+        self.selectivity = selectivity
+        self.est_matches = est_matches
+        self.est_scanned = est_scanned
+        self.max_results = max_results
+        self.forced = forced
+        self.actual = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "forced": self.forced,
+            "folder": self.stats.get("name", ""),
+            "folder_items": self.stats.get("count", 0),
+            "indexed": self.stats.get("indexed", False),
+            "dasl": self.dasl_filter,
+            "selectivity": round(self.selectivity, 5),
+            "est_matches": round(self.est_matches),
+            "est_scanned": round(self.est_scanned),
+            "estimates": self.estimates,
+            "actual": dict(self.actual),
+        }
+
+    def explain(self) -> str:
+        """Descripción legible del plan (y de la ejecución, si ya corrió)."""
+        s = self.stats
+        lines = [
+            f"Plan: {self.strategy}" + (" (forzada)" if self.forced else ""),
+            f"Carpeta: {s.get('name', '?')} — {_n(s.get('count', 0))} ítems, "
+            f"índice de contenido: {'sí' if s.get('indexed') else 'no'}",
+            f"Filtro DASL: {self.dasl_filter or '(ninguno)'}",
+            f"Selectividad estimada: {self.selectivity:.2%} → ~{_n(self.est_matches)} "
+            f"coincidencias; ~{_n(self.est_scanned)} a revisar para {_n(self.max_results)} resultados",
+            "",
+            f"  {'estrategia':<17}{'costo':>10}{'filas':>10}",
+        ]
+        for name in STRATEGIES:
+            est = self.estimates.get(name, {})
+            mark = "*" if name == self.strategy else " "
+            if "unavailable" in est:
+                lines.append(f"{mark} {name:<17}no disponible: {est['unavailable']}")
+            else:
+                lines.append(f"{mark} {name:<17}{_n(est['cost']):>10}{_n(est['rows']):>10}")
+        if self.actual:
+            a = self.actual
+            lines += ["", f"Real: {_n(a.get('scanned', 0))} revisados (estimado {_n(self.est_scanned)}), "
+                          f"{_n(a.get('matched', 0))} coincidencias, {a.get('seconds', 0):.2f} s"]
+        return "\n".join(lines)
+
+
+def _n(value) -> str:
+    return f"{round(value):,}".replace(",", ".")
+
+
+class QueryPlanner:
+    """Estadísticas por carpeta (en caché) y elección de estrategia."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def invalidate(self, folder_entry_id: str = None):
+        """Descarta las estadísticas de una carpeta (o de todas)."""
+        if folder_entry_id is None:
+            self._stats.clear()
+        else:
+            self._stats.pop(folder_entry_id, None)
+
+    def folder_stats(self, folder) -> dict:
+        """Cantidad de ítems, rango de fechas e indexación de una carpeta (en caché)."""
+        try:
+            key = folder.EntryID
+        except Exception:
+            key = None
+        cached = self._stats.get(key)
+        if cached and time.monotonic() - cached["gathered"] < STATS_TTL:
+            return cached
+
+        stats = {"name": "", "count": 0, "newest": None, "oldest": None,
+                 "indexed": False, "store_id": "", "gathered": time.monotonic()}
+        try:
+            stats["name"] = folder.Name
+            items = folder.Items
+            stats["count"] = items.Count
+            if stats["count"]:
+                items.Sort("[ReceivedTime]", True)
+                stats["newest"] = _naive(items.GetFirst().ReceivedTime)
+                stats["oldest"] = _naive(items.GetLast().ReceivedTime)
+        except Exception:
+            pass
+        try:
+            store = folder.Store
+            stats["store_id"] = store.StoreID
+            stats["indexed"] = bool(store.IsInstantSearchEnabled)
+        except Exception:
+            pass
+        if key is not None:
+            self._stats[key] = stats
+        return stats
+
+    def selectivity(self, dasl_filter: str, stats: dict) -> float:
+        """Fracción estimada de la carpeta que cumple el filtro DASL."""
+        if not dasl_filter:
+            return 1.0
+        try:
+            node = parse(dasl_filter)
+        except DaslError:
+            return _DEFAULT_SELECTIVITY
+        return max(0.0, min(1.0, self._estimate(node, stats)))
+
+    def _estimate(self, node, stats) -> float:
+        kind = node[0]
+        if kind == "or":
+            miss = 1.0
+            for child in node[1]:
+                miss *= 1 - self._estimate(child, stats)
+            return 1 - miss
+        if kind == "not":
+            return 1 - self._estimate(node[1], stats)
+        if kind == "and":
+            # Las cotas de fecha se combinan en un solo rango
+            lower, upper, sel = None, None, 1.0
+            for child in node[1]:
+                bound = _date_bound(child)
+                if bound:
+                    op, value = bound
+                    if op in (">", ">="):
+                        lower = value if lower is None else max(lower, value)
+                    else:
+                        upper = value if upper is None else min(upper, value)
+                else:
+                    sel *= self._estimate(child, stats)
+            if lower is not None or upper is not None:
+                sel *= _date_fraction(lower, upper, stats)
+            return sel
+
+        bound = _date_bound(node)
+        if bound:
+            op, value = bound
+            if op in (">", ">="):
+                return _date_fraction(value, None, stats)
+            return _date_fraction(None, value, stats)
+        _, prop, op, value = node
+        name = PROPERTY_MAP.get(prop) or PROPERTY_MAP.get(prop.lower())
+        if op in ("LIKE", "CI_STARTSWITH", "CI_PHRASEMATCH"):
+            return _LIKE_SELECTIVITY.get(name, _DEFAULT_SELECTIVITY)
+        if name == "HasAttachment":
+            return 0.3 if str(value) == "1" else 0.7
+        if name == "Read":
+            return 0.8 if str(value) == "1" else 0.2
+        if name == "Importance":
+            return {2: 0.1, 1: 0.85, 0: 0.05}.get(value, 0.3) if op == "=" else 0.5
+        if name == "Size":
+            return 0.1 if op in (">", ">=") and isinstance(value, (int, float)) and value >= 1024 ** 2 else 0.5
+        return _DEFAULT_SELECTIVITY
+
+    def plan(self, folder, dasl_filter: str, max_results: int, local_selectivity: float = 1.0,
+             strategy: str = None) -> Plan:
+        """
+        Elige la estrategia de menor costo estimado.
+
+        Args:
+            folder: Carpeta a buscar
+            dasl_filter: Filtro '@SQL=...' (vacío = todos)
+            max_results: Resultados pedidos
+            local_selectivity: Fracción de candidatos que pasará los filtros Python
+            strategy: Forzar una estrategia (si está disponible)
+
+        Returns:
+            Plan
+        """
+        stats = self.folder_stats(folder)
+        n = stats["count"]
+        sel = self.selectivity(dasl_filter, stats)
+        matches = n * sel
+        local_selectivity = max(local_selectivity, 1e-4)
+        scanned = min(matches, max_results / local_selectivity)
+        returned = min(max_results, matches * local_selectivity)
+        per_candidate = COST_LOCAL_CHECK if local_selectivity < 1 else 0.0
+        tail = scanned * per_candidate + returned * COST_EXTRACT
+
+        estimates = {}
+        estimates["restrict"] = {
+            "cost": n * COST_SORT + (n * COST_SERVER_SCAN if dasl_filter else 0)
+                    + scanned * COST_NEXT + tail,
+            "rows": scanned,
+        }
+        if dasl_filter:
+            frac = min(1.0, scanned / matches) if matches else 1.0
+            estimates["find"] = {
+                "cost": n * COST_SORT + n * COST_SERVER_SCAN * frac + scanned * COST_FIND_NEXT + tail,
+                "rows": scanned,
+            }
+        else:
+            estimates["find"] = {"unavailable": "requiere un filtro"}
+        # La tabla trae las columnas de la fila: el correo solo se abre para
+        # los filtros locales (cuerpo, destinatarios) y para listar adjuntos
+        opened = scanned * (COST_GET_ITEM + per_candidate) if per_candidate else 0.0
+        estimates["table"] = {
+            "cost": n * COST_SERVER_SCAN + matches * COST_SORT
+                    + (scanned / TABLE_CHUNK + 1) * COST_TABLE_CHUNK + opened
+                    + returned * COST_TABLE_ROW,
+            "rows": scanned,
+        }
+        if not stats["indexed"]:
+            estimates["advanced_search"] = {"unavailable": "almacén sin índice de contenido"}
+        elif not dasl_filter:
+            estimates["advanced_search"] = {"unavailable": "requiere un filtro"}
+        else:
+            estimates["advanced_search"] = {
+                "cost": COST_ADVANCED_FIXED + matches * (COST_SERVER_SCAN + COST_SORT)
+                        + scanned * COST_NEXT + tail,
+                "rows": scanned,
+            }
+
+        available = [k for k in STRATEGIES if "unavailable" not in estimates[k]]
+        forced = strategy in available
+        chosen = strategy if forced else min(available, key=lambda k: estimates[k]["cost"])
+        for est in estimates.values():
+            if "cost" in est:
+                est["cost"] = round(est["cost"], 1)
+                est["rows"] = round(est["rows"])
+        return Plan(chosen, estimates, stats, dasl_filter, sel, matches, scanned,
+                    max_results, forced=forced)
+
+
+def _date_bound(node):
+    if node[0] != "cmp":
+        return None
+    _, prop, op, value = node
+    if PROPERTY_MAP.get(prop) != "ReceivedTime" or op not in (">", ">=", "<", "<="):
+        return None
+    try:
+        return op, parse_date(value)
+    except Exception:
+        return None
+
+
+def _date_fraction(lower, upper, stats) -> float:
+    """Fracción de la carpeta dentro de [lower, upper) asumiendo llegada uniforme."""
+    oldest, newest = stats.get("oldest"), stats.get("newest")
+    if oldest is None or newest is None or newest <= oldest:
+        return _DEFAULT_SELECTIVITY
+    lo = max(lower, oldest) if lower else oldest
+    hi = min(upper, newest) if upper else newest
+    if hi <= lo:
+        return 0.001  # fuera del rango conocido: casi nada
+    return (hi - lo).total_seconds() / (newest - oldest).total_seconds()
+
+
+def _naive(dt):
+    if dt is not None and getattr(dt, "tzinfo", None) is not None:
+        return dt.replace(tzinfo=None)
+    return dt
+
+
+# ══════════════ AdvancedSearch ══════════════
+
+class _SearchEvents:
+    """Receptor del evento Application.AdvancedSearchComplete."""
+
+    done = None
+
+    def OnAdvancedSearchComplete(self, search):
+        try:
+            tag = search.Tag
+        except Exception:
+            tag = None
+        self.done.add(tag)
+
+
+def advanced_search(application, folder, dasl_filter: str, timeout: float = 60.0,
+                    cancel_event=None):
+    """
+    Ejecuta Application.AdvancedSearch sobre una carpeta y espera su término.
+
+    Args:
+        application: Objeto Application de Outlook
+        folder: Carpeta (alcance de la búsqueda, sin subcarpetas)
+        dasl_filter: Filtro '@SQL=...'
+        timeout: Segundos máximos de espera
+        cancel_event: Evento opcional que detiene la espera
+
+    Returns:
+        Colección Results (ordenable, enumerable como Items)
+
+    Raises:
+        TimeoutError: si la búsqueda no termina a tiempo
+    """
+    tag = f"outlook_search_{time.monotonic_ns()}"
+    handler = _connect_events(application)
+    scope = "'" + folder.FolderPath.replace("'", "''") + "'"
+    condition = dasl_filter[len("@SQL="):] if dasl_filter.upper().startswith("@SQL=") else dasl_filter
+    try:
+        search = application.AdvancedSearch(scope, condition, False, tag)
+        deadline = time.monotonic() + timeout
+        while tag not in handler.done:
+            if cancel_event and cancel_event.is_set():
+                search.Stop()
+                break
+            if time.monotonic() > deadline:
+                search.Stop()
+                raise TimeoutError("AdvancedSearch no terminó a tiempo")
+            _pump()
+        return search.Results
+    finally:
+        close = getattr(handler, "close", None)
+        if close:
+            close()
+
+
+def _connect_events(application):
+    subscribe = getattr(application, "_subscribe", None)  # Outlook simulado
+    if subscribe is not None:
+        handler = _SearchEvents()
+        handler.done = set()
+        subscribe(handler)
+        return handler
+    import win32com.client
+    handler = win32com.client.WithEvents(application, _SearchEvents)
+    handler.done = set()
+    return handler
+
+
+def _pump():
+    try:
+        import pythoncom
+    except ImportError:
+        time.sleep(0.01)
+        return
+    pythoncom.PumpWaitingMessages()
+    time.sleep(0.01)
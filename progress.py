@@ -0,0 +1,88 @@
+"""
+Canal de progreso entre el OutlookWorker y la GUI.
+El worker publica actualizaciones estructuradas tan seguido como quiera;
+el canal conserva solo la última por tipo (latest-value-wins) y la GUI las
+recoge con un único sondeo periódico a frecuencia fija. Así una búsqueda
+rápida no inunda la cola de eventos de Tk con miles de callbacks.
+"""
+
+import threading
+import time
+
+
+DEFAULT_RATE_HZ = 10
+
+
+class ProgressChannel:
+    """Buzón thread-safe de progreso: una entrada pendiente por tipo."""
+
+    def __init__(self, max_rate_hz: float = DEFAULT_RATE_HZ):
+        """
+        Args:
+            max_rate_hz: Frecuencia máxima de entrega a la GUI (sondeos por segundo)
+        """
+        self.interval_ms = max(1, int(1000 / max_rate_hz))
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def publish(self, kind: str, **fields):
+        """Publica (o reemplaza) la última actualización de un tipo."""
+        with self._lock:
+            self._pending[kind] = fields
+
+    def discard(self, kind: str):
+        """Descarta la actualización pendiente de un tipo (p. ej. al terminar la tarea)."""
+        with self._lock:
+            self._pending.pop(kind, None)
+
+    def drain(self) -> dict:
+        """Retorna y limpia las actualizaciones pendientes: {tipo: campos}."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class ProgressTracker:
+    """
+    Calcula métricas derivadas (tasa, ETA) de una tarea y las publica en un canal.
+
+    Campos publicados: current, total, matched, scanned, rate (por segundo),
+    eta (segundos o None), elapsed, message.
+    """
+
+    def __init__(self, channel: ProgressChannel, kind: str):
+        self.channel = channel
+        self.kind = kind
+        self.started = time.perf_counter()
+
+    def update(self, current: int, total: int = None, message: str = "", **extra):
+        """
+        Args:
+            current: Unidades procesadas (ítems revisados, correos exportados...)
+            total: Total de unidades si se conoce (habilita la ETA)
+            message: Texto descriptivo
+            **extra: Campos adicionales (p. ej. matched=)
+        """
+        elapsed = time.perf_counter() - self.started
+        rate = current / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if total and rate > 0 and current <= total:
+            eta = (total - current) / rate
+        self.channel.publish(
+            self.kind, current=current, total=total, rate=rate, eta=eta,
+            elapsed=elapsed, message=message, **extra,
+        )
+
+    def finish(self):
+        """Descarta la última actualización pendiente (la tarea ya terminó)."""
+        self.channel.discard(self.kind)
+
+
+def format_eta(seconds) -> str:
+    """Formatea una ETA en segundos como '8 s', '2 min 05 s'."""
+    if seconds is None:
+        return ""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    return f"{seconds // 60} min {seconds % 60:02d} s"
@@ -0,0 +1,422 @@
+"""
+Lenguaje de consulta de búsqueda.
+Una consulta como
+
+    from:juan subject:"factura 2024" after:01-01-2024 has:attachment -category:Procesado size>5MB
+
+se compila a un filtro DASL (con escape de comillas, OR, NOT y paréntesis)
+para todo lo que Outlook puede evaluar en Restrict, más un predicado Python
+solo para los términos que Outlook no puede filtrar (p. ej. nombres de
+adjuntos). Las consultas compiladas se guardan en caché.
+
+Sintaxis:
+    término              asunto o remitente contienen el texto
+    campo:valor          ver FIELDS; valor entre comillas si tiene espacios
+    size>5MB             comparaciones de tamaño (>, >=, <, <=, =) en B/KB/MB/GB
+    a b                  ambos (AND implícito)
+    a OR b               cualquiera
+    -a                   negación
+    ( ... )              agrupación
+
+Los textos se buscan tal cual: '%' y '_' no son comodines (subject:100%).
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from dasl import compile_filter
+
+
+class QueryError(ValueError):
+    """Consulta con sintaxis inválida."""
+
+
+# Alias de campo -> campo canónico
+FIELDS = {
+    "subject": "subject", "asunto": "subject",
+    "from": "from", "de": "from", "remitente": "from",
+    "to": "to", "para": "to",
+    "cc": "cc",
+    "body": "body", "cuerpo": "body",
+    "category": "category", "categoria": "category", "categoría": "category",
+    "has": "has", "tiene": "has",
+    "is": "is", "es": "is",
+    "importance": "importance", "importancia": "importance",
+    "after": "after", "desde": "after",
+    "before": "before", "hasta": "before",
+    "on": "on", "el": "on",
+    "size": "size", "tamaño": "size", "tamano": "size",
+    "recipient": "recipient", "destinatario": "recipient",
+    "attachment": "attachment", "adjunto": "attachment",
+}
+
+# Campos que Outlook no puede filtrar con DASL: se evalúan en Python
+LOCAL_FIELDS = {"recipient", "attachment"}
+
+# Campos de texto (LIKE '%valor%') -> propiedades del MailItem que revisan
+_TEXT_FIELDS = {
+    "text": ("Subject", "SenderName", "SenderEmailAddress"),
+    "subject": ("Subject",),
+    "from": ("SenderName", "SenderEmailAddress"),
+    "to": ("To",),
+    "cc": ("CC",),
+    "body": ("Body",),
+    "category": ("Categories",),
+}
+# Comodines de LIKE: DASL no tiene ESCAPE, así que un texto que los trae se
+# filtra en Outlook como comodín (más amplio) y se confirma en Python
+_LIKE_WILDCARDS = re.compile(r"[%_]")
+
+_P_SUBJECT = '"urn:schemas:httpmail:subject"'
+_P_FROMNAME = '"urn:schemas:httpmail:fromname"'
+_P_FROMEMAIL = '"urn:schemas:httpmail:fromemail"'
+_P_TO = '"urn:schemas:httpmail:displayto"'
+_P_CC = '"urn:schemas:httpmail:displaycc"'
+_P_BODY = '"urn:schemas:httpmail:textdescription"'
+_P_CATEGORY = '"urn:schemas-microsoft-com:office:office#Keywords"'
+_P_ATTACH = '"urn:schemas:httpmail:hasattachment"'
+_P_READ = '"urn:schemas:httpmail:read"'
+_P_IMPORTANCE = '"urn:schemas:httpmail:importance"'
+_P_RECEIVED = '"urn:schemas:httpmail:datereceived"'
+_P_SIZE = '"http://schemas.microsoft.com/mapi/proptag/0x0E080003"'
+
+_IMPORTANCE = {"baja": 0, "low": 0, "normal": 1, "alta": 2, "high": 2}
+_SIZE_UNITS = {"": 1, "b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+      | (?P<neg>-(?=[^\s)]))
+      | (?P<field>[^\W\d_]+)(?P<op>:|>=|<=|>|<|=)(?P<value>"(?:[^"]|"")*"|[^\s()]+)
+      | (?P<text>"(?:[^"]|"")*"|[^\s()]+)
+    )""",
+    re.VERBOSE,
+)
+
+# Resultado de compilar una consulta.
+#   dasl: filtro '@SQL=...' para Restrict (vacío si nada es evaluable por Outlook)
+#   predicate: función(item) -> bool para el resto, o None si no hace falta
+#   local_fields: campos que quedaron para el predicado Python
+CompiledQuery = namedtuple("CompiledQuery", ["dasl", "predicate", "local_fields"])
+
+
+# ══════════════ Parser ══════════════
+# Nodos: ("and", [hijos]) | ("or", [hijos]) | ("not", hijo)
+#        | ("term", campo, operador, valor)
+
+
+def parse(text: str):
+    """
+    Convierte una consulta en un árbol de nodos (tuplas).
+
+    Raises:
+        QueryError: si la sintaxis no es válida
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        raise QueryError("La consulta está vacía.")
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise QueryError("Paréntesis ')' sin abrir en la consulta.")
+    return node
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('""', '"')
+    return value
+
+
+def _tokenize(text: str) -> list:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        if not text[pos:].strip():
+            break
+        m = _TOKEN_RE.match(text, pos)
+        if not m:
+            raise QueryError(f"No se pudo interpretar la consulta cerca de: {text[pos:pos + 30]}")
+        pos = m.end()
+        if m.group("paren"):
+            tokens.append(("paren", m.group("paren")))
+        elif m.group("neg"):
+            tokens.append(("neg", "-"))
+        elif m.group("field") and m.group("field").lower() in FIELDS:
+            field = FIELDS[m.group("field").lower()]
+            tokens.append(("term", (field, m.group("op"), _unquote(m.group("value")))))
+        elif m.group("field"):
+            # 'RE:factura' o 'http://...': no es un campo, se busca como texto
+            tokens.append(("term", ("text", ":", m.group(0).strip())))
+        else:
+            raw = m.group("text")
+            if raw == "OR":
+                tokens.append(("or", raw))
+            else:
+                tokens.append(("term", ("text", ":", _unquote(raw))))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self._peek()[0] == "or":
+            self.pos += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = []
+        while self._peek()[0] in ("term", "neg") or self._peek() == ("paren", "("):
+            children.append(self.parse_unary())
+        if not children:
+            raise QueryError("Falta un término en la consulta (¿OR o paréntesis vacíos?).")
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_unary(self):
+        kind, value = self.tokens[self.pos]
+        self.pos += 1
+        if kind == "neg":
+            if self._peek()[0] is None:
+                raise QueryError("'-' sin término en la consulta.")
+            return ("not", self.parse_unary())
+        if kind == "paren":
+            node = self.parse_or()
+            if self._peek() != ("paren", ")"):
+                raise QueryError("Falta ')' en la consulta.")
+            self.pos += 1
+            return node
+        return ("term",) + value
+
+
+# ══════════════ Compilación ══════════════
+
+
+@lru_cache(maxsize=256)
+def compile_query(text: str) -> CompiledQuery:
+    """
+    Compila una consulta a DASL + predicado Python (resultado en caché).
+
+    Los términos de campos locales (LOCAL_FIELDS) que están dentro de un OR
+    o una negación arrastran a todo ese grupo al predicado Python; fuera de
+    ellos, el DASL filtra en Outlook y el predicado solo revisa lo que queda.
+    Los textos con '%' o '_' se filtran en Outlook (donde son comodines) y
+    se confirman en el predicado; negados, quedan solo en el predicado.
+
+    Raises:
+        QueryError: si la consulta no es válida
+    """
+    node = parse(text)
+    parts = node[1] if node[0] == "and" else [node]
+
+    dasl_parts, local_nodes, checked = [], [], []
+    for part in parts:
+        if _is_local(part) or (_has_wildcards(part) and _has_not(part)):
+            local_nodes.append(part)
+        else:
+            dasl_parts.append(_to_dasl(part))
+            if _has_wildcards(part):
+                checked.append(part)  # el LIKE de Outlook trae de más
+
+    dasl = "@SQL=" + " AND ".join(dasl_parts) if dasl_parts else ""
+    predicate = None
+    if local_nodes or checked:
+        checks = [_to_predicate(n) for n in local_nodes + checked]
+        predicate = lambda item: all(check(item) for check in checks)
+    fields = tuple(sorted({f for n in local_nodes + checked for f in _fields(n)}))
+    return CompiledQuery(dasl, predicate, fields)
+
+
+def compile_item_predicate(text: str):
+    """
+    Predicado Python completo de una consulta (DASL incluido), evaluado
+    sobre un MailItem sin consultar Outlook. Lo usan los resultados en vivo.
+    """
+    return _to_predicate(parse(text))
+
+
+def _fields(node):
+    return [t[1] for t in _terms(node)]
+
+
+def _is_local(node) -> bool:
+    return any(f in LOCAL_FIELDS for f in _fields(node))
+
+
+def _terms(node):
+    if node[0] == "term":
+        return [node]
+    children = node[1] if node[0] in ("and", "or") else [node[1]]
+    return [t for c in children for t in _terms(c)]
+
+
+def _has_wildcards(node) -> bool:
+    return any(t[1] in _TEXT_FIELDS and _LIKE_WILDCARDS.search(t[3]) for t in _terms(node))
+
+
+def _has_not(node) -> bool:
+    if node[0] == "not":
+        return True
+    return node[0] in ("and", "or") and any(_has_not(c) for c in node[1])
+
+
+def quote(value: str) -> str:
+    """Valor entre comillas para armar una consulta (ej. subject:{quote(x)})."""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def escape(value: str) -> str:
+    """Escapa un literal de texto DASL (comillas simples duplicadas)."""
+    return value.replace("'", "''")
+
+
+def _like(prop: str, value: str) -> str:
+    return f"{prop} LIKE '%{escape(value)}%'"
+
+
+def _to_dasl(node) -> str:
+    kind = node[0]
+    if kind == "and":
+        return "(" + " AND ".join(_to_dasl(c) for c in node[1]) + ")"
+    if kind == "or":
+        return "(" + " OR ".join(_to_dasl(c) for c in node[1]) + ")"
+    if kind == "not":
+        return f"NOT ({_to_dasl(node[1])})"
+    return _term_dasl(*node[1:])
+
+
+def _term_dasl(field: str, op: str, value: str) -> str:
+    if field != "size" and op != ":":
+        raise QueryError(f"El campo '{field}' solo admite ':' (ej. {field}:valor)")
+    if field == "text":
+        return f"({_like(_P_SUBJECT, value)} OR {_like(_P_FROMNAME, value)} OR {_like(_P_FROMEMAIL, value)})"
+    if field == "subject":
+        return _like(_P_SUBJECT, value)
+    if field == "from":
+        return f"({_like(_P_FROMNAME, value)} OR {_like(_P_FROMEMAIL, value)})"
+    if field == "to":
+        return _like(_P_TO, value)
+    if field == "cc":
+        return _like(_P_CC, value)
+    if field == "body":
+        return _like(_P_BODY, value)
+    if field == "category":
+        return _like(_P_CATEGORY, value)
+    if field == "has":
+        if value.lower() in ("attachment", "attachments", "adjunto", "adjuntos"):
+            return f"{_P_ATTACH} = 1"
+        raise QueryError(f"Valor no soportado para has: {value} (use has:attachment)")
+    if field == "is":
+        v = value.lower()
+        if v in ("unread", "noleido", "noleído"):
+            return f"{_P_READ} = 0"
+        if v in ("read", "leido", "leído"):
+            return f"{_P_READ} = 1"
+        raise QueryError(f"Valor no soportado para is: {value} (use is:unread o is:read)")
+    if field == "importance":
+        level = _IMPORTANCE.get(value.lower())
+        if level is None:
+            raise QueryError(f"Importancia inválida: {value} (alta, normal o baja)")
+        return f"{_P_IMPORTANCE} = {level}"
+    if field in ("after", "before", "on"):
+        day = _parse_day(value)
+        start = f"{_P_RECEIVED} >= '{day.strftime('%m/%d/%Y')}'"
+        end = f"{_P_RECEIVED} < '{(day + timedelta(days=1)).strftime('%m/%d/%Y')}'"
+        if field == "after":
+            return start
+        if field == "before":
+            return end
+        return f"({start} AND {end})"
+    if field == "size":
+        dasl_op = "=" if op == ":" else op
+        return f"{_P_SIZE} {dasl_op} {_parse_size(value)}"
+    raise QueryError(f"El campo '{field}' no se puede evaluar en Outlook")
+
+
+def _parse_day(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%d-%m-%Y")
+    except ValueError:
+        raise QueryError(f"Fecha inválida: {value}. Use DD-MM-YYYY")
+
+
+def _parse_size(value: str) -> int:
+    m = re.fullmatch(r"(\d+(?:[.,]\d+)?)\s*([kmg]?b?)", value.strip().lower())
+    if not m:
+        raise QueryError(f"Tamaño inválido: {value} (ej. 500KB, 5MB)")
+    unit = m.group(2)
+    if unit and not unit.endswith("b"):
+        unit += "b"
+    return int(float(m.group(1).replace(",", ".")) * _SIZE_UNITS[unit])
+
+
+# ══════════════ Predicado Python ══════════════
+
+
+def _to_predicate(node):
+    kind = node[0]
+    if kind == "and":
+        parts = [_to_predicate(c) for c in node[1]]
+        return lambda item: all(p(item) for p in parts)
+    if kind == "or":
+        parts = [_to_predicate(c) for c in node[1]]
+        return lambda item: any(p(item) for p in parts)
+    if kind == "not":
+        inner = _to_predicate(node[1])
+        return lambda item: not inner(item)
+
+    field, op, value = node[1:]
+    term = value.lower()
+    if field == "recipient":
+        return lambda item: term in recipients_text(item)
+    if field == "attachment":
+        return lambda item: any(term in name.lower() for name in _attachment_names(item))
+    if field in _TEXT_FIELDS and op == ":":
+        # Subcadena literal: como LIKE '%valor%' pero sin comodines
+        names = _TEXT_FIELDS[field]
+        return lambda item: any(term in str(item_value(item, n) or "").lower() for n in names)
+    # Término evaluable por Outlook: se reutiliza el evaluador DASL
+    dasl_pred = compile_filter("@SQL=" + _term_dasl(field, op, value))
+    return lambda item: dasl_pred(lambda name: item_value(item, name))
+
+
+def item_value(item, name: str):
+    """Valor de una propiedad DASL leída de un MailItem (ver dasl.PROPERTY_MAP)."""
+    if name == "HasAttachment":
+        return item.Attachments.Count > 0
+    if name == "Read":
+        return not item.UnRead
+    return getattr(item, name)
+
+
+def recipients_text(item) -> str:
+    """Nombres y direcciones de los destinatarios, en minúsculas."""
+    text = ""
+    try:
+        recipients = item.Recipients
+        for i in range(recipients.Count):
+            r = recipients.Item(i + 1)
+            text += f"{r.Name} {r.Address} "
+    except Exception:
+        pass
+    return text.lower()
+
+
+def _attachment_names(item) -> list:
+    names = []
+    try:
+        attachments = item.Attachments
+        for i in range(attachments.Count):
+            names.append(attachments.Item(i + 1).FileName or "")
+    except Exception:
+        pass
+    return names
@@ -4,8 +4,33 @@ Soporta exportación a Excel y CSV, y generación de resúmenes estadísticos.
 """
 
 import os
+import csv
+import itertools
 from datetime import datetime
-import pandas as pd
+
+# pandas/openpyxl se importan dentro de cada exportación: son los módulos más
+# pesados de la aplicación y solo se necesitan al exportar.
+
+# Columnas exportadas (en orden) y su encabezado en español. 'store' solo
+# viene en búsquedas en varios almacenes (multistore)
+COLUMN_NAMES = {
+    "store": "Buzón",
+    "subject": "Asunto",
+    "sender_name": "Remitente",
+    "sender_email": "Email Remitente",
+    "to": "Destinatario",
+    "cc": "CC",
+    "date": "Fecha",
+    "time": "Hora",
+    "body_preview": "Vista Previa",
+    "has_attachments": "Tiene Adjuntos",
+    "attachment_count": "Nº Adjuntos",
+    "attachment_names": "Nombres Adjuntos",
+    "importance": "Importancia",
+    "categories": "Categorías",
+    "size_kb": "Tamaño (KB)",
+    "body_matches": "Coincidencias Cuerpo",
+}
 
 
 def export_to_excel(results: list, filepath: str = None) -> str:
@@ -27,28 +52,14 @@ def export_to_excel(results: list, filepath: str = None) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join("reportes", f"busqueda_{timestamp}.xlsx")
 
+    import pandas as pd
+
     # Preparar datos (sin objetos COM)
     clean_results = _clean_for_export(results)
     df = pd.DataFrame(clean_results)
 
     # Renombrar columnas a español
-    column_names = {
-        "subject": "Asunto",
-        "sender_name": "Remitente",
-        "sender_email": "Email Remitente",
-        "to": "Destinatario",
-        "cc": "CC",
-        "date": "Fecha",
-        "time": "Hora",
-        "has_attachments": "Tiene Adjuntos",
-        "attachment_count": "Nº Adjuntos",
-        "attachment_names": "Nombres Adjuntos",
-        "importance": "Importancia",
-        "categories": "Categorías",
-        "size_kb": "Tamaño (KB)",
-        "body_preview": "Vista Previa",
-    }
-    df = df.rename(columns=column_names)
+    df = df.rename(columns=COLUMN_NAMES)
 
     # Exportar con formato
     with pd.ExcelWriter(filepath, engine="openpyxl") as writer:
@@ -87,31 +98,125 @@ def export_to_csv(results: list, filepath: str = None) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join("reportes", f"busqueda_{timestamp}.csv")
 
+    import pandas as pd
+
     clean_results = _clean_for_export(results)
     df = pd.DataFrame(clean_results)
 
-    column_names = {
-        "subject": "Asunto",
-        "sender_name": "Remitente",
-        "sender_email": "Email Remitente",
-        "to": "Destinatario",
-        "cc": "CC",
-        "date": "Fecha",
-        "time": "Hora",
-        "has_attachments": "Tiene Adjuntos",
-        "attachment_count": "Nº Adjuntos",
-        "attachment_names": "Nombres Adjuntos",
-        "importance": "Importancia",
-        "categories": "Categorías",
-        "size_kb": "Tamaño (KB)",
-        "body_preview": "Vista Previa",
-    }
-    df = df.rename(columns=column_names)
+    df = df.rename(columns=COLUMN_NAMES)
     df.to_csv(filepath, index=False, encoding="utf-8-sig")
 
     return os.path.abspath(filepath)
 
 
+def export_rows(rows, csv_path: str = None, xlsx_path: str = None,
+                progress_callback=None, cancel_event=None) -> dict:
+    """
+    Escribe resultados a CSV y/o Excel en streaming, fila a fila.
+    A diferencia de export_to_csv/export_to_excel, no requiere tener todos
+    los resultados en memoria: acepta cualquier iterable (p. ej. iter_search).
+    
+    Args:
+        rows: Iterable de diccionarios con datos de correos
+        csv_path: Ruta del CSV de salida (None = no generar)
+        xlsx_path: Ruta del Excel de salida (None = no generar)
+        progress_callback: Función opcional (current, total, message); total
+                           es None si rows no tiene largo
+        cancel_event: threading.Event opcional; si se activa se detiene la
+                      escritura y se borran los archivos incompletos
+        
+    Returns:
+        Diccionario con 'rows' escritas, rutas absolutas generadas y
+        'cancelled' (las rutas quedan vacías si se canceló)
+
+    Raises:
+        Las excepciones de rows o de la escritura, después de borrar los
+        archivos incompletos
+    """
+    total = len(rows) if hasattr(rows, "__len__") else None
+    clean = _iter_clean_rows(rows)
+    # La columna de almacén se agrega solo si las filas la traen
+    first = next(clean, None)
+    if first is not None:
+        clean = itertools.chain([first], clean)
+    columns = [c for c in COLUMN_NAMES if c != "store" or (first is not None and "store" in first)]
+    header = [COLUMN_NAMES[c] for c in columns]
+    csv_file = csv_writer = None
+    workbook = sheet = None
+
+    if xlsx_path:
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Resultados")
+        # En modo write_only el ancho se fija antes de escribir filas
+        for i, col in enumerate(header, 1):
+            sheet.column_dimensions[get_column_letter(i)].width = min(
+                max(len(col), _EXCEL_WIDTHS.get(columns[i - 1], 12)) + 2, 50
+            )
+        sheet.append(header)
+
+    # Después del Excel: si falta openpyxl no queda un CSV vacío abierto
+    if csv_path:
+        csv_file = open(csv_path, "w", newline="", encoding="utf-8-sig")
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(header)
+
+    count = 0
+    cancelled = False
+    saving = done = False
+    try:
+        for row in clean:
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            values = [row.get(c, "") for c in columns]
+            if csv_writer:
+                csv_writer.writerow(values)
+            if sheet is not None:
+                sheet.append(values)
+            count += 1
+            if progress_callback and count % _PROGRESS_EVERY == 0:
+                progress_callback(count, total, f"Escribiendo {count:,} filas...".replace(",", "."))
+        if workbook is not None and not cancelled:
+            saving = True
+            workbook.save(xlsx_path)
+        done = True
+    finally:
+        if csv_file:
+            csv_file.close()
+        if cancelled or not done:
+            # Sin archivos a medias que parezcan una exportación completa
+            for path in (csv_path if csv_file else None, xlsx_path if saving else None):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    if cancelled:
+        csv_path = xlsx_path = None
+    elif progress_callback:
+        progress_callback(count, total, f"{count:,} filas escritas.".replace(",", "."))
+
+    return {
+        "rows": count,
+        "csv": os.path.abspath(csv_path) if csv_path else "",
+        "xlsx": os.path.abspath(xlsx_path) if xlsx_path else "",
+        "cancelled": cancelled,
+    }
+
+
+# Cada cuántas filas export_rows informa progreso
+_PROGRESS_EVERY = 500
+
+
+# Ancho aproximado (caracteres) de cada columna en exportaciones en streaming
+_EXCEL_WIDTHS = {
+    "store": 25, "subject": 50, "sender_name": 25, "sender_email": 30, "to": 30, "cc": 20,
+    "date": 10, "time": 8, "body_preview": 50, "attachment_names": 40,
+    "categories": 15, "body_matches": 30,
+}
+
+
 def generate_summary(results: list) -> dict:
     """
     Genera un resumen estadístico de los resultados de búsqueda.
@@ -154,14 +259,18 @@ def generate_summary(results: list) -> dict:
 
 def _clean_for_export(results: list) -> list:
     """Limpia los resultados para exportación (elimina objetos COM)."""
-    clean = []
+    return list(_iter_clean_rows(results))
+
+
+def _iter_clean_rows(results):
+    """Versión perezosa de _clean_for_export: limpia fila a fila."""
     for r in results:
-        row = {k: v for k, v in r.items() if k != "_outlook_item"}
+        row = {k: v for k, v in r.items() if k in COLUMN_NAMES}
         # Convertir listas a string
-        if "attachment_names" in row:
-            row["attachment_names"] = ", ".join(row["attachment_names"])
-        clean.append(row)
-    return clean
+        for key in ("attachment_names", "body_matches"):
+            if key in row:
+                row[key] = ", ".join(row[key])
+        yield row
 
 
 def _truncate(text: str, max_len: int) -> str:
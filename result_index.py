@@ -0,0 +1,135 @@
+"""
+Índice invertido en memoria sobre resultados ya cargados (filtro instantáneo).
+Indexa asunto, remitente, destinatarios y nombres de adjuntos de cada fila a
+medida que llegan (búsqueda, páginas siguientes) y responde filtros por
+prefijo sin volver a consultar Outlook:
+
+    index = ResultIndex()
+    index.add(rows)
+    index.search("juan fact")   # posiciones con un término 'juan*' y otro 'fact*'
+
+Los términos se comparan sin mayúsculas ni tildes ('reunion' encuentra
+'Reunión') y todos deben coincidir con el comienzo de alguna palabra.
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+# Campos de la fila que se indexan
+INDEXED_FIELDS = ("subject", "sender_name", "sender_email", "to", "cc", "attachment_names")
+
+# Prefijos recordados (al escribir, cada tecla repite los anteriores)
+_CACHE_SIZE = 64
+# Los prefijos de hasta esta cantidad de letras tienen posiciones precalculadas:
+# abarcan gran parte del vocabulario y unirlas al escribir la primera tecla es lento
+_SHORT_PREFIX = 2
+_SHORT_LENGTHS = range(1, _SHORT_PREFIX + 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Texto en minúsculas y sin tildes."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    """Palabras normalizadas de un texto."""
+    if text.isascii():
+        return _WORD_RE.findall(text.lower())
+    return _WORD_RE.findall(fold(text))
+
+
+class ResultIndex:
+    """
+    Índice de palabras -> posiciones de fila (en el orden en que se agregaron).
+
+    Attributes:
+        rows: Cantidad de filas indexadas
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.rows = 0
+        self._postings = {}  # palabra -> array de posiciones (crecientes)
+        self._short = {}     # prefijo corto -> array de posiciones (crecientes)
+        self._vocab = None   # palabras ordenadas (se rearma al buscar si hay nuevas)
+        self._cache = {}     # prefijo -> set de posiciones
+
+    def __len__(self):
+        return self.rows
+
+    def add(self, rows):
+        """Indexa filas nuevas; sus posiciones siguen a las ya indexadas."""
+        postings = self._postings
+        short = self._short
+        for row in rows:
+            position = self.rows
+            self.rows += 1
+            words = set()
+            for field in INDEXED_FIELDS:
+                value = row.get(field)
+                if not value:
+                    continue
+                if not isinstance(value, str):
+                    value = " ".join(value)  # attachment_names es una lista
+                words.update(tokenize(value))
+            for word in words:
+                posting = postings.get(word)
+                if posting is None:
+                    posting = postings[word] = array("I")
+                    self._vocab = None
+                posting.append(position)
+            for prefix in {word[:n] for word in words for n in _SHORT_LENGTHS}:
+                posting = short.get(prefix)
+                if posting is None:
+                    posting = short[prefix] = array("I")
+                posting.append(position)
+        self._cache.clear()
+
+    def search(self, text: str):
+        """
+        Posiciones de las filas que coinciden con todos los términos.
+
+        Returns:
+            set de posiciones, o None si el texto no tiene términos (sin filtro)
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return None
+        result = None
+        # Los términos largos suelen ser los más selectivos: se intersecta desde ahí
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self._prefix(term)
+            result = set(matches) if result is None else result & matches
+            if not result:
+                break
+        return result
+
+    def _prefix(self, prefix: str) -> set:
+        cached = self._cache.get(prefix)
+        if cached is not None:
+            return cached
+        if len(prefix) <= _SHORT_PREFIX:
+            matches = set(self._short.get(prefix, ()))
+            self._remember(prefix, matches)
+            return matches
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        vocab = self._vocab
+        lo = bisect_left(vocab, prefix)
+        hi = bisect_left(vocab, prefix + "￿", lo)
+        matches = set()
+        for word in vocab[lo:hi]:
+            matches.update(self._postings[word])
+        self._remember(prefix, matches)
+        return matches
+
+    def _remember(self, prefix: str, matches: set):
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[prefix] = matches
@@ -0,0 +1,309 @@
+"""
+Almacén de resultados con memoria acotada.
+Se comporta como una lista de filas (len, índice, iteración, append/extend),
+pero solo mantiene en memoria las más recientes: al superar el presupuesto las
+más antiguas se pasan a un archivo SQLite temporal y se leen por páginas
+cuando se piden. Así una búsqueda de cientos de miles de correos no agota la
+memoria del worker ni de la GUI:
+
+    store = ResultStore(memory_rows=20000)
+    store.extend(page)          # puede volcar filas antiguas a disco
+    store[150000]               # lectura aleatoria (página en caché)
+    export_rows(store, ...)     # recorre disco y memoria en orden
+
+Las filas leídas desde disco son copias sin las claves internas ('_outlook_item'
+y similares): el objeto COM se recupera por EntryID cuando se necesita
+(EmailSearch.get_item). Cada almacén se usa desde un solo thread (la conexión
+SQLite es de su thread) y el archivo se borra con close() o al liberarlo.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableSequence
+
+# Filas en memoria por almacén (variable de entorno para ajustarlo por equipo)
+MEMORY_ROWS_ENV = "OUTLOOK_SEARCH_MEMORY_ROWS"
+DEFAULT_MEMORY_ROWS = 50_000
+
+# Filas por página leída desde disco (acceso aleatorio) y páginas recordadas
+PAGE_ROWS = 250
+_CACHED_PAGES = 32
+
+# Filas por lectura al recorrer todo el almacén
+_SCAN_ROWS = 5000
+
+_SPILLED_MSG = ("Los resultados más antiguos ya están en disco: solo se pueden "
+                "modificar las filas que siguen en memoria.")
+
+
+def default_memory_rows() -> int:
+    """Presupuesto de filas en memoria (OUTLOOK_SEARCH_MEMORY_ROWS o el predeterminado)."""
+    try:
+        return max(PAGE_ROWS, int(os.environ.get(MEMORY_ROWS_ENV, DEFAULT_MEMORY_ROWS)))
+    except ValueError:
+        return DEFAULT_MEMORY_ROWS
+
+
+class ResultStore(MutableSequence):
+    """
+    Lista de resultados que vuelca a SQLite las filas antiguas.
+
+    Las posiciones 0..spilled-1 están en disco y el resto en memoria. Las
+    modificaciones (insert, asignación, del) solo se admiten sobre la parte
+    en memoria; append/extend y update_row siempre.
+
+    Attributes:
+        memory_rows: Máximo de filas en memoria antes de volcar a disco
+        path: Archivo SQLite con las filas volcadas (None si todo está en memoria)
+        with_attachments: Filas con adjuntos (sin recorrer el disco)
+    """
+
+    def __init__(self, rows=(), memory_rows: int = None, directory: str = None):
+        """
+        Args:
+            rows: Filas iniciales
+            memory_rows: Presupuesto de filas en memoria (None = default_memory_rows())
+            directory: Directorio del archivo temporal (None = el del sistema)
+        """
+        self.memory_rows = memory_rows or default_memory_rows()
+        self.directory = directory
+        self.with_attachments = 0
+        self._memory = []   # filas desde la posición _spilled
+        self._spilled = 0
+        self.path = None
+        self._db = None
+        self._pages = OrderedDict()  # número de página -> filas (LRU)
+        self._finalizer = None
+        self.extend(rows)
+
+    @property
+    def spilled(self) -> int:
+        """Cantidad de filas que están en disco."""
+        return self._spilled
+
+    def close(self):
+        """Vacía el almacén y borra su archivo temporal."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._db = self.path = None
+        self._memory = []
+        self._spilled = 0
+        self._pages.clear()
+        self.with_attachments = 0
+
+    # === Lectura ===
+
+    def __len__(self):
+        return self._spilled + len(self._memory)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        i = self._position(index)
+        if i >= self._spilled:
+            return self._memory[i - self._spilled]
+        page = self._page(i // PAGE_ROWS)
+        return page[i % PAGE_ROWS]
+
+    def __iter__(self):
+        for start in range(0, self._spilled, _SCAN_ROWS):
+            yield from self._read(start, _SCAN_ROWS)
+        yield from list(self._memory)
+
+    def known_entries(self, entry_ids) -> set:
+        """EntryIDs del conjunto dado que ya están en el almacén."""
+        wanted = {e for e in entry_ids if e}
+        if not wanted:
+            return set()
+        found = {r.get("entry_id") for r in self._memory} & wanted
+        if self._db is not None:
+            pending = list(wanted - found)
+            for start in range(0, len(pending), 500):  # límite de parámetros SQLite
+                chunk = pending[start:start + 500]
+                found.update(e for e, in self._db.execute(
+                    f"SELECT entry_id FROM rows WHERE entry_id IN ({','.join('?' * len(chunk))})",
+                    chunk))
+        return found
+
+    # === Escritura ===
+
+    def append(self, row):
+        self._memory.append(row)
+        self.with_attachments += bool(row.get("has_attachments"))
+        if len(self._memory) > self.memory_rows:
+            self._spill()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def insert(self, index, row):
+        i = min(max(0, index + len(self) if index < 0 else index), len(self))
+        if i < self._spilled:
+            raise RuntimeError(_SPILLED_MSG)
+        self._memory.insert(i - self._spilled, row)
+        self.with_attachments += bool(row.get("has_attachments"))
+        if len(self._memory) > self.memory_rows:
+            self._spill()
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            if self._spilled:
+                raise RuntimeError(_SPILLED_MSG)
+            self._memory[index] = value
+            self.with_attachments = sum(bool(r.get("has_attachments")) for r in self._memory)
+            return
+        i = self._local(index)
+        self.with_attachments += (bool(value.get("has_attachments"))
+                                  - bool(self._memory[i].get("has_attachments")))
+        self._memory[i] = value
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            if self._spilled:
+                raise RuntimeError(_SPILLED_MSG)
+            del self._memory[index]
+            self.with_attachments = sum(bool(r.get("has_attachments")) for r in self._memory)
+            return
+        i = self._local(index)
+        self.with_attachments -= bool(self._memory[i].get("has_attachments"))
+        del self._memory[i]
+
+    def update_row(self, index: int, changes: dict):
+        """
+        Modifica campos de una fila, esté en memoria o en disco (p. ej. el
+        EntryID nuevo de un correo movido). En disco no se guardan las claves
+        internas ('_outlook_item').
+        """
+        i = self._position(index)
+        if i >= self._spilled:
+            row = self._memory[i - self._spilled]
+            self.with_attachments -= bool(row.get("has_attachments"))
+            row.update(changes)
+            self.with_attachments += bool(row.get("has_attachments"))
+            return
+        page = self._pages.get(i // PAGE_ROWS)
+        row = page[i % PAGE_ROWS] if page is not None else self._read(i, 1)[0]
+        self.with_attachments -= bool(row.get("has_attachments"))
+        row.update({k: v for k, v in changes.items() if not k.startswith("_")})
+        self.with_attachments += bool(row.get("has_attachments"))
+        with self._db:
+            self._db.execute("UPDATE rows SET entry_id = ?, data = ? WHERE pos = ?",
+                             (row.get("entry_id"), _dumps(row), i))
+
+    # === Disco ===
+
+    def _position(self, index: int) -> int:
+        n = len(self)
+        i = index + n if index < 0 else index
+        if not 0 <= i < n:
+            raise IndexError("índice fuera de rango")
+        return i
+
+    def _local(self, index: int) -> int:
+        i = self._position(index)
+        if i < self._spilled:
+            raise RuntimeError(_SPILLED_MSG)
+        return i - self._spilled
+
+    def _open(self):
+        fd, path = tempfile.mkstemp(prefix="resultados_", suffix=".sqlite", dir=self.directory)
+        os.close(fd)
+        db = sqlite3.connect(path, check_same_thread=False)  # close() al salir, desde otro thread
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute("CREATE TABLE rows (pos INTEGER PRIMARY KEY, entry_id TEXT, data TEXT)")
+        db.execute("CREATE INDEX rows_entry ON rows (entry_id)")
+        self._db, self.path = db, path
+        self._finalizer = weakref.finalize(self, _discard, db, path)
+
+    def _spill(self):
+        """Pasa a disco las filas más antiguas en memoria (deja la mitad del presupuesto)."""
+        if self._db is None:
+            self._open()
+        keep = self.memory_rows // 2
+        # Se vuelcan páginas completas: las lecturas no mezclan disco y memoria
+        n = (len(self._memory) - keep) // PAGE_ROWS * PAGE_ROWS or len(self._memory) - keep
+        moving, self._memory = self._memory[:n], self._memory[n:]
+        start = self._spilled
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO rows (pos, entry_id, data) VALUES (?, ?, ?)",
+                ((start + k, r.get("entry_id"), _dumps(r)) for k, r in enumerate(moving)),
+            )
+        self._spilled += n
+        self._pages.pop(start // PAGE_ROWS, None)  # la página incompleta ahora tiene más filas
+
+    def _read(self, start: int, count: int) -> list:
+        end = min(start + count, self._spilled)
+        return [json.loads(data) for data, in self._db.execute(
+            "SELECT data FROM rows WHERE pos >= ? AND pos < ? ORDER BY pos", (start, end))]
+
+    def _page(self, number: int) -> list:
+        page = self._pages.get(number)
+        if page is None:
+            page = self._pages[number] = self._read(number * PAGE_ROWS, PAGE_ROWS)
+            if len(self._pages) > _CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page
+
+
+class StoreCursor:
+    """
+    Páginas de un ResultStore ya lleno, con la interfaz de search.ResultCursor
+    (fetch, has_more, close). Así el worker entrega los resultados de una
+    búsqueda completa de a una página, como los de una búsqueda paginada,
+    en vez de copiarlos todos de una vez. Debe usarse desde el thread dueño
+    del almacén.
+    """
+
+    def __init__(self, store: ResultStore, page_size: int = PAGE_ROWS):
+        self.store = store
+        self.page_size = page_size
+        self.fetched = 0
+        self.cancelled = False
+        self.plan = None
+        self.last_used = time.monotonic()
+
+    @property
+    def has_more(self) -> bool:
+        return self.store is not None and self.fetched < len(self.store)
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def fetch(self, n: int = None, progress_callback=None, cancel_event=None) -> list:
+        """Siguiente página (las filas en memoria conservan '_outlook_item')."""
+        if self.store is None:
+            return []
+        n = n or self.page_size
+        page = self.store[self.fetched:self.fetched + n]
+        self.fetched += len(page)
+        self.last_used = time.monotonic()
+        return page
+
+    def close(self):
+        """Suelta el almacén (lo sigue cerrando su dueño)."""
+        self.store = None
+
+
+def _dumps(row: dict) -> str:
+    # Las claves internas ('_outlook_item', ...) no se guardan
+    return json.dumps({k: v for k, v in row.items() if not k.startswith("_")},
+                      ensure_ascii=False, default=str)
+
+
+def _discard(db, path):
+    db.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
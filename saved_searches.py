@@ -0,0 +1,199 @@
+"""
+Búsquedas guardadas con actualización incremental (delta sync).
+Cada búsqueda se guarda con sus parámetros, su último conjunto de resultados
+y una marca de agua (ReceivedTime/EntryID del correo más reciente). Al
+actualizarla solo se consultan los correos posteriores a la marca de agua y
+se fusionan con los resultados guardados, marcando los nuevos.
+"""
+
+import heapq
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional, Callable
+
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".outlook_search", "saved")
+
+# Solapamiento al consultar desde la marca de agua. Los filtros DASL de fecha
+# se evalúan con la zona horaria del almacén; un día de margen evita perder
+# correos por diferencias horarias, y los repetidos se descartan por EntryID.
+WATERMARK_OVERLAP = timedelta(days=1)
+
+_RECEIVED_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+class SavedSearchStore:
+    """Persistencia de búsquedas guardadas (un archivo JSON por búsqueda)."""
+
+    def __init__(self, directory: str = DEFAULT_DIR):
+        """
+        Args:
+            directory: Carpeta donde se guardan las búsquedas
+        """
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        slug = re.sub(r"[^\w\-]+", "_", name.strip(), flags=re.UNICODE).strip("_") or "busqueda"
+        return os.path.join(self.directory, f"{slug}.json")
+
+    def list_names(self) -> list:
+        """Nombres de las búsquedas guardadas, ordenados."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = []
+        for fn in os.listdir(self.directory):
+            if fn.endswith(".json"):
+                try:
+                    names.append(self.load(os.path.join(self.directory, fn))["name"])
+                except (OSError, ValueError, KeyError):
+                    continue
+        return sorted(names, key=str.lower)
+
+    def load(self, name_or_path: str) -> dict:
+        """Carga una búsqueda guardada por nombre (o ruta del archivo)."""
+        path = name_or_path if name_or_path.endswith(".json") else self._path(name_or_path)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, name: str) -> Optional[dict]:
+        """Búsqueda guardada por nombre, o None si no existe."""
+        try:
+            return self.load(name)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, name: str, params: dict, results: list) -> dict:
+        """
+        Guarda (o reemplaza) una búsqueda con su conjunto de resultados.
+
+        Args:
+            name: Nombre de la búsqueda
+            params: Parámetros de EmailSearch.search (serializables)
+            results: Resultados limpios (sin '_outlook_item')
+
+        Returns:
+            El registro guardado
+        """
+        rows = [_storable(r) for r in results]
+        for r in rows:
+            r["is_new"] = False
+        record = {
+            "name": name,
+            "params": params,
+            "results": rows,
+            "watermark": _watermark(rows),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "last_refresh": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._write(record)
+        return record
+
+    def delete(self, name: str):
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+
+    def _write(self, record: dict, results=None):
+        """
+        Escribe el registro (reemplazo atómico). Si se indica results, las
+        filas se escriben a medida que se recorren en vez de las de
+        record['results'] (p. ej. un ResultStore con parte de ellas en disco).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(record["name"])
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            if results is None:
+                json.dump(record, f, ensure_ascii=False)
+            else:
+                head = {k: v for k, v in record.items() if k != "results"}
+                f.write(json.dumps(head, ensure_ascii=False)[:-1] + ', "results": [')
+                for i, row in enumerate(results):
+                    f.write((", " if i else "") + json.dumps(_storable(row), ensure_ascii=False))
+                f.write("]}")
+        os.replace(tmp, path)
+
+    def refresh(
+        self,
+        name: str,
+        searcher,
+        progress_callback: Optional[Callable] = None,
+        cancel_event=None,
+        out: Optional[list] = None,
+    ) -> tuple:
+        """
+        Actualiza una búsqueda guardada consultando solo correos nuevos.
+
+        Los nuevos llegan ordenados por fecha, igual que los guardados: se
+        intercalan a medida que se leen, sin armar ni ordenar una lista con
+        ambos.
+
+        Args:
+            name: Nombre de la búsqueda guardada
+            searcher: Instancia de EmailSearch
+            progress_callback: Igual que en EmailSearch.search
+            cancel_event: Evento para detener la consulta
+            out: Lista (o ResultStore) donde se agregan los resultados
+                 fusionados; None = una lista nueva
+
+        Returns:
+            Tupla (out con COM refs en los nuevos, cantidad de nuevos)
+        """
+        record = self.load(name)
+        params = dict(record["params"])
+        known = {r["entry_id"] for r in record["results"] if r.get("entry_id")}
+
+        mark = record.get("watermark") or {}
+        if mark.get("received"):
+            since = datetime.strptime(mark["received"], _RECEIVED_FMT) - WATERMARK_OVERLAP
+            params["received_after"] = since
+
+        n_new = 0
+
+        def fresh():
+            nonlocal n_new
+            for row in searcher.iter_search(
+                progress_callback=progress_callback, cancel_event=cancel_event, **params
+            ):
+                if row.get("entry_id") and row["entry_id"] in known:
+                    continue
+                row["is_new"] = True
+                n_new += 1
+                yield row
+
+        previous = record.pop("results")
+        for r in previous:
+            r["is_new"] = False
+        previous.sort(key=_received, reverse=True)  # ya suele venir ordenada: casi gratis
+
+        out = [] if out is None else out
+        newest = None
+        for row in heapq.merge(fresh(), previous, key=_received, reverse=True):
+            out.append(row)
+            if newest is None:
+                newest = row
+        del previous  # las filas que out ya pasó a disco se liberan
+
+        if not (cancel_event and cancel_event.is_set()):
+            record["watermark"] = _watermark([newest] if newest else [])
+            record["last_refresh"] = datetime.now().isoformat(timespec="seconds")
+            self._write(record, out)
+        return out, n_new
+
+
+def _received(row: dict) -> str:
+    return row.get("received", "")
+
+
+def _storable(row: dict) -> dict:
+    return {k: v for k, v in row.items() if k != "_outlook_item"}
+
+
+def _watermark(rows: list) -> dict:
+    newest = max(rows, key=lambda r: r.get("received", ""), default=None)
+    if not newest or not newest.get("received"):
+        return {}
+    return {"received": newest["received"], "entry_id": newest.get("entry_id", "")}
@@ -4,21 +4,70 @@ Permite búsquedas flexibles por múltiples criterios con soporte de filtros DAS
 """
 
 import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterator
+
+from dasl import format_date, compile_filter
+from instrumentation import INSTRUMENTATION
+from query import compile_query, compile_item_predicate, escape, item_value, recipients_text
+from planner import QueryPlanner, LOCAL_SELECTIVITY, advanced_search
+import threads
+from content_match import BATCH_BODIES, BodyMatchPool, ContentMatcher
+
+# Vista previa del cuerpo calculada por Outlook (PidTagPreview, texto plano)
+PR_PREVIEW = "http://schemas.microsoft.com/mapi/proptag/0x3FD9001F"
+PREVIEW_CHARS = 200
+# Sin PR_PREVIEW, se lee Body solo en correos de hasta este tamaño (bytes)
+PREVIEW_BODY_MAX_SIZE = 32 * 1024
+# Dirección SMTP del remitente (PidTagSenderSmtpAddress), también para Exchange
+PR_SENDER_SMTP = "http://schemas.microsoft.com/mapi/proptag/0x5D01001F"
+
+# Columnas que lee la estrategia 'table' para armar la fila sin abrir el
+# correo: {columna de Folder.GetTable: atributo de _TableItem}
+TABLE_COLUMNS = {
+    "EntryID": "EntryID", "Subject": "Subject", "SenderName": "SenderName",
+    "SenderEmailAddress": "SenderEmailAddress", "To": "To", "CC": "CC",
+    "ReceivedTime": "ReceivedTime", "Importance": "Importance",
+    "Categories": "Categories", "Size": "Size",
+    "urn:schemas:httpmail:hasattachment": "HasAttachment",
+    PR_PREVIEW: "Preview", PR_SENDER_SMTP: "SenderSmtpAddress",
+}
 
 
 class EmailSearch:
     """Motor de búsqueda de correos en Outlook."""
 
+    # Filas que se asume leerá una búsqueda sin límite (cursor) al planificarla
+    UNBOUNDED_PLAN_ROWS = 1000
+    # Mínimo de filas del primer bloque de la estrategia 'table' (un bloque
+    # chico evita leer cientos de filas para pocos resultados)
+    TABLE_FIRST_ROWS = 100
+
+    # Procesos para buscar body_terms/body_regex (None = núcleos - 1)
+    MATCH_PROCESSES = None
+
     def __init__(self, outlook_client):
         """
         Args:
-            outlook_client: Instancia de OutlookClient
+            outlook_client: Origen de correo (backend.MailBackend: OutlookClient
+                            o archive.ArchiveBackend)
         """
         self.client = outlook_client
+        self.planner = QueryPlanner()
+        self.last_plan = None  # plan de la última búsqueda (ver explain)
+
+    def search(self, **filters) -> list:
+        """
+        Busca correos con múltiples filtros.
+        Acepta los mismos argumentos que iter_search.
 
-    def search(
+        Returns:
+            Lista de diccionarios con datos de cada correo
+        """
+        return list(self.iter_search(**filters))
+
+    def iter_search(
         self,
         subject: Optional[str] = None,
         sender: Optional[str] = None,
@@ -28,13 +77,22 @@ class EmailSearch:
         has_attachments: Optional[bool] = None,
         body_contains: Optional[str] = None,
         recipient: Optional[str] = None,
-        max_results: int = 500,
+        max_results: Optional[int] = 500,
         subfolder: Optional[str] = None,
+        folder_path: Optional[str] = None,
+        received_after: Optional[datetime] = None,
+        query: Optional[str] = None,
+        strategy: Optional[str] = None,
+        store_id: Optional[str] = None,
+        body_terms: Optional[list] = None,
+        body_regex: Optional[list] = None,
+        body_match: str = "any",
         progress_callback: Optional[Callable] = None,
         cancel_event: Optional[threading.Event] = None,
-    ) -> list:
+    ) -> Iterator[dict]:
         """
-        Busca correos con múltiples filtros.
+        Busca correos con múltiples filtros, entregándolos a medida que se
+        encuentran (permite volcarlos a disco sin acumularlos en memoria).
         
         Args:
             subject: Texto a buscar en el asunto (parcial)
@@ -45,77 +103,428 @@ class EmailSearch:
             has_attachments: Filtrar por adjuntos (True/False/None)
             body_contains: Texto a buscar en el cuerpo
             recipient: Destinatario (para carpeta sent)
-            max_results: Máximo de resultados a retornar
+            max_results: Máximo de resultados a retornar (None = sin límite,
+                         ver open_cursor)
             subfolder: Subcarpeta dentro de la carpeta principal
-            progress_callback: Función opcional (current, message) para reportar progreso
+            folder_path: Ruta completa de cualquier carpeta del buzón
+                         (ej: 'Cuenta/Bandeja de entrada/Proyectos'); si se
+                         indica, tiene prioridad sobre folder
+            received_after: Solo correos recibidos desde este instante
+                            (marca de agua de las búsquedas guardadas)
+            query: Consulta en el lenguaje de query.py (ej: 'from:juan
+                   has:attachment'); se combina con AND con los demás filtros
+            strategy: Forzar una estrategia del planificador ('restrict',
+                      'find', 'table', 'advanced_search'); None = la de
+                      menor costo estimado
+            store_id: Buscar folder en otro almacén (buzón compartido, PST);
+                      ver OutlookClient.list_stores y multistore.search_stores
+            body_terms: Lista de textos a buscar en el cuerpo, todos a la vez
+                        (p. ej. 500 números de cuenta); ver content_match
+            body_regex: Lista de expresiones regulares a buscar en el cuerpo
+            body_match: 'any' = basta un término/expresión; 'all' = todos.
+                        Las filas traen 'body_matches' con lo encontrado
+            progress_callback: Función opcional (current, message, scanned=, total=)
+                               para reportar progreso: current = coincidencias,
+                               scanned = ítems revisados, total = ítems a revisar
+            cancel_event: Evento opcional que detiene la búsqueda al activarse
             
-        Returns:
-            Lista de diccionarios con datos de cada correo
+        Yields:
+            Diccionarios con datos de cada correo
         """
         # Obtener la carpeta
-        try:
-            target_folder = self.client.get_default_folder(folder)
-            if subfolder:
-                target_folder = target_folder.Folders[subfolder]
-        except Exception as e:
-            raise ValueError(f"Error al acceder a la carpeta: {e}")
+        target_folder = self.resolve_folder(folder, folder_path, subfolder, store_id)
+        # Fuera del almacén predeterminado GetItemFromID necesita el StoreID:
+        # se guarda en cada fila (detalle, adjuntos, acciones masivas)
+        row_store = target_folder.StoreID if (store_id or folder_path) else None
 
         # Construir filtro DASL para mejor rendimiento
         dasl_filter = self._build_dasl_filter(
-            subject, sender, date_from, date_to, has_attachments
+            subject, sender, date_from, date_to, has_attachments, received_after
         )
+        local_predicate = None
+        if query:
+            compiled = compile_query(query)
+            dasl_filter = _and_filters(dasl_filter, compiled.dasl)
+            local_predicate = compiled.predicate
+        # Si el origen busca en el cuerpo (IMAP), se filtra allá y no se lee Body
+        local_body = body_contains
+        if body_contains and self.client.server_body_search:
+            dasl_filter = _and_filters(
+                dasl_filter, f"@SQL=\"urn:schemas:httpmail:textdescription\" LIKE '%{escape(body_contains)}%'"
+            )
+            local_body = None
+        content = None
+        if body_terms or body_regex:
+            content = ContentMatcher(body_terms or (), body_regex or (), match_all=body_match == "all")
+
+        # Elegir estrategia de ejecución según costo estimado
+        local_selectivity = 1.0
+        if local_body:
+            local_selectivity *= LOCAL_SELECTIVITY["body_contains"]
+        if content:
+            local_selectivity *= LOCAL_SELECTIVITY["body_contains"]
+        if recipient:
+            local_selectivity *= LOCAL_SELECTIVITY["recipient"]
+        if local_predicate:
+            local_selectivity *= LOCAL_SELECTIVITY["query"]
+        planned_rows = max_results if max_results is not None else self.UNBOUNDED_PLAN_ROWS
+        plan = self.planner.plan(target_folder, dasl_filter, planned_rows, local_selectivity,
+                                 strategy=strategy)
+        self.last_plan = plan
+        started = time.perf_counter()
+        count = 0
+        scanned = 0
 
         # Ejecutar búsqueda
-        results = []
         try:
-            items = target_folder.Items
-            items.Sort("[ReceivedTime]", True)  # Más recientes primero
-
-            if dasl_filter:
-                items = items.Restrict(dasl_filter)
-
-            count = 0
-            for item in items:
-                if count >= max_results:
-                    break
-                if cancel_event and cancel_event.is_set():
-                    break
+            items, total = self._candidates(
+                target_folder, dasl_filter, plan.strategy, cancel_event,
+                want_total=progress_callback is not None,
+                expected_rows=max(self.TABLE_FIRST_ROWS, round(plan.est_scanned)),
+            )
+            if progress_callback and total is None:
+                total = round(plan.est_matches) or None
 
+            def candidates():
+                """Correos que pasan los filtros locales, en orden."""
+                nonlocal scanned
+                # Con body_terms/body_regex el cuerpo se lee aquí (thread COM)
+                # y se analiza por lotes en procesos aparte, en paralelo
+                pool = BodyMatchPool(content, self.MATCH_PROCESSES) if content else None
+                batch = []
                 try:
-                    # Filtros adicionales que no se pueden hacer con DASL
-                    if body_contains and body_contains.lower() not in (
-                        item.Body or ""
-                    ).lower():
-                        continue
-
-                    if recipient:
-                        recipients_str = ""
+                    for item in items:
+                        if cancel_event and cancel_event.is_set():
+                            return
+                        scanned += 1
+                        if progress_callback and scanned % 25 == 0:
+                            progress_callback(count, f"Encontrados: {count} correos...",
+                                              scanned=scanned, total=total)
+
                         try:
-                            for r in range(item.Recipients.Count):
-                                recip = item.Recipients.Item(r + 1)
-                                recipients_str += (
-                                    f"{recip.Name} {recip.Address} "
-                                )
+                            # Filtros adicionales que no se pueden hacer con DASL
+                            if local_body and local_body.lower() not in (
+                                item.Body or ""
+                            ).lower():
+                                continue
+
+                            if recipient and recipient.lower() not in recipients_text(item):
+                                continue
+
+                            if local_predicate and not local_predicate(item):
+                                continue
+
+                            if pool is not None:
+                                batch.append((item, item.Body or ""))
+                                email_data = None
+                            else:
+                                with INSTRUMENTATION.span("EmailSearch._extract_email_data"):
+                                    email_data = self._extract_email_data(item)
                         except Exception:
-                            pass
-                        if recipient.lower() not in recipients_str.lower():
                             continue
 
-                    email_data = self._extract_email_data(item)
-                    results.append(email_data)
-                    count += 1
+                        if email_data is not None:
+                            yield email_data
+                        elif len(batch) >= BATCH_BODIES:
+                            pool.submit([body for _, body in batch], [it for it, _ in batch])
+                            batch = []
+                            yield from self._body_matches(
+                                pool.ready(wait=len(pool) >= pool.max_inflight), content)
+                    if pool is not None:
+                        if batch:
+                            pool.submit([body for _, body in batch], [it for it, _ in batch])
+                        yield from self._body_matches(pool.drain(), content)
+                finally:
+                    if pool is not None:
+                        pool.close()
 
+            rows = candidates()
+            try:
+                for email_data in rows:
+                    count += 1
+                    if row_store:
+                        email_data["store_id"] = row_store
                     if progress_callback:
-                        progress_callback(count, f"Encontrados: {count} correos...")
+                        progress_callback(count, f"Encontrados: {count} correos...",
+                                          scanned=scanned, total=total)
+                    yield email_data
+                    if max_results is not None and count >= max_results:
+                        break
+            finally:
+                rows.close()  # termina el pool de procesos, si hay
+
+        except Exception as e:
+            raise RuntimeError(f"Error durante la búsqueda: {e}")
+        finally:
+            plan.actual = {"scanned": scanned, "matched": count,
+                           "seconds": time.perf_counter() - started}
 
+    def _body_matches(self, batches, content) -> Iterator[dict]:
+        """Filas de los correos de lotes analizados que cumplen content."""
+        for found_lists, batch_items in batches:
+            for item, found in zip(batch_items, found_lists):
+                if not content.accepts(found):
+                    continue
+                try:
+                    with INSTRUMENTATION.span("EmailSearch._extract_email_data"):
+                        email_data = self._extract_email_data(item)
                 except Exception:
                     continue
+                email_data["body_matches"] = found
+                yield email_data
+
+    def open_cursor(self, page_size: int = 100, **filters) -> "ResultCursor":
+        """
+        Abre un cursor sobre una búsqueda sin límite de resultados.
+        La colección de Outlook (Items restringido, tabla o Find/FindNext)
+        queda abierta y conserva su posición: cada página continúa donde
+        terminó la anterior, sin volver a buscar desde el principio.
+
+        Args:
+            page_size: Correos por página
+            **filters: Mismos argumentos que iter_search (salvo max_results,
+                       cancel_event y progress_callback, que maneja el cursor)
+
+        Returns:
+            ResultCursor listo para pedir páginas con fetch()
+        """
+        filters.pop("max_results", None)
+        cursor = ResultCursor(page_size)
+        cursor._rows = self.iter_search(
+            max_results=None,
+            progress_callback=cursor._progress,
+            cancel_event=cursor,
+            **filters,
+        )
+        cursor._searcher = self
+        return cursor
+
+    def _candidates(self, folder, dasl_filter, strategy, cancel_event=None, want_total=False,
+                    expected_rows=None):
+        """
+        Correos que cumplen el filtro DASL, más recientes primero, según la
+        estrategia del plan. expected_rows (candidatos que se estima revisar)
+        fija el tamaño del primer bloque de la tabla.
+
+        Returns:
+            Tupla (iterable de MailItems, o de _TableItem con 'table'; total
+            conocido o None)
+        """
+        if strategy == "find":
+            items = folder.Items
+            items.Sort("[ReceivedTime]", True)
+            return _find_all(items, dasl_filter), None
 
+        if strategy == "table":
+            store_id = folder.StoreID
+            namespace = self.client.namespace
+            rows = threads.read_table(folder, dasl_filter, cancel_event, columns=tuple(TABLE_COLUMNS),
+                                      first_chunk=expected_rows)
+            open_item = lambda entry_id: namespace.GetItemFromID(entry_id, store_id)
+            return (_TableItem(row, open_item) for row in rows), None
+
+        if strategy == "advanced_search":
+            results = advanced_search(self.client.outlook, folder, dasl_filter,
+                                      cancel_event=cancel_event)
+            results.Sort("[ReceivedTime]", True)
+            return results, (results.Count if want_total else None)
+
+        items = folder.Items
+        items.Sort("[ReceivedTime]", True)  # Más recientes primero
+        if dasl_filter:
+            items = items.Restrict(dasl_filter)
+        total = None
+        if want_total:
+            try:
+                total = items.Count
+            except Exception:
+                pass
+        return items, total
+
+    def explain(self, execute: bool = True, **filters) -> str:
+        """
+        Plan de ejecución de una búsqueda (ver planner.Plan.explain).
+        
+        Args:
+            execute: Ejecutar la búsqueda para incluir filas reales revisadas
+            **filters: Mismos argumentos que iter_search
+            
+        Returns:
+            Texto con la estrategia elegida, costos estimados y, si se
+            ejecutó, filas estimadas vs reales
+        """
+        rows = self.iter_search(**filters)
+        if execute:
+            for _ in rows:
+                pass
+        else:
+            next(rows, None)  # planificar sin recorrer resultados
+            rows.close()
+            self.last_plan.actual = {}
+        return self.last_plan.explain()
+
+    def resolve_folder(
+        self,
+        folder: str = "inbox",
+        folder_path: Optional[str] = None,
+        subfolder: Optional[str] = None,
+        store_id: Optional[str] = None,
+    ):
+        """
+        Obtiene la carpeta de búsqueda a partir de los parámetros de search().
+        
+        Returns:
+            Objeto Folder de Outlook
+        """
+        try:
+            if folder_path:
+                target_folder = self.client.get_folder_by_path(folder_path)
+            else:
+                target_folder = self.client.get_default_folder(folder, store_id)
+            if subfolder:
+                target_folder = target_folder.Folders[subfolder]
+        except Exception as e:
+            raise ValueError(f"Error al acceder a la carpeta: {e}")
+        return target_folder
+
+    def search_threads(
+        self,
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        folder: str = "inbox",
+        has_attachments: Optional[bool] = None,
+        body_contains: Optional[str] = None,
+        recipient: Optional[str] = None,
+        max_threads: int = 200,
+        subfolder: Optional[str] = None,
+        folder_path: Optional[str] = None,
+        query: Optional[str] = None,
+        store_id: Optional[str] = None,
+        cancel_event=None,
+    ) -> list:
+        """
+        Busca correos y los agrupa por conversación sin abrir cada MailItem.
+        Los filtros de cuerpo y destinatario se evalúan en la tabla (DASL)
+        en vez de localmente.
+        
+        Args:
+            (mismos filtros que search)
+            max_threads: Máximo de hilos a retornar (los más recientes)
+            
+        Returns:
+            Lista de hilos (ver threads.group_rows); sin referencias COM
+        """
+        target_folder = self.resolve_folder(folder, folder_path, subfolder, store_id)
+        dasl_filter = self._build_dasl_filter(
+            subject, sender, date_from, date_to, has_attachments
+        )
+        if body_contains:
+            dasl_filter = _and_filters(
+                dasl_filter, f"@SQL=\"urn:schemas:httpmail:textdescription\" LIKE '%{escape(body_contains)}%'"
+            )
+        if recipient:
+            term = escape(recipient)
+            dasl_filter = _and_filters(
+                dasl_filter, f"@SQL=(\"urn:schemas:httpmail:displayto\" LIKE '%{term}%' OR "
+                             f"\"urn:schemas:httpmail:displaycc\" LIKE '%{term}%')"
+            )
+        if query:
+            compiled = compile_query(query)
+            if compiled.predicate:
+                raise ValueError(
+                    "La vista agrupada no admite los filtros "
+                    f"{', '.join(compiled.local_fields)}: requieren abrir cada correo."
+                )
+            dasl_filter = _and_filters(dasl_filter, compiled.dasl)
+
+        try:
+            rows = threads.read_table(target_folder, dasl_filter, cancel_event)
+            return threads.group_rows(rows, max_threads, store_id=target_folder.StoreID)
         except Exception as e:
             raise RuntimeError(f"Error durante la búsqueda: {e}")
 
+    def expand_thread(self, entry_ids: list, store_id: str = None) -> list:
+        """
+        Abre los correos de un hilo (al expandirlo en la vista agrupada).
+        
+        Args:
+            entry_ids: EntryIDs del hilo (ver search_threads)
+            store_id: StoreID del almacén de la carpeta
+            
+        Returns:
+            Lista de resultados con el mismo formato que search()
+        """
+        results = []
+        for entry_id in entry_ids:
+            try:
+                if store_id:
+                    item = self.client.namespace.GetItemFromID(entry_id, store_id)
+                else:
+                    item = self.client.namespace.GetItemFromID(entry_id)
+                results.append(self._extract_email_data(item))
+            except Exception:
+                continue
         return results
 
+    def compile_predicate(
+        self,
+        subject=None,
+        sender=None,
+        date_from=None,
+        date_to=None,
+        has_attachments=None,
+        body_contains=None,
+        recipient=None,
+        received_after=None,
+        query=None,
+        body_terms=None,
+        body_regex=None,
+        body_match="any",
+        **_ignored,
+    ) -> Callable:
+        """
+        Compila los filtros de búsqueda a un predicado Python sobre un MailItem.
+        Evalúa las mismas condiciones que search() (DASL + filtros locales)
+        sin consultar Outlook; se usa para decidir si un correo recién llegado
+        coincide con la búsqueda activa. Los parámetros de carpeta y límite
+        se ignoran.
+        
+        Returns:
+            Función predicate(item) -> bool
+        """
+        dasl_filter = self._build_dasl_filter(
+            subject, sender, date_from, date_to, has_attachments, received_after
+        )
+        dasl_pred = compile_filter(dasl_filter) if dasl_filter else None
+        body = body_contains.lower() if body_contains else None
+        recip = recipient.lower() if recipient else None
+        query_pred = compile_item_predicate(query) if query else None
+        content = None
+        if body_terms or body_regex:
+            content = ContentMatcher(body_terms or (), body_regex or (), match_all=body_match == "all")
+
+        def predicate(item) -> bool:
+            try:
+                if getattr(item, "Class", 43) != 43:  # solo MailItem (olMail)
+                    return False
+                if dasl_pred and not dasl_pred(lambda name: item_value(item, name)):
+                    return False
+                if body and body not in (item.Body or "").lower():
+                    return False
+                if recip and recip not in recipients_text(item):
+                    return False
+                if query_pred and not query_pred(item):
+                    return False
+                if content and not content.accepts(content.find(item.Body or "")):
+                    return False
+                return True
+            except Exception:
+                return False
+
+        return predicate
+
     def _build_dasl_filter(
         self,
         subject=None,
@@ -123,6 +532,7 @@ class EmailSearch:
         date_from=None,
         date_to=None,
         has_attachments=None,
+        received_after=None,
     ) -> str:
         """
         Construye un filtro DASL para Outlook.
@@ -135,14 +545,15 @@ class EmailSearch:
         if subject:
             # urn:schemas:httpmail:subject para búsqueda parcial
             conditions.append(
-                f"@SQL=\"urn:schemas:httpmail:subject\" LIKE '%{subject}%'"
+                f"@SQL=\"urn:schemas:httpmail:subject\" LIKE '%{escape(subject)}%'"
             )
 
         if sender:
             # Buscar por nombre o email del remitente
+            term = escape(sender)
             sender_filter = (
-                f"@SQL=(\"urn:schemas:httpmail:fromemail\" LIKE '%{sender}%' "
-                f"OR \"urn:schemas:httpmail:fromname\" LIKE '%{sender}%')"
+                f"@SQL=(\"urn:schemas:httpmail:fromemail\" LIKE '%{term}%' "
+                f"OR \"urn:schemas:httpmail:fromname\" LIKE '%{term}%')"
             )
             conditions.append(sender_filter)
 
@@ -172,6 +583,11 @@ class EmailSearch:
                     f"Formato de fecha_hasta inválido: {date_to}. Use DD-MM-YYYY"
                 )
 
+        if received_after is not None:
+            conditions.append(
+                f"@SQL=\"urn:schemas:httpmail:datereceived\" >= '{format_date(received_after)}'"
+            )
+
         if has_attachments is not None:
             val = "1" if has_attachments else "0"
             conditions.append(
@@ -209,13 +625,22 @@ class EmailSearch:
         Returns:
             Diccionario con los campos del correo
         """
+        if isinstance(item, _TableItem):
+            return self._extract_table_row(item)
         try:
             received_time = item.ReceivedTime
             date_str = received_time.strftime("%d-%m-%Y")
             time_str = received_time.strftime("%H:%M:%S")
+            received = received_time.strftime("%Y-%m-%d %H:%M:%S")
         except Exception:
             date_str = "N/A"
             time_str = "N/A"
+            received = ""
+
+        try:
+            entry_id = item.EntryID
+        except Exception:
+            entry_id = ""
 
         try:
             sender_email = item.SenderEmailAddress or "N/A"
@@ -248,10 +673,7 @@ class EmailSearch:
         except Exception:
             importance = "Normal"
 
-        try:
-            body_preview = (item.Body or "")[:200].replace("\r\n", " ").strip()
-        except Exception:
-            body_preview = ""
+        body_preview = self._body_preview(item)
 
         try:
             categories = item.Categories or ""
@@ -283,9 +705,186 @@ class EmailSearch:
             "importance": importance,
             "categories": categories,
             "size_kb": round(getattr(item, "Size", 0) / 1024, 1),
+            "entry_id": entry_id,        # identifica el correo entre sesiones
+            "received": received,        # fecha/hora ordenable (YYYY-MM-DD HH:MM:SS)
             "_outlook_item": item,  # Referencia interna para adjuntos
         }
 
+    def _body_preview(self, item) -> str:
+        """
+        Vista previa del cuerpo sin descargar el mensaje completo.
+        Usa PR_PREVIEW, que Outlook calcula también para correos solo HTML;
+        si el almacén no la tiene, lee Body únicamente en correos pequeños.
+        """
+        try:
+            text = item.PropertyAccessor.GetProperty(PR_PREVIEW)
+        except Exception:
+            text = None
+        if not text:
+            try:
+                if (item.Size or 0) > PREVIEW_BODY_MAX_SIZE:
+                    return ""
+                text = item.Body or ""
+            except Exception:
+                return ""
+        return _preview_text(text)
+
+    def _extract_table_row(self, row) -> dict:
+        """
+        Datos de un correo leído con la estrategia 'table', desde las columnas
+        de la tabla. El correo se abre solo para listar sus adjuntos, para
+        resolver un remitente Exchange sin dirección SMTP en la tabla o si
+        el almacén no tiene PR_PREVIEW. Como en el filtro has_attachments,
+        los correos que solo traen imágenes insertadas quedan sin adjuntos.
+
+        Args:
+            row: _TableItem
+
+        Returns:
+            Diccionario con los campos del correo (con '_outlook_item' solo
+            si el correo se abrió)
+        """
+        values = row.values
+        received_time = values["ReceivedTime"]
+        try:
+            date_str = received_time.strftime("%d-%m-%Y")
+            time_str = received_time.strftime("%H:%M:%S")
+            received = received_time.strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            date_str = "N/A"
+            time_str = "N/A"
+            received = ""
+
+        sender_email = values["SenderEmailAddress"] or "N/A"
+        if "/" in sender_email:
+            if values["SenderSmtpAddress"]:
+                sender_email = values["SenderSmtpAddress"]
+            else:
+                try:
+                    exch_user = row.Sender.GetExchangeUser()
+                    if exch_user:
+                        sender_email = exch_user.PrimarySmtpAddress
+                except Exception:
+                    pass
+
+        attachment_count = 0
+        attachment_names = []
+        if values["HasAttachment"]:
+            try:
+                attachments = row.Attachments
+                attachment_count = attachments.Count
+                for i in range(attachment_count):
+                    attachment_names.append(attachments.Item(i + 1).FileName)
+            except Exception:
+                attachment_count = 0
+                attachment_names = []
+
+        importance_map = {0: "Baja", 1: "Normal", 2: "Alta"}
+        preview = values["Preview"]
+        data = {
+            "subject": values["Subject"] or "Sin asunto",
+            "sender_name": values["SenderName"] or "N/A",
+            "sender_email": sender_email,
+            "to": values["To"] or "",
+            "cc": values["CC"] or "",
+            "date": date_str,
+            "time": time_str,
+            "body_preview": _preview_text(preview) if preview else self._body_preview(row),
+            "has_attachments": attachment_count > 0,
+            "attachment_count": attachment_count,
+            "attachment_names": attachment_names,
+            "importance": importance_map.get(values["Importance"], "Normal"),
+            "categories": values["Categories"] or "",
+            "size_kb": round((values["Size"] or 0) / 1024, 1),
+            "entry_id": values["EntryID"] or "",
+            "received": received,
+        }
+        if row.opened is not None:
+            data["_outlook_item"] = row.opened
+        return data
+
+    def get_detail(self, entry_id: str, store_id: Optional[str] = None) -> dict:
+        """
+        Detalle completo de un correo (solo al abrir su detalle): lo que la
+        búsqueda no trae para no descargar el mensaje entero.
+
+        Args:
+            entry_id: EntryID del correo
+            store_id: StoreID de su almacén (necesario en buzones compartidos y PST)
+
+        Returns:
+            Diccionario con entry_id, body, recipients (lista de
+            {name, address, type} con type 'Para'/'CC'/'CCO') y attachments
+            (lista de {name, size_kb})
+        """
+        if store_id:
+            item = self.client.namespace.GetItemFromID(entry_id, store_id)
+        else:
+            item = self.client.namespace.GetItemFromID(entry_id)
+        recipient_types = {1: "Para", 2: "CC", 3: "CCO"}
+        recipients = []
+        try:
+            items = item.Recipients
+            for i in range(items.Count):
+                r = items.Item(i + 1)
+                recipients.append({"name": r.Name or "", "address": r.Address or "",
+                                   "type": recipient_types.get(r.Type, "Para")})
+        except Exception:
+            pass
+        attachments = []
+        try:
+            items = item.Attachments
+            for i in range(items.Count):
+                att = items.Item(i + 1)
+                attachments.append({"name": att.FileName or "",
+                                    "size_kb": round((att.Size or 0) / 1024, 1)})
+        except Exception:
+            pass
+        return {
+            "entry_id": entry_id,
+            "body": item.Body or "",
+            "recipients": recipients,
+            "attachments": attachments,
+        }
+
+    def hydrate(self, results: list) -> list:
+        """
+        Recupera el objeto COM de los resultados que no lo tienen (p. ej.
+        cargados desde disco) usando su EntryID. Los que no se encuentran
+        quedan sin '_outlook_item'.
+        
+        Args:
+            results: Lista de resultados (se modifica en el lugar)
+            
+        Returns:
+            La misma lista
+        """
+        for r in results:
+            if r.get("_outlook_item") is None and r.get("entry_id"):
+                item = self.get_item(r)
+                if item is not None:
+                    r["_outlook_item"] = item
+        return results
+
+    def get_item(self, row: dict):
+        """
+        Objeto COM de un resultado: su '_outlook_item' o, si no lo tiene
+        (filas de disco o de un ResultStore), el que se abre por EntryID.
+        No modifica la fila.
+
+        Returns:
+            El objeto COM, o None si no se encuentra
+        """
+        item = row.get("_outlook_item")
+        if item is not None or not row.get("entry_id"):
+            return item
+        try:
+            if row.get("store_id"):
+                return self.client.namespace.GetItemFromID(row["entry_id"], row["store_id"])
+            return self.client.namespace.GetItemFromID(row["entry_id"])
+        except Exception:
+            return None
+
     def get_results_without_item(self, results: list) -> list:
         """
         Retorna los resultados sin la referencia al objeto COM (para serializar).
@@ -301,3 +900,149 @@ class EmailSearch:
             row = {k: v for k, v in r.items() if k != "_outlook_item"}
             clean.append(row)
         return clean
+
+
+class ResultCursor:
+    """
+    Posición abierta dentro de los resultados de una búsqueda.
+
+    Se crea con EmailSearch.open_cursor. Mantiene vivo el generador de
+    iter_search (y con él la colección COM y su posición) y entrega páginas
+    bajo demanda. Debe usarse siempre desde el mismo thread (el del worker).
+    """
+
+    def __init__(self, page_size: int = 100):
+        self.page_size = page_size
+        self.fetched = 0          # correos entregados hasta ahora
+        self.exhausted = False    # no quedan más resultados
+        self.cancelled = False    # la última página se detuvo por cancelación
+        self.plan = None
+        self.last_used = time.monotonic()
+        self._rows = None
+        self._searcher = None
+        self._lookahead = []
+        self._cancel_event = None
+        self._progress_callback = None
+
+    @property
+    def has_more(self) -> bool:
+        return not self.exhausted
+
+    def idle_seconds(self) -> float:
+        """Segundos desde la última página pedida."""
+        return time.monotonic() - self.last_used
+
+    def fetch(
+        self,
+        n: Optional[int] = None,
+        progress_callback: Optional[Callable] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> list:
+        """
+        Entrega la siguiente página de resultados.
+
+        Args:
+            n: Correos a entregar (por defecto page_size)
+            progress_callback: Como en iter_search, solo para esta página
+            cancel_event: Evento que detiene esta página; una búsqueda
+                          cancelada no puede continuar (el cursor se agota)
+
+        Returns:
+            Lista de diccionarios (con COM refs, como iter_search)
+        """
+        n = n or self.page_size
+        self.last_used = time.monotonic()
+        self._cancel_event = cancel_event
+        self._progress_callback = progress_callback
+        page = self._lookahead
+        self._lookahead = []
+        try:
+            # Se lee un correo de más para saber si quedan resultados
+            while len(page) <= n and not self.exhausted:
+                try:
+                    row = next(self._rows, None)
+                except Exception:
+                    self.exhausted = True
+                    raise
+                if row is None:
+                    self.exhausted = True
+                    self.cancelled = self.is_set()
+                else:
+                    page.append(row)
+        finally:
+            self._cancel_event = self._progress_callback = None
+            if self.plan is None and self._searcher is not None:
+                self.plan = self._searcher.last_plan
+        if len(page) > n:
+            self._lookahead = page[n:]
+            page = page[:n]
+        self.fetched += len(page)
+        self.last_used = time.monotonic()
+        return page
+
+    def close(self):
+        """Libera la colección COM; el cursor queda agotado."""
+        if self._rows is not None:
+            self._rows.close()
+            self._rows = None
+        self._lookahead = []
+        self.exhausted = True
+
+    # El cursor hace de cancel_event y progress_callback de su iter_search,
+    # reenviando a los de la página en curso
+
+    def is_set(self) -> bool:
+        return bool(self._cancel_event and self._cancel_event.is_set())
+
+    def _progress(self, current, message, **kwargs):
+        if self._progress_callback:
+            self._progress_callback(current, message, **kwargs)
+
+
+def _and_filters(*filters) -> str:
+    """Combina filtros '@SQL=...' con AND (los vacíos se omiten)."""
+    parts = [f[len("@SQL="):] for f in filters if f]
+    if len(parts) <= 1:
+        return f"@SQL={parts[0]}" if parts else ""
+    return "@SQL=" + " AND ".join(f"({p})" for p in parts)
+
+
+def _preview_text(text: str) -> str:
+    """Texto de vista previa: espacios normalizados, hasta PREVIEW_CHARS."""
+    return " ".join(text[:PREVIEW_CHARS * 2].split())[:PREVIEW_CHARS].rstrip()
+
+
+class _TableItem:
+    """
+    Correo de la estrategia 'table': las propiedades de TABLE_COLUMNS salen
+    de la fila de Folder.GetTable; cualquier otra (Body, Recipients,
+    Attachments...) abre el MailItem por EntryID, una sola vez.
+    """
+
+    __slots__ = ("values", "opened", "_open")
+
+    def __init__(self, row, open_item):
+        """
+        Args:
+            row: Tupla con los valores de TABLE_COLUMNS, en orden
+            open_item: Función(entry_id) que abre el MailItem
+        """
+        self.values = dict(zip(TABLE_COLUMNS.values(), row))
+        self.opened = None  # MailItem, si ya se abrió
+        self._open = open_item
+
+    def __getattr__(self, name):
+        values = self.values
+        if name in values:
+            return values[name]
+        if self.opened is None:
+            self.opened = self._open(values["EntryID"])
+        return getattr(self.opened, name)
+
+
+def _find_all(items, dasl_filter: str):
+    """Enumera las coincidencias de Items.Find/FindNext."""
+    item = items.Find(dasl_filter)
+    while item is not None:
+        yield item
+        item = items.FindNext()
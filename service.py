@@ -0,0 +1,522 @@
+"""
+Servicio local HTTP/JSON.
+Varias personas que usan el mismo perfil de Outlook pueden compartir un
+único worker COM en vez de abrir cada una su interfaz y repetir recorridos.
+Las búsquedas idénticas en curso se comparten (un solo recorrido por
+Outlook para todos los pedidos iguales) y las filas se entregan como NDJSON
+(una fila JSON por línea) a medida que se leen.
+
+    python main.py serve --port 8765 --token secreto
+    curl -H "Authorization: Bearer secreto" -H "Content-Type: application/json" \
+         -d '{"subject": "factura", "max_results": 100}' localhost:8765/search
+
+Endpoints:
+    GET  /health                    estado, cuenta y contadores del servicio
+    GET  /saved                     nombres de las búsquedas guardadas
+    POST /search                    filtros (como EmailSearch.search) -> filas NDJSON
+    POST /summary                   filtros -> resumen (reports.generate_summary)
+    POST /saved/<nombre>/refresh    actualiza una búsqueda guardada -> filas NDJSON
+    POST /export                    trabajo con el formato de 'batch' (search, csv,
+                                    xlsx, attachments) -> estadísticas JSON
+
+/search y /summary entregan hasta max_results filas (500 si el pedido no lo
+indica). Las respuestas NDJSON terminan con una línea {"done": true, "rows": n,
+"shared": bool, "seconds": s} (o {"error": "..."} si la búsqueda falló).
+Todo pedido exige 'Authorization: Bearer <token>' (si no se indica un token
+se genera uno al iniciar) y los POST, 'Content-Type: application/json': así
+una página web no puede enviar pedidos al servicio. Por defecto escucha solo
+en 127.0.0.1. Las rutas de /export son relativas al directorio de
+exportación del servicio y no pueden salir de él.
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import unquote
+
+from async_client import AsyncOutlook
+from cli import SEARCH_KEYS
+
+DEFAULT_PORT = 8765
+# Filas por lote leído del worker (y por bloque de la respuesta NDJSON)
+PAGE_SIZE = 200
+# Máximo de filas de /search y /summary cuando el pedido no indica max_results
+# (el mismo valor por defecto que 'search --max' de la línea de comandos)
+DEFAULT_MAX_RESULTS = 500
+# Filas que una búsqueda compartida guarda para quien se suma tarde: pasado
+# ese límite se descartan los lotes ya leídos y no se aceptan más lectores
+MAX_SHARED_ROWS = 2000
+# Directorio donde /export puede escribir (CSV, Excel y adjuntos)
+DEFAULT_EXPORT_DIR = os.path.join(os.path.expanduser("~"), ".outlook_search", "exportaciones")
+
+
+class SharedScan:
+    """
+    Una búsqueda en curso compartida por todos los pedidos idénticos.
+    Guarda los lotes leídos para que quien se suma tarde reciba también los
+    anteriores (hasta max_rows filas; después solo los que algún lector aún
+    no recibió), y se cancela si todos los lectores se desconectan.
+    """
+
+    def __init__(self, max_rows: int = MAX_SHARED_ROWS):
+        self.pages = []
+        self.first = 0           # número del primer lote guardado (los anteriores se descartaron)
+        self.rows = 0
+        self.max_rows = max_rows
+        self.done = False
+        self.error = None
+        self.extra = {}          # datos adicionales del final (p. ej. 'new')
+        self.readers = 0
+        self.future = None       # concurrent.futures.Future de la corrutina
+        self._positions = {}     # lector (iter_pages en curso) -> próximo lote
+        self._cond = threading.Condition()
+
+    def join(self) -> bool:
+        """
+        Suma un lector si todavía puede recibir la búsqueda desde el comienzo.
+
+        Returns:
+            False si la búsqueda terminó o ya superó max_rows filas
+        """
+        with self._cond:
+            if self.done or self.rows > self.max_rows:
+                return False
+            self.readers += 1
+            return True
+
+    def leave(self) -> int:
+        """Quita un lector; retorna cuántos quedan."""
+        with self._cond:
+            self.readers -= 1
+            self._trim()
+            return self.readers
+
+    def publish(self, page: list):
+        with self._cond:
+            self.pages.append(page)
+            self.rows += len(page)
+            self._trim()
+            self._cond.notify_all()
+
+    def _trim(self):
+        """Descarta los lotes que ya recibieron todos los lectores (pasado max_rows)."""
+        if self.rows <= self.max_rows or len(self._positions) < self.readers:
+            return  # alguien puede sumarse o no empezó a leer: se guarda todo
+        upto = min(self._positions.values(), default=self.first + len(self.pages))
+        if upto > self.first:
+            del self.pages[:upto - self.first]
+            self.first = upto
+
+    def finish(self, error: str = None, **extra):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self.extra.update(extra)
+            self._cond.notify_all()
+
+    def iter_pages(self, alive: Callable = None):
+        """
+        Lotes de filas a medida que llegan (desde el primero).
+
+        Args:
+            alive: Función que indica si el lector sigue conectado; se
+                   consulta cada segundo mientras no llegan filas
+
+        Raises:
+            RuntimeError: si la búsqueda falló
+        """
+        reader = object()
+        with self._cond:
+            self._positions[reader] = index = self.first
+        try:
+            while True:
+                with self._cond:
+                    while index >= self.first + len(self.pages) and not self.done:
+                        if not self._cond.wait(1.0) and alive is not None and not alive():
+                            return
+                    pages = self.pages[index - self.first:]
+                    index += len(pages)
+                    self._positions[reader] = index
+                    self._trim()
+                    finished = self.done and index == self.first + len(self.pages)
+                yield from pages
+                if finished:
+                    break
+        finally:
+            with self._cond:
+                del self._positions[reader]
+        if self.error:
+            raise RuntimeError(self.error)
+
+
+class SearchService:
+    """
+    Núcleo del servicio: un AsyncOutlook en un event loop propio y el
+    registro de búsquedas en curso para compartirlas.
+
+    Attributes:
+        stats: Contadores requests (pedidos), scans (recorridos reales) y
+               shared (pedidos atendidos por un recorrido ya en curso)
+    """
+
+    def __init__(self, client_factory: Optional[Callable] = None, page_size: int = PAGE_SIZE,
+                 coalesce: bool = True, export_dir: str = DEFAULT_EXPORT_DIR):
+        """
+        Args:
+            client_factory: Origen de correo (ver AsyncOutlook)
+            page_size: Filas por lote
+            coalesce: False = cada pedido hace su propio recorrido (para comparar)
+            export_dir: Único directorio donde export() puede escribir
+        """
+        self.outlook = AsyncOutlook(client_factory)
+        self.page_size = page_size
+        self.coalesce = coalesce
+        self.export_dir = os.path.realpath(export_dir)
+        self.stats = {"requests": 0, "scans": 0, "shared": 0}
+        self._inflight = {}  # clave del pedido -> SharedScan
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def start(self) -> "SearchService":
+        """
+        Inicia el event loop y el worker.
+
+        Raises:
+            ConnectionError: si no se pudo conectar al origen de correo
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="service-loop", daemon=True)
+        self._thread.start()
+        self._run(self.outlook.start())
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._run(self.outlook.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def _run(self, coro, timeout: float = None):
+        """Ejecuta una corrutina en el loop del servicio y espera su resultado."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    @property
+    def account_email(self) -> str:
+        return self.outlook.account_email
+
+    # === Búsquedas compartidas ===
+
+    def search(self, params: dict) -> tuple:
+        """
+        Búsqueda compartida con los pedidos idénticos en curso.
+
+        Returns:
+            Tupla (clave, SharedScan, compartida); llamar a release(clave,
+            scan) al terminar de leer
+        """
+        unknown = set(params) - set(SEARCH_KEYS)
+        if unknown:
+            raise ValueError(f"Parámetros de búsqueda no reconocidos: {', '.join(sorted(unknown))}")
+        return self._scan(("search", _key(params)), lambda scan: self._run_search(scan, dict(params)))
+
+    def refresh(self, name: str) -> tuple:
+        """Actualización compartida de una búsqueda guardada (ver search)."""
+        from saved_searches import SavedSearchStore
+
+        if SavedSearchStore().get(name) is None:
+            raise ValueError(f"Búsqueda guardada no encontrada: {name}")
+        return self._scan(("refresh", name), lambda scan: self._run_refresh(scan, name))
+
+    def release(self, key, scan: SharedScan):
+        """Un lector terminó; si era el último y la búsqueda sigue, se cancela."""
+        with self._lock:
+            if scan.leave() > 0 or scan.done:
+                return
+            if self._inflight.get(key) is scan:
+                del self._inflight[key]
+        scan.future.cancel()
+
+    def _scan(self, key, make_coro) -> tuple:
+        with self._lock:
+            self.stats["requests"] += 1
+            scan = self._inflight.get(key) if self.coalesce else None
+            if scan is not None and scan.join():
+                self.stats["shared"] += 1
+                return key, scan, True
+            scan = SharedScan()
+            scan.join()
+            self.stats["scans"] += 1
+            if self.coalesce:
+                self._inflight[key] = scan
+        scan.future = asyncio.run_coroutine_threadsafe(self._guard(key, scan, make_coro(scan)), self._loop)
+        return key, scan, False
+
+    async def _guard(self, key, scan: SharedScan, coro):
+        """Ejecuta el recorrido y lo retira del registro al terminar."""
+        try:
+            await coro
+        except asyncio.CancelledError:
+            scan.finish("Búsqueda cancelada")
+            raise
+        except Exception as e:
+            scan.finish(str(e))
+        else:
+            scan.finish()
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is scan:
+                    del self._inflight[key]
+
+    async def _run_search(self, scan: SharedScan, params: dict):
+        store_names = params.pop("stores", None)
+        limit = params.pop("max_results", None) or DEFAULT_MAX_RESULTS
+        if store_names:
+            from multistore import select_stores
+
+            stores = select_stores(await self.outlook.list_stores(), store_names)
+            rows, stats = await self.outlook.search_stores(stores, max_results=limit, **params)
+            scan.publish(rows)
+            scan.extra["stores"] = stats
+            return
+        count = 0
+        async for page in self.outlook.search_stream(page_size=min(self.page_size, limit), **params):
+            page = page[:limit - count]
+            count += len(page)
+            scan.publish(page)
+            if count >= limit:
+                break
+
+    async def _run_refresh(self, scan: SharedScan, name: str):
+        rows, n_new = await self.outlook.refresh_saved_search(name)
+        scan.publish(rows)
+        scan.extra["new"] = n_new
+
+    # === Exportación ===
+
+    def export(self, job: dict) -> dict:
+        """
+        Trabajo con el formato de 'batch' (search, csv, xlsx, attachments).
+        La búsqueda se comparte como en search; el CSV/Excel se escribe a
+        medida que llegan las filas y los adjuntos se exportan en el worker.
+        Las rutas son relativas a export_dir.
+
+        Raises:
+            ValueError: si una ruta sale de export_dir
+        """
+        from reports import export_rows
+
+        csv_path = self._export_path(job.get("csv"))
+        xlsx_path = self._export_path(job.get("xlsx"))
+        att_cfg = job.get("attachments")
+        if att_cfg:
+            att_cfg = dict(att_cfg, output_dir=self._export_path(att_cfg.get("output_dir") or "adjuntos"))
+        key, scan, shared = self.search(dict(job.get("search", {})))
+        with_att = []
+
+        def rows():
+            for page in scan.iter_pages():
+                for row in page:
+                    if att_cfg and row.get("has_attachments"):
+                        with_att.append(row)
+                    yield row
+
+        started = time.perf_counter()
+        try:
+            if csv_path or xlsx_path:
+                stats = export_rows(rows(), csv_path=csv_path, xlsx_path=xlsx_path)
+            else:
+                stats = {"rows": sum(1 for _ in rows()), "csv": "", "xlsx": ""}
+        finally:
+            self.release(key, scan)
+        if att_cfg:
+            stats["attachments"] = self._run(self.outlook.export_attachments(
+                with_att, att_cfg["output_dir"],
+                organize_by=att_cfg.get("organize_by", "flat"),
+                file_types=att_cfg.get("file_types"),
+            ))
+        stats["shared"] = shared
+        stats["seconds"] = round(time.perf_counter() - started, 2)
+        return stats
+
+    def _export_path(self, path: Optional[str]) -> Optional[str]:
+        """Ruta dentro de export_dir (relativa a él); ValueError si sale de ahí."""
+        if not path:
+            return None
+        full = os.path.realpath(os.path.join(self.export_dir, path))
+        if os.path.commonpath([self.export_dir, full]) != self.export_dir:
+            raise ValueError(f"Ruta fuera del directorio de exportación: {path}")
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return full
+
+
+def _key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+
+# ══════════════ HTTP ══════════════
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP (un thread por conexión) sobre un SearchService.
+    Sin token se genera uno aleatorio (atributo token).
+    """
+
+    daemon_threads = True
+    request_queue_size = 64  # conexiones en espera de accept (clientes concurrentes)
+
+    def __init__(self, service: SearchService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 token: str = None):
+        super().__init__((host, port), _Handler)
+        self.service = service
+        self.token = token or secrets.token_urlsafe(24)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # respuestas por bloques (chunked)
+    server_version = "CorreoPython"
+
+    def log_message(self, format, *args):
+        pass  # sin una línea por pedido en la consola
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        service = self.server.service
+        expected = f"Bearer {self.server.token}".encode("utf-8")
+        given = (self.headers.get("Authorization") or "").encode("utf-8")
+        if not secrets.compare_digest(given, expected):
+            self.close_connection = True  # el cuerpo no se lee
+            self._json(401, {"error": "Token inválido"})
+            return
+        # Solo JSON: los formularios de otra página no pueden enviar este tipo
+        if method == "POST" and self.headers.get_content_type() != "application/json":
+            self.close_connection = True
+            self._json(415, {"error": "Se requiere 'Content-Type: application/json'"})
+            return
+        path = self.path.split("?", 1)[0].rstrip("/")
+        try:
+            if method == "GET" and path == "/health":
+                with service._lock:
+                    inflight = len(service._inflight)
+                self._json(200, {"status": "ok", "account": service.account_email,
+                                 "inflight": inflight, **service.stats})
+            elif method == "GET" and path == "/saved":
+                from saved_searches import SavedSearchStore
+                self._json(200, {"saved": SavedSearchStore().list_names()})
+            elif method == "POST" and path == "/search":
+                self._stream(*service.search(self._body()))
+            elif method == "POST" and path == "/summary":
+                self._summary(*service.search(self._body()))
+            elif method == "POST" and path.startswith("/saved/") and path.endswith("/refresh"):
+                name = unquote(path[len("/saved/"):-len("/refresh")])
+                self._stream(*service.refresh(name))
+            elif method == "POST" and path == "/export":
+                self._json(200, service.export(self._body()))
+            else:
+                self._json(404, {"error": f"Ruta no encontrada: {method} {path}"})
+        except (ValueError, KeyError) as e:
+            self._json(400, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            self._json(500, {"error": str(e)})
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("El cuerpo debe ser un objeto JSON")
+        return data
+
+    def _json(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, key, scan: SharedScan, shared: bool):
+        """Filas NDJSON por bloques, un bloque por lote leído."""
+        service = self.server.service
+        started = time.perf_counter()
+        count = 0
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for page in scan.iter_pages(self._connected):
+                    count += len(page)
+                    self._chunk("".join(_line(row) for row in page))
+                tail = {"done": True, "rows": count, "shared": shared,
+                        "seconds": round(time.perf_counter() - started, 3), **scan.extra}
+            except RuntimeError as e:
+                tail = {"error": str(e), "rows": count}
+            self._chunk(_line(tail))
+            self.wfile.write(b"0\r\n\r\n")
+        finally:
+            service.release(key, scan)
+
+    def _summary(self, key, scan: SharedScan, shared: bool):
+        from reports import generate_summary
+
+        try:
+            rows = [row for page in scan.iter_pages() for row in page]
+        except RuntimeError as e:
+            self._json(500, {"error": str(e)})
+            return
+        finally:
+            self.server.service.release(key, scan)
+        self._json(200, {"summary": generate_summary(rows), "rows": len(rows), "shared": shared})
+
+    def _connected(self) -> bool:
+        """False si el cliente cerró la conexión (lectura vacía sin bloquear)."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return not readable or self.connection.recv(1, socket.MSG_PEEK) != b""
+        except OSError:
+            return False
+
+    def _chunk(self, text: str):
+        data = text.encode("utf-8")
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+def _line(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, client_factory: Optional[Callable] = None,
+          token: str = None, export_dir: str = DEFAULT_EXPORT_DIR, log=print):
+    """Inicia el servicio y atiende pedidos hasta Ctrl+C (sin token se genera uno)."""
+    service = SearchService(client_factory, export_dir=export_dir).start()
+    httpd = ServiceHTTPServer(service, host, port, token)
+    log(f"🌐 Servicio de búsqueda en http://{host}:{httpd.server_address[1]} "
+        f"(cuenta: {service.account_email})")
+    if not token:
+        log(f"🔑 Token: {httpd.token}")
+    log(f"📁 Exportaciones en: {service.export_dir}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        log("⏹ Deteniendo servicio...")
+    finally:
+        httpd.server_close()
+        service.stop()
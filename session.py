@@ -0,0 +1,390 @@
+"""
+Sesiones de búsqueda persistentes (resultados + estado de la tabla).
+Guarda los resultados en un archivo binario por columnas: cada columna es un
+arreglo de enteros comprimido con zlib y los textos (y demás valores) se
+guardan una sola vez en una tabla compartida, así los remitentes, carpetas y
+categorías repetidos miles de veces ocupan un entero por fila:
+
+    save_session(path, rows, state={"sort": ["date", True]}, order=positions)
+    rows = open_session(path)   # instantáneo: mmap, columnas bajo demanda
+    rows[0]                     # dict como el de la búsqueda original
+    rows.state, rows.order      # estado guardado de la tabla
+
+Al abrir, el archivo se mapea en memoria y cada columna se descomprime la
+primera vez que se lee. Las filas no traen '_outlook_item': el objeto COM se
+abre por EntryID solo cuando hace falta (detalle, exportar adjuntos).
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections.abc import Sequence
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".outlook_search")
+# Sesión que se guarda al cerrar la aplicación y se restaura al abrirla
+LAST_SESSION = os.path.join(DEFAULT_DIR, "ultima_sesion.oss")
+SESSION_SUFFIX = ".oss"
+
+_MAGIC = b"OSSESS1\n"
+_VERSION = 1
+_HEADER = struct.Struct("<I")  # largo del encabezado JSON
+_MISSING_INT = -(2 ** 63)      # fila sin la clave (columnas de enteros)
+_INT_RANGE = range(_MISSING_INT + 1, 2 ** 63)
+_LEVEL = 6
+_PAGE_ROWS = 5000  # filas que se codifican juntas al guardar
+
+
+def save_session(path: str, rows, state: dict = None, order=None) -> int:
+    """
+    Guarda filas y estado en un archivo de sesión (reemplazo atómico).
+
+    Args:
+        path: Ruta del archivo
+        rows: Resultados limpios: lista, ResultStore o SessionRows, se
+              recorren una sola vez (se ignoran las claves que empiezan con '_')
+        state: Estado serializable a JSON (parámetros, orden, filtro, ...)
+        order: Posiciones en el orden mostrado (None = orden de llegada)
+
+    Returns:
+        Tamaño del archivo en bytes
+    """
+    if isinstance(rows, SessionRows) and rows.path and _same_file(rows.path, path):
+        rows.detach()  # se va a reemplazar el archivo que está mapeado
+
+    # Las filas se recorren por páginas (un ResultStore volcado se lee del
+    # disco de a poco) y cada columna se comprime a medida que llegan
+    table, ids = [None], {}  # valores únicos (0 = fila sin la clave)
+    writers = {}             # nombre -> _ColumnWriter, en orden de aparición
+    count = with_attachments = 0
+    page = []
+    for row in rows:
+        page.append(row)
+        if len(page) >= _PAGE_ROWS:
+            with_attachments += _add_page(writers, page, count, table, ids)
+            count += len(page)
+            page = []
+    if page:
+        with_attachments += _add_page(writers, page, count, table, ids)
+        count += len(page)
+
+    blocks, columns = [], []
+    for name, writer in writers.items():
+        columns.append({"name": name, **writer.finish(blocks)})
+
+    header = {
+        "version": _VERSION,
+        "rows": count,
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "with_attachments": with_attachments,
+        "state": state or {},
+        "columns": columns,
+        "table": _block(blocks, json.dumps(table[1:], ensure_ascii=False, default=str).encode("utf-8")),
+        "order": _block(blocks, array("I", order)) if order is not None else None,
+    }
+    encoded = json.dumps(header, ensure_ascii=False, default=str).encode("utf-8")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        f.write(_HEADER.pack(len(encoded)))
+        f.write(encoded)
+        for block in blocks:
+            f.write(block)
+        size = f.tell()
+    os.replace(tmp, path)
+    return size
+
+
+def open_session(path: str) -> "SessionRows":
+    """
+    Abre un archivo de sesión sin leer las filas (ver SessionRows).
+
+    Raises:
+        ValueError: si el archivo no es una sesión válida
+    """
+    return SessionRows(path)
+
+
+class SessionRows(Sequence):
+    """
+    Filas de una sesión guardada, de solo lectura y leídas bajo demanda.
+    Se puede compartir entre la GUI y el worker (las lecturas del archivo
+    están protegidas por un lock).
+
+    Attributes:
+        path: Archivo de la sesión
+        state: Estado guardado con save_session
+        saved_at: Fecha y hora en que se guardó
+        with_attachments: Filas con adjuntos
+        spilled: Siempre 0 (compatibilidad con ResultStore)
+    """
+
+    spilled = 0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._map[:len(_MAGIC)] != _MAGIC:
+                raise ValueError("El archivo no es una sesión de búsqueda.")
+            start = len(_MAGIC) + _HEADER.size
+            (length,) = _HEADER.unpack_from(self._map, len(_MAGIC))
+            header = json.loads(self._map[start:start + length].decode("utf-8"))
+        except (ValueError, struct.error, OSError) as e:
+            self.close()
+            raise ValueError(f"Sesión inválida '{os.path.basename(path)}': {e}")
+        if header.get("version") != _VERSION:
+            self.close()
+            raise ValueError(f"Versión de sesión no soportada: {header.get('version')}")
+        self._data_start = start + length
+        self._rows = header["rows"]
+        self._columns = header["columns"]
+        self._table_block = header["table"]
+        self._order_block = header["order"]
+        self.state = header["state"]
+        self.saved_at = header["saved_at"]
+        self.with_attachments = header["with_attachments"]
+        self._decoded = {}  # columna -> arreglo descomprimido
+        self._table = None
+        self._order = None
+        self._updated = {}  # posición -> fila modificada con update_row (solo en memoria)
+
+    # === Lectura ===
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._rows))]
+        i = self._index(index)
+        updated = self._updated.get(i)
+        if updated is not None:
+            return dict(updated)
+        return self._row(self._plan(), self._values(), i)
+
+    def __iter__(self):
+        plan, table, updated = self._plan(), self._values(), self._updated
+        for i in range(self._rows):
+            row = updated.get(i)
+            yield dict(row) if row is not None else self._row(plan, table, i)
+
+    def _index(self, index: int) -> int:
+        i = index + self._rows if index < 0 else index
+        if not 0 <= i < self._rows:
+            raise IndexError("índice fuera de rango")
+        return i
+
+    def update_row(self, index: int, changes: dict):
+        """
+        Modifica campos de una fila (p. ej. el EntryID nuevo de un correo
+        movido). El cambio queda en memoria; se escribe al volver a guardar
+        la sesión.
+        """
+        i = self._index(index)
+        row = self[i]
+        row.update({k: v for k, v in changes.items() if not k.startswith("_")})
+        self._updated[i] = row
+
+    @staticmethod
+    def _row(plan, table, i) -> dict:
+        row = {}
+        for name, is_int, data in plan:
+            value = data[i]
+            if is_int:
+                if value != _MISSING_INT:
+                    row[name] = value
+            elif value:
+                value = table[value]
+                row[name] = list(value) if type(value) is list else value
+        return row
+
+    @property
+    def order(self):
+        """Posiciones en el orden guardado de la tabla (None si no se guardó)."""
+        if self._order is None and self._order_block is not None:
+            self._order = list(self._decompress(self._order_block, "I"))
+        return self._order
+
+    # === Archivo ===
+
+    def detach(self):
+        """
+        Descomprime todas las columnas y cierra el archivo. Necesario antes de
+        reemplazarlo (Windows no permite sobrescribir un archivo mapeado).
+        """
+        self._values()
+        self._plan()
+        self.order
+        self._release()
+
+    def close(self):
+        """Libera el archivo y las columnas leídas."""
+        self._release()
+        with self._lock:
+            self._decoded = {}
+            self._table = None
+
+    def _release(self):
+        with self._lock:
+            if getattr(self, "_map", None) is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _plan(self) -> list:
+        """(nombre, es entero, arreglo) de cada columna, descomprimiéndolas si falta."""
+        return [(c["name"], c["kind"] == "int", self._column(c)) for c in self._columns]
+
+    def _column(self, column: dict) -> array:
+        data = self._decoded.get(column["name"])
+        if data is None:
+            data = self._decoded[column["name"]] = self._decompress(
+                column, "q" if column["kind"] == "int" else "I")
+        return data
+
+    def _values(self) -> list:
+        if self._table is None:
+            raw = self._decompress(self._table_block, None)
+            self._table = [None] + json.loads(raw.decode("utf-8"))
+        return self._table
+
+    def _decompress(self, block: dict, typecode):
+        with self._lock:
+            if self._map is None:
+                raise ValueError("La sesión está cerrada.")
+            start = self._data_start + block["offset"]
+            raw = zlib.decompress(self._map[start:start + block["size"]])
+        if typecode is None:
+            return raw
+        data = array(typecode)
+        data.frombytes(raw)
+        if sys.byteorder == "big":
+            data.byteswap()
+        return data
+
+
+# === Codificación ===
+
+class _Absent:
+    __slots__ = ()
+
+
+_ABSENT = _Absent()  # la fila no tiene la clave (distinto de None)
+
+
+def _intern(value, table: list, ids: dict) -> int:
+    """Id del valor en la tabla compartida (lo agrega si es nuevo)."""
+    if type(value) is str:
+        found = ids.get(value)
+        if found is not None:
+            return found
+        key = value
+    else:
+        kind = type(value)
+        if kind is list and all(type(v) is str for v in value):
+            key = (kind, tuple(value))
+        elif kind in (bool, int, float, type(None)):
+            key = (kind, value)
+        else:
+            key = (kind, json.dumps(value, default=str))
+        found = ids.get(key)
+    if found is None:
+        found = ids[key] = len(table)
+        table.append(value)
+    return found
+
+
+def _same_file(a: str, b: str) -> bool:
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _block(blocks: list, data) -> dict:
+    """Agrega un bloque comprimido y retorna su posición relativa."""
+    return _append(blocks, zlib.compress(_bytes(data), _LEVEL))
+
+
+def _append(blocks: list, compressed: bytes) -> dict:
+    offset = sum(len(b) for b in blocks)
+    blocks.append(compressed)
+    return {"offset": offset, "size": len(compressed)}
+
+
+def _bytes(data) -> bytes:
+    if isinstance(data, array):
+        if sys.byteorder == "big":
+            data = array(data.typecode, data)
+            data.byteswap()
+        data = data.tobytes()
+    return data
+
+
+def _add_page(writers: dict, page: list, start: int, table: list, ids: dict) -> int:
+    """
+    Codifica una página de filas en sus columnas.
+
+    Args:
+        writers: Columnas en construcción (se agregan las nuevas)
+        page: Filas de la página
+        start: Filas ya codificadas antes de esta página
+        table, ids: Tabla compartida de valores únicos
+
+    Returns:
+        Filas de la página con adjuntos
+    """
+    shapes = dict.fromkeys(tuple(row) for row in page)  # pocas combinaciones de claves
+    for shape in shapes:
+        for name in shape:
+            if name not in writers and not name.startswith("_"):
+                writers[name] = _ColumnWriter(start)
+    for name, writer in writers.items():
+        writer.add([row.get(name, _ABSENT) for row in page], table, ids)
+    return [row.get("has_attachments") for row in page].count(True)
+
+
+class _ColumnWriter:
+    """
+    Columna en construcción. Mientras todos sus valores sean enteros se
+    guardan tal cual; si no, cada página se pasa a ids de la tabla
+    compartida y se comprime apenas llega.
+    """
+
+    def __init__(self, missing_rows: int):
+        """
+        Args:
+            missing_rows: Filas anteriores a la primera página que la trae
+        """
+        self.ints = array("q", [_MISSING_INT]) * missing_rows  # None = columna de ids
+        self._compressor = zlib.compressobj(_LEVEL)
+        self._chunks = []
+
+    def add(self, values: list, table: list, ids: dict):
+        if self.ints is not None:
+            if all(type(v) is int and v in _INT_RANGE for v in values if v is not _ABSENT):
+                self.ints.extend(_MISSING_INT if v is _ABSENT else v for v in values)
+                return
+            # Dejó de ser de enteros: lo anterior también pasa a la tabla
+            previous, self.ints = self.ints, None
+            self._refs([0 if v == _MISSING_INT else _intern(v, table, ids) for v in previous])
+        self._refs([0 if v is _ABSENT else _intern(v, table, ids) for v in values])
+
+    def _refs(self, refs: list):
+        self._chunks.append(self._compressor.compress(_bytes(array("I", refs))))
+
+    def finish(self, blocks: list) -> dict:
+        """Agrega el bloque de la columna y retorna su entrada del encabezado."""
+        if self.ints is not None:
+            return {"kind": "int", **_block(blocks, self.ints)}
+        self._chunks.append(self._compressor.flush())
+        return {"kind": "ref", **_append(blocks, b"".join(self._chunks))}
@@ -0,0 +1,101 @@
+"""
+Pruebas de bulk.py contra el Outlook simulado (python -m pytest o
+python -m unittest test_bulk).
+"""
+
+import unittest
+
+from bulk import bulk_action
+from fake_outlook import FakeOutlook, generate_mailbox
+from outlook_client import OutlookClient
+from result_store import ResultStore
+from search import EmailSearch
+
+
+def _searcher(move_changes_entry_id=False, n_items=60):
+    outlook = FakeOutlook(move_changes_entry_id=move_changes_entry_id)
+    generate_mailbox(outlook, "usuario@bancotanner.cl", n_items, seed=7)
+    client = OutlookClient(application=outlook.application)
+    return outlook, EmailSearch(client)
+
+
+class MoveTest(unittest.TestCase):
+
+    def test_move_updates_rows_when_entry_id_changes(self):
+        outlook, searcher = _searcher(move_changes_entry_id=True)
+        rows = searcher.search(folder="inbox", max_results=10)
+        old_ids = [r["entry_id"] for r in rows]
+        target = searcher.client.get_default_folder("inbox").Folders.Add("Procesadas")
+
+        stats = bulk_action(rows, "move", target, pause=0, resolve_item=searcher.get_item)
+
+        self.assertEqual(stats["done"], 10)
+        self.assertEqual(sorted(stats["updated"]), list(range(10)))
+        for old, row in zip(old_ids, rows):
+            self.assertNotEqual(row["entry_id"], old)
+            self.assertEqual(row["_outlook_item"].EntryID, row["entry_id"])
+            item = searcher.client.namespace.GetItemFromID(row["entry_id"], row["store_id"])
+            self.assertEqual(item.Parent.EntryID, target.EntryID)
+
+        # Las filas siguen sirviendo: repetir el movimiento no cambia nada
+        again = bulk_action(rows, "move", target, pause=0, resolve_item=searcher.get_item)
+        self.assertEqual((again["done"], again["unchanged"], again["errors"]), (0, 10, 0))
+
+    def test_move_updates_rows_on_disk(self):
+        outlook, searcher = _searcher(move_changes_entry_id=True, n_items=1200)
+        rows = searcher.search(folder="inbox", max_results=600)
+        store = ResultStore(searcher.get_results_without_item(rows), memory_rows=250)
+        self.assertTrue(store.spilled)
+        target = searcher.client.get_default_folder("deleted")
+
+        stats = bulk_action(store, "move", target, positions=[0, len(store) - 1],
+                            pause=0, resolve_item=searcher.get_item)
+
+        self.assertEqual(stats["done"], 2)
+        for position in (0, len(store) - 1):
+            row = store[position]
+            self.assertEqual(row["entry_id"], stats["updated"][position]["entry_id"])
+            self.assertIsNotNone(searcher.get_item(row))
+
+
+class CategorizeTest(unittest.TestCase):
+
+    def test_categories_ignore_case(self):
+        _, searcher = _searcher()
+        rows = searcher.search(folder="inbox", max_results=5)
+        bulk_action(rows, "categorize", "Revisado", pause=0, resolve_item=searcher.get_item)
+
+        stats = bulk_action(rows, "categorize", "revisado", pause=0, resolve_item=searcher.get_item)
+        self.assertEqual(stats["unchanged"], 5)
+
+        stats = bulk_action(rows, "uncategorize", "REVISADO", pause=0, resolve_item=searcher.get_item)
+        self.assertEqual(stats["done"], 5)
+        for row in rows:
+            self.assertNotIn("revisado", searcher.get_item(row).Categories.casefold())
+
+
+class FlagTest(unittest.TestCase):
+
+    def test_flag_marks_as_task(self):
+        outlook, searcher = _searcher()
+        rows = searcher.search(folder="inbox", max_results=5)
+        before = outlook.stats.snapshot()
+
+        stats = bulk_action(rows, "flag", None, pause=0, resolve_item=searcher.get_item)
+        self.assertEqual(stats["done"], 5)
+        calls = outlook.stats.snapshot()
+        self.assertEqual(calls.get("MailItem.MarkAsTask", 0) - before.get("MailItem.MarkAsTask", 0), 5)
+        self.assertNotIn("MailItem.FlagStatus=", calls)
+        self.assertTrue(all(searcher.get_item(row).IsMarkedAsTask for row in rows))
+
+        stats = bulk_action(rows, "flag", None, pause=0, resolve_item=searcher.get_item)
+        self.assertEqual(stats["unchanged"], 5)
+
+        stats = bulk_action(rows, "unflag", None, pause=0, resolve_item=searcher.get_item)
+        self.assertEqual(stats["done"], 5)
+        self.assertEqual(outlook.stats.snapshot().get("MailItem.ClearTaskFlag"), 5)
+        self.assertFalse(any(searcher.get_item(row).IsMarkedAsTask for row in rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Pruebas de imap_backend.py contra el servidor IMAP simulado (python -m
+pytest o python -m unittest test_imap).
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from fake_imap import FakeImapServer
+from imap_backend import FETCH_BATCH, ImapBackend, imap_criteria
+from search import EmailSearch
+
+P_SUBJECT = '"urn:schemas:httpmail:subject"'
+P_FROMEMAIL = '"urn:schemas:httpmail:fromemail"'
+P_SIZE = '"http://schemas.microsoft.com/mapi/proptag/0x0E080003"'
+P_RECEIVED = '"urn:schemas:httpmail:datereceived"'
+
+START = datetime(2024, 3, 1, 9, 0)
+
+
+def _message(subject, sender, body) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "ana@empresa.cl"
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg.as_bytes()
+
+
+def _server(n=250, **kwargs):
+    """Servidor con n correos: uno de cada tres es 'factura', cuerpos de largo variable."""
+    server = FakeImapServer(user="ana", password="secreta", **kwargs)
+    for i in range(n):
+        subject = f"factura {i}" if i % 3 == 0 else f"reunión {i}"
+        sender = "juan@proveedor.cl" if i % 2 == 0 else "maria@empresa.cl"
+        server.add_message("INBOX", _message(subject, sender, "x" * (i * 20 + 10)),
+                           date=START + timedelta(hours=i))
+    return server
+
+
+class TranslateTest(unittest.TestCase):
+
+    def test_exact_subject_needs_no_local_check(self):
+        key, residual = imap_criteria(f"@SQL={P_SUBJECT} LIKE '%factura%'")
+        self.assertEqual(key, 'SUBJECT "factura"')
+        self.assertIsNone(residual)
+
+    def test_sender_is_checked_locally(self):
+        key, residual = imap_criteria(f"@SQL={P_FROMEMAIL} LIKE '%juan%'")
+        self.assertEqual(key, 'FROM "juan"')
+        self.assertIsNotNone(residual)
+
+    def test_size_keeps_residual(self):
+        key, residual = imap_criteria(f"@SQL={P_SIZE} > 5000")
+        self.assertEqual(key, "LARGER 5000")
+        self.assertEqual(residual[0], "cmp")
+        key, residual = imap_criteria(f"@SQL=NOT ({P_SIZE} > 5000)")
+        self.assertEqual(key, "ALL")
+        self.assertEqual(residual[0], "not")
+
+    def test_dates_are_widened(self):
+        key, residual = imap_criteria(f"@SQL={P_RECEIVED} >= '03/10/2024 00:00'")
+        self.assertEqual(key, "SINCE 9-Mar-2024")
+        self.assertIsNotNone(residual)
+
+
+class SearchTest(unittest.TestCase):
+
+    def _search(self, server, **filters):
+        with server:
+            backend = ImapBackend("127.0.0.1", server.user, server.password, port=server.port, ssl=False)
+            try:
+                searcher = EmailSearch(backend)
+                # Las estadísticas del planificador se leen una vez por carpeta
+                searcher.planner.folder_stats(searcher.resolve_folder())
+                server.commands.clear()
+                return searcher.search(**filters)
+            finally:
+                backend.close()
+
+    def test_subject_search(self):
+        server = _server()
+        rows = self._search(server, subject="factura", max_results=500)
+
+        self.assertEqual(len(rows), 84)
+        self.assertTrue(all(r["subject"].startswith("factura") for r in rows))
+        received = [r["received"] for r in rows]
+        self.assertEqual(received, sorted(received, reverse=True))
+        self.assertEqual(server.commands["UID SORT"], 1)
+        self.assertNotIn("UID SEARCH", server.commands)
+        # Encabezados y vista previa se piden por lotes (más la lectura
+        # anticipada del lote siguiente), no uno por correo
+        self.assertLessEqual(server.commands["UID FETCH"], 2 * (len(rows) // FETCH_BATCH + 2))
+
+    def test_max_results_fetches_only_what_it_needs(self):
+        server = _server()
+        rows = self._search(server, max_results=10)
+
+        self.assertEqual([r["subject"] for r in rows], [f"{'factura' if i % 3 == 0 else 'reunión'} {i}"
+                                                       for i in range(249, 239, -1)])
+        self.assertLessEqual(server.commands["UID FETCH"], 4)
+
+    def test_sort_fallback_without_capability(self):
+        server = _server(capabilities=("IMAP4rev1", "ENABLE", "UTF8=ACCEPT"))
+        rows = self._search(server, query="from:juan", max_results=500)
+
+        self.assertEqual(len(rows), 125)
+        self.assertTrue(all(r["sender_email"] == "juan@proveedor.cl" for r in rows))
+        self.assertEqual(server.commands["UID SEARCH"], 1)
+        self.assertNotIn("UID SORT", server.commands)
+
+    def test_size_is_checked_locally(self):
+        # El servidor cuenta 2 KB de más: LARGER trae candidatos que no cumplen
+        server = _server(size_slack=2048)
+        limit = 3000
+        expected = {m.uid for m in server.mailboxes["INBOX"].messages if len(m.raw) > limit}
+        rows = self._search(server, query=f"size>{limit}B", max_results=500)
+
+        self.assertEqual(len(rows), len(expected))
+        self.assertTrue(all(r["size_kb"] * 1024 > limit - 52 for r in rows))
+        self.assertGreater(server.commands["UID SORT"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
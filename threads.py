@@ -0,0 +1,111 @@
+"""
+Agrupación de resultados por conversación.
+Lee solo las columnas necesarias de la carpeta con Folder.GetTable (en
+bloques con Table.GetArray, sin abrir cada MailItem), agrupa por
+ConversationID y devuelve una fila por hilo. Los correos de un hilo se
+abren recién al expandirlo.
+"""
+
+# Columnas leídas de la tabla (en este orden)
+THREAD_COLUMNS = (
+    "EntryID",
+    "ConversationID",
+    "ConversationTopic",
+    "SenderName",
+    "ReceivedTime",
+    "urn:schemas:httpmail:hasattachment",
+)
+
+# Filas por llamada a Table.GetArray
+TABLE_CHUNK = 500
+
+
+def read_table(folder, dasl_filter: str = "", cancel_event=None, columns=THREAD_COLUMNS,
+               first_chunk: int = None):
+    """
+    Lee las columnas de hilo de los correos de una carpeta, más recientes primero.
+
+    Args:
+        folder: Carpeta de Outlook
+        dasl_filter: Filtro '@SQL=...' (vacío = todos)
+        cancel_event: Evento opcional que detiene la lectura
+        columns: Columnas a leer (por defecto THREAD_COLUMNS)
+        first_chunk: Filas del primer GetArray (p. ej. las que se espera
+                     usar); las siguientes se leen de a TABLE_CHUNK
+
+    Yields:
+        Tuplas con los valores de las columnas
+    """
+    table = folder.GetTable(dasl_filter or "", 0)  # 0 = olUserItems
+    table_columns = table.Columns
+    table_columns.RemoveAll()
+    for name in columns:
+        table_columns.Add(name)
+    table.Sort("[ReceivedTime]", True)
+
+    chunk = min(first_chunk, TABLE_CHUNK) if first_chunk else TABLE_CHUNK
+    while not table.EndOfTable:
+        if cancel_event and cancel_event.is_set():
+            return
+        rows = table.GetArray(chunk)
+        chunk = TABLE_CHUNK
+        if not rows:
+            return
+        for row in rows:
+            yield tuple(row)
+
+
+def group_rows(rows, max_threads: int = 200, store_id: str = "") -> list:
+    """
+    Agrupa filas de read_table() en hilos.
+
+    Args:
+        rows: Iterable de tuplas (orden de THREAD_COLUMNS), más recientes primero
+        max_threads: Máximo de hilos a retornar (los más recientes)
+        store_id: StoreID de la carpeta (para abrir los correos al expandir)
+
+    Returns:
+        Lista de hilos: diccionarios con thread_id, topic, count, participants,
+        latest, date, time, has_attachments, entry_ids y store_id
+    """
+    threads = {}
+    for entry_id, conv_id, topic, sender, received, has_att in rows:
+        key = conv_id or (topic or "").lower()
+        thread = threads.get(key)
+        if thread is None:
+            if len(threads) >= max_threads:
+                continue  # hilo más antiguo que los ya retenidos
+            thread = threads[key] = {
+                "thread_id": key,
+                "topic": topic or "(Sin asunto)",
+                "count": 0,
+                "participants": [],
+                "latest": _received_text(received),
+                "date": _received_text(received, "%d-%m-%Y"),
+                "time": _received_text(received, "%H:%M:%S"),
+                "has_attachments": False,
+                "entry_ids": [],
+                "store_id": store_id,
+            }
+        thread["count"] += 1
+        thread["entry_ids"].append(entry_id)
+        if sender and sender not in thread["participants"]:
+            thread["participants"].append(sender)
+        if has_att:
+            thread["has_attachments"] = True
+
+    return list(threads.values())
+
+
+def _received_text(value, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
+    try:
+        return value.strftime(fmt)
+    except Exception:
+        return ""
+
+
+def format_participants(participants: list, limit: int = 3) -> str:
+    """Lista corta de participantes: 'Ana, Juan, Pedro +2'."""
+    shown = ", ".join(participants[:limit])
+    extra = len(participants) - limit
+    return f"{shown} +{extra}" if extra > 0 else shown